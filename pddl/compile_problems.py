@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Batch-compile level files x domain variants into PDDL problems.
+
+Every (level, domain) pair whose domain maps to a generator is written to
+`<out-dir>/<domain stem>/<level stem>.pddl`; pairs that would share an
+output file are rejected up front. Pairs run in a process pool whose
+workers import each generator once and then call it in-process; all pairs of
+one level go to the same worker so domain-matched wrappers build the level's
+facts once and derive every variant from them. A manifest in
+the output directory records input/output hashes and timings; pairs whose
+generator, level and domain are unchanged since the last run are skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, TextIO
+
+THIS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = THIS_DIR.parent
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+
+import problem_gen  # type: ignore  # noqa: E402
+from problem_gen_registry import (  # type: ignore  # noqa: E402
+    add_problem_cache_args,
+    compile_problem,
+    configure_problem_cache,
+    load_generator,
+    problem_cache_key,
+    problem_gen_for_domain,
+    variant_writers_for,
+)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+DEFAULT_OUT_DIR = REPO_ROOT / "compiled-problems"
+DEFAULT_DOMAINS = REPO_ROOT / "pddl" / "test_domains_target" / "*.pddl"
+
+
+@dataclass
+class CompileTask:
+    level: Path
+    domain: Path
+    generator: Path
+    problem_name: str
+    dest: Path
+    key: str
+    options: problem_gen.ProblemOptions = problem_gen.DEFAULT_PROBLEM_OPTIONS
+
+
+@dataclass
+class ManifestEntry:
+    level: str
+    domain: str
+    generator: str
+    problem_name: str
+    key: str
+    level_sha256: str
+    domain_sha256: str
+    problem_sha256: str = ""
+    problem_bytes: int = 0
+    compile_sec: float = 0.0
+    cache_hit: bool = False
+    status: str = "ok"
+    error: str = ""
+
+
+def _display_path(path: Path) -> str:
+    path = path.resolve()
+    return str(path.relative_to(REPO_ROOT)) if path.is_relative_to(REPO_ROOT) else str(path)
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _problem_name(level: Path) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", level.stem).strip("_") or "level"
+
+
+def _expand(raw: str, *, suffix: str) -> List[Path]:
+    """A directory (its *suffix files), a glob, or a single file."""
+    path = Path(raw)
+    if path.is_dir():
+        return sorted(path.glob(f"*{suffix}"))
+    if any(ch in raw for ch in "*?["):
+        return sorted(Path(p) for p in glob.glob(raw, recursive=True) if p.endswith(suffix))
+    return [path]
+
+
+def collect_paths(raws: Sequence[str], *, suffix: str) -> List[Path]:
+    seen: Dict[Path, None] = {}
+    for raw in raws:
+        for path in _expand(raw, suffix=suffix):
+            if not path.is_file():
+                raise FileNotFoundError(f"Not found: {path}")
+            seen.setdefault(path.resolve(), None)
+    return list(seen)
+
+
+def load_manifest(path: Path) -> Dict[str, ManifestEntry]:
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        print(f"[WARN] Ignoring unreadable manifest {path}: {exc}")
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    entries: Dict[str, ManifestEntry] = {}
+    for rel, raw in (data.get("entries") or {}).items():
+        try:
+            entries[rel] = ManifestEntry(**raw)
+        except TypeError:
+            continue
+    return entries
+
+
+def write_manifest(path: Path, entries: Dict[str, ManifestEntry]) -> None:
+    payload = {
+        "version": MANIFEST_VERSION,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entries": {rel: asdict(entries[rel]) for rel in sorted(entries)},
+    }
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def is_up_to_date(entry: Optional[ManifestEntry], task: CompileTask) -> bool:
+    if entry is None or entry.status != "ok" or entry.key != task.key:
+        return False
+    try:
+        return task.dest.stat().st_size == entry.problem_bytes
+    except OSError:
+        return False
+
+
+def _init_worker(
+    cache_dir: Optional[Path],
+    cache_max_mb: Optional[int],
+    cache_enabled: bool,
+    generators: Sequence[Path],
+) -> None:
+    configure_problem_cache(cache_dir=cache_dir, max_mb=cache_max_mb, enabled=cache_enabled)
+    # Import every generator once per worker so each task is a plain call.
+    for gen_py in generators:
+        load_generator(gen_py)
+
+
+def _compile_one(
+    task: CompileTask,
+    level_sha256: str,
+    domain_sha256: str,
+    writer: Optional[Callable[[TextIO], None]] = None,
+) -> ManifestEntry:
+    entry = ManifestEntry(
+        level=_display_path(task.level),
+        domain=_display_path(task.domain),
+        generator=_display_path(task.generator),
+        problem_name=task.problem_name,
+        key=task.key,
+        level_sha256=level_sha256,
+        domain_sha256=domain_sha256,
+    )
+    start = time.perf_counter()
+    try:
+        entry.cache_hit = compile_problem(
+            task.generator,
+            task.level,
+            task.problem_name,
+            task.dest,
+            domain=task.domain,
+            options=task.options,
+            writer=writer,
+        )
+        entry.problem_sha256 = _sha256_file(task.dest)
+        entry.problem_bytes = task.dest.stat().st_size
+    except Exception as exc:
+        entry.status = "error"
+        entry.error = str(exc)
+        task.dest.unlink(missing_ok=True)  # never leave a partial problem behind
+    entry.compile_sec = round(time.perf_counter() - start, 4)
+    return entry
+
+
+def _compile_level(tasks: Sequence[CompileTask], shas: Dict[Path, str]) -> List[ManifestEntry]:
+    """
+    Compile every task of one level (same options). Wrapper variants share one
+    fact build, which is timed into the first entry that misses the cache.
+    """
+    first = tasks[0]
+    try:
+        writers = variant_writers_for([t.generator for t in tasks], first.level, first.problem_name, first.options)
+    except Exception:
+        writers = {}  # compile one by one; each entry then reports its own error
+    return [
+        _compile_one(task, shas[task.level], shas[task.domain], writers.get(task.generator))
+        for task in tasks
+    ]
+
+
+def build_tasks(
+    levels: Sequence[Path],
+    domains: Sequence[Path],
+    out_dir: Path,
+    options: problem_gen.ProblemOptions = problem_gen.DEFAULT_PROBLEM_OPTIONS,
+) -> List[CompileTask]:
+    """
+    One task per (domain, level) pair. Raises ValueError when two pairs would
+    write the same output file (levels or domains whose names sanitize alike).
+    """
+    tasks: List[CompileTask] = []
+    by_dest: Dict[Path, CompileTask] = {}
+    for domain in domains:
+        gen_py = problem_gen_for_domain(domain)
+        if not gen_py.exists():
+            print(f"[WARN] Skipping {_display_path(domain)}: no generator ({gen_py.name} not found)")
+            continue
+        for level in levels:
+            problem_name = _problem_name(level)
+            dest = out_dir / domain.stem / f"{problem_name}.pddl"
+            other = by_dest.get(dest)
+            if other is not None:
+                raise ValueError(
+                    f"{_display_path(other.level)} ({_display_path(other.domain)}) and "
+                    f"{_display_path(level)} ({_display_path(domain)}) would both be written to "
+                    f"{domain.stem}/{problem_name}.pddl; rename one or compile them separately."
+                )
+            task = CompileTask(
+                level=level,
+                domain=domain,
+                generator=gen_py,
+                problem_name=problem_name,
+                dest=dest,
+                key=problem_cache_key(gen_py, level, problem_name, domain, options),
+                options=options,
+            )
+            by_dest[dest] = task
+            tasks.append(task)
+    return tasks
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description="Compile every (level, domain variant) pair to PDDL in parallel, skipping up-to-date pairs."
+    )
+    ap.add_argument(
+        "--levels",
+        nargs="+",
+        required=True,
+        help="Level directories, globs or .txt files (e.g. 'pddl/*.txt').",
+    )
+    ap.add_argument(
+        "--domains",
+        nargs="+",
+        default=[str(DEFAULT_DOMAINS)],
+        help=f"Domain directories, globs or .pddl files (default: {DEFAULT_DOMAINS.relative_to(REPO_ROOT)}).",
+    )
+    ap.add_argument(
+        "--out-dir",
+        type=Path,
+        default=DEFAULT_OUT_DIR,
+        help=f"Output directory (default: {DEFAULT_OUT_DIR.relative_to(REPO_ROOT)}).",
+    )
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count).")
+    ap.add_argument("--force", action="store_true", help="Recompile pairs even when the manifest says they are up to date.")
+    problem_gen.add_problem_option_args(ap)
+    add_problem_cache_args(ap)
+    args = ap.parse_args()
+
+    try:
+        levels = collect_paths(args.levels, suffix=".txt")
+        domains = collect_paths(args.domains, suffix=".pddl")
+    except FileNotFoundError as exc:
+        print(f"[ERR] {exc}")
+        return 1
+    if not levels or not domains:
+        print(f"[ERR] Nothing to compile ({len(levels)} levels, {len(domains)} domains).")
+        return 1
+
+    out_dir = args.out_dir.resolve()
+    try:
+        tasks = build_tasks(levels, domains, out_dir, problem_gen.problem_options_from_args(args))
+    except ValueError as exc:
+        print(f"[ERR] {exc}")
+        return 1
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+
+    pending: List[CompileTask] = []
+    for task in tasks:
+        rel = str(task.dest.relative_to(out_dir))
+        if args.force or not is_up_to_date(manifest.get(rel), task):
+            pending.append(task)
+    skipped = len(tasks) - len(pending)
+    print(
+        f"[INFO] {len(levels)} levels x {len(domains)} domains: "
+        f"{len(pending)} to compile, {skipped} up to date"
+    )
+
+    sha_memo: Dict[Path, str] = {}
+
+    def input_sha(path: Path) -> str:
+        if path not in sha_memo:
+            sha_memo[path] = _sha256_file(path)
+        return sha_memo[path]
+
+    groups: Dict[tuple, List[CompileTask]] = {}
+    for task in pending:
+        groups.setdefault((task.level, task.options), []).append(task)
+
+    failed = 0
+    cache_dir = args.problem_cache_dir.resolve() if args.problem_cache_dir else None
+    generators = sorted({task.generator for task in pending})
+    jobs = max(1, min(args.jobs, len(groups) or 1))
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(cache_dir, args.problem_cache_max_mb, not args.no_problem_cache, generators),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _compile_level,
+                    group,
+                    {path: input_sha(path) for task in group for path in (task.level, task.domain)},
+                ): group
+                for group in groups.values()
+            }
+            done = 0
+            for future in concurrent.futures.as_completed(futures):
+                for task, entry in zip(futures[future], future.result()):
+                    done += 1
+                    manifest[str(task.dest.relative_to(out_dir))] = entry
+                    label = f"{task.domain.stem}/{task.problem_name}"
+                    if entry.status == "ok":
+                        suffix = " (cache hit)" if entry.cache_hit else ""
+                        print(f"[INFO] [{done}/{len(pending)}] {label} {entry.compile_sec:.3f}s{suffix}")
+                    else:
+                        failed += 1
+                        print(f"[ERR] [{done}/{len(pending)}] {label}: {entry.error}")
+
+    finally:
+        write_manifest(manifest_path, manifest)
+
+    print(
+        f"[OK] {len(pending) - failed} compiled, {skipped} up to date, {failed} failed; "
+        f"manifest: {_display_path(manifest_path)}"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
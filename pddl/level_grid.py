@@ -0,0 +1,287 @@
+"""
+Compact, memoized view of a stonesngems level.
+
+Level text format (from stonesngems_cpp README):
+
+    rows|cols|max_time|required_gems|cell_0|cell_1|...|cell_{rows*cols-1}
+
+optionally preceded by `; key: value` / `# key: value` metadata lines. The
+problem generators, the planning wrappers, the validator and the benchmark
+runners all read this format; they share the one parser here so a level is
+split and classified once per process instead of once per tool.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import FrozenSet, List, NamedTuple, Tuple
+
+# ----------------------------------------------------------------------
+# HiddenCellType IDs
+# ----------------------------------------------------------------------
+
+# These values are taken from stonesngems_cpp/definitions.h
+# (enum class HiddenCellType). We only handle a subset here.
+# The 90/91 values are planner-only markers used in generated test problems
+# to distinguish the target gem without relying on comment metadata.
+STONE_IDS   = {3, 4, 48}        # Stone, StoneFalling, StoneInDirt
+STONE_FALLING_IDS = {4}         # StoneFalling
+TARGET_GEM_STATIC_ID = 90
+TARGET_GEM_FALLING_ID = 91
+TARGET_GEM_IDS = {TARGET_GEM_STATIC_ID, TARGET_GEM_FALLING_ID}
+TARGET_GEM_FALLING_IDS = {TARGET_GEM_FALLING_ID}
+GEM_IDS     = {5, 6, *TARGET_GEM_IDS}  # Diamond, DiamondFalling, marked target gems
+GEM_FALLING_IDS = {6, *TARGET_GEM_FALLING_IDS}  # DiamondFalling, marked falling target gem
+EMPTY_IDS   = {1}               # Empty
+DIRT_IDS    = {2}               # Dirt
+AGENT_IDS   = {0, 9}            # Agent, AgentInExit
+BRICK_IDS   = {
+    7, 8,                      # ExitClosed, ExitOpen
+    10, 11, 12, 13,            # Fireflies (unmodeled hazards -> solid blockers)
+    14, 15, 16, 17,            # Butterflies (unmodeled hazards -> solid blockers)
+    18, 19,                    # WallBrick, WallSteel
+    20, 21, 22,                # Magic walls (treat as solid)
+    23,                        # Blob (unmodeled growth -> solid blocker)
+}
+# Terrain that never changes during play (exits, walls, magic walls). Unlike
+# BRICK_IDS this leaves out the creatures, which move in the native engine.
+STATIC_IDS = {7, 8, 18, 19, 20, 21, 22}
+
+
+def classify_cell_id(cell_id: int):
+    """
+    Map a HiddenCellType ID to a simple content kind understood by the PDDL domain.
+
+    Returns one of: "agent", "empty", "dirt", "stone", "gem", "brick".
+
+    Raises ValueError if the ID is not recognised. Extend the sets above
+    if you want to support more elements.
+    """
+    if cell_id in AGENT_IDS:
+        return "agent"
+    if cell_id in EMPTY_IDS:
+        return "empty"
+    if cell_id in DIRT_IDS:
+        return "dirt"
+    if cell_id in STONE_IDS:
+        return "stone"
+    if cell_id in GEM_IDS:
+        return "gem"
+    if cell_id in BRICK_IDS:
+        return "brick"
+    raise ValueError(
+        f"Unsupported cell ID {cell_id}; extend the mapping in classify_cell_id()."
+    )
+
+
+# ----------------------------------------------------------------------
+# Parsed level
+# ----------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class LevelMetadata:
+    start_gem_ordinal: int | None = None
+    target_gem_ordinal: int | None = None
+
+
+class LevelHeader(NamedTuple):
+    rows: int
+    cols: int
+    max_time: int
+    required_gems: int
+
+
+@dataclass(frozen=True)
+class LevelGrid:
+    """
+    One parsed level: the header, one byte per cell ID (row-major), and the
+    indexes callers keep asking for. Instances are shared through the memo
+    caches below, so they are immutable; copy `cell_ids()` before editing.
+    """
+    rows: int
+    cols: int
+    max_time: int
+    required_gems: int
+    cells: bytes
+    metadata: LevelMetadata
+    agent_indexes: Tuple[int, ...]
+    gem_indexes: Tuple[int, ...]
+    static_indexes: FrozenSet[int]
+
+    @property
+    def header(self) -> LevelHeader:
+        return LevelHeader(self.rows, self.cols, self.max_time, self.required_gems)
+
+    def cell_ids(self) -> List[int]:
+        return list(self.cells)
+
+    def position(self, idx: int) -> Tuple[int, int]:
+        """(row, col) of a row-major cell index."""
+        return divmod(idx, self.cols)
+
+    @property
+    def gem_positions(self) -> List[Tuple[int, int]]:
+        return [divmod(idx, self.cols) for idx in self.gem_indexes]
+
+
+def split_level_text(level_text: str) -> Tuple[str, LevelMetadata]:
+    """Separate the `|`-delimited level body from its metadata comment lines."""
+    metadata: dict[str, int] = {}
+    level_lines: list[str] = []
+
+    for raw_line in level_text.splitlines():
+        stripped = raw_line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith((";", "#")):
+            body = stripped[1:].strip()
+            if ":" in body:
+                key, value = body.split(":", 1)
+                norm_key = key.strip().lower().replace("_", "-")
+                if norm_key in {"start-gem-ordinal", "target-gem-ordinal"}:
+                    metadata[norm_key] = int(value.strip())
+            continue
+        level_lines.append(stripped)
+
+    if not level_lines:
+        raise ValueError("Level input did not contain a level string.")
+
+    return "\n".join(level_lines), LevelMetadata(
+        start_gem_ordinal=metadata.get("start-gem-ordinal"),
+        target_gem_ordinal=metadata.get("target-gem-ordinal"),
+    )
+
+
+def _parse_header(fields: List[str]) -> LevelHeader:
+    if len(fields) < 4:
+        raise ValueError(
+            "Level string must have at least 4 fields: "
+            "rows|cols|max_time|required_gems|..."
+        )
+    return LevelHeader(int(fields[0]), int(fields[1]), int(fields[2]), int(fields[3]))
+
+
+LEVEL_TEXT_CACHE_SIZE = 64
+
+
+@functools.lru_cache(maxsize=LEVEL_TEXT_CACHE_SIZE)
+def parse_level_grid(level_text: str) -> LevelGrid:
+    """Parse level text (metadata lines allowed); raises ValueError when malformed."""
+    body, metadata = split_level_text(level_text)
+    parts = [p for p in body.split("|") if p.strip()]
+    header = _parse_header(parts)
+
+    cell_strs = parts[4:]
+    expected = header.rows * header.cols
+    if len(cell_strs) != expected:
+        raise ValueError(f"Expected {expected} cell IDs, got {len(cell_strs)}")
+    try:
+        cells = bytes(map(int, cell_strs))
+    except ValueError as exc:
+        raise ValueError(f"Level cell IDs must be integers in 0..255: {exc}") from exc
+
+    agents: List[int] = []
+    gems: List[int] = []
+    static: List[int] = []
+    for idx, cell_id in enumerate(cells):
+        if cell_id in AGENT_IDS:
+            agents.append(idx)
+        elif cell_id in GEM_IDS:
+            gems.append(idx)
+        elif cell_id in STATIC_IDS:
+            static.append(idx)
+
+    return LevelGrid(
+        rows=header.rows,
+        cols=header.cols,
+        max_time=header.max_time,
+        required_gems=header.required_gems,
+        cells=cells,
+        metadata=metadata,
+        agent_indexes=tuple(agents),
+        gem_indexes=tuple(gems),
+        static_indexes=frozenset(static),
+    )
+
+
+# ----------------------------------------------------------------------
+# Level files
+# ----------------------------------------------------------------------
+# Benchmarks and the validator look the same level file up many times, so
+# parsed grids are memoized per path and reused until the file's mtime or
+# size changes.
+
+LEVEL_FILE_CACHE_SIZE = 256
+HEADER_CHUNK_SIZE = 4096
+
+_LOCK = threading.Lock()
+_LEVEL_FILES: "OrderedDict[Path, Tuple[int, int, LevelGrid]]" = OrderedDict()
+
+
+def _cached_grid(path: Path, mtime_ns: int, size: int) -> LevelGrid | None:
+    with _LOCK:
+        cached = _LEVEL_FILES.get(path)
+        if cached is None or cached[0] != mtime_ns or cached[1] != size:
+            return None
+        _LEVEL_FILES.move_to_end(path)
+        return cached[2]
+
+
+def load_level_grid(path: Path) -> LevelGrid:
+    """Parsed grid for a level file, reparsed only when the file changes."""
+    path = Path(path).resolve()
+    st = path.stat()
+    grid = _cached_grid(path, st.st_mtime_ns, st.st_size)
+    if grid is not None:
+        return grid
+
+    grid = parse_level_grid(path.read_text(encoding="utf-8", errors="replace"))
+    with _LOCK:
+        _LEVEL_FILES[path] = (st.st_mtime_ns, st.st_size, grid)
+        _LEVEL_FILES.move_to_end(path)
+        while len(_LEVEL_FILES) > LEVEL_FILE_CACHE_SIZE:
+            _LEVEL_FILES.popitem(last=False)
+    return grid
+
+
+def read_level_header(path: Path) -> LevelHeader:
+    """
+    rows/cols/max_time/required_gems of a level file without reading its cells.
+
+    Uses the memoized grid when the file was already parsed; otherwise reads
+    only as many chunks as the leading comment lines and the four header
+    fields need.
+    """
+    path = Path(path).resolve()
+    st = path.stat()
+    grid = _cached_grid(path, st.st_mtime_ns, st.st_size)
+    if grid is not None:
+        return grid.header
+
+    pending = ""
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(HEADER_CHUNK_SIZE)
+            pending += chunk
+            # Drop blank and metadata lines ahead of the level body.
+            while True:
+                pending = pending.lstrip()
+                if not pending.startswith((";", "#")):
+                    break
+                newline = pending.find("\n")
+                if newline < 0:
+                    break
+                pending = pending[newline + 1:]
+            if pending and not pending.startswith((";", "#")):
+                pieces = pending.split("|")
+                # Until EOF the last piece may be a field cut off mid-chunk.
+                complete = pieces if not chunk else pieces[:-1]
+                fields = [p for p in complete if p.strip()]
+                if len(fields) >= 4 or not chunk:
+                    return _parse_header(fields)
+            if not chunk:
+                raise ValueError("Level input did not contain a level string.")
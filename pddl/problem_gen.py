@@ -10,44 +10,32 @@ where each cell_i is an integer HiddenCellType ID.
 """
 
 import argparse
+import functools
+import io
+import itertools
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
-
-# ----------------------------------------------------------------------
-# Mapping from HiddenCellType IDs to our simplified PDDL 
-
-# ----------------------------------------------------------------------
-
-# These values are taken from stonesngems_cpp/definitions.h
-# (enum class HiddenCellType). We only handle a subset here.
-# The 90/91 values are planner-only markers used in generated test problems
-# to distinguish the target gem without relying on comment metadata.
-STONE_IDS   = {3, 4, 48}        # Stone, StoneFalling, StoneInDirt
-STONE_FALLING_IDS = {4}         # StoneFalling
-TARGET_GEM_STATIC_ID = 90
-TARGET_GEM_FALLING_ID = 91
-TARGET_GEM_IDS = {TARGET_GEM_STATIC_ID, TARGET_GEM_FALLING_ID}
-TARGET_GEM_FALLING_IDS = {TARGET_GEM_FALLING_ID}
-GEM_IDS     = {5, 6, *TARGET_GEM_IDS}  # Diamond, DiamondFalling, marked target gems
-GEM_FALLING_IDS = {6, *TARGET_GEM_FALLING_IDS}  # DiamondFalling, marked falling target gem
-EMPTY_IDS   = {1}               # Empty
-DIRT_IDS    = {2}               # Dirt
-AGENT_IDS   = {0, 9}            # Agent, AgentInExit
-BRICK_IDS   = {
-    7, 8,                      # ExitClosed, ExitOpen
-    10, 11, 12, 13,            # Fireflies (unmodeled hazards -> solid blockers)
-    14, 15, 16, 17,            # Butterflies (unmodeled hazards -> solid blockers)
-    18, 19,                    # WallBrick, WallSteel
-    20, 21, 22,                # Magic walls (treat as solid)
-    23,                        # Blob (unmodeled growth -> solid blocker)
-}
-
-
-@dataclass(frozen=True)
-class LevelMetadata:
-    start_gem_ordinal: int | None = None
-    target_gem_ordinal: int | None = None
+from typing import Dict, FrozenSet, Iterable, Iterator, NamedTuple, Optional, Sequence, TextIO, Tuple, Union
+
+from level_grid import (  # noqa: F401  (re-exported for the other generators)
+    AGENT_IDS,
+    BRICK_IDS,
+    DIRT_IDS,
+    EMPTY_IDS,
+    GEM_FALLING_IDS,
+    GEM_IDS,
+    STONE_FALLING_IDS,
+    STONE_IDS,
+    TARGET_GEM_FALLING_ID,
+    TARGET_GEM_FALLING_IDS,
+    TARGET_GEM_IDS,
+    TARGET_GEM_STATIC_ID,
+    LevelMetadata,
+    classify_cell_id,
+    parse_level_grid,
+    split_level_text,
+)
 
 
 @dataclass(frozen=True)
@@ -61,31 +49,6 @@ class PreparedLevel:
     target_gem_pos: tuple[int, int] | None
     initial_got_gem: bool
 
-def classify_cell_id(cell_id: int):
-    """
-    Map a HiddenCellType ID to a simple content kind understood by the PDDL domain.
-
-    Returns one of: "agent", "empty", "dirt", "stone", "gem", "brick".
-
-    Raises ValueError if the ID is not recognised. Extend the sets above
-    if you want to support more elements.
-    """
-    if cell_id in AGENT_IDS:
-        return "agent"
-    if cell_id in EMPTY_IDS:
-        return "empty"
-    if cell_id in DIRT_IDS:
-        return "dirt"
-    if cell_id in STONE_IDS:
-        return "stone"
-    if cell_id in GEM_IDS:
-        return "gem"
-    if cell_id in BRICK_IDS:
-        return "brick"
-    raise ValueError(
-        f"Unsupported cell ID {cell_id}; extend the mapping in classify_cell_id()."
-    )
-
 # ----------------------------------------------------------------------
 # Level parsing and PDDL generation
 # ----------------------------------------------------------------------
@@ -94,54 +57,18 @@ def parse_level_string(level_str: str):
     """
     Parse a |-delimited stonesngems level string.
 
-    Returns (rows, cols, max_time, required_gems, cell_ids).
+    Returns (rows, cols, max_time, required_gems, cell_ids); cell_ids is a
+    fresh list the caller may edit.
     """
-    parts = [p for p in level_str.strip().split("|") if p != ""]
-    if len(parts) < 4:
-        raise ValueError(
-            "Level string must have at least 4 fields: "
-            "rows|cols|max_time|required_gems|..."
-        )
-
-    rows = int(parts[0])
-    cols = int(parts[1])
-    max_time = int(parts[2])
-    required_gems = int(parts[3])
-
-    cell_strs = parts[4:]
-    expected = rows * cols
-    if len(cell_strs) != expected:
-        raise ValueError(f"Expected {expected} cell IDs, got {len(cell_strs)}")
-
-    cell_ids = [int(s) for s in cell_strs]
-    return rows, cols, max_time, required_gems, cell_ids
+    grid = parse_level_grid(level_str)
+    if grid.metadata != LevelMetadata():
+        # Callers of this raw form would silently drop the start/target gem.
+        raise ValueError("Gem ordinal metadata needs prepare_level(); this generator reads the bare level string.")
+    return grid.rows, grid.cols, grid.max_time, grid.required_gems, grid.cell_ids()
 
 
 def parse_level_text(level_text: str) -> tuple[str, LevelMetadata]:
-    metadata: dict[str, int] = {}
-    level_lines: list[str] = []
-
-    for raw_line in level_text.splitlines():
-        stripped = raw_line.strip()
-        if not stripped:
-            continue
-        if stripped.startswith((";", "#")):
-            body = stripped[1:].strip()
-            if ":" in body:
-                key, value = body.split(":", 1)
-                norm_key = key.strip().lower().replace("_", "-")
-                if norm_key in {"start-gem-ordinal", "target-gem-ordinal"}:
-                    metadata[norm_key] = int(value.strip())
-            continue
-        level_lines.append(raw_line.strip())
-
-    if not level_lines:
-        raise ValueError("Level input did not contain a level string.")
-
-    return "\n".join(level_lines), LevelMetadata(
-        start_gem_ordinal=metadata.get("start-gem-ordinal"),
-        target_gem_ordinal=metadata.get("target-gem-ordinal"),
-    )
+    return split_level_text(level_text)
 
 
 def _pick_gem_position(gem_positions, ordinal: int, field_name: str):
@@ -153,7 +80,8 @@ def _pick_gem_position(gem_positions, ordinal: int, field_name: str):
 
 
 def prepare_level(level_text: str, level_metadata: LevelMetadata | None = None) -> PreparedLevel:
-    parsed_level_text, inline_metadata = parse_level_text(level_text)
+    grid = parse_level_grid(level_text)
+    inline_metadata = grid.metadata
     if level_metadata is None:
         level_metadata = inline_metadata
     else:
@@ -170,27 +98,21 @@ def prepare_level(level_text: str, level_metadata: LevelMetadata | None = None)
             ),
         )
 
-    rows, cols, max_time, required_gems, parsed_cell_ids = parse_level_string(parsed_level_text)
-    cell_ids = list(parsed_cell_ids)
-
-    agent_pos = None
-    gem_positions = []
-    explicit_target_gem_positions = []
-    for idx, cell_id in enumerate(cell_ids):
-        r = idx // cols
-        c = idx % cols
-        kind = classify_cell_id(cell_id)
-        if kind == "agent":
-            if agent_pos is not None:
-                raise ValueError("Multiple agent cells found; this script expects exactly one.")
-            agent_pos = (r, c)
-        elif kind == "gem":
-            gem_positions.append((r, c))
-            if cell_id in TARGET_GEM_IDS:
-                explicit_target_gem_positions.append((r, c))
-
-    if agent_pos is None:
+    rows, cols, max_time, required_gems = grid.header
+    # Reject unsupported IDs up front; each distinct ID only needs one check.
+    for cell_id in dict.fromkeys(grid.cells):
+        classify_cell_id(cell_id)
+    if len(grid.agent_indexes) > 1:
+        raise ValueError("Multiple agent cells found; this script expects exactly one.")
+    if not grid.agent_indexes:
         raise ValueError("No agent found in level (no cell with ID in AGENT_IDS).")
+
+    cell_ids = grid.cell_ids()
+    agent_pos = grid.position(grid.agent_indexes[0])
+    gem_positions = grid.gem_positions
+    explicit_target_gem_positions = [
+        grid.position(idx) for idx in grid.gem_indexes if grid.cells[idx] in TARGET_GEM_IDS
+    ]
     if len(explicit_target_gem_positions) > 1:
         raise ValueError(
             "Multiple target gem markers found; this script expects at most one marked target gem."
@@ -229,10 +151,8 @@ def prepare_level(level_text: str, level_metadata: LevelMetadata | None = None)
         if target_gem_pos == agent_pos:
             initial_got_gem = True
     else:
-        current_gem_positions = []
-        for idx, cell_id in enumerate(cell_ids):
-            if classify_cell_id(cell_id) == "gem":
-                current_gem_positions.append((idx // cols, idx % cols))
+        # A start-gem swap turns that gem into the agent; every other gem stays put.
+        current_gem_positions = [pos for pos in gem_positions if pos != agent_pos]
         target_gem_pos = select_target_gem_position(agent_pos, current_gem_positions)
 
     return PreparedLevel(
@@ -277,79 +197,434 @@ def select_target_gem_position(agent_pos, gem_positions):
         ),
     )
 
-def generate_pddl_problem(
-    level_str: str,
-    problem_name: str = "level-1",
-    domain_name: str = "mine-tick-gravity",
-    agent_name: str = "player",
+# ----------------------------------------------------------------------
+# Streaming problem writer
+# ----------------------------------------------------------------------
+
+def iter_object_line(names: Iterable[str], type_name: str | None = None) -> Iterator[str]:
+    """Yield one `:objects` line in pieces so huge grids never build it whole."""
+    yield "    "
+    for i, name in enumerate(names):
+        yield name if i == 0 else f" {name}"
+    yield f" - {type_name}\n" if type_name else "\n"
+
+
+class Fact(NamedTuple):
+    """
+    One init or goal literal.
+
+    `(pred a b)` by default, `(not (pred a b))` when negated, and
+    `(= (pred a b) value)` when value is set (numeric fluents).
+    """
+    predicate: str
+    args: Tuple[str, ...] = ()
+    negated: bool = False
+    value: Optional[int] = None
+
+
+def render_fact(fact: Fact) -> str:
+    predicate, args, negated, value = fact
+    if value is None and not negated:
+        return f"    ({predicate} {' '.join(args)})\n" if args else f"    ({predicate})\n"
+    atom = f"({predicate} {' '.join(args)})" if args else f"({predicate})"
+    if value is not None:
+        return f"    (= {atom} {value})\n"
+    if negated:
+        return f"    (not {atom})\n"
+    return f"    {atom}\n"
+
+
+BLOCK_PREDICATES: Dict[str, FrozenSet[str]] = {
+    "adjacency": frozenset({"up", "down", "right-of"}),
+    "scan-chain": frozenset({"first-cell", "last-cell", "next-cell"}),
+    "cell-coordinates": frozenset({"cx", "cy"}),
+}
+
+
+@dataclass(frozen=True)
+class FactBlock:
+    """
+    A run of facts that depends only on the grid shape.
+
+    `anchor` is the left_void object for adjacency and coordinates, and the
+    optional scan-chain tail for the scan chain.
+    """
+    kind: str
+    rows: int
+    cols: int
+    anchor: Optional[str] = None
+
+    @property
+    def predicates(self) -> FrozenSet[str]:
+        return BLOCK_PREDICATES[self.kind]
+
+    def facts(self) -> Iterator[Fact]:
+        if self.kind == "adjacency":
+            return iter_adjacency_facts(self.rows, self.cols, self.anchor or "left_void")
+        if self.kind == "scan-chain":
+            return iter_scan_chain_facts(self.rows, self.cols, self.anchor)
+        if self.kind == "cell-coordinates":
+            return iter_cell_coordinate_fluents(self.rows, self.cols, self.anchor or "left_void")
+        raise ValueError(f"Unknown fact block kind: {self.kind}")
+
+    @property
+    def text(self) -> str:
+        return _render_block(self)
+
+
+InitItem = Union[Fact, FactBlock]
+
+
+@dataclass(frozen=True)
+class FactFilter:
+    """
+    Per-domain adaptation applied while rendering.
+
+    Predicates are renamed first, then dropped if the (renamed) head is in
+    `drop`. Both are dict/set lookups, so adapting a problem costs one pass no
+    matter how many predicates a variant touches.
+    """
+    drop: FrozenSet[str] = frozenset()
+    rename: Dict[str, str] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return bool(self.drop or self.rename)
+
+    def apply(self, fact: Fact) -> Optional[Fact]:
+        predicate = self.rename.get(fact.predicate, fact.predicate)
+        if predicate in self.drop:
+            return None
+        if predicate != fact.predicate:
+            return fact._replace(predicate=predicate)
+        return fact
+
+
+def iter_rendered_facts(items: Iterable[InitItem], fact_filter: Optional[FactFilter] = None) -> Iterator[str]:
+    """Render facts and shape blocks, applying `fact_filter` on the way through."""
+    if not fact_filter:
+        for item in items:
+            yield item.text if isinstance(item, FactBlock) else render_fact(item)
+        return
+
+    touched = fact_filter.drop | fact_filter.rename.keys()
+    for item in items:
+        if isinstance(item, FactBlock):
+            if not (item.predicates & touched):
+                # Untouched blocks keep their cached text.
+                yield item.text
+                continue
+            if all(fact_filter.rename.get(p, p) in fact_filter.drop for p in item.predicates):
+                continue
+            facts: Iterable[Fact] = item.facts()
+        else:
+            facts = (item,)
+        for fact in facts:
+            kept = fact_filter.apply(fact)
+            if kept is not None:
+                yield render_fact(kept)
+
+
+def iter_lean_init(items: Iterable[InitItem]) -> Iterator[InitItem]:
+    """Init items minus `(not ...)` literals, which a closed-world :init never needs."""
+    for item in items:
+        if isinstance(item, FactBlock) or not item.negated:
+            yield item
+
+
+def write_problem(
+    out: TextIO,
+    *,
+    problem_name: str,
+    domain_name: str,
+    objects: Iterable[str],
+    init: Iterable[InitItem],
+    goal: Iterable[Fact],
+    requirements: str | None = None,
+    init_header: Iterable[str] = ("  (= (total-cost) 0)\n",),
+    blank_before_close: bool = False,
+    fact_filter: Optional[FactFilter] = None,
+    options: Optional["ProblemOptions"] = None,
+) -> None:
+    """
+    Write a problem to `out` section by section.
+
+    `objects` and `init_header` are newline-terminated text chunks; `init` and
+    `goal` are structured facts that pass through `fact_filter` and are
+    rendered as they stream, so nothing larger than one fact (or one cached
+    shape block) is held at a time. `options.lean_init` drops negated init
+    literals; negated goals are kept.
+    """
+    if options is not None and options.lean_init:
+        init = iter_lean_init(init)
+    _write_rendered_problem(
+        out,
+        problem_name=problem_name,
+        domain_name=domain_name,
+        requirements=requirements,
+        objects=objects,
+        init_header=init_header,
+        init_lines=iter_rendered_facts(init, fact_filter),
+        goal_lines=iter_rendered_facts(goal, fact_filter),
+        blank_before_close=blank_before_close,
+    )
+
+
+def _write_rendered_problem(
+    out: TextIO,
+    *,
+    problem_name: str,
+    domain_name: str,
+    requirements: str | None,
+    objects: Iterable[str],
+    init_header: Iterable[str],
+    init_lines: Iterable[str],
+    goal_lines: Iterable[str],
+    blank_before_close: bool,
+) -> None:
+    out.write(f"(define (problem {problem_name})\n")
+    out.write(f"  (:domain {domain_name})\n")
+    if requirements:
+        out.write(f"  (:requirements {requirements})\n")
+    out.write("  (:objects\n")
+    out.writelines(objects)
+    out.write("  )\n")
+    out.write("  (:init\n")
+    out.writelines(init_header)
+    out.writelines(init_lines)
+    out.write("  )\n")
+    out.write("  (:goal\n")
+    out.write("  (and\n")
+    out.writelines(goal_lines)
+    out.write("  ))\n")
+    out.write("  (:metric minimize (total-cost))\n")
+    if blank_before_close:
+        out.write("\n")
+    out.write(")\n")
+
+
+# (facts of the base level, facts of the variant) for one agent-at fact or one
+# interior cell's content run.
+FactPatch = Tuple[Tuple[Fact, ...], Tuple[Fact, ...]]
+
+
+def content_patches(base: PreparedLevel, variant: PreparedLevel) -> Optional[list[FactPatch]]:
+    """
+    The agent-at and cell-content runs that differ between two prepared levels
+    of the same shape, or None when they differ in anything else (shape or an
+    initial got-gem).
+
+    This is what start/target-gem variants of one level change: the agent
+    moves, the start gem becomes the agent, and the target-gem fact moves.
+    """
+    if (base.rows, base.cols) != (variant.rows, variant.cols):
+        return None
+    if base.initial_got_gem or variant.initial_got_gem:
+        return None
+    patches: list[FactPatch] = []
+    if base.agent_pos != variant.agent_pos:
+        patches.append((
+            (Fact("agent-at", (interior_cell_name(*base.agent_pos),)),),
+            (Fact("agent-at", (interior_cell_name(*variant.agent_pos),)),),
+        ))
+
+    cols = base.cols
+    changed = {idx for idx, (a, b) in enumerate(zip(base.cell_ids, variant.cell_ids)) if a != b}
+    for pos in (base.target_gem_pos, variant.target_gem_pos):
+        if pos is not None:
+            changed.add(pos[0] * cols + pos[1])
+    for idx in sorted(changed):
+        pos = divmod(idx, cols)
+        cname = interior_cell_name(*pos)
+        old = tuple(iter_interior_cell_facts(cname, base.cell_ids[idx], pos == base.target_gem_pos))
+        new = tuple(iter_interior_cell_facts(cname, variant.cell_ids[idx], pos == variant.target_gem_pos))
+        if old != new:
+            patches.append((old, new))
+    return patches
+
+
+def _apply_patches(
+    init_text: str,
+    patches: Sequence[FactPatch],
+    fact_filter: Optional[FactFilter],
+    lean_init: bool,
 ) -> str:
+    """Splice each patch's rendered replacement over its unique base run."""
+    edits = []
+    for old, new in patches:
+        old_text = "".join(iter_rendered_facts(iter_lean_init(old) if lean_init else old, fact_filter))
+        new_text = "".join(iter_rendered_facts(iter_lean_init(new) if lean_init else new, fact_filter))
+        at = init_text.find(old_text) if old_text else -1
+        if at < 0 or init_text.find(old_text, at + 1) >= 0:
+            raise ValueError(f"Patch does not match exactly one init run: {old_text.strip()!r}")
+        edits.append((at, at + len(old_text), new_text))
+    edits.sort()
+    pieces = []
+    pos = 0
+    for start, end, new_text in edits:
+        if start < pos:
+            raise ValueError("Overlapping init patches.")
+        pieces.append(init_text[pos:start])
+        pieces.append(new_text)
+        pos = end
+    pieces.append(init_text[pos:])
+    return "".join(pieces)
+
+
+@dataclass(frozen=True)
+class ProblemParts:
     """
-    Generate a full PDDL problem text from a level string.
+    A generator's sections for one level, collected once so several domain
+    variants can be written from them.
+
+    The problem and domain names, the per-variant FactFilter and lean_init are
+    applied at write time, so one ProblemParts serves every variant that shares
+    its generator. Shape blocks stay FactBlocks (cached text); only the
+    per-level content facts are held in memory. The rendered :init/:goal text
+    is kept per distinct filter, since several variants often adapt the same
+    facts the same way and differ only in their domain name.
+
+    `content_patchable` marks generators whose level-dependent init facts are
+    just agent-at, got-gem and the iter_cell_content_facts runs (with the full
+    scan chain); write() can then apply content_patches to derive a same-shape
+    level's problem from these parts.
     """
-    prepared = prepare_level(level_str)
-    rows = prepared.rows
-    cols = prepared.cols
-    max_time = prepared.max_time
-    required_gems = prepared.required_gems
-    cell_ids = list(prepared.cell_ids)
-    target_gem_pos = prepared.target_gem_pos
-
-    # Pad with a 1-cell brick border so physics never steps outside.
+    objects: str
+    init: Tuple[InitItem, ...]
+    goal: Tuple[Fact, ...]
+    requirements: str | None = None
+    init_header: Tuple[str, ...] = ("  (= (total-cost) 0)\n",)
+    blank_before_close: bool = False
+    content_patchable: bool = False
+    _rendered: Dict[tuple, Tuple[str, str]] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    @classmethod
+    def collect(
+        cls,
+        *,
+        objects: Iterable[str],
+        init: Iterable[InitItem],
+        goal: Iterable[Fact],
+        **kwargs,
+    ) -> "ProblemParts":
+        """Materialize the keyword arguments a generator would pass to write_problem."""
+        if "init_header" in kwargs:
+            kwargs["init_header"] = tuple(kwargs["init_header"])
+        return cls(objects="".join(objects), init=tuple(init), goal=tuple(goal), **kwargs)
+
+    def _rendered_facts(self, fact_filter: Optional[FactFilter], lean_init: bool) -> Tuple[str, str]:
+        fact_filter = fact_filter or FactFilter()
+        key = (fact_filter.drop, tuple(sorted(fact_filter.rename.items())), lean_init)
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            init = iter_lean_init(self.init) if lean_init else self.init
+            rendered = (
+                "".join(iter_rendered_facts(init, fact_filter)),
+                "".join(iter_rendered_facts(self.goal, fact_filter)),
+            )
+            self._rendered[key] = rendered
+        return rendered
+
+    def can_patch(self, options: Optional["ProblemOptions"] = None) -> bool:
+        # A dynamic scan chain follows the stones and gems, so it is not local.
+        return self.content_patchable and (options is None or options.scan_chain == "full")
+
+    def write(
+        self,
+        out: TextIO,
+        *,
+        problem_name: str,
+        domain_name: str,
+        fact_filter: Optional[FactFilter] = None,
+        options: Optional["ProblemOptions"] = None,
+        patches: Sequence[FactPatch] = (),
+    ) -> None:
+        """
+        Write the problem; `patches` (from content_patches) turn it into the
+        problem of a variant level. Raises ValueError if a patch does not match
+        exactly one run of the rendered :init, so callers can fall back to a
+        full build.
+        """
+        lean_init = options is not None and options.lean_init
+        init_text, goal_text = self._rendered_facts(fact_filter, lean_init)
+        if patches:
+            if not self.can_patch(options):
+                raise ValueError("These problem parts cannot be patched with the given options.")
+            init_text = _apply_patches(init_text, patches, fact_filter, lean_init)
+        _write_rendered_problem(
+            out,
+            problem_name=problem_name,
+            domain_name=domain_name,
+            requirements=self.requirements,
+            objects=(self.objects,),
+            init_header=self.init_header,
+            init_lines=(init_text,),
+            goal_lines=(goal_text,),
+            blank_before_close=self.blank_before_close,
+        )
+
+
+def iter_interior_cell_names(rows: int, cols: int) -> Iterator[str]:
+    for r in range(rows):
+        for c in range(cols):
+            yield interior_cell_name(r, c)
+
+
+def iter_border_cell_names(rows: int, cols: int) -> Iterator[str]:
     padded_rows = rows + 2
     padded_cols = cols + 2
+    for r in range(padded_rows):
+        for c in range(padded_cols):
+            if r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1:
+                yield cell_name(r, c)
 
-    # Build grid of object names (includes border)
-    cells = [[cell_name(r, c) for c in range(padded_cols)] for r in range(padded_rows)]
-    interior_cells = [interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    border_cells = [
-        cell_name(r, c)
-        for r in range(padded_rows)
-        for c in range(padded_cols)
-        if r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
-    ]
-    left_void = "left_void"
-    border_cells.append(left_void)
-
-    # Find agent and classify contents
-    contents = {}  # (r, c) -> kind
-    falling_cells = set()
-
-    for idx, cell_id in enumerate(cell_ids):
-        r = idx // cols
-        c = idx % cols
-        kind = classify_cell_id(cell_id)
-        contents[(r, c)] = kind
-        if cell_id in STONE_FALLING_IDS or cell_id in GEM_FALLING_IDS:
-            falling_cells.add((r, c))
-    agent_pos = prepared.agent_pos
-
-    # Shift agent into padded coordinates
-    padded_agent_pos = (agent_pos[0] + 1, agent_pos[1] + 1)
-
-    # ------------------------------------------------------------------
-    # :objects
-    # ------------------------------------------------------------------
-    obj_lines = []
-    obj_lines.append(f"    {' '.join(interior_cells)} - real-cell")
-    obj_lines.append(f"    {' '.join(border_cells)} - border-cell")
-
-    # ------------------------------------------------------------------
-    # :init
-    # ------------------------------------------------------------------
-    init_lines = []
-
-    # High-level flags
-    init_lines.append("    (agent-alive)")
-    if prepared.initial_got_gem:
-        init_lines.append("    (got-gem)")
 
+def iter_typed_grid_objects(rows: int, cols: int, extra_border_cells=("left_void",)) -> Iterator[str]:
+    yield from iter_object_line([interior_cell_names_text(rows, cols)], "real-cell")
+    yield from iter_object_line(
+        itertools.chain([border_cell_names_text(rows, cols)], extra_border_cells),
+        "border-cell",
+    )
 
-    # Agent position
-    ar, ac = padded_agent_pos
-    init_lines.append(f"    (agent-at {cell_name(ar, ac)})")
 
+def iter_interior_cell_facts(cname: str, cell_id: int, is_target: bool = False) -> Iterator[Fact]:
+    """
+    real-cell marker and contents of one interior cell.
 
-    # Cell contents
+    The run always starts with the cell's own real-cell fact, so its rendered
+    text occurs once per problem; content_patches relies on that.
+    """
+    yield Fact("real-cell", (cname,))
+    inner_kind = classify_cell_id(cell_id)
+    if inner_kind == "agent":
+        # Treat underlying cell as empty for physics
+        yield Fact("empty", (cname,), negated=True)
+    elif inner_kind == "empty":
+        yield Fact("empty", (cname,))
+    elif inner_kind == "dirt":
+        yield Fact("dirt", (cname,))
+    elif inner_kind == "stone":
+        yield Fact("stone", (cname,))
+    elif inner_kind == "gem":
+        yield Fact("gem", (cname,))
+        if is_target:
+            yield Fact("target-gem", (cname,))
+    elif inner_kind == "brick":
+        yield Fact("brick", (cname,))
+    if cell_id in STONE_FALLING_IDS or cell_id in GEM_FALLING_IDS:
+        yield Fact("falling", (cname,))
+
+
+def iter_cell_content_facts(
+    rows: int,
+    cols: int,
+    cell_ids,
+    target_gem_pos=None,
+    initial_got_gem: bool = False,
+) -> Iterator[Fact]:
+    """Border/real-cell markers and contents for every padded grid cell."""
+    padded_rows = rows + 2
+    padded_cols = cols + 2
+    target = None if initial_got_gem else target_gem_pos
     for r in range(padded_rows):
         for c in range(padded_cols):
             cname = cell_name(r, c)
@@ -357,96 +632,297 @@ def generate_pddl_problem(
                 r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
             )
             if is_border:
-                init_lines.append(f"    (border-cell {cname})")
-                init_lines.append(f"    (not (empty {cname}))")
-
+                yield Fact("border-cell", (cname,))
+                yield Fact("empty", (cname,), negated=True)
                 continue
+            yield from iter_interior_cell_facts(
+                cname,
+                cell_ids[(r - 1) * cols + (c - 1)],
+                (r - 1, c - 1) == target,
+            )
+
 
-            init_lines.append(f"    (real-cell {cname})")
-            inner_kind = contents[(r - 1, c - 1)]
-            if inner_kind == "agent":
-                # Treat underlying cell as empty for physics
-                init_lines.append(f"    (not (empty {cname}))")
-            elif inner_kind == "empty":
-                init_lines.append(f"    (empty {cname})")
-            elif inner_kind == "dirt":
-                init_lines.append(f"    (dirt {cname})")
-            elif inner_kind == "stone":
-                init_lines.append(f"    (stone {cname})")
-            elif inner_kind == "gem":
-                init_lines.append(f"    (gem {cname})")
-                if (r - 1, c - 1) == target_gem_pos and not prepared.initial_got_gem:
-                    init_lines.append(f"    (target-gem {cname})")
-            elif inner_kind == "brick":
-                init_lines.append(f"    (brick {cname})")
-            if (r - 1, c - 1) in falling_cells:
-                init_lines.append(f"    (falling {cname})")
-
-    init_lines.append(f"    (border-cell {left_void})")
-    init_lines.append(f"    (not (empty {left_void}))")
-
-
-    # Adjacency predicates: up, down, right-of (left via reverse right-of).
+def iter_adjacency_facts(rows: int, cols: int, left_void: str = "left_void") -> Iterator[Fact]:
+    """up/down/right-of over the padded grid (left via reverse right-of)."""
+    padded_rows = rows + 2
+    padded_cols = cols + 2
     for r in range(padded_rows):
         for c in range(padded_cols):
             cname = cell_name(r, c)
             # up: from this cell to the one above (this -> above)
             if r > 0:
-                above = cell_name(r - 1, c)
-                init_lines.append(f"    (up {cname} {above})")
+                yield Fact("up", (cname, cell_name(r - 1, c)))
             # down: from this to below (this -> below)
             if r < padded_rows - 1:
-                below = cell_name(r + 1, c)
-                init_lines.append(f"    (down {cname} {below})")
+                yield Fact("down", (cname, cell_name(r + 1, c)))
             # right-of: left -> right
             if c == 0:
-                init_lines.append(f"    (right-of {left_void} {cname})")
+                yield Fact("right-of", (left_void, cname))
             else:
-                left = cell_name(r, c - 1)
-                init_lines.append(f"    (right-of {left} {cname})")
+                yield Fact("right-of", (cell_name(r, c - 1), cname))
+
+
+def iter_scan_chain_facts(
+    rows: int,
+    cols: int,
+    tail: str | None = None,
+    cells: Sequence[tuple[int, int]] | None = None,
+) -> Iterator[Fact]:
+    """
+    Scan order: top-left to bottom-right over interior cells only, optionally
+    followed by a sentinel `tail` cell that becomes the last-cell.
+
+    `cells` restricts the chain to those interior cells (level coordinates, in
+    scan order); by default every interior cell is scanned.
+    """
+    if cells is None:
+        cells = [(r, c) for r in range(rows) for c in range(cols)]
+    names = [interior_cell_name(r, c) for r, c in cells]
+    last = tail if tail is not None else names[-1]
+    yield Fact("first-cell", (names[0],))
+    yield Fact("last-cell", (last,))
+    for prev, here in zip(names, names[1:]):
+        yield Fact("next-cell", (prev, here))
+    if tail is not None:
+        yield Fact("next-cell", (names[-1], tail))
+
+
+def dynamic_scan_cells(rows: int, cols: int, cell_ids) -> list[tuple[int, int]]:
+    """
+    Interior cells, in scan order, that can ever hold a stone or gem.
+
+    Stones and gems only move down (falling) or sideways (rolling, pushing),
+    and brick cells never change, so the closure of the initial stone/gem cells
+    under down/left/right moves through non-brick cells bounds every position a
+    falling object can reach. Sealed pockets and the rows above every object
+    drop out. The closure already contains every non-brick cell directly below
+    a member, so the landing cells a fall writes to are always scanned.
+    Levels without any stone or gem keep a one-cell chain so moves can still
+    start a tick.
+    """
+    open_cells = [classify_cell_id(cell_id) != "brick" for cell_id in cell_ids]
+    stack = [
+        divmod(idx, cols)
+        for idx, cell_id in enumerate(cell_ids)
+        if classify_cell_id(cell_id) in ("stone", "gem")
+    ]
+    reachable = set(stack)
+    while stack:
+        r, c = stack.pop()
+        for nr, nc in ((r + 1, c), (r, c - 1), (r, c + 1)):
+            if 0 <= nr < rows and 0 <= nc < cols and (nr, nc) not in reachable and open_cells[nr * cols + nc]:
+                reachable.add((nr, nc))
+                stack.append((nr, nc))
+    return sorted(reachable) or [(0, 0)]
+
+
+SCAN_CHAIN_MODES = ("full", "dynamic")
+
+
+@dataclass(frozen=True)
+class ProblemOptions:
+    """Opt-in generator variations; the defaults reproduce the historical output."""
+    scan_chain: str = "full"
+    # Drop negated :init literals; closed-world semantics already imply them.
+    lean_init: bool = False
+
+    def __post_init__(self) -> None:
+        if self.scan_chain not in SCAN_CHAIN_MODES:
+            raise ValueError(
+                f"Unknown scan_chain mode {self.scan_chain!r}; expected one of {', '.join(SCAN_CHAIN_MODES)}."
+            )
+
+    def cli_args(self) -> list[str]:
+        """Flags that reproduce these options on a generator command line."""
+        args = ["--scan-chain", self.scan_chain] if self.scan_chain != "full" else []
+        if self.lean_init:
+            args.append("--lean-init")
+        return args
+
+
+DEFAULT_PROBLEM_OPTIONS = ProblemOptions()
+
+
+def add_problem_option_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--scan-chain",
+        choices=SCAN_CHAIN_MODES,
+        default="full",
+        help=(
+            "Scanner chain cells: 'full' links every interior cell, 'dynamic' only "
+            "the cells a stone or gem can ever reach (default: full)."
+        ),
+    )
+    parser.add_argument(
+        "--lean-init",
+        action="store_true",
+        help=(
+            "Leave out closed-world-redundant (not ...) init literals; domain-matched "
+            "wrappers also drop numeric fluents the domain never references."
+        ),
+    )
+
+
+def problem_options_from_args(args: argparse.Namespace) -> ProblemOptions:
+    return ProblemOptions(scan_chain=args.scan_chain, lean_init=args.lean_init)
+
+
+def scan_chain_items(
+    rows: int,
+    cols: int,
+    cell_ids,
+    options: ProblemOptions | None = None,
+    tail: str | None = None,
+) -> Iterator[InitItem]:
+    """The scan chain for `options`: the cached full block or a per-level dynamic chain."""
+    options = options or DEFAULT_PROBLEM_OPTIONS
+    if options.scan_chain == "dynamic":
+        yield from iter_scan_chain_facts(rows, cols, tail, cells=dynamic_scan_cells(rows, cols, cell_ids))
+    else:
+        yield scan_chain_block(rows, cols, tail)
+
+
+def iter_cell_coordinate_fluents(rows: int, cols: int, left_void: str = "left_void") -> Iterator[Fact]:
+    """(= (cx c) r) / (= (cy c) c) for every padded cell; left_void sits at (-1, -1)."""
+    for r in range(rows + 2):
+        for c in range(cols + 2):
+            cname = cell_name(r, c)
+            yield Fact("cx", (cname,), value=r)
+            yield Fact("cy", (cname,), value=c)
+    yield Fact("cx", (left_void,), value=-1)
+    yield Fact("cy", (left_void,), value=-1)
+
+
+# ----------------------------------------------------------------------
+# Memoized topology
+# ----------------------------------------------------------------------
+# Adjacency, the scan chain, cx/cy fluents and the cell object names depend
+# only on the grid shape. Generators yield them as FactBlocks, which render
+# once per shape and are written as a single cached chunk unless a FactFilter
+# touches one of their predicates; per-level work is then just the content
+# facts. A benchmark sweep touches few distinct shapes, so a small LRU bound
+# keeps memory flat.
+TOPOLOGY_CACHE_SIZE = 16
+
 
-    # Scan order: top-left to bottom-right over interior cells only
-    order = [interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    first = order[0]
-    last = order[-1]
-    init_lines.append(f"    (first-cell {first})")
-    init_lines.append(f"    (last-cell {last})")
+@functools.lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def interior_cell_names_text(rows: int, cols: int) -> str:
+    return " ".join(iter_interior_cell_names(rows, cols))
 
-    for i in range(len(order) - 1):
-        init_lines.append(f"    (next-cell {order[i]} {order[i+1]})")
+
+@functools.lru_cache(maxsize=TOPOLOGY_CACHE_SIZE)
+def border_cell_names_text(rows: int, cols: int) -> str:
+    return " ".join(iter_border_cell_names(rows, cols))
+
+
+def adjacency_block(rows: int, cols: int, left_void: str = "left_void") -> FactBlock:
+    return FactBlock("adjacency", rows, cols, left_void)
+
+
+def scan_chain_block(rows: int, cols: int, tail: Optional[str] = None) -> FactBlock:
+    return FactBlock("scan-chain", rows, cols, tail)
+
+
+def cell_coordinate_block(rows: int, cols: int, left_void: str = "left_void") -> FactBlock:
+    return FactBlock("cell-coordinates", rows, cols, left_void)
+
+
+@functools.lru_cache(maxsize=TOPOLOGY_CACHE_SIZE * len(BLOCK_PREDICATES))
+def _render_block(block: FactBlock) -> str:
+    return "".join(map(render_fact, block.facts()))
+
+
+def _iter_init(prepared: PreparedLevel, options: ProblemOptions | None = None) -> Iterator[InitItem]:
+    left_void = "left_void"
+
+    # High-level flags
+    yield Fact("agent-alive")
+    if prepared.initial_got_gem:
+        yield Fact("got-gem")
+
+    # Agent position, shifted into padded coordinates
+    ar, ac = prepared.agent_pos[0] + 1, prepared.agent_pos[1] + 1
+    yield Fact("agent-at", (cell_name(ar, ac),))
+
+    yield from iter_cell_content_facts(
+        prepared.rows,
+        prepared.cols,
+        prepared.cell_ids,
+        prepared.target_gem_pos,
+        prepared.initial_got_gem,
+    )
+    yield Fact("border-cell", (left_void,))
+    yield Fact("empty", (left_void,), negated=True)
+
+    yield adjacency_block(prepared.rows, prepared.cols, left_void)
+    yield from scan_chain_items(prepared.rows, prepared.cols, prepared.cell_ids, options)
 
     # Note: no scan-at in the initial state; a move-* action will start a tick.
 
-    # ------------------------------------------------------------------
-    # :goal
-    # ------------------------------------------------------------------
-    # Simple default: eventually get a gem
-    goal_lines = ["    (got-gem)", 
-                  "    (not (update-required))", 
-                  "    (not (crushed))", 
-                  "    (agent-alive)"]
-
-    # Assemble full PDDL
-    pddl = f"""\
-(define (problem {problem_name})
-  (:domain {domain_name})
-  (:requirements :typing :negative-preconditions :action-costs)
-  (:objects
-{chr(10).join(obj_lines)}
-  )
-  (:init
-  (= (total-cost) 0)
-{chr(10).join(init_lines)}
-  )
-  (:goal
-  (and
-{chr(10).join(goal_lines)}
-  ))
-  (:metric minimize (total-cost))
 
+# Simple default: eventually get a gem
+GOAL_FACTS = (
+    Fact("got-gem"),
+    Fact("update-required", negated=True),
+    Fact("crushed", negated=True),
+    Fact("agent-alive"),
 )
-"""
-    return pddl
+
+
+def write_pddl_problem(
+    out: TextIO,
+    level_str: str,
+    problem_name: str = "level-1",
+    domain_name: str = "mine-tick-gravity",
+    agent_name: str = "player",
+    fact_filter: FactFilter | None = None,
+    options: ProblemOptions | None = None,
+) -> None:
+    """
+    Stream a full PDDL problem for a level string to a file-like object.
+
+    `fact_filter` adapts the facts to a domain variant while rendering;
+    `options` selects opt-in generator variations such as the scan chain mode.
+    """
+    write_problem(
+        out,
+        problem_name=problem_name,
+        domain_name=domain_name,
+        fact_filter=fact_filter,
+        options=options,
+        **_problem_sections(level_str, options),
+    )
+
+
+def _problem_sections(level_str: str, options: ProblemOptions | None = None) -> dict:
+    prepared = prepare_level(level_str)
+    return dict(
+        requirements=":typing :negative-preconditions :action-costs",
+        objects=iter_typed_grid_objects(prepared.rows, prepared.cols),
+        init=_iter_init(prepared, options),
+        goal=GOAL_FACTS,
+        blank_before_close=True,
+    )
+
+
+def build_problem_parts(level_str: str, options: ProblemOptions | None = None) -> ProblemParts:
+    """The level's sections, reusable across domain variants (see ProblemParts)."""
+    return ProblemParts.collect(content_patchable=True, **_problem_sections(level_str, options))
+
+
+def generate_pddl_problem(
+    level_str: str,
+    problem_name: str = "level-1",
+    domain_name: str = "mine-tick-gravity",
+    agent_name: str = "player",
+    options: ProblemOptions | None = None,
+) -> str:
+    """
+    Generate a full PDDL problem text from a level string.
+    """
+    buf = io.StringIO()
+    write_pddl_problem(buf, level_str, problem_name, domain_name, agent_name, options=options)
+    return buf.getvalue()
 
 def main():
     parser = argparse.ArgumentParser(
@@ -471,6 +947,7 @@ def main():
         default="player",
         help="Name of the agent object (default: player)."
     )
+    add_problem_option_args(parser)
     args = parser.parse_args()
 
     # --------------------------------------------------
@@ -497,6 +974,7 @@ def main():
             problem_name=args.problem_name,
             domain_name=args.domain_name,
             agent_name=args.agent_name,
+            options=problem_options_from_args(args),
         )
     except Exception as e:
         sys.stderr.write(f"Error: {e}\n")
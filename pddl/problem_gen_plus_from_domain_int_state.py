@@ -4,8 +4,11 @@
 from __future__ import annotations
 
 import argparse
+import io
+import itertools
 import sys
 from pathlib import Path
+from typing import Iterator, TextIO
 
 THIS_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(THIS_DIR))
@@ -49,43 +52,15 @@ def _state_for_cell_id(cell_id: int) -> int:
     raise ValueError(f"Unsupported cell ID {cell_id}; extend _state_for_cell_id().")
 
 
-def generate_compact_problem(level_str: str, problem_name: str, domain_name: str) -> str:
-    rows, cols, _max_time, _required_gems, cell_ids = base.parse_level_string(level_str)
-
+def _iter_init(rows: int, cols: int, cell_ids, options: base.ProblemOptions | None = None) -> Iterator[base.InitItem]:
     padded_rows = rows + 2
     padded_cols = cols + 2
-
-    interior_cells = [_interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    border_cells = [
-        _cell_name(r, c)
-        for r in range(padded_rows)
-        for c in range(padded_cols)
-        if r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
-    ]
     left_void = "left_void"
-    border_cells.append(left_void)
-
-    contents = {}
-    agent_pos = None
-
-    for idx, cell_id in enumerate(cell_ids):
-        r = idx // cols
-        c = idx % cols
-        state = _state_for_cell_id(cell_id)
-        contents[(r, c)] = state
-        if state == 0:
-            if agent_pos is not None:
-                raise ValueError("Multiple agent cells found; expected exactly one.")
-            agent_pos = (r, c)
-
-    if agent_pos is None:
-        raise ValueError("No agent found in level.")
 
-    init_lines = []
-    init_lines.append("    (agent-alive)")
-    init_lines.append("    (scan-complete)")
-    init_lines.append("    (= (sim-time) 0)")
-    init_lines.append("    (= (tick) 0)")
+    yield base.Fact("agent-alive")
+    yield base.Fact("scan-complete")
+    yield base.Fact("sim-time", value="0")
+    yield base.Fact("tick", value="0")
 
     for r in range(padded_rows):
         for c in range(padded_cols):
@@ -93,69 +68,78 @@ def generate_compact_problem(level_str: str, problem_name: str, domain_name: str
             is_border = r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
 
             if is_border:
-                init_lines.append(f"    (border-cell {cname})")
-                init_lines.append(f"    (= (cell-state {cname}) 19)")
-                init_lines.append(f"    (= (last-updated-tick {cname}) 0)")
+                yield base.Fact("border-cell", (cname,))
+                yield base.Fact("cell-state", (cname,), value="19")
+                yield base.Fact("last-updated-tick", (cname,), value="0")
                 continue
 
-            init_lines.append(f"    (real-cell {cname})")
-            state = contents[(r - 1, c - 1)]
-            init_lines.append(f"    (= (cell-state {cname}) {state})")
-            init_lines.append(f"    (= (last-updated-tick {cname}) 0)")
+            yield base.Fact("real-cell", (cname,))
+            state = _state_for_cell_id(cell_ids[(r - 1) * cols + (c - 1)])
+            yield base.Fact("cell-state", (cname,), value=state)
+            yield base.Fact("last-updated-tick", (cname,), value="0")
 
-    init_lines.append(f"    (border-cell {left_void})")
-    init_lines.append(f"    (= (cell-state {left_void}) 19)")
-    init_lines.append(f"    (= (last-updated-tick {left_void}) 0)")
+    yield base.Fact("border-cell", (left_void,))
+    yield base.Fact("cell-state", (left_void,), value="19")
+    yield base.Fact("last-updated-tick", (left_void,), value="0")
 
-    for r in range(padded_rows):
-        for c in range(padded_cols):
-            here = _cell_name(r, c)
-            if r > 0:
-                init_lines.append(f"    (up {here} {_cell_name(r - 1, c)})")
-            if r < padded_rows - 1:
-                init_lines.append(f"    (down {here} {_cell_name(r + 1, c)})")
-            if c == 0:
-                init_lines.append(f"    (right-of {left_void} {here})")
-            else:
-                init_lines.append(f"    (right-of {_cell_name(r, c - 1)} {here})")
-
-    order = [_interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    if order:
-        init_lines.append(f"    (first-cell {order[0]})")
-        init_lines.append(f"    (last-cell {order[-1]})")
-        for i in range(len(order) - 1):
-            init_lines.append(f"    (next-cell {order[i]} {order[i + 1]})")
+    yield base.adjacency_block(rows, cols, left_void)
+    yield from base.scan_chain_items(rows, cols, cell_ids, options)
 
     for c in range(cols):
-        init_lines.append(f"    (bottom {_interior_cell_name(r=rows - 1, c=c)})")
-
-    obj_lines = [f"    {' '.join(interior_cells + border_cells)}"]
-
-    goal_lines = [
-        "    (got-gem)",
-        "    (scan-complete)",
-        "    (not (crushed))",
-        "    (agent-alive)",
-    ]
-
-    pddl = f"""\
-(define (problem {problem_name})
-  (:domain {domain_name})
-  (:objects
-{chr(10).join(obj_lines)}
-  )
-  (:init
-  (= (total-cost) 0)
-{chr(10).join(init_lines)}
-  )
-  (:goal
-  (and
-{chr(10).join(goal_lines)}
-  ))
-  (:metric minimize (total-cost))
+        yield base.Fact("bottom", (_interior_cell_name(r=rows - 1, c=c),))
+
+
+GOAL_FACTS = (
+    base.Fact("got-gem"),
+    base.Fact("scan-complete"),
+    base.Fact("crushed", negated=True),
+    base.Fact("agent-alive"),
 )
-"""
-    return pddl
+
+
+def write_compact_problem(
+    out: TextIO,
+    level_str: str,
+    problem_name: str,
+    domain_name: str,
+    fact_filter: base.FactFilter | None = None,
+    options: base.ProblemOptions | None = None,
+) -> None:
+    rows, cols, _max_time, _required_gems, cell_ids = base.parse_level_string(level_str)
+
+    # Validate the agent up front so errors surface before anything is written.
+    agent_count = sum(1 for cell_id in cell_ids if _state_for_cell_id(cell_id) == 0)
+    if agent_count > 1:
+        raise ValueError("Multiple agent cells found; expected exactly one.")
+    if agent_count == 0:
+        raise ValueError("No agent found in level.")
+
+    objects = itertools.chain(
+        [base.interior_cell_names_text(rows, cols)],
+        [base.border_cell_names_text(rows, cols)],
+        ["left_void"],
+    )
+    base.write_problem(
+        out,
+        problem_name=problem_name,
+        domain_name=domain_name,
+        objects=base.iter_object_line(objects),
+        init=_iter_init(rows, cols, cell_ids, options),
+        goal=GOAL_FACTS,
+        fact_filter=fact_filter,
+        options=options,
+    )
+
+
+def generate_compact_problem(
+    level_str: str,
+    problem_name: str,
+    domain_name: str,
+    options: base.ProblemOptions | None = None,
+) -> str:
+    buf = io.StringIO()
+    write_compact_problem(buf, level_str, problem_name, domain_name, options=options)
+    return buf.getvalue()
 
 
 def main() -> int:
@@ -163,6 +147,7 @@ def main() -> int:
     ap.add_argument("level_input", help="Level string or .txt path")
     ap.add_argument("-p", "--problem-name", default="")
     ap.add_argument("-d", "--domain-name", default="mine-tick-gravity-plus-from-domain-int-state")
+    base.add_problem_option_args(ap)
     args = ap.parse_args()
 
     if not args.problem_name:
@@ -170,7 +155,12 @@ def main() -> int:
 
     try:
         level_str = _read_level(args.level_input)
-        pddl = generate_compact_problem(level_str, args.problem_name, args.domain_name)
+        pddl = generate_compact_problem(
+            level_str,
+            args.problem_name,
+            args.domain_name,
+            options=base.problem_options_from_args(args),
+        )
     except Exception as exc:
         sys.stderr.write(f"Error: {exc}\n")
         return 1
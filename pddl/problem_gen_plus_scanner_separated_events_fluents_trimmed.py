@@ -4,8 +4,11 @@
 from __future__ import annotations
 
 import argparse
+import io
+import itertools
 import sys
 from pathlib import Path
+from typing import Iterator, TextIO
 
 THIS_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(THIS_DIR))
@@ -27,24 +30,8 @@ def _interior_cell_name(r: int, c: int) -> str:
     return _cell_name(r + 1, c + 1)
 
 
-def generate_compact_problem(level_str: str, problem_name: str, domain_name: str) -> str:
-    rows, cols, _max_time, _required_gems, cell_ids = base.parse_level_string(level_str)
-
-    padded_rows = rows + 2
-    padded_cols = cols + 2
-
-    interior_cells = [_interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    border_cells = [
-        _cell_name(r, c)
-        for r in range(padded_rows)
-        for c in range(padded_cols)
-        if r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
-    ]
-    left_void = "left_void"
-    border_cells.append(left_void)
-
-    contents = {}
-    falling_cells = set()
+def _locate_entities(rows: int, cols: int, cell_ids):
+    """Return (agent_pos, stone_positions, gem_positions) in level coordinates."""
     agent_pos = None
     stone_positions = []
     gem_positions = []
@@ -53,9 +40,6 @@ def generate_compact_problem(level_str: str, problem_name: str, domain_name: str
         r = idx // cols
         c = idx % cols
         kind = base.classify_cell_id(cell_id)
-        contents[(r, c)] = kind
-        if cell_id in base.STONE_FALLING_IDS or cell_id in base.GEM_FALLING_IDS:
-            falling_cells.add((r, c))
         if kind == "agent":
             if agent_pos is not None:
                 raise ValueError("Multiple agent cells found; expected exactly one.")
@@ -67,140 +51,114 @@ def generate_compact_problem(level_str: str, problem_name: str, domain_name: str
 
     if agent_pos is None:
         raise ValueError("No agent found in level.")
-    target_gem_pos = base.select_target_gem_position(agent_pos, gem_positions)
-    target_gem_index = gem_positions.index(target_gem_pos) if target_gem_pos is not None else None
+    return agent_pos, stone_positions, gem_positions
 
+
+def _iter_init(rows: int, cols: int, cell_ids, agent_pos, stone_positions, gem_positions, target_gem_index, options: base.ProblemOptions | None = None) -> Iterator[base.InitItem]:
+    left_void = "left_void"
     agent_obj = "agent_0"
-    stone_objs = [f"stone_{i}" for i in range(len(stone_positions))]
-    gem_objs = [f"gem_{i}" for i in range(len(gem_positions))]
-    target_gem_obj = gem_objs[target_gem_index] if target_gem_index is not None else None
 
-    init_lines = []
-    init_lines.append("    (agent-alive)")
-    init_lines.append("    (scan-complete)")
-    init_lines.append(f"    (agent-entity {agent_obj})")
+    yield base.Fact("agent-alive")
+    yield base.Fact("scan-complete")
+    yield base.Fact("agent-entity", (agent_obj,))
 
     ar, ac = agent_pos[0] + 1, agent_pos[1] + 1
     agent_cell = _cell_name(ar, ac)
-    init_lines.append(f"    (agent-at {agent_cell})")
-    init_lines.append(f"    (agent-at-obj {agent_obj} {agent_cell})")
-    init_lines.append(f"    (= (x {agent_obj}) {ar})")
-    init_lines.append(f"    (= (y {agent_obj}) {ac})")
+    yield base.Fact("agent-at", (agent_cell,))
+    yield base.Fact("agent-at-obj", (agent_obj, agent_cell))
+    yield base.Fact("x", (agent_obj,), value=ar)
+    yield base.Fact("y", (agent_obj,), value=ac)
 
-    for stone_obj, (r, c) in zip(stone_objs, stone_positions):
+    for i, (r, c) in enumerate(stone_positions):
+        stone_obj = f"stone_{i}"
         pr, pc = r + 1, c + 1
         cell = _cell_name(pr, pc)
-        init_lines.append(f"    (stone-entity {stone_obj})")
-        init_lines.append(f"    (stone-at {stone_obj} {cell})")
-        init_lines.append(f"    (= (x {stone_obj}) {pr})")
-        init_lines.append(f"    (= (y {stone_obj}) {pc})")
+        yield base.Fact("stone-entity", (stone_obj,))
+        yield base.Fact("stone-at", (stone_obj, cell))
+        yield base.Fact("x", (stone_obj,), value=pr)
+        yield base.Fact("y", (stone_obj,), value=pc)
 
-    for gem_obj, (r, c) in zip(gem_objs, gem_positions):
+    for i, (r, c) in enumerate(gem_positions):
+        gem_obj = f"gem_{i}"
         pr, pc = r + 1, c + 1
         cell = _cell_name(pr, pc)
-        init_lines.append(f"    (gem-entity {gem_obj})")
-        init_lines.append(f"    (gem-at {gem_obj} {cell})")
-        if gem_obj == target_gem_obj:
-            init_lines.append(f"    (target-gem-entity {gem_obj})")
-        init_lines.append(f"    (= (x {gem_obj}) {pr})")
-        init_lines.append(f"    (= (y {gem_obj}) {pc})")
-
-    for r in range(padded_rows):
-        for c in range(padded_cols):
-            cname = _cell_name(r, c)
-            init_lines.append(f"    (= (cx {cname}) {r})")
-            init_lines.append(f"    (= (cy {cname}) {c})")
-    init_lines.append(f"    (= (cx {left_void}) -1)")
-    init_lines.append(f"    (= (cy {left_void}) -1)")
-
-    for r in range(padded_rows):
-        for c in range(padded_cols):
-            cname = _cell_name(r, c)
-            is_border = r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
-
-            if is_border:
-                init_lines.append(f"    (border-cell {cname})")
-                init_lines.append(f"    (not (empty {cname}))")
-                continue
-
-            init_lines.append(f"    (real-cell {cname})")
-            kind = contents[(r - 1, c - 1)]
-
-            if kind == "agent":
-                init_lines.append(f"    (not (empty {cname}))")
-            elif kind == "empty":
-                init_lines.append(f"    (empty {cname})")
-            elif kind == "dirt":
-                init_lines.append(f"    (dirt {cname})")
-            elif kind == "stone":
-                init_lines.append(f"    (stone {cname})")
-            elif kind == "gem":
-                init_lines.append(f"    (gem {cname})")
-            elif kind == "brick":
-                init_lines.append(f"    (brick {cname})")
-
-            if (r - 1, c - 1) in falling_cells:
-                init_lines.append(f"    (falling {cname})")
-
-    init_lines.append(f"    (border-cell {left_void})")
-    init_lines.append(f"    (not (empty {left_void}))")
-
-    for r in range(padded_rows):
-        for c in range(padded_cols):
-            here = _cell_name(r, c)
-            if r > 0:
-                init_lines.append(f"    (up {here} {_cell_name(r - 1, c)})")
-            if r < padded_rows - 1:
-                init_lines.append(f"    (down {here} {_cell_name(r + 1, c)})")
-            if c == 0:
-                init_lines.append(f"    (right-of {left_void} {here})")
-            else:
-                init_lines.append(f"    (right-of {_cell_name(r, c - 1)} {here})")
-
-    order = [_interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    if order:
-        init_lines.append(f"    (first-cell {order[0]})")
-        init_lines.append(f"    (last-cell {order[-1]})")
-        for i in range(len(order) - 1):
-            init_lines.append(f"    (next-cell {order[i]} {order[i + 1]})")
-
-    obj_lines = []
-    obj_lines.append(f"    {' '.join(interior_cells + border_cells)} - cell")
-    obj_lines.append(f"    {agent_obj} - agent")
-    if stone_objs:
-        obj_lines.append(f"    {' '.join(stone_objs)} - stone")
-    normal_gem_objs = [gem_obj for gem_obj in gem_objs if gem_obj != target_gem_obj]
+        yield base.Fact("gem-entity", (gem_obj,))
+        yield base.Fact("gem-at", (gem_obj, cell))
+        if i == target_gem_index:
+            yield base.Fact("target-gem-entity", (gem_obj,))
+        yield base.Fact("x", (gem_obj,), value=pr)
+        yield base.Fact("y", (gem_obj,), value=pc)
+
+    yield base.cell_coordinate_block(rows, cols, left_void)
+
+    yield from base.iter_cell_content_facts(rows, cols, cell_ids)
+    yield base.Fact("border-cell", (left_void,))
+    yield base.Fact("empty", (left_void,), negated=True)
+
+    yield base.adjacency_block(rows, cols, left_void)
+    yield from base.scan_chain_items(rows, cols, cell_ids, options)
+
+
+def _iter_objects(rows: int, cols: int, stone_count: int, gem_count: int, target_gem_index) -> Iterator[str]:
+    cells = itertools.chain(
+        [base.interior_cell_names_text(rows, cols)],
+        [base.border_cell_names_text(rows, cols)],
+        ["left_void"],
+    )
+    yield from base.iter_object_line(cells, "cell")
+    yield "    agent_0 - agent\n"
+    if stone_count:
+        yield from base.iter_object_line((f"stone_{i}" for i in range(stone_count)), "stone")
+    normal_gem_objs = [f"gem_{i}" for i in range(gem_count) if i != target_gem_index]
     if normal_gem_objs:
-        obj_lines.append(f"    {' '.join(normal_gem_objs)} - gem")
-    if target_gem_obj is not None:
-        obj_lines.append(f"    {target_gem_obj} - target-gem")
-
-    goal_lines = [
-        "    (got-gem)",
-        "    (scan-complete)",
-        "    (not (crushed))",
-        "    (agent-alive)",
-    ]
-
-    pddl = f"""\
-(define (problem {problem_name})
-  (:domain {domain_name})
-  (:objects
-{chr(10).join(obj_lines)}
-  )
-  (:init
-  (= (total-cost) 0)
-  (= (sim-time) 0)
-{chr(10).join(init_lines)}
-  )
-  (:goal
-  (and
-{chr(10).join(goal_lines)}
-  ))
-  (:metric minimize (total-cost))
+        yield from base.iter_object_line(normal_gem_objs, "gem")
+    if target_gem_index is not None:
+        yield f"    gem_{target_gem_index} - target-gem\n"
+
+
+GOAL_FACTS = (
+    base.Fact("got-gem"),
+    base.Fact("scan-complete"),
+    base.Fact("crushed", negated=True),
+    base.Fact("agent-alive"),
 )
-"""
-    return pddl
+
+
+def write_compact_problem(
+    out: TextIO,
+    level_str: str,
+    problem_name: str,
+    domain_name: str,
+    fact_filter: base.FactFilter | None = None,
+    options: base.ProblemOptions | None = None,
+) -> None:
+    rows, cols, _max_time, _required_gems, cell_ids = base.parse_level_string(level_str)
+    agent_pos, stone_positions, gem_positions = _locate_entities(rows, cols, cell_ids)
+    target_gem_pos = base.select_target_gem_position(agent_pos, gem_positions)
+    target_gem_index = gem_positions.index(target_gem_pos) if target_gem_pos is not None else None
+
+    base.write_problem(
+        out,
+        problem_name=problem_name,
+        domain_name=domain_name,
+        objects=_iter_objects(rows, cols, len(stone_positions), len(gem_positions), target_gem_index),
+        init_header=("  (= (total-cost) 0)\n", "  (= (sim-time) 0)\n"),
+        init=_iter_init(rows, cols, cell_ids, agent_pos, stone_positions, gem_positions, target_gem_index, options),
+        goal=GOAL_FACTS,
+        fact_filter=fact_filter,
+        options=options,
+    )
+
+
+def generate_compact_problem(
+    level_str: str,
+    problem_name: str,
+    domain_name: str,
+    options: base.ProblemOptions | None = None,
+) -> str:
+    buf = io.StringIO()
+    write_compact_problem(buf, level_str, problem_name, domain_name, options=options)
+    return buf.getvalue()
 
 
 def main() -> int:
@@ -208,6 +166,7 @@ def main() -> int:
     ap.add_argument("level_input", help="Level string or .txt path")
     ap.add_argument("-p", "--problem-name", default="")
     ap.add_argument("-d", "--domain-name", default="mine-tick-gravity-plus-scanner-separated-events-fluents-trimmed")
+    base.add_problem_option_args(ap)
     args = ap.parse_args()
 
     if not args.problem_name:
@@ -215,7 +174,12 @@ def main() -> int:
 
     try:
         level_str = _read_level(args.level_input)
-        pddl = generate_compact_problem(level_str, args.problem_name, args.domain_name)
+        pddl = generate_compact_problem(
+            level_str,
+            args.problem_name,
+            args.domain_name,
+            options=base.problem_options_from_args(args),
+        )
     except Exception as exc:
         sys.stderr.write(f"Error: {exc}\n")
         return 1
@@ -10,7 +10,8 @@ from pathlib import Path
 THIS_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(THIS_DIR))
 
-from problem_gen_plus_from_domain_int_state import generate_compact_problem  # type: ignore  # noqa: E402
+import problem_gen as base  # type: ignore  # noqa: E402
+from problem_gen_plus_from_domain_int_state import generate_compact_problem, write_compact_problem  # type: ignore  # noqa: E402,F401
 
 
 def _read_level(level_input: str) -> str:
@@ -24,6 +25,7 @@ def main() -> int:
     ap.add_argument('level_input', help='Level string or .txt path')
     ap.add_argument('-p', '--problem-name', default='')
     ap.add_argument('-d', '--domain-name', default='mine-tick-gravity-plus-scanner-separated-int-state')
+    base.add_problem_option_args(ap)
     args = ap.parse_args()
 
     if not args.problem_name:
@@ -31,7 +33,12 @@ def main() -> int:
 
     try:
         level_str = _read_level(args.level_input)
-        pddl = generate_compact_problem(level_str, args.problem_name, args.domain_name)
+        pddl = generate_compact_problem(
+            level_str,
+            args.problem_name,
+            args.domain_name,
+            options=base.problem_options_from_args(args),
+        )
     except Exception as exc:
         sys.stderr.write(f"Error: {exc}\n")
         return 1
@@ -10,8 +10,10 @@ where each cell_i is an integer HiddenCellType ID.
 """
 
 import argparse
+import io
 import sys
 from pathlib import Path
+from typing import Iterator, TextIO
 
 import problem_gen as base
 
@@ -102,181 +104,106 @@ def interior_cell_name(r: int, c: int) -> str:
     return cell_name(r + 1, c + 1)
 
 
-def generate_pddl_problem(
+def _iter_init(prepared: base.PreparedLevel, options: base.ProblemOptions | None = None) -> Iterator[base.InitItem]:
+    left_void = "left_void"
+    scan_end = "scan_end"
+
+    # High-level flags
+    yield base.Fact("agent-alive")
+    yield base.Fact("scan-complete")
+    if prepared.initial_got_gem:
+        yield base.Fact("got-gem")
+
+    # Agent position, shifted into padded coordinates
+    ar, ac = prepared.agent_pos[0] + 1, prepared.agent_pos[1] + 1
+    yield base.Fact("agent-at", (cell_name(ar, ac),))
+
+    yield from base.iter_cell_content_facts(
+        prepared.rows,
+        prepared.cols,
+        prepared.cell_ids,
+        prepared.target_gem_pos,
+        prepared.initial_got_gem,
+    )
+    yield base.Fact("border-cell", (scan_end,))
+    yield base.Fact("empty", (scan_end,))
+    yield base.Fact("border-cell", (left_void,))
+    yield base.Fact("empty", (left_void,), negated=True)
+
+    yield base.adjacency_block(prepared.rows, prepared.cols, left_void)
+    # Scan order: interior cells top-left to bottom-right, then the scan_end sentinel.
+    yield from base.scan_chain_items(prepared.rows, prepared.cols, prepared.cell_ids, options, tail=scan_end)
+
+    # Note: no scan-at in the initial state; a move-* action will start a tick.
+
+
+# Simple default: eventually get a gem and finish the scan tick.
+GOAL_FACTS = (
+    base.Fact("got-gem"),
+    base.Fact("scan-complete"),
+    base.Fact("crushed", negated=True),
+    base.Fact("agent-alive"),
+)
+
+
+def write_pddl_problem(
+    out: TextIO,
     level_str: str,
     problem_name: str = "level-1",
     domain_name: str = "mine-tick-gravity",
     agent_name: str = "player",
-) -> str:
+    fact_filter: base.FactFilter | None = None,
+    options: base.ProblemOptions | None = None,
+) -> None:
     """
-    Generate a full PDDL problem text from a level string.
+    Stream a full PDDL problem for a level string to a file-like object.
+
+    `fact_filter` adapts the facts to a domain variant while rendering;
+    `options` selects opt-in generator variations such as the scan chain mode.
     """
+    base.write_problem(
+        out,
+        problem_name=problem_name,
+        domain_name=domain_name,
+        fact_filter=fact_filter,
+        options=options,
+        **_problem_sections(level_str, options),
+    )
+
+
+def _problem_sections(level_str: str, options: base.ProblemOptions | None = None) -> dict:
     prepared = base.prepare_level(level_str)
-    rows = prepared.rows
-    cols = prepared.cols
-    max_time = prepared.max_time
-    required_gems = prepared.required_gems
-    cell_ids = list(prepared.cell_ids)
-    target_gem_pos = prepared.target_gem_pos
-
-    # Pad with a 1-cell brick border so physics never steps outside.
-    padded_rows = rows + 2
-    padded_cols = cols + 2
-
-    # Build grid of object names (includes border)
-    cells = [[cell_name(r, c) for c in range(padded_cols)] for r in range(padded_rows)]
-    interior_cells = [interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    scan_end = "scan_end"
-    real_cells = interior_cells
-    border_cells = [
-        cell_name(r, c)
-        for r in range(padded_rows)
-        for c in range(padded_cols)
-        if r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
-    ]
-    left_void = "left_void"
-    border_cells.append(left_void)
-    border_cells.append(scan_end)
-
-    # Find agent and classify contents
-    contents = {}  # (r, c) -> kind
-    falling_cells = set()
-
-    for idx, cell_id in enumerate(cell_ids):
-        r = idx // cols
-        c = idx % cols
-        kind = classify_cell_id(cell_id)
-        contents[(r, c)] = kind
-        if cell_id in STONE_FALLING_IDS or cell_id in GEM_FALLING_IDS:
-            falling_cells.add((r, c))
-    agent_pos = prepared.agent_pos
-
-    # Shift agent into padded coordinates
-    padded_agent_pos = (agent_pos[0] + 1, agent_pos[1] + 1)
-
-    # ------------------------------------------------------------------
-    # :objects
-    # ------------------------------------------------------------------
-    obj_lines = []
-    obj_lines.append(f"    {' '.join(real_cells)} - real-cell")
-    obj_lines.append(f"    {' '.join(border_cells)} - border-cell")
-
-    # ------------------------------------------------------------------
-    # :init
-    # ------------------------------------------------------------------
-    init_lines = []
+    return dict(
+        requirements=":typing :negative-preconditions :action-costs",
+        objects=base.iter_typed_grid_objects(
+            prepared.rows,
+            prepared.cols,
+            extra_border_cells=("left_void", "scan_end"),
+        ),
+        init=_iter_init(prepared, options),
+        goal=GOAL_FACTS,
+        blank_before_close=True,
+    )
 
-    # High-level flags
-    init_lines.append("    (agent-alive)")
-    init_lines.append("    (scan-complete)")
-    if prepared.initial_got_gem:
-        init_lines.append("    (got-gem)")
-
-    # Agent position
-    ar, ac = padded_agent_pos
-    init_lines.append(f"    (agent-at {cell_name(ar, ac)})")
-
-    # Cell contents
-    for r in range(padded_rows):
-        for c in range(padded_cols):
-            cname = cell_name(r, c)
-            is_border = (
-                r == 0 or r == padded_rows - 1 or c == 0 or c == padded_cols - 1
-            )
-            if is_border:
-                init_lines.append(f"    (border-cell {cname})")
-                init_lines.append(f"    (not (empty {cname}))")
-                continue
-
-            init_lines.append(f"    (real-cell {cname})")
-            inner_kind = contents[(r - 1, c - 1)]
-            if inner_kind == "agent":
-                # Treat underlying cell as empty for physics
-                init_lines.append(f"    (not (empty {cname}))")
-            elif inner_kind == "empty":
-                init_lines.append(f"    (empty {cname})")
-            elif inner_kind == "dirt":
-                init_lines.append(f"    (dirt {cname})")
-            elif inner_kind == "stone":
-                init_lines.append(f"    (stone {cname})")
-            elif inner_kind == "gem":
-                init_lines.append(f"    (gem {cname})")
-                if (r - 1, c - 1) == target_gem_pos and not prepared.initial_got_gem:
-                    init_lines.append(f"    (target-gem {cname})")
-            elif inner_kind == "brick":
-                init_lines.append(f"    (brick {cname})")
-            if (r - 1, c - 1) in falling_cells:
-                init_lines.append(f"    (falling {cname})")
-
-    init_lines.append(f"    (border-cell {scan_end})")
-    init_lines.append(f"    (empty {scan_end})")
-    init_lines.append(f"    (border-cell {left_void})")
-    init_lines.append(f"    (not (empty {left_void}))")
-
-    # Adjacency predicates: up, down, right-of (left via reverse right-of).
-    for r in range(padded_rows):
-        for c in range(padded_cols):
-            cname = cell_name(r, c)
-            # up: from this cell to the one above (this -> above)
-            if r > 0:
-                above = cell_name(r - 1, c)
-                init_lines.append(f"    (up {cname} {above})")
-            # down: from this to below (this -> below)
-            if r < padded_rows - 1:
-                below = cell_name(r + 1, c)
-                init_lines.append(f"    (down {cname} {below})")
-            # right-of: left -> right
-            if c == 0:
-                init_lines.append(f"    (right-of {left_void} {cname})")
-            else:
-                left = cell_name(r, c - 1)
-                init_lines.append(f"    (right-of {left} {cname})")
-
-    # Scan order: top-left to bottom-right over interior cells only
-    order = [interior_cell_name(r, c) for r in range(rows) for c in range(cols)]
-    order.append(scan_end)
-    first = order[0]
-    last = order[-1]
-    init_lines.append(f"    (first-cell {first})")
-    init_lines.append(f"    (last-cell {last})")
-
-    for i in range(len(order) - 1):
-        init_lines.append(f"    (next-cell {order[i]} {order[i+1]})")
 
-    # Note: no scan-at in the initial state; a move-* action will start a tick.
+def build_problem_parts(level_str: str, options: base.ProblemOptions | None = None) -> base.ProblemParts:
+    """The level's sections, reusable across domain variants (see base.ProblemParts)."""
+    return base.ProblemParts.collect(content_patchable=True, **_problem_sections(level_str, options))
 
-    # ------------------------------------------------------------------
-    # :goal
-    # ------------------------------------------------------------------
-    # Simple default: eventually get a gem and finish the scan tick.
-    goal_lines = [
-        "    (got-gem)",
-        "    (scan-complete)",
-        "    (not (crushed))",
-        "    (agent-alive)",
-    ]
-
-    # Assemble full PDDL
-    pddl = f"""\
-(define (problem {problem_name})
-  (:domain {domain_name})
-  (:requirements :typing :negative-preconditions :action-costs)
-  (:objects
-{chr(10).join(obj_lines)}
-  )
-  (:init
-  (= (total-cost) 0)
-{chr(10).join(init_lines)}
-  )
-  (:goal
-  (and
-{chr(10).join(goal_lines)}
-  ))
-  (:metric minimize (total-cost))
 
-)
-"""
-    return pddl
+def generate_pddl_problem(
+    level_str: str,
+    problem_name: str = "level-1",
+    domain_name: str = "mine-tick-gravity",
+    agent_name: str = "player",
+    options: base.ProblemOptions | None = None,
+) -> str:
+    """
+    Generate a full PDDL problem text from a level string.
+    """
+    buf = io.StringIO()
+    write_pddl_problem(buf, level_str, problem_name, domain_name, agent_name, options=options)
+    return buf.getvalue()
 
 
 def main():
@@ -305,6 +232,7 @@ def main():
         default="player",
         help="Name of the agent object (default: player).",
     )
+    base.add_problem_option_args(parser)
     args = parser.parse_args()
 
     # --------------------------------------------------
@@ -333,6 +261,7 @@ def main():
             problem_name=args.problem_name,
             domain_name=args.domain_name,
             agent_name=args.agent_name,
+            options=base.problem_options_from_args(args),
         )
     except Exception as e:
         sys.stderr.write(f"Error: {e}\n")
@@ -4,19 +4,24 @@
 from __future__ import annotations
 
 import argparse
-import re
+import io
 import sys
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Mapping, TextIO
 
 THIS_DIR = Path(__file__).resolve().parent
 PDDL_DIR = THIS_DIR.parent
+TOOLS_DIR = PDDL_DIR.parent / "tools"
 sys.path.insert(0, str(PDDL_DIR))
+sys.path.insert(0, str(TOOLS_DIR))
 
 import problem_gen as classic_gen  # type: ignore  # noqa: E402
 import problem_gen_scanner_separated as scanner_sep_gen  # type: ignore  # noqa: E402
 import problem_gen_plus_from_domain as plus_from_gen  # type: ignore  # noqa: E402
 import problem_gen_plus_scanner_separated as plus_scanner_gen  # type: ignore  # noqa: E402
 import problem_gen_plus_scanner_separated_events_fluents as plus_events_fluent_gen  # type: ignore  # noqa: E402
+from domain_signature import DomainSignature, load_domain_signature  # type: ignore  # noqa: E402
 
 
 SOURCE_TO_KIND = {
@@ -30,6 +35,16 @@ SOURCE_TO_KIND = {
     "domain_plus_scanner_separated_events_fluents.pddl": "plus_scanner_events_fluents",
 }
 
+# Modules behind each kind. plus_scanner re-exports the plus_from_domain
+# writers, so the two kinds share one build_problem_parts.
+KIND_MODULES = {
+    "classic": classic_gen,
+    "scanner_separated": scanner_sep_gen,
+    "plus_from_domain": plus_from_gen,
+    "plus_scanner": plus_scanner_gen,
+    "plus_scanner_events_fluents": plus_events_fluent_gen,
+}
+
 SCANNER_CHAIN_PREDICATES = ("first-cell", "next-cell", "last-cell")
 OPTIONAL_DOMAIN_PREDICATES = ("update-required", "crushed")
 PREDICATE_COMPAT_RENAMES = (
@@ -50,20 +65,16 @@ def _default_problem_name(level_input: str) -> str:
     return "level"
 
 
-def _extract_domain_name(domain_path: Path) -> str:
-    text = domain_path.read_text(encoding="utf-8", errors="replace")
-    match = re.search(r"\(define\s*\(domain\s+([^\s\)]+)\)", text, flags=re.IGNORECASE)
-    if not match:
+def _extract_domain_name(domain_path: Path, signature: DomainSignature) -> str:
+    if not signature.name:
         raise ValueError(f"Could not find domain name in {domain_path}")
-    return match.group(1)
+    return signature.name
 
 
-def _extract_source(domain_path: Path) -> str:
-    text = domain_path.read_text(encoding="utf-8", errors="replace")
-    match = re.search(r"^;\s*source:\s*(.+)$", text, flags=re.MULTILINE)
-    if not match:
+def _extract_source(domain_path: Path, signature: DomainSignature) -> str:
+    if not signature.source:
         raise ValueError(f"Could not find '; source:' header in {domain_path}")
-    return Path(match.group(1).strip()).name
+    return signature.source
 
 
 def _resolve_domain_path(domain_filename: str) -> Path:
@@ -84,66 +95,301 @@ def _resolve_domain_path(domain_filename: str) -> Path:
     return domain_path
 
 
-def _domain_declares_predicate(domain_text: str, predicate: str) -> bool:
-    return re.search(rf"\(\s*{re.escape(predicate)}(\s|\))", domain_text) is not None
-
-
-def _strip_scanner_chain_facts(problem_pddl: str) -> str:
-    out_lines = []
-    for line in problem_pddl.splitlines():
-        if re.search(r"\(\s*(first-cell|next-cell|last-cell)\b", line):
-            continue
-        out_lines.append(line)
-    if not out_lines:
-        return ""
-    return "\n".join(out_lines) + "\n"
-
-
-def _strip_predicate_facts(problem_pddl: str, predicate: str) -> str:
-    out_lines = []
-    # Remove both positive and negated literals, e.g.:
-    #   (update-required)
-    #   (not (update-required))
-    pattern = re.compile(rf"\(\s*(?:not\s+\(\s*)?{re.escape(predicate)}\b")
-    for line in problem_pddl.splitlines():
-        if pattern.search(line):
-            continue
-        out_lines.append(line)
-    if not out_lines:
-        return ""
-    return "\n".join(out_lines) + "\n"
-
-
-def _rename_predicate_facts(problem_pddl: str, src_predicate: str, dst_predicate: str) -> str:
-    # Handles both positive and negated atoms by replacing predicate heads.
-    pattern = re.compile(rf"(\(\s*(?:not\s+\(\s*)?){re.escape(src_predicate)}(\b)")
-    return pattern.sub(rf"\1{dst_predicate}\2", problem_pddl)
-
-
-def _generate(kind: str, level_str: str, problem_name: str, domain_name: str, agent_name: str) -> str:
+def _fact_filter_for_domain(
+    signature: DomainSignature,
+    options: classic_gen.ProblemOptions = classic_gen.DEFAULT_PROBLEM_OPTIONS,
+) -> classic_gen.FactFilter:
+    """
+    Adapt generator output to what a domain variant actually declares.
+
+    Generators emit one superset of facts; instead of regex passes over the
+    rendered text, the differences become a single drop/rename filter that
+    write_problem applies while rendering.
+    """
+    drop = set()
+    # Classic generators emit scanner-chain init facts unconditionally.
+    # Remove them when the domain variant does not declare these predicates.
+    if any(not signature.declares(pred) for pred in SCANNER_CHAIN_PREDICATES):
+        drop.update(SCANNER_CHAIN_PREDICATES)
+    rename = {
+        src_pred: dst_pred
+        for src_pred, dst_pred in PREDICATE_COMPAT_RENAMES
+        if not signature.declares(src_pred) and signature.declares(dst_pred)
+    }
+    # Renames apply first, so a renamed predicate is never dropped here.
+    drop.update(pred for pred in OPTIONAL_DOMAIN_PREDICATES if not signature.declares(pred))
+    if options.lean_init:
+        # Numeric fluents no operator reads or writes only cost parse/ground time.
+        drop.update(signature.unreferenced_functions)
+        drop.update(
+            fluent
+            for fluent in classic_gen.BLOCK_PREDICATES["cell-coordinates"]
+            if not signature.references(fluent)
+        )
+    return classic_gen.FactFilter(drop=frozenset(drop), rename=rename)
+
+
+def _write(
+    out: TextIO,
+    kind: str,
+    level_str: str,
+    problem_name: str,
+    domain_name: str,
+    agent_name: str,
+    fact_filter: classic_gen.FactFilter,
+    options: classic_gen.ProblemOptions,
+) -> None:
     if kind == "classic":
-        return classic_gen.generate_pddl_problem(
+        classic_gen.write_pddl_problem(
+            out,
             level_str,
             problem_name=problem_name,
             domain_name=domain_name,
             agent_name=agent_name,
+            fact_filter=fact_filter,
+            options=options,
         )
+        return
     if kind == "scanner_separated":
-        return scanner_sep_gen.generate_pddl_problem(
+        scanner_sep_gen.write_pddl_problem(
+            out,
             level_str,
             problem_name=problem_name,
             domain_name=domain_name,
             agent_name=agent_name,
+            fact_filter=fact_filter,
+            options=options,
         )
+        return
     if kind == "plus_from_domain":
-        return plus_from_gen.generate_compact_problem(level_str, problem_name, domain_name)
+        plus_from_gen.write_compact_problem(
+            out, level_str, problem_name, domain_name, fact_filter=fact_filter, options=options
+        )
+        return
     if kind == "plus_scanner":
-        return plus_scanner_gen.generate_compact_problem(level_str, problem_name, domain_name)
+        plus_scanner_gen.write_compact_problem(
+            out, level_str, problem_name, domain_name, fact_filter=fact_filter, options=options
+        )
+        return
     if kind == "plus_scanner_events_fluents":
-        return plus_events_fluent_gen.generate_compact_problem(level_str, problem_name, domain_name)
+        plus_events_fluent_gen.write_compact_problem(
+            out, level_str, problem_name, domain_name, fact_filter=fact_filter, options=options
+        )
+        return
     raise ValueError(f"Unsupported generator kind: {kind}")
 
 
+@dataclass(frozen=True)
+class DomainVariant:
+    """What a domain variant needs from the shared generators."""
+    domain_filename: str
+    kind: str
+    domain_name: str
+    fact_filter: classic_gen.FactFilter
+
+
+def resolve_domain_variant(
+    domain_filename: str,
+    domain_name: str = "",
+    options: classic_gen.ProblemOptions | None = None,
+) -> DomainVariant:
+    domain_path = _resolve_domain_path(domain_filename)
+    if not domain_path.exists():
+        raise FileNotFoundError(f"missing domain file {domain_path}")
+
+    signature = load_domain_signature(domain_path)
+    source_name = _extract_source(domain_path, signature)
+    kind = SOURCE_TO_KIND.get(source_name)
+    if kind is None:
+        raise ValueError(
+            f"No generator mapping for source '{source_name}' in {domain_path.name}. "
+            "Update SOURCE_TO_KIND in problem_gen_common.py."
+        )
+    return DomainVariant(
+        domain_filename=domain_filename,
+        kind=kind,
+        domain_name=domain_name or _extract_domain_name(domain_path, signature),
+        fact_filter=_fact_filter_for_domain(signature, options or classic_gen.DEFAULT_PROBLEM_OPTIONS),
+    )
+
+
+def write_for_domain_file(
+    out: TextIO,
+    domain_filename: str,
+    level_str: str,
+    problem_name: str,
+    domain_name: str = "",
+    agent_name: str = "player",
+    options: classic_gen.ProblemOptions | None = None,
+) -> None:
+    """Stream the problem for a domain variant to `out`; raises on any generator error."""
+    options = options or classic_gen.DEFAULT_PROBLEM_OPTIONS
+    variant = resolve_domain_variant(domain_filename, domain_name, options)
+    _write(
+        out,
+        variant.kind,
+        level_str,
+        problem_name,
+        variant.domain_name,
+        agent_name,
+        variant.fact_filter,
+        options,
+    )
+
+
+def variant_writers(
+    domain_filenames: Iterable[str],
+    level_str: str,
+    problem_name: str,
+    options: classic_gen.ProblemOptions | None = None,
+) -> Dict[str, Callable[[TextIO], None]]:
+    """
+    One `(out) -> None` writer per domain variant for the same level.
+
+    Variants that share a generator share one ProblemParts: the level is parsed
+    and its facts are built on the first write for that generator, and every
+    other variant only re-renders them through its own FactFilter. A domain
+    that cannot be resolved raises when its own writer runs, so one bad
+    variant does not stop the others.
+    """
+    options = options or classic_gen.DEFAULT_PROBLEM_OPTIONS
+    parts: Dict[Callable, classic_gen.ProblemParts] = {}
+
+    def writer(domain_filename: str) -> Callable[[TextIO], None]:
+        def write(out: TextIO) -> None:
+            variant = resolve_domain_variant(domain_filename, options=options)
+            build = KIND_MODULES[variant.kind].build_problem_parts
+            if build not in parts:
+                parts[build] = build(level_str, options)
+            parts[build].write(
+                out,
+                problem_name=problem_name,
+                domain_name=variant.domain_name,
+                fact_filter=variant.fact_filter,
+                options=options,
+            )
+
+        return write
+
+    return {domain_filename: writer(domain_filename) for domain_filename in domain_filenames}
+
+
+def level_variant_writers(
+    base_level_str: str,
+    variants: Mapping[str, str],
+    domain_filenames: Iterable[str],
+    options: classic_gen.ProblemOptions | None = None,
+) -> Dict[tuple[str, str], Callable[[TextIO], None]]:
+    """
+    `{(problem_name, domain_filename): writer}` for same-shape variants of one
+    level, e.g. the start/target-gem variants of a bd level.
+
+    `variants` maps each problem name to its level text. Each generator
+    renders the base level once; a variant is then written by patching the
+    agent-at and cell-content runs it changes (problem_gen.content_patches).
+    Variants the patch cannot express (another shape, an initial got-gem, a
+    dynamic scan chain, a generator without the plain cell-content layout)
+    are generated in full instead.
+    """
+    options = options or classic_gen.DEFAULT_PROBLEM_OPTIONS
+    domain_filenames = list(domain_filenames)
+    resolved: Dict[str, DomainVariant] = {}
+    parts: Dict[Callable, classic_gen.ProblemParts] = {}
+    patches: Dict[str, list | None] = {}
+
+    def patches_for(problem_name: str) -> list | None:
+        if problem_name not in patches:
+            try:
+                patches[problem_name] = classic_gen.content_patches(
+                    classic_gen.prepare_level(base_level_str),
+                    classic_gen.prepare_level(variants[problem_name]),
+                )
+            except ValueError:
+                patches[problem_name] = None
+        return patches[problem_name]
+
+    def writer(problem_name: str, domain_filename: str) -> Callable[[TextIO], None]:
+        def write(out: TextIO) -> None:
+            if domain_filename not in resolved:
+                resolved[domain_filename] = resolve_domain_variant(domain_filename, options=options)
+            variant = resolved[domain_filename]
+            build = KIND_MODULES[variant.kind].build_problem_parts
+            level_patches = patches_for(problem_name)
+            if level_patches is not None:
+                if build not in parts:
+                    parts[build] = build(base_level_str, options)
+                if parts[build].can_patch(options):
+                    try:
+                        # Patches are matched before anything is written.
+                        parts[build].write(
+                            out,
+                            problem_name=problem_name,
+                            domain_name=variant.domain_name,
+                            fact_filter=variant.fact_filter,
+                            options=options,
+                            patches=level_patches,
+                        )
+                        return
+                    except ValueError:
+                        pass
+            _write(
+                out,
+                variant.kind,
+                variants[problem_name],
+                problem_name,
+                variant.domain_name,
+                "player",
+                variant.fact_filter,
+                options,
+            )
+
+        return write
+
+    return {
+        (problem_name, domain_filename): writer(problem_name, domain_filename)
+        for problem_name in variants
+        for domain_filename in domain_filenames
+    }
+
+
+def write_for_domain_files(
+    outs: Mapping[str, TextIO],
+    level_str: str,
+    problem_name: str,
+    options: classic_gen.ProblemOptions | None = None,
+) -> None:
+    """Write one level's problem for every `{domain_filename: out}` pair."""
+    writers = variant_writers(outs.keys(), level_str, problem_name, options)
+    for domain_filename, out in outs.items():
+        writers[domain_filename](out)
+
+
+def generate_for_domain_files(
+    domain_filenames: Iterable[str],
+    level_str: str,
+    problem_name: str,
+    options: classic_gen.ProblemOptions | None = None,
+) -> Dict[str, str]:
+    """Return `{domain_filename: problem text}` for one level across domain variants."""
+    bufs = {name: io.StringIO() for name in domain_filenames}
+    write_for_domain_files(bufs, level_str, problem_name, options)
+    return {name: buf.getvalue() for name, buf in bufs.items()}
+
+
+def generate_for_domain_file(
+    domain_filename: str,
+    level_str: str,
+    problem_name: str,
+    domain_name: str = "",
+    agent_name: str = "player",
+    options: classic_gen.ProblemOptions | None = None,
+) -> str:
+    """Return the problem text for a domain variant; raises on any generator error."""
+    buf = io.StringIO()
+    write_for_domain_file(buf, domain_filename, level_str, problem_name, domain_name, agent_name, options)
+    return buf.getvalue()
+
+
 def main_for_domain_file(domain_filename: str) -> int:
     ap = argparse.ArgumentParser(
         description=(
@@ -155,6 +401,7 @@ def main_for_domain_file(domain_filename: str) -> int:
     ap.add_argument("-p", "--problem-name", default="", help="Problem name (default: derived from level input)")
     ap.add_argument("-d", "--domain-name", default="", help="Override domain name in the generated problem")
     ap.add_argument("-a", "--agent-name", default="player", help="Agent object name for classic generators")
+    classic_gen.add_problem_option_args(ap)
     args = ap.parse_args()
 
     domain_path = _resolve_domain_path(domain_filename)
@@ -167,34 +414,14 @@ def main_for_domain_file(domain_filename: str) -> int:
 
     try:
         level_str = _read_level(args.level_input)
-        domain_text = domain_path.read_text(encoding="utf-8", errors="replace")
-        source_name = _extract_source(domain_path)
-        kind = SOURCE_TO_KIND.get(source_name)
-        if kind is None:
-            raise ValueError(
-                f"No generator mapping for source '{source_name}' in {domain_path.name}. "
-                "Update SOURCE_TO_KIND in problem_gen_common.py."
-            )
-
-        domain_name = args.domain_name or _extract_domain_name(domain_path)
-        pddl = _generate(kind, level_str, args.problem_name, domain_name, args.agent_name)
-
-        # Classic generators currently emit scanner-chain init facts unconditionally.
-        # Remove them when the domain variant does not declare these predicates.
-        if any(
-            not _domain_declares_predicate(domain_text, pred)
-            for pred in SCANNER_CHAIN_PREDICATES
-        ):
-            pddl = _strip_scanner_chain_facts(pddl)
-        for src_pred, dst_pred in PREDICATE_COMPAT_RENAMES:
-            if (
-                not _domain_declares_predicate(domain_text, src_pred)
-                and _domain_declares_predicate(domain_text, dst_pred)
-            ):
-                pddl = _rename_predicate_facts(pddl, src_pred, dst_pred)
-        for pred in OPTIONAL_DOMAIN_PREDICATES:
-            if not _domain_declares_predicate(domain_text, pred):
-                pddl = _strip_predicate_facts(pddl, pred)
+        pddl = generate_for_domain_file(
+            domain_filename,
+            level_str,
+            args.problem_name,
+            domain_name=args.domain_name,
+            agent_name=args.agent_name,
+            options=classic_gen.problem_options_from_args(args),
+        )
     except Exception as exc:
         sys.stderr.write(f"Error: {exc}\n")
         return 1
@@ -0,0 +1,134 @@
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.Arrays;
+import java.util.jar.JarFile;
+
+/**
+ * Long-lived JVM that runs ENHSP's main class once per job (see enhsp_worker.py).
+ *
+ * Usage: java -Djava.security.manager=allow -cp <dir> EnhspWorker enhsp.jar
+ *
+ * Protocol on stdin/stdout, one line each, tab separated:
+ *   job:   <id> TAB <output file> TAB <arg> TAB <arg> ...
+ *   reply: done TAB <id> TAB <exit status> TAB <elapsed ms>
+ * The worker prints "ready" once the jar's main class is loaded. Everything
+ * the planner prints during a job goes to the job's output file; System.exit
+ * inside a job ends the job, not the JVM. On JDKs without a SecurityManager
+ * the exit does end the JVM, and the caller restarts the worker.
+ */
+public final class EnhspWorker {
+    private static volatile boolean trapping = false;
+
+    private static final class ExitTrap extends SecurityException {
+        private static final long serialVersionUID = 1L;
+        final int status;
+
+        ExitTrap(int status) {
+            super("System.exit(" + status + ") trapped by EnhspWorker");
+            this.status = status;
+        }
+    }
+
+    private static void trapExits() {
+        try {
+            System.setSecurityManager(new SecurityManager() {
+                @Override
+                public void checkExit(int status) {
+                    if (trapping) {
+                        throw new ExitTrap(status);
+                    }
+                }
+
+                @Override
+                public void checkPermission(Permission perm) {
+                }
+
+                @Override
+                public void checkPermission(Permission perm, Object context) {
+                }
+            });
+        } catch (UnsupportedOperationException | SecurityException e) {
+            System.err.println("[WARN] EnhspWorker: cannot trap System.exit (" + e + "); one job per JVM.");
+        }
+    }
+
+    private static ExitTrap findTrap(Throwable t) {
+        for (Throwable cur = t; cur != null; cur = cur.getCause()) {
+            if (cur instanceof ExitTrap) {
+                return (ExitTrap) cur;
+            }
+        }
+        return null;
+    }
+
+    public static void main(String[] argv) throws Exception {
+        if (argv.length != 1) {
+            System.err.println("usage: EnhspWorker <enhsp.jar>");
+            System.exit(2);
+        }
+        File jar = new File(argv[0]);
+        String mainClass;
+        try (JarFile jf = new JarFile(jar)) {
+            mainClass = jf.getManifest().getMainAttributes().getValue("Main-Class");
+        }
+        URLClassLoader loader = new URLClassLoader(new URL[] {jar.toURI().toURL()}, EnhspWorker.class.getClassLoader());
+        Thread.currentThread().setContextClassLoader(loader);
+        Method entry = Class.forName(mainClass, true, loader).getMethod("main", String[].class);
+
+        PrintStream control = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        PrintStream idleOut = System.err;
+        trapExits();
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        control.println("ready");
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.isEmpty()) {
+                continue;
+            }
+            String[] fields = line.split("\t", -1);
+            String id = fields[0];
+            String[] args = Arrays.copyOfRange(fields, 2, fields.length);
+            int status = 0;
+            long start = System.nanoTime();
+            try (PrintStream out = new PrintStream(new FileOutputStream(fields[1]), true, "UTF-8")) {
+                System.setOut(out);
+                System.setErr(out);
+                trapping = true;
+                try {
+                    entry.invoke(null, (Object) args);
+                } catch (InvocationTargetException e) {
+                    ExitTrap trap = findTrap(e.getCause());
+                    if (trap != null) {
+                        status = trap.status;
+                    } else {
+                        e.getCause().printStackTrace(out);
+                        status = 1;
+                    }
+                } catch (ExitTrap e) {
+                    status = e.status;
+                } catch (OutOfMemoryError e) {
+                    e.printStackTrace(out);
+                    status = 1;
+                } finally {
+                    trapping = false;
+                    out.flush();
+                    System.setOut(idleOut);
+                    System.setErr(idleOut);
+                }
+            }
+            long elapsedMs = (System.nanoTime() - start) / 1_000_000L;
+            control.println("done\t" + id + "\t" + status + "\t" + elapsedMs);
+        }
+    }
+}
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Opt-in pool of long-lived ENHSP JVMs.
+
+`java -jar enhsp.jar` pays JVM startup, class loading and JIT warm-up on
+every run, which dominates the solve time of small plus levels. A worker is
+one JVM running EnhspWorker.java, which loads the jar's main class once and
+calls it per job; the job's output goes to a file and System.exit ends only
+the job. The first job on a worker is "cold", later ones are "warm".
+
+Workers run in their own process group like any planner (subprocess_utils),
+so a job that exceeds its timeout kills the whole JVM; the pool starts a
+fresh worker for the next job. Workers are also retired after
+MAX_JOBS_PER_WORKER jobs or a job that ran out of memory, since planner
+static state and heap fragmentation persist between jobs.
+
+A worker keeps the CPU pinning (launch_on_cpus) it was started with, so
+workers are pooled per CPU set. Inside launch_in_cgroup no worker is used:
+a pooled JVM would join that run's cgroup and be killed with it.
+
+EnhspWorker.java is compiled with the javac next to the chosen java into
+.cache/enhsp-worker/<source digest>/ on first use.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+TOOLS_DIR = Path(__file__).resolve().parents[2] / "tools"
+if str(TOOLS_DIR) not in sys.path:
+    sys.path.insert(0, str(TOOLS_DIR))
+
+from content_cache import DEFAULT_CACHE_ROOT, hash_parts  # type: ignore  # noqa: E402
+from subprocess_utils import (  # type: ignore  # noqa: E402
+    is_memout,
+    kill_note,
+    kill_process_group,
+    launch_context,
+    popen_group,
+    read_captured,
+)
+
+WORKER_SOURCE = Path(__file__).resolve().with_name("EnhspWorker.java")
+WORKER_CLASS = "EnhspWorker"
+WORKER_BUILD_ROOT = DEFAULT_CACHE_ROOT / "enhsp-worker"
+# Lets EnhspWorker install its System.exit trap on JDK 18+.
+WORKER_JVM_ARGS = ("-Djava.security.manager=allow",)
+MAX_JOBS_PER_WORKER = 50
+START_TIMEOUT_SEC = 60.0
+CLOSE_GRACE_SEC = 2.0
+_EOF = "\0eof"
+
+_BUILD_LOCK = threading.Lock()
+
+
+class WorkerUnavailable(RuntimeError):
+    """The worker could not be built or started; callers fall back to `java -jar`."""
+
+
+@dataclass
+class WorkerJobResult:
+    returncode: Optional[int]  # None on timeout
+    output: str
+    elapsed_sec: float
+    warm: bool
+    cpu_user_sec: Optional[float] = None
+    cpu_sys_sec: Optional[float] = None
+    timed_out: bool = False
+    note: str = ""
+
+
+def _javac_for(java_bin: str) -> Optional[str]:
+    sibling = Path(java_bin).resolve().with_name("javac")
+    if sibling.exists():
+        return str(sibling)
+    return shutil.which("javac")
+
+
+def build_worker(java_bin: str) -> Path:
+    """Directory holding the compiled EnhspWorker class (built once per source version)."""
+    digest = hash_parts(WORKER_SOURCE.read_bytes())[:16]
+    out_dir = WORKER_BUILD_ROOT / digest
+    if (out_dir / f"{WORKER_CLASS}.class").exists():
+        return out_dir
+    with _BUILD_LOCK:
+        if (out_dir / f"{WORKER_CLASS}.class").exists():
+            return out_dir
+        javac = _javac_for(java_bin)
+        if javac is None:
+            raise WorkerUnavailable("javac not found (a JDK is needed to build EnhspWorker)")
+        scratch = Path(tempfile.mkdtemp(prefix="enhsp_worker_build_"))
+        try:
+            proc = subprocess.run(
+                [javac, "-nowarn", "-Xlint:-removal", "-d", str(scratch), str(WORKER_SOURCE)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+            )
+            if proc.returncode != 0:
+                raise WorkerUnavailable(f"javac failed: {proc.stdout.strip()}")
+            out_dir.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(scratch, out_dir)
+            except OSError:
+                pass  # built concurrently by another process
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return out_dir
+
+
+def _cpu_times(pid: int) -> Optional[Tuple[float, float]]:
+    """(user, sys) seconds a live process has used so far (Linux /proc only)."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    fields = stat[stat.rfind(")") + 2:].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    # utime and stime are fields 14 and 15; fields[] starts at field 3.
+    return int(fields[11]) / ticks, int(fields[12]) / ticks
+
+
+class EnhspWorker:
+    def __init__(
+        self,
+        java_bin: str,
+        java_opts: Sequence[str],
+        jar: Path,
+        memory_limit_mb: Optional[int] = None,
+    ) -> None:
+        classes = build_worker(java_bin)
+        self.scratch = Path(tempfile.mkdtemp(prefix="enhsp_worker_"))
+        self.jobs = 0
+        self._stderr = (self.scratch / "worker.stderr").open("w", encoding="utf-8")
+        cmd = [java_bin, *WORKER_JVM_ARGS, *java_opts, "-cp", str(classes), WORKER_CLASS, str(jar)]
+        self.proc = popen_group(
+            cmd,
+            memory_limit_mb=memory_limit_mb,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self._stderr,
+            text=True,
+            bufsize=1,
+        )
+        self._replies: "queue.Queue[str]" = queue.Queue()
+        threading.Thread(target=self._pump, daemon=True).start()
+        reply = self._next_reply(START_TIMEOUT_SEC)
+        if reply != "ready":
+            log = self._stderr_tail()
+            self.close()
+            detail = log or (reply if reply not in (None, _EOF) else "no output")
+            raise WorkerUnavailable(f"ENHSP worker did not start: {detail}")
+
+    def _pump(self) -> None:
+        assert self.proc.stdout is not None
+        try:
+            for line in self.proc.stdout:
+                self._replies.put(line.rstrip("\n"))
+        finally:
+            self._replies.put(_EOF)
+
+    def _next_reply(self, timeout: Optional[float]) -> Optional[str]:
+        try:
+            return self._replies.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _stderr_tail(self, limit: int = 2000) -> str:
+        self._stderr.flush()
+        try:
+            return (self.scratch / "worker.stderr").read_text(encoding="utf-8", errors="replace")[-limit:].strip()
+        except OSError:
+            return ""
+
+    def alive(self) -> bool:
+        return self.proc.returncode is None and self.proc.poll() is None
+
+    def run(self, args: Sequence[str], timeout_sec: Optional[float]) -> WorkerJobResult:
+        warm = self.jobs > 0
+        self.jobs += 1
+        job_id = str(self.jobs)
+        out_file = self.scratch / f"job{job_id}.out"
+        cpu_before = _cpu_times(self.proc.pid)
+        start = time.monotonic()
+        assert self.proc.stdin is not None
+        try:
+            self.proc.stdin.write("\t".join([job_id, str(out_file), *args]) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as exc:
+            raise WorkerUnavailable(f"ENHSP worker exited before the job started: {exc}") from exc
+
+        returncode: Optional[int] = None
+        timed_out = False
+        note = ""
+        deadline = start + timeout_sec if timeout_sec else None
+        while True:
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                timed_out = True
+                break
+            reply = self._next_reply(wait)
+            if reply == _EOF:
+                # System.exit without the trap (or a crash) ended the JVM with the job.
+                try:
+                    returncode = self.proc.wait(timeout=CLOSE_GRACE_SEC)
+                except subprocess.TimeoutExpired:
+                    returncode = None
+                note = "[INFO] ENHSP worker JVM exited with the job; it will be restarted.\n"
+                break
+            if reply and reply.startswith("done\t"):
+                parts = reply.split("\t")
+                if len(parts) >= 3 and parts[1] == job_id:
+                    returncode = int(parts[2])
+                    break
+        cpu_after = _cpu_times(self.proc.pid) if not timed_out else None
+        if timed_out:
+            survivors = kill_process_group(self.proc)
+            note = kill_note(self.proc.pid, survivors) + "\n"
+        try:
+            output = read_captured(out_file)
+            out_file.unlink()
+        except OSError:
+            output = ""
+        user = sys_time = None
+        if cpu_before and cpu_after:
+            user = round(cpu_after[0] - cpu_before[0], 3)
+            sys_time = round(cpu_after[1] - cpu_before[1], 3)
+        return WorkerJobResult(
+            returncode=returncode,
+            output=output,
+            elapsed_sec=round(time.monotonic() - start, 3),
+            warm=warm,
+            cpu_user_sec=user,
+            cpu_sys_sec=sys_time,
+            timed_out=timed_out,
+            note=note,
+        )
+
+    def close(self) -> None:
+        if self.alive() and self.proc.stdin is not None:
+            try:
+                self.proc.stdin.close()  # EOF ends the worker loop
+                self.proc.wait(timeout=CLOSE_GRACE_SEC)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        kill_process_group(self.proc, grace_sec=CLOSE_GRACE_SEC)
+        self._stderr.close()
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+
+WorkerKey = Tuple[str, Tuple[str, ...], str, Optional[int], Optional[Tuple[int, ...]]]
+
+
+class EnhspWorkerPool:
+    """Idle workers per (java, JVM options, jar, memory limit, CPUs); one job per worker at a time."""
+
+    def __init__(self, max_jobs_per_worker: int = MAX_JOBS_PER_WORKER) -> None:
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._lock = threading.Lock()
+        self._idle: Dict[WorkerKey, List[EnhspWorker]] = {}
+
+    def _checkout(self, key: WorkerKey) -> Optional[EnhspWorker]:
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                worker = idle.pop()
+                if worker.alive():
+                    return worker
+                worker.close()
+        return None
+
+    def run(
+        self,
+        *,
+        java_bin: str,
+        java_opts: Sequence[str],
+        jar: Path,
+        args: Sequence[str],
+        timeout_sec: Optional[float],
+        memory_limit_mb: Optional[int] = None,
+    ) -> WorkerJobResult:
+        cgroup, cpus = launch_context()
+        if cgroup is not None:
+            raise WorkerUnavailable(f"ENHSP workers are not used inside the run cgroup {cgroup.name}")
+        key: WorkerKey = (java_bin, tuple(java_opts), str(jar), memory_limit_mb, cpus)
+        worker = self._checkout(key) or EnhspWorker(java_bin, java_opts, jar, memory_limit_mb)
+        try:
+            result = worker.run(args, timeout_sec)
+        except BaseException:
+            worker.close()
+            raise
+        retire = (
+            result.timed_out
+            or not worker.alive()
+            or worker.jobs >= self.max_jobs_per_worker
+            or (result.returncode != 0 and is_memout(None, result.output))
+        )
+        if retire:
+            worker.close()
+        else:
+            with self._lock:
+                self._idle.setdefault(key, []).append(worker)
+        return result
+
+    def shutdown(self) -> None:
+        with self._lock:
+            workers = [w for idle in self._idle.values() for w in idle]
+            self._idle.clear()
+        for worker in workers:
+            worker.close()
+
+
+_POOL: Optional[EnhspWorkerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def worker_pool() -> EnhspWorkerPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = EnhspWorkerPool()
+            atexit.register(_POOL.shutdown)
+        return _POOL
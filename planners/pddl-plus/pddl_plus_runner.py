@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import dataclasses
 import re
 import shlex
@@ -12,6 +13,21 @@ import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+TOOLS_DIR = Path(__file__).resolve().parents[2] / "tools"
+if str(TOOLS_DIR) not in sys.path:
+    sys.path.insert(0, str(TOOLS_DIR))
+
+from subprocess_utils import (  # type: ignore  # noqa: E402
+    Launch,
+    ProcessGroupTimeout,
+    SolveSteps,
+    emit_output,
+    is_memout,
+    run_steps,
+    run_steps_async,
+)
+from enhsp_worker import WorkerUnavailable, worker_pool  # type: ignore  # noqa: E402
+
 
 @dataclasses.dataclass
 class TimedAction:
@@ -24,7 +40,7 @@ class TimedAction:
 @dataclasses.dataclass
 class PlusPlanResult:
     planner: str
-    status: str  # solved | no-path | unsolved | timeout | error
+    status: str  # solved | no-path | unsolved | timeout | memout | error
     actions: List[TimedAction]
     raw_stdout: str
     raw_stderr: str
@@ -197,49 +213,126 @@ def parse_actions(raw_text: str) -> List[TimedAction]:
     return actions
 
 
-def _run_capture(cmd: List[str], timeout_sec: Optional[int]) -> Tuple[int, str, str]:
-    proc = subprocess.run(
+def _launch(cmd: List[str], timeout_sec: Optional[int], stream: bool, memory_limit_mb: Optional[int]) -> Launch:
+    return Launch(
         cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        timeout=timeout_sec,
+        timeout_sec=timeout_sec,
+        prefix="[PDDL+] ",
+        live=stream,
+        merge_stderr=stream,
+        memory_limit_mb=memory_limit_mb,
     )
-    return proc.returncode, proc.stdout, proc.stderr
 
 
-def _run_stream(cmd: List[str], timeout_sec: Optional[int], prefix: str) -> Tuple[int, str, str]:
-    start = time.time()
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
+def _plus_status(rc: Optional[int], out: str, err: str, actions: List[TimedAction]) -> str:
+    lowered = ((out or "") + "\n" + (err or "")).lower()
+    if not actions and rc != 0 and is_memout(None, lowered):
+        return "memout"
+    if any(token in lowered for token in ["runtimeexception", "some syntax error", "severe:"]):
+        return "error"
+    if actions:
+        return "solved"
+    if rc == 0 and any(token in lowered for token in ["unsat", "no plan", "unsolvable", "unsolvable problem"]):
+        return "no-path"
+    if rc == 0:
+        return "unsolved"
+    return "error"
+
+
+def _solve_with_worker(
+    cmd: List[str],
+    timeout: Optional[int],
+    stream: bool,
+    memory_limit_mb: Optional[int],
+    start: float,
+) -> PlusPlanResult:
+    """Run the `java [opts] -jar enhsp.jar args` command as a job on a pooled ENHSP JVM."""
+    jar_idx = cmd.index("-jar")
+    result = worker_pool().run(
+        java_bin=cmd[0],
+        java_opts=cmd[1:jar_idx],
+        jar=Path(cmd[jar_idx + 1]),
+        args=cmd[jar_idx + 2:],
+        timeout_sec=timeout,
+        memory_limit_mb=memory_limit_mb,
+    )
+    emit_output("err", result.note)
+    if stream:
+        # Jobs write to a file inside the worker; echo it once the job ends.
+        for line in result.output.splitlines():
+            print(f"[PDDL+] {line}")
+    actions = [] if result.timed_out else parse_actions(result.output)
+    metrics: Dict[str, Any] = {
+        "returncode": result.returncode,
+        "time_sec": round(time.time() - start, 3),
+        "command": cmd,
+        "memory_limit_mb": memory_limit_mb,
+        "enhsp_worker": "warm" if result.warm else "cold",
+        "cpu_user_sec": result.cpu_user_sec,
+        "cpu_sys_sec": result.cpu_sys_sec,
+    }
+    return PlusPlanResult(
+        planner="enhsp",
+        status="timeout" if result.timed_out else _plus_status(result.returncode, result.output, "", actions),
+        actions=actions,
+        raw_stdout=result.output,
+        raw_stderr=result.note,
+        metrics=metrics,
     )
 
-    out_lines: List[str] = []
 
+def _plus_steps(
+    cmd: List[str],
+    planner_used: str,
+    timeout: Optional[int],
+    stream: bool,
+    memory_limit_mb: Optional[int],
+    start: float,
+    fallback_note: str = "",
+) -> SolveSteps[PlusPlanResult]:
     try:
-        assert proc.stdout is not None
-        for line in proc.stdout:
-            out_lines.append(line)
-            sys.stdout.write(f"{prefix}{line}" if prefix else line)
-            sys.stdout.flush()
-
-            if timeout_sec is not None and (time.time() - start) > timeout_sec:
-                proc.kill()
-                raise subprocess.TimeoutExpired(cmd=cmd, timeout=timeout_sec)
-
-        rc = proc.wait()
-        return rc, "".join(out_lines), ""
-    except subprocess.TimeoutExpired:
-        try:
-            proc.kill()
-        except Exception:
-            pass
-        raise
+        run = yield _launch(cmd, timeout, stream, memory_limit_mb)
+    except subprocess.TimeoutExpired as exc:
+        out = exc.output if isinstance(exc.output, str) else ""
+        err = exc.stderr if isinstance(exc.stderr, str) else ""
+        metrics: Dict[str, Any] = {
+            "returncode": None,
+            "time_sec": round(time.time() - start, 3),
+            "command": cmd,
+            "memory_limit_mb": memory_limit_mb,
+        }
+        if isinstance(exc, ProcessGroupTimeout):
+            err += exc.note() + "\n"
+            emit_output("err", exc.note())
+            metrics["survivors"] = len(exc.survivors)
+            if exc.usage:
+                metrics.update(exc.usage.metrics())
+        return PlusPlanResult(
+            planner=planner_used,
+            status="timeout",
+            actions=[],
+            raw_stdout=out,
+            raw_stderr=fallback_note + err,
+            metrics=metrics,
+        )
+
+    rc, out, err = run.returncode, run.stdout, run.stderr
+    actions = parse_actions((out or "") + "\n" + (err or ""))
+
+    return PlusPlanResult(
+        planner=planner_used,
+        status=_plus_status(rc, out, err, actions),
+        actions=actions,
+        raw_stdout=out,
+        raw_stderr=fallback_note + err,
+        metrics={
+            "returncode": rc,
+            "time_sec": round(time.time() - start, 3),
+            "command": cmd,
+            "memory_limit_mb": memory_limit_mb,
+            **(run.usage.metrics() if run.usage else {}),
+        },
+    )
 
 
 def solve(
@@ -253,7 +346,14 @@ def solve(
     cmd_template: Optional[str] = None,
     enhsp_jar: Optional[Path] = None,
     optic_bin: Optional[Path] = None,
+    memory_limit_mb: Optional[int] = None,
+    enhsp_worker: bool = False,
 ) -> PlusPlanResult:
+    """
+    Run a PDDL+ planner. With enhsp_worker, ENHSP runs as a job on a pooled
+    long-lived JVM (see enhsp_worker.py), falling back to `java -jar` when no
+    worker can be started; metrics["enhsp_worker"] is "warm" or "cold".
+    """
     start = time.time()
     planner_used, cmd = _build_command(
         planner=planner,
@@ -266,44 +366,63 @@ def solve(
         optic_bin=optic_bin,
     )
 
-    try:
-        if stream:
-            rc, out, err = _run_stream(cmd, timeout_sec=timeout, prefix="[PDDL+] ")
-        else:
-            rc, out, err = _run_capture(cmd, timeout_sec=timeout)
-    except subprocess.TimeoutExpired:
-        return PlusPlanResult(
-            planner=planner_used,
-            status="timeout",
-            actions=[],
-            raw_stdout="",
-            raw_stderr="",
-            metrics={"returncode": None, "time_sec": round(time.time() - start, 3), "command": cmd},
-        )
+    fallback_note = ""
+    if enhsp_worker and planner_used == "enhsp":
+        try:
+            return _solve_with_worker(cmd, timeout, stream, memory_limit_mb, start)
+        except WorkerUnavailable as exc:
+            fallback_note = f"[WARN] {exc}; running java -jar instead.\n"
+            emit_output("err", fallback_note)
 
-    full = (out or "") + "\n" + (err or "")
-    actions = parse_actions(full)
+    return run_steps(_plus_steps(cmd, planner_used, timeout, stream, memory_limit_mb, start, fallback_note))
 
-    lowered = full.lower()
-    if any(token in lowered for token in ["runtimeexception", "some syntax error", "severe:"]):
-        status = "error"
-    elif actions:
-        status = "solved"
-    elif rc == 0 and any(token in lowered for token in ["unsat", "no plan", "unsolvable", "unsolvable problem"]):
-        status = "no-path"
-    elif rc == 0:
-        status = "unsolved"
-    else:
-        status = "error"
 
-    return PlusPlanResult(
-        planner=planner_used,
-        status=status,
-        actions=actions,
-        raw_stdout=out,
-        raw_stderr=err,
-        metrics={"returncode": rc, "time_sec": round(time.time() - start, 3), "command": cmd},
+async def solve_async(
+    domain: Path,
+    problem: Path,
+    planner: str = "auto",
+    timeout: Optional[int] = None,
+    stream: bool = False,
+    planner_args: str = "",
+    java_opts: str = "",
+    cmd_template: Optional[str] = None,
+    enhsp_jar: Optional[Path] = None,
+    optic_bin: Optional[Path] = None,
+    memory_limit_mb: Optional[int] = None,
+    enhsp_worker: bool = False,
+) -> PlusPlanResult:
+    """
+    solve on the running event loop (see run_process_async). Pooled ENHSP
+    workers are blocking, so enhsp_worker runs the whole solve in a thread.
+    """
+    if enhsp_worker:
+        return await asyncio.to_thread(
+            solve,
+            domain,
+            problem,
+            planner=planner,
+            timeout=timeout,
+            stream=stream,
+            planner_args=planner_args,
+            java_opts=java_opts,
+            cmd_template=cmd_template,
+            enhsp_jar=enhsp_jar,
+            optic_bin=optic_bin,
+            memory_limit_mb=memory_limit_mb,
+            enhsp_worker=True,
+        )
+    start = time.time()
+    planner_used, cmd = _build_command(
+        planner=planner,
+        domain=domain,
+        problem=problem,
+        planner_args=planner_args,
+        java_opts=java_opts,
+        cmd_template=cmd_template,
+        enhsp_jar=enhsp_jar,
+        optic_bin=optic_bin,
     )
+    return await run_steps_async(_plus_steps(cmd, planner_used, timeout, stream, memory_limit_mb, start))
 
 
 def _format_action(a: TimedAction) -> str:
@@ -425,6 +544,7 @@ def main() -> int:
     ap.add_argument("--problem", type=Path, required=True)
     ap.add_argument("--planner", choices=["auto", "enhsp", "optic", "cmd"], default="auto")
     ap.add_argument("--timeout", type=int, default=None)
+    ap.add_argument("--memory-limit-mb", type=int, default=None, help="RLIMIT_AS cap for the planner process.")
     ap.add_argument("--stream", action="store_true")
     ap.add_argument("--planner-args", default="-h ngc -s gbfs -dap")
     ap.add_argument(
@@ -452,6 +572,7 @@ def main() -> int:
         cmd_template=args.cmd_template,
         enhsp_jar=args.enhsp_jar.resolve() if args.enhsp_jar else None,
         optic_bin=args.optic_bin.resolve() if args.optic_bin else None,
+        memory_limit_mb=args.memory_limit_mb,
     )
 
     for a in res.actions:
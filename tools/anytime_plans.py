@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Live pickup of Fast Downward's anytime plans.
+
+An iterated FD search (--fd-keep-searching, or aliases such as lama) writes
+each improved plan to sas_plan.1, sas_plan.2, ... in its working directory
+while it keeps searching. PlanFileWatcher polls that directory from a
+background thread, reads each plan file incrementally as it grows, and hands
+every plan that beats the previous best to a callback as soon as the file is
+complete, so callers can save or start executing it seconds into a long run.
+
+FD finishes a plan file with a "; cost = N (unit cost)" comment; files
+without it count as complete only once the search process has exited.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+POLL_INTERVAL_SEC = 0.25
+
+PLAN_FILE_RE = re.compile(r"^sas_plan(?:\.(\d+))?$")
+PLAN_ACTION_RE = re.compile(r"^\(\s*([^\s()]+)(.*?)\)\s*$")
+PLAN_COST_RE = re.compile(r"^;\s*cost\s*=\s*([0-9.]+)")
+
+
+@dataclass(frozen=True)
+class AnytimePlan:
+    index: int  # 1 for the first plan, then one more per improvement
+    path: Path
+    actions: List[Tuple[str, List[str]]]
+    cost: Optional[float]
+    elapsed_sec: float  # since the watcher's start time
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "index": self.index,
+            "file": self.path.name,
+            "length": len(self.actions),
+            "cost": self.cost,
+            "time_sec": self.elapsed_sec,
+        }
+
+
+AnytimePlanCallback = Callable[[AnytimePlan], None]
+
+
+@dataclass
+class _PlanFile:
+    path: Path
+    offset: int = 0
+    pending: bytes = b""
+    actions: List[Tuple[str, List[str]]] = field(default_factory=list)
+    cost: Optional[float] = None
+    done: bool = False
+
+    def read_new(self) -> None:
+        """Parse the lines appended since the last call."""
+        try:
+            with self.path.open("rb") as f:
+                f.seek(self.offset)
+                chunk = f.read()
+        except OSError:
+            return
+        self.offset += len(chunk)
+        data = self.pending + chunk
+        cut = data.rfind(b"\n") + 1
+        self.pending = data[cut:]
+        for raw in data[:cut].decode("utf-8", errors="replace").splitlines():
+            self._parse_line(raw.strip())
+
+    def finish(self) -> None:
+        """The writer is gone: take an unterminated last line as is."""
+        if self.pending:
+            self._parse_line(self.pending.decode("utf-8", errors="replace").strip())
+            self.pending = b""
+
+    def _parse_line(self, line: str) -> None:
+        if line.startswith(";"):
+            m = PLAN_COST_RE.match(line)
+            if m:
+                self.cost = float(m.group(1))
+                self.done = True
+            return
+        m = PLAN_ACTION_RE.match(line)
+        if m:
+            rest = m.group(2).strip()
+            self.actions.append((m.group(1), rest.split() if rest else []))
+
+
+def _plan_number(path: Path) -> int:
+    m = PLAN_FILE_RE.match(path.name)
+    return int(m.group(1)) if m and m.group(1) else 0
+
+
+class PlanFileWatcher:
+    """
+    Context manager watching `workdir` for FD plan files while a search runs.
+    Improvements go to `on_plan` (called from the watcher thread, and from
+    the caller's thread for plans found by the final poll in stop()).
+    """
+
+    def __init__(
+        self,
+        workdir: Path,
+        on_plan: Optional[AnytimePlanCallback] = None,
+        started_at: Optional[float] = None,
+        poll_interval: float = POLL_INTERVAL_SEC,
+    ) -> None:
+        self.workdir = workdir
+        self.on_plan = on_plan
+        self.started_at = time.time() if started_at is None else started_at
+        self.poll_interval = poll_interval
+        self.plans: List[AnytimePlan] = []
+        self._files: Dict[str, _PlanFile] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def best(self) -> Optional[AnytimePlan]:
+        return self.plans[-1] if self.plans else None
+
+    def _improves(self, candidate: _PlanFile) -> bool:
+        best = self.best
+        if best is None:
+            return True
+        if candidate.cost is not None and best.cost is not None:
+            return candidate.cost < best.cost
+        return len(candidate.actions) < len(best.actions)
+
+    def poll(self, final: bool = False) -> None:
+        """Read new plan file content; report plans that completed and improve on the best."""
+        try:
+            paths = [p for p in self.workdir.iterdir() if PLAN_FILE_RE.match(p.name)]
+        except OSError:
+            return
+        for path in sorted(paths, key=_plan_number):
+            state = self._files.setdefault(path.name, _PlanFile(path))
+            if state.done:
+                continue
+            state.read_new()
+            if final:
+                state.finish()
+                state.done = True
+            if not state.done or not state.actions or not self._improves(state):
+                continue
+            plan = AnytimePlan(
+                index=len(self.plans) + 1,
+                path=path,
+                actions=list(state.actions),
+                cost=state.cost,
+                elapsed_sec=round(time.time() - self.started_at, 3),
+            )
+            self.plans.append(plan)
+            if self.on_plan is not None:
+                try:
+                    self.on_plan(plan)
+                except Exception as exc:
+                    print(f"[WARN] anytime plan callback failed: {exc}", file=sys.stderr)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def start(self) -> "PlanFileWatcher":
+        self._thread = threading.Thread(target=self._run, name="fd-plan-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop polling and pick up whatever the finished search left behind."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.poll(final=True)
+
+    def __enter__(self) -> "PlanFileWatcher":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Time-to-first/best-plan plus the (time, length, cost) series of improvements."""
+        return {
+            "time_to_first_plan_sec": self.plans[0].elapsed_sec if self.plans else None,
+            "time_to_best_plan_sec": self.plans[-1].elapsed_sec if self.plans else None,
+            "anytime_plans": [p.summary() for p in self.plans],
+        }
@@ -4,6 +4,7 @@ from __future__ import annotations
 import argparse
 import concurrent.futures
 import csv
+import functools
 import json
 import os
 import random
@@ -12,12 +13,11 @@ import shlex
 import signal
 import subprocess
 import sys
-import tempfile
 import time
 from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 TOOLS_DIR = Path(__file__).resolve().parents[1]
 BENCHMARK_DIR = Path(__file__).resolve().parent
@@ -31,9 +31,50 @@ PLUS_RUNNER_DIR = REPO_ROOT / "planners" / "pddl-plus"
 if str(PLUS_RUNNER_DIR) not in sys.path:
     sys.path.insert(0, str(PLUS_RUNNER_DIR))
 
+PDDL_DIR = REPO_ROOT / "pddl"
+if str(PDDL_DIR) not in sys.path:
+    sys.path.insert(0, str(PDDL_DIR))
+
 from plan import PlanResult, solve_with_fd, solve_with_ff, write_direction_plan  # type: ignore
+from domain_signature import try_load_domain_signature  # type: ignore
 from plan_lifted import solve_with_lifted  # type: ignore
+from problem_gen_registry import (  # type: ignore
+    add_problem_cache_args,
+    apply_problem_cache_args,
+    compile_problem,
+    default_problem_gen_for_domain,
+    problem_options,
+)
 from pddl_plus_runner import PlusPlanResult, TimedAction, solve as solve_plus  # type: ignore
+from level_grid import read_level_header  # type: ignore
+from grounding_estimate import GroundingEstimate, estimate_grounding, load_calibration  # type: ignore
+from translate_cache import add_translate_cache_args, apply_translate_cache_args  # type: ignore
+from workspace import add_workspace_args, apply_workspace_args  # type: ignore
+from plan_cache import (  # type: ignore
+    add_plan_cache_args,
+    apply_plan_cache_args,
+    hit_metrics,
+    lookup_plan,
+    plan_cache_key,
+    store_plan,
+)
+from subprocess_utils import (  # type: ignore
+    SURVIVOR_NOTE_RE,
+    capture_output,
+    emit_output,
+    kill_all_process_groups,
+    launch_in_cgroup,
+)
+from output_capture import (  # type: ignore
+    MetricScanner,
+    MetricText,
+    OutputCapture,
+    ProgressSnapshot,
+    ProgressTracker,
+    search_first,
+    search_last,
+)
+from cgroup_sandbox import CgroupLimits, CgroupSandbox, RunCgroup, open_sandbox  # type: ignore
 
 
 def repo_root() -> Path:
@@ -97,24 +138,23 @@ def parse_numeric(token: str) -> Optional[float]:
         return None
 
 
-def parse_first_float(text: str, pattern: str) -> Optional[float]:
-    m = re.search(pattern, text, flags=re.IGNORECASE | re.MULTILINE)
+# The parse_* helpers take the full log text or a MetricScanner that saw it
+# line by line (see output_capture).
+def parse_first_float(text: MetricText, pattern: str) -> Optional[float]:
+    m = search_first(text, pattern)
     if not m:
         return None
     return parse_numeric(m.group(1))
 
 
-def parse_last_float(text: str, pattern: str) -> Optional[float]:
-    matches = re.findall(pattern, text, flags=re.IGNORECASE | re.MULTILINE)
-    if not matches:
+def parse_last_float(text: MetricText, pattern: str) -> Optional[float]:
+    m = search_last(text, pattern)
+    if not m:
         return None
-    last = matches[-1]
-    if isinstance(last, tuple):
-        last = last[0]
-    return parse_numeric(str(last))
+    return parse_numeric(m.group(1))
 
 
-def parse_first_int(text: str, pattern: str) -> Optional[int]:
+def parse_first_int(text: MetricText, pattern: str) -> Optional[int]:
     val = parse_first_float(text, pattern)
     if val is None:
         return None
@@ -124,7 +164,7 @@ def parse_first_int(text: str, pattern: str) -> Optional[int]:
         return None
 
 
-def parse_last_int(text: str, pattern: str) -> Optional[int]:
+def parse_last_int(text: MetricText, pattern: str) -> Optional[int]:
     val = parse_last_float(text, pattern)
     if val is None:
         return None
@@ -134,14 +174,14 @@ def parse_last_int(text: str, pattern: str) -> Optional[int]:
         return None
 
 
-def parse_first_ms_as_sec(text: str, pattern: str) -> Optional[float]:
+def parse_first_ms_as_sec(text: MetricText, pattern: str) -> Optional[float]:
     val = parse_first_float(text, pattern)
     if val is None:
         return None
     return val / 1000.0
 
 
-def parse_last_ms_as_sec(text: str, pattern: str) -> Optional[float]:
+def parse_last_ms_as_sec(text: MetricText, pattern: str) -> Optional[float]:
     val = parse_last_float(text, pattern)
     if val is None:
         return None
@@ -150,7 +190,7 @@ def parse_last_ms_as_sec(text: str, pattern: str) -> Optional[float]:
 
 def is_failure_status(status: str) -> bool:
     s = (status or "").strip().lower()
-    return s in {"timeout", "error"}
+    return s in {"timeout", "memout", "error", "over-budget"}
 
 
 def is_success_status(status: str) -> bool:
@@ -270,6 +310,14 @@ class PlannerSetting:
     problem_gen: Optional[Path]
     domain_include: Tuple[str, ...]
     domain_exclude: Tuple[str, ...]
+    scan_chain: str = "full"  # full | dynamic (scanner domains only)
+    # Admission control: skip (domain, level) pairs predicted to ground larger.
+    max_estimated_atoms: Optional[int] = None
+    max_estimated_operators: Optional[int] = None
+    # RLIMIT_AS cap per planner process; runs that hit it report status memout.
+    memory_limit_mb: Optional[int] = None
+    # Run ENHSP as jobs on pooled long-lived JVMs (planners/pddl-plus/enhsp_worker.py).
+    enhsp_worker: bool = False
 
 
 @dataclass(frozen=True)
@@ -425,6 +473,34 @@ class BenchRow:
     plan_file: str
     timed_plan_file: str
     error_message: str
+    problem_cache_hit: Optional[bool] = None
+    scan_chain: str = "full"
+    estimated_atoms: Optional[int] = None
+    estimated_operators: Optional[int] = None
+    estimated_forced: Optional[int] = None
+    # Processes of a killed planner group still alive after SIGKILL (timeouts only).
+    surviving_processes: Optional[int] = None
+    # wait4() accounting of the planner process tree; see subprocess_utils.ResourceUsage.
+    cpu_user_sec: Optional[float] = None
+    cpu_sys_sec: Optional[float] = None
+    max_rss_mb: Optional[float] = None
+    major_faults: Optional[int] = None
+    memory_limit_mb: Optional[int] = None
+    # Kernel accounting of the run's transient cgroup (sandbox=cgroup only).
+    sandbox: str = ""
+    cgroup_memory_peak_mb: Optional[float] = None
+    cgroup_cpu_user_sec: Optional[float] = None
+    cgroup_cpu_sys_sec: Optional[float] = None
+    cgroup_throttled_sec: Optional[float] = None
+    cgroup_oom_kills: Optional[int] = None
+    cgroup_pids_peak: Optional[int] = None
+    # Fast Downward reused a cached output.sas (None: not an FD run / cache off).
+    translate_cache_hit: Optional[bool] = None
+    translate_saved_sec: Optional[float] = None
+    # "warm" / "cold" for ENHSP jobs on a pooled worker JVM, "" otherwise.
+    enhsp_worker: str = ""
+    # Answered from the plan cache (None: cache off or the planner did not run).
+    plan_cache_hit: Optional[bool] = None
 
 
 CSV_FIELDS = list(BenchRow.__annotations__.keys())
@@ -522,6 +598,19 @@ def parse_planner_settings(
         domain_include = tuple(str(x) for x in (entry.get("domain_include") or []))
         domain_exclude = tuple(str(x) for x in (entry.get("domain_exclude") or []))
 
+        scan_chain = str(entry.get("scan_chain", "full") or "full").strip().lower()
+        try:
+            problem_options(scan_chain=scan_chain)
+        except ValueError as exc:
+            raise ValueError(f"planner_settings[{idx}] {exc}") from exc
+
+        limits: Dict[str, Optional[int]] = {}
+        for key in ("max_estimated_atoms", "max_estimated_operators", "memory_limit_mb"):
+            raw = entry.get(key)
+            limits[key] = None if raw in (None, "") else int(raw)
+            if limits[key] is not None and limits[key] <= 0:
+                raise ValueError(f"planner_settings[{idx}] {key} must be > 0.")
+
         setting = PlannerSetting(
             name=name,
             family=family,
@@ -550,6 +639,9 @@ def parse_planner_settings(
             problem_gen=problem_gen,
             domain_include=domain_include,
             domain_exclude=domain_exclude,
+            scan_chain=scan_chain,
+            **limits,
+            enhsp_worker=bool(entry.get("enhsp_worker", False)),
         )
         settings.append(setting)
 
@@ -570,13 +662,8 @@ def domain_is_plus(path: Path) -> bool:
     # even for action-only formulations without :process/:event sections.
     if re.search(r"(?:^|_)plus(?:_|$)", path.stem, flags=re.IGNORECASE):
         return True
-    text = path.read_text(encoding="utf-8", errors="replace")
-    return bool(
-        re.search(r"\(:\s*process\b", text, flags=re.IGNORECASE)
-        or re.search(r"\(:\s*event\b", text, flags=re.IGNORECASE)
-        or re.search(r":processes\b", text, flags=re.IGNORECASE)
-        or re.search(r":events\b", text, flags=re.IGNORECASE)
-    )
+    signature = try_load_domain_signature(path)
+    return bool(signature and signature.is_plus)
 
 
 def domain_is_fa(path: Path) -> bool:
@@ -629,19 +716,13 @@ def discover_domains(
 
 
 def parse_level_size(path: Path) -> Tuple[int, int]:
-    text = path.read_text(encoding="utf-8", errors="replace")
-    level_lines: List[str] = []
-    for raw_line in text.splitlines():
-        stripped = raw_line.strip()
-        if not stripped or stripped.startswith((";", "#")):
-            continue
-        level_lines.append(stripped)
-    parts = [p.strip() for p in "\n".join(level_lines).split("|") if p.strip()]
-    if len(parts) < 2:
-        raise ValueError(f"Could not parse rows/cols from level: {path}")
-    rows = int(parts[0])
-    cols = int(parts[1])
-    return rows, cols
+    # Header-only read: growth and random-repeat levels are sized by the
+    # thousand, and only their dimensions matter here.
+    try:
+        header = read_level_header(path)
+    except ValueError as exc:
+        raise ValueError(f"Could not parse rows/cols from level: {path}") from exc
+    return header.rows, header.cols
 
 
 def _path_has_glob_magic(raw: str) -> bool:
@@ -1614,52 +1695,6 @@ class GrowthManager:
         return summary
 
 
-def read_source_name(domain: Path) -> Optional[str]:
-    try:
-        text = domain.read_text(encoding="utf-8", errors="replace")
-    except Exception:
-        return None
-    m = re.search(r"^;\s*source:\s*(.+)$", text, flags=re.MULTILINE)
-    if not m:
-        return None
-    return Path(m.group(1).strip()).name
-
-
-def default_problem_gen_for_domain(domain: Path) -> Path:
-    root = repo_root()
-    source_to_gen = {
-        "domain.pddl": "problem_gen.py",
-        "domain_merged.pddl": "problem_gen.py",
-        "domain_scanner_combined.pddl": "problem_gen.py",
-        "domain_scanner_separated.pddl": "problem_gen_scanner_separated.py",
-        "domain_plus_from_domain.pddl": "problem_gen_plus_from_domain.py",
-        "domain_plus_scanner_separated.pddl": "problem_gen_plus_scanner_separated.py",
-        "domain_plus_scanner_separated_events.pddl": "problem_gen_plus_scanner_separated.py",
-        "domain_plus_scanner_separated_events_fluents.pddl": "problem_gen_plus_scanner_separated_events_fluents.py",
-        "domain_plus_scanner_separated_events_fluents_trimmed.pddl": "problem_gen_plus_scanner_separated_events_fluents_trimmed.py",
-        "domain_plus_relaxed.pddl": "problem_gen_plus_relaxed.py",
-    }
-
-    source_name = read_source_name(domain)
-    if source_name and source_name in source_to_gen:
-        return root / "pddl" / source_to_gen[source_name]
-
-    name = (source_name or domain.name).lower()
-    if "scanner_separated_events_fluents_trimmed" in name:
-        return root / "pddl" / "problem_gen_plus_scanner_separated_events_fluents_trimmed.py"
-    if "scanner_separated_events_fluents" in name:
-        return root / "pddl" / "problem_gen_plus_scanner_separated_events_fluents.py"
-    if "plus" in name and ("plus_scanner" in name or "scanner_separated" in name):
-        return root / "pddl" / "problem_gen_plus_scanner_separated.py"
-    if "plus_relaxed" in name:
-        return root / "pddl" / "problem_gen_plus_relaxed.py"
-    if "plus" in name:
-        return root / "pddl" / "problem_gen_plus_from_domain.py"
-    if "scanner_separated" in name or "scaner_separated" in name:
-        return root / "pddl" / "problem_gen_scanner_separated.py"
-    return root / "pddl" / "problem_gen.py"
-
-
 def pick_problem_gen(
     *,
     setting: PlannerSetting,
@@ -1678,21 +1713,12 @@ def generate_problem_from_level(
     domain: DomainInfo,
     setting: PlannerSetting,
     problem_name: str,
-) -> Tuple[Path, tempfile.TemporaryDirectory]:
+    dest: Path,
+) -> bool:
+    """Compile the level to dest through the shared problem cache; True on a cache hit."""
     gen_py = pick_problem_gen(setting=setting, domain=domain)
-    if not gen_py.exists():
-        raise FileNotFoundError(f"Missing problem generator at {gen_py}")
-
-    tmpdir = tempfile.TemporaryDirectory(prefix="bench_config_matrix_problem_")
-    out_path = Path(tmpdir.name) / f"{problem_name}.pddl"
-    cmd = [sys.executable, str(gen_py), str(level_path), "-p", problem_name]
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if proc.returncode != 0:
-        tmpdir.cleanup()
-        detail = (proc.stderr or proc.stdout).strip()
-        raise RuntimeError(f"{gen_py.name} failed (rc={proc.returncode}): {detail}")
-    out_path.write_text(proc.stdout, encoding="utf-8")
-    return out_path, tmpdir
+    options = problem_options(scan_chain=setting.scan_chain)
+    return compile_problem(gen_py, level_path, problem_name, dest, domain=domain.path, options=options)
 
 
 def command_to_string(cmd: Any) -> str:
@@ -1706,13 +1732,13 @@ def command_to_string(cmd: Any) -> str:
     return ""
 
 
-def parse_plus_metrics(full_text: str) -> Dict[str, Any]:
+def parse_plus_metrics(full_text: MetricText) -> Dict[str, Any]:
     metrics: Dict[str, Any] = {}
     metrics["domain_parsed"] = (
-        1 if re.search(r"^\s*Domain parsed\s*$", full_text, flags=re.IGNORECASE | re.MULTILINE) else None
+        1 if search_first(full_text, r"^\s*Domain parsed\s*$") else None
     )
     metrics["problem_parsed"] = (
-        1 if re.search(r"^\s*Problem parsed\s*$", full_text, flags=re.IGNORECASE | re.MULTILINE) else None
+        1 if search_first(full_text, r"^\s*Problem parsed\s*$") else None
     )
 
     grounding_msec = parse_first_float(full_text, r"Grounding Time:\s*([0-9.,]+)")
@@ -1759,7 +1785,7 @@ def parse_plus_metrics(full_text: str) -> Dict[str, Any]:
     return metrics
 
 
-def parse_classic_metrics(full_text: str) -> Dict[str, Any]:
+def parse_classic_metrics(full_text: MetricText) -> Dict[str, Any]:
     metrics: Dict[str, Any] = {}
     metrics["reported_grounding_sec"] = parse_first_float(
         full_text,
@@ -1792,7 +1818,7 @@ def parse_classic_metrics(full_text: str) -> Dict[str, Any]:
     return metrics
 
 
-def parse_lifted_metrics(full_text: str) -> Dict[str, Any]:
+def parse_lifted_metrics(full_text: MetricText) -> Dict[str, Any]:
     metrics: Dict[str, Any] = {}
     # Powerlifted logs vary by search mode; parse generic patterns when present.
     metrics["reported_search_sec"] = parse_last_float(full_text, r"Search time:\s*([0-9.,]+)s")
@@ -1809,12 +1835,24 @@ def parse_lifted_metrics(full_text: str) -> Dict[str, Any]:
     return metrics
 
 
+def metrics_parser(setting: PlannerSetting) -> Callable[[MetricText], Dict[str, Any]]:
+    if setting.family == "plus":
+        return parse_plus_metrics
+    if setting.planner == "lifted":
+        return parse_lifted_metrics
+    return parse_classic_metrics
+
+
+def report_progress(name_tag: str, snapshot: ProgressSnapshot) -> None:
+    print(f"[PROGRESS] {name_tag}: {snapshot.describe()}", flush=True)
+
+
 def execute_planner(
     *,
     setting: PlannerSetting,
     domain_path: Path,
     problem_path: Path,
-) -> Tuple[str, int, Optional[int], Optional[float], str, str, str, Any, Any]:
+) -> Tuple[str, int, Optional[int], Optional[float], str, str, str, Any, Any, Dict[str, Any]]:
     if setting.family in {"classic", "fa"}:
         if setting.planner == "lifted":
             status, actions, out, err, extra = solve_with_lifted(
@@ -1834,6 +1872,7 @@ def execute_planner(
                 novelty_early_stop=setting.lifted_novelty_early_stop,
                 planner_args=setting.planner_args,
                 stream=setting.stream,
+                memory_limit_mb=setting.memory_limit_mb,
             )
             metrics = extra.get("metrics", {}) if isinstance(extra, dict) else {}
             command_obj = metrics.get("command")
@@ -1857,6 +1896,7 @@ def execute_planner(
                 "powerlifted",
                 actions,
                 command_obj,
+                metrics,
             )
 
         result: PlanResult
@@ -1867,6 +1907,7 @@ def execute_planner(
                 timeout=setting.timeout_sec,
                 stream=setting.stream,
                 planner_args=setting.planner_args,
+                memory_limit_mb=setting.memory_limit_mb,
             )
         else:
             result = solve_with_fd(
@@ -1877,6 +1918,7 @@ def execute_planner(
                 stream=setting.stream,
                 keep_searching=setting.fd_keep_searching,
                 planner_args=setting.planner_args,
+                memory_limit_mb=setting.memory_limit_mb,
             )
         return (
             result.status,
@@ -1888,6 +1930,7 @@ def execute_planner(
             result.planner,
             result.actions,
             result.metrics.get("command"),
+            result.metrics,
         )
 
     plus_result: PlusPlanResult = solve_plus(
@@ -1901,6 +1944,8 @@ def execute_planner(
         cmd_template=setting.cmd_template,
         enhsp_jar=setting.enhsp_jar,
         optic_bin=setting.optic_bin,
+        memory_limit_mb=setting.memory_limit_mb,
+        enhsp_worker=setting.enhsp_worker,
     )
     return (
         plus_result.status,
@@ -1912,7 +1957,169 @@ def execute_planner(
         plus_result.planner,
         plus_result.actions,
         plus_result.metrics.get("command"),
+        plus_result.metrics,
+    )
+
+
+# Setting fields that select or filter runs but do not change what the planner does.
+PLAN_CACHE_IGNORED_FIELDS = frozenset(
+    {
+        "name",
+        "validator",
+        "stream",
+        "problem_gen",
+        "domain_include",
+        "domain_exclude",
+        "scan_chain",
+        "max_estimated_atoms",
+        "max_estimated_operators",
+    }
+)
+
+
+def execute_planner_cached(
+    *,
+    setting: PlannerSetting,
+    domain_path: Path,
+    problem_path: Path,
+) -> Tuple[str, int, Optional[int], Optional[float], str, str, str, Any, Any, Dict[str, Any]]:
+    """
+    execute_planner, answered from the plan cache when an identical run was
+    stored (--plan-cache). A hit replays the stored output into the run's logs.
+    """
+    if setting.family == "plus":
+        planner_kind = "plus"
+    else:
+        planner_kind = setting.planner if setting.planner in {"ff", "lifted"} else "fd"
+    config = {k: v for k, v in asdict(setting).items() if k not in PLAN_CACHE_IGNORED_FIELDS}
+    key = plan_cache_key(planner_kind, config, domain_path, problem_path, (setting.enhsp_jar, setting.optic_bin))
+    start = time.time()
+    cached = lookup_plan(key)
+    if cached is not None:
+        stored = cached.result
+        emit_output("out", cached.stdout)
+        emit_output("err", cached.stderr)
+        metrics = hit_metrics(stored["metrics"], time.time() - start)
+        if planner_kind == "plus":
+            actions: Any = [TimedAction(**a) for a in stored["actions"]]
+        else:
+            actions = [(name, list(args)) for name, args in stored["actions"]]
+        return (
+            stored["status"],
+            len(actions),
+            stored["returncode"],
+            metrics["time_sec"],
+            cached.stdout,
+            cached.stderr,
+            stored["planner"],
+            actions,
+            stored["command"],
+            metrics,
+        )
+
+    outcome = execute_planner(setting=setting, domain_path=domain_path, problem_path=problem_path)
+    if key is not None:
+        status, _count, returncode, _time_sec, stdout, stderr, planner_used, actions_obj, command_obj, metrics = outcome
+        metrics["plan_cache_hit"] = False
+        stored_actions = [asdict(a) if isinstance(a, TimedAction) else a for a in actions_obj or []]
+        store_plan(
+            key,
+            {
+                "status": status,
+                "returncode": returncode,
+                "planner": planner_used,
+                "actions": stored_actions,
+                "command": command_obj,
+                "metrics": metrics,
+            },
+            stdout,
+            stderr,
+        )
+    return outcome
+
+
+@functools.lru_cache(maxsize=1)
+def grounding_calibration() -> Dict[str, Dict[str, object]]:
+    return load_calibration()
+
+
+def estimate_task_grounding(task: RunTask) -> Optional[GroundingEstimate]:
+    """Predicted grounding size for the task; None when the level or domain cannot be read."""
+    try:
+        return estimate_grounding(
+            task.domain.path,
+            task.level.path,
+            scan_chain=task.setting.scan_chain,
+            calibration=grounding_calibration(),
+        )
+    except (OSError, ValueError):
+        return None
+
+
+def grounding_budget_violation(setting: PlannerSetting, estimate: Optional[GroundingEstimate]) -> str:
+    """Why the task exceeds the setting's estimated-size budget, or "" when admitted."""
+    if estimate is None:
+        return ""
+    for quantity, limit in (
+        ("atoms", setting.max_estimated_atoms),
+        ("operators", setting.max_estimated_operators),
+    ):
+        value = getattr(estimate, quantity)
+        if limit is not None and value > limit:
+            return f"estimated {quantity} {value} > max_estimated_{quantity} {limit}"
+    return ""
+
+
+def resource_columns(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: metrics.get(key) for key in ("cpu_user_sec", "cpu_sys_sec", "max_rss_mb", "major_faults")}
+
+
+def parse_sandbox_config(raw: Any, *, config_dir: Path) -> Tuple[str, CgroupLimits, Optional[Path]]:
+    """
+    Top-level "sandbox": "none" | "cgroup" | {"mode": ..., "cpu_cores": 1.0,
+    "memory_max_mb": null, "pids_max": 256, "parent": "<delegated cgroup dir>"}.
+    """
+    entry = raw if isinstance(raw, dict) else {"mode": raw or "none"}
+    mode = str(entry.get("mode", "cgroup") or "none").strip().lower()
+    if mode not in {"none", "cgroup"}:
+        raise ValueError(f"sandbox.mode must be 'none' or 'cgroup', got {mode!r}.")
+    defaults = CgroupLimits()
+    cpu_cores = entry.get("cpu_cores", defaults.cpu_cores)
+    memory_max_mb = entry.get("memory_max_mb", defaults.memory_max_mb)
+    pids_max = entry.get("pids_max", defaults.pids_max)
+    limits = CgroupLimits(
+        cpu_cores=None if cpu_cores in (None, "") else float(cpu_cores),
+        memory_max_mb=None if memory_max_mb in (None, "") else int(memory_max_mb),
+        pids_max=None if pids_max in (None, "") else int(pids_max),
     )
+    for key in ("cpu_cores", "memory_max_mb", "pids_max"):
+        value = getattr(limits, key)
+        if value is not None and value <= 0:
+            raise ValueError(f"sandbox.{key} must be > 0.")
+    parent = resolve_path(str(entry["parent"]), config_dir=config_dir) if entry.get("parent") else None
+    return mode, limits, parent
+
+
+def open_run_cgroup(sandbox: Optional[CgroupSandbox], task: RunTask, name_tag: str) -> Tuple[Optional[RunCgroup], str]:
+    """The task's transient cgroup, or (None, warning) to run it as a plain subprocess."""
+    if sandbox is None:
+        return None, ""
+    try:
+        return sandbox.create_run(name_tag, memory_max_mb=task.setting.memory_limit_mb), ""
+    except OSError as exc:
+        return None, f"[WARN] cgroup sandbox unavailable for this run ({exc}); running unsandboxed.\n"
+
+
+def cgroup_columns(run_cgroup: Optional[RunCgroup], stats: Dict[str, Any]) -> Dict[str, Any]:
+    return {"sandbox": "cgroup" if run_cgroup else "", **stats}
+
+
+def estimate_columns(estimate: Optional[GroundingEstimate]) -> Dict[str, Optional[int]]:
+    return {
+        "estimated_atoms": estimate.atoms if estimate else None,
+        "estimated_operators": estimate.operators if estimate else None,
+        "estimated_forced": estimate.forced if estimate else None,
+    }
 
 
 def run_single_task(
@@ -1920,6 +2127,8 @@ def run_single_task(
     *,
     run_dir: Path,
     dry_run: bool,
+    sandbox: Optional[CgroupSandbox] = None,
+    progress_interval: float = 0.0,
 ) -> TaskResult:
     logs_dir = run_dir / "logs"
     plans_dir = run_dir / "plans"
@@ -1950,117 +2159,133 @@ def run_single_task(
     plan_action_count = 0
     returncode: Optional[int] = None
     planner_used = task.setting.planner
-    out_text = ""
-    err_text = ""
     command = ""
-    parse_metrics: Dict[str, Any] = {}
+    planner_metrics: Dict[str, Any] = {}
     error_message = ""
 
-    tmpdir: Optional[tempfile.TemporaryDirectory] = None
     generated_problem: Optional[Path] = None
-    try:
-        if dry_run:
-            ensure_text_file(stdout_path, "")
-            ensure_text_file(stderr_path, "[DRY-RUN] planner execution skipped.\n")
-            row = BenchRow(
-                run_id=task.run_id,
-                pairing_id=task.pairing_id,
-                planner_setting=task.setting.name,
-                planner_family=task.setting.family,
-                planner=planner_used,
-                planner_args=task.setting.planner_args,
-                domain=str(task.domain.path),
-                domain_kind=task.domain.kind,
-                level=str(task.level.path),
-                level_source=task.level.source,
-                phase=task.phase,
-                repeat_index=task.repeat_index,
-                rows=task.level.rows,
-                cols=task.level.cols,
-                cells=task.level.cells,
-                status="dry-run",
-                timeout_sec=task.setting.timeout_sec,
-                measured_total_sec=round(time.perf_counter() - measured_total_start, 6),
-                measured_problem_gen_sec=0.0,
-                measured_solver_sec=0.0,
-                wrapper_time_sec=None,
-                domain_parsed=None,
-                problem_parsed=None,
-                reported_grounding_msec=None,
-                reported_grounding_sec=None,
-                reported_h1_setup_msec=None,
-                reported_h1_setup_sec=None,
-                initial_heuristic_h=None,
-                reported_heuristic_msec=None,
-                reported_heuristic_sec=None,
-                reported_search_msec=None,
-                reported_search_sec=None,
-                reported_total_sec=None,
-                reported_planning_msec=None,
-                reported_planning_sec=None,
-                reported_elapsed_plan_sec=None,
-                plan_length_reported=None,
-                plan_action_count=0,
-                plan_cost_reported=None,
-                action_set_size=None,
-                facts_count=None,
-                x_count=None,
-                problem_count=None,
-                predicate_count=None,
-                event_count=None,
-                translator_operators=None,
-                expanded_nodes=None,
-                reopened_nodes=None,
-                evaluated_states=None,
-                generated_nodes=None,
-                dead_end_states=None,
-                duplicate_states=None,
-                registered_states=None,
-                nodes_per_second_reported=None,
-                nodes_per_second_derived=None,
-                nodes_per_second=None,
-                returncode=None,
-                command="",
-                stdout_file=str(stdout_path),
-                stderr_file=str(stderr_path),
-                compiled_problem_file="",
-                plan_file="",
-                timed_plan_file="",
-                error_message="",
-            )
-            return TaskResult(row=row, task=task)
-
-        problem_gen_start = time.perf_counter()
-        problem_name = f"cfg_{safe_tag(task.domain.path.stem)}_{safe_tag(task.level.path.stem)}_{task.run_id:06d}"
-        generated_problem, tmpdir = generate_problem_from_level(
-            level_path=task.level.path,
-            domain=task.domain,
-            setting=task.setting,
-            problem_name=problem_name,
-        )
-        measured_problem_gen_sec = time.perf_counter() - problem_gen_start
-        compiled_problem_path.write_text(
-            generated_problem.read_text(encoding="utf-8", errors="replace"),
-            encoding="utf-8",
+    problem_cache_hit: Optional[bool] = None
+    estimate = estimate_task_grounding(task)
+    over_budget = grounding_budget_violation(task.setting, estimate)
+    if dry_run or over_budget:
+        ensure_text_file(stdout_path, "")
+        skip_note = "[DRY-RUN] planner execution skipped." if dry_run else f"[SKIP] {over_budget}"
+        ensure_text_file(stderr_path, f"{skip_note}\n")
+        row = BenchRow(
+            run_id=task.run_id,
+            pairing_id=task.pairing_id,
+            planner_setting=task.setting.name,
+            planner_family=task.setting.family,
+            planner=planner_used,
+            planner_args=task.setting.planner_args,
+            domain=str(task.domain.path),
+            domain_kind=task.domain.kind,
+            level=str(task.level.path),
+            level_source=task.level.source,
+            phase=task.phase,
+            repeat_index=task.repeat_index,
+            rows=task.level.rows,
+            cols=task.level.cols,
+            cells=task.level.cells,
+            status="over-budget" if over_budget else "dry-run",
+            timeout_sec=task.setting.timeout_sec,
+            measured_total_sec=round(time.perf_counter() - measured_total_start, 6),
+            measured_problem_gen_sec=0.0,
+            measured_solver_sec=0.0,
+            wrapper_time_sec=None,
+            domain_parsed=None,
+            problem_parsed=None,
+            reported_grounding_msec=None,
+            reported_grounding_sec=None,
+            reported_h1_setup_msec=None,
+            reported_h1_setup_sec=None,
+            initial_heuristic_h=None,
+            reported_heuristic_msec=None,
+            reported_heuristic_sec=None,
+            reported_search_msec=None,
+            reported_search_sec=None,
+            reported_total_sec=None,
+            reported_planning_msec=None,
+            reported_planning_sec=None,
+            reported_elapsed_plan_sec=None,
+            plan_length_reported=None,
+            plan_action_count=0,
+            plan_cost_reported=None,
+            action_set_size=None,
+            facts_count=None,
+            x_count=None,
+            problem_count=None,
+            predicate_count=None,
+            event_count=None,
+            translator_operators=None,
+            expanded_nodes=None,
+            reopened_nodes=None,
+            evaluated_states=None,
+            generated_nodes=None,
+            dead_end_states=None,
+            duplicate_states=None,
+            registered_states=None,
+            nodes_per_second_reported=None,
+            nodes_per_second_derived=None,
+            nodes_per_second=None,
+            returncode=None,
+            command="",
+            stdout_file=str(stdout_path),
+            stderr_file=str(stderr_path),
+            compiled_problem_file="",
+            plan_file="",
+            timed_plan_file="",
+            error_message=over_budget,
+            scan_chain=task.setting.scan_chain,
+            **estimate_columns(estimate),
         )
+        return TaskResult(row=row, task=task)
 
-        solver_start = time.perf_counter()
+    problem_gen_start = time.perf_counter()
+    # No run id in the PDDL problem name: repeats and other planner settings on
+    # the same (domain, level) then share one compiled-problem cache entry.
+    problem_name = f"cfg_{safe_tag(task.domain.path.stem)}_{safe_tag(task.level.path.stem)}"
+    problem_cache_hit = generate_problem_from_level(
+        level_path=task.level.path,
+        domain=task.domain,
+        setting=task.setting,
+        problem_name=problem_name,
+        dest=compiled_problem_path,
+    )
+    generated_problem = compiled_problem_path
+    measured_problem_gen_sec = time.perf_counter() - problem_gen_start
+
+    run_cgroup, sandbox_note = open_run_cgroup(sandbox, task, name_tag)
+    # Planner output streams to the log files and the metric scanner line by
+    # line; only bounded head/tail excerpts are ever held in memory.
+    scanner = MetricScanner.for_parser(metrics_parser(task.setting), extra=(SURVIVOR_NOTE_RE.pattern,))
+    observers: List[Any] = [scanner]
+    if progress_interval > 0:
+        observers.append(
+            ProgressTracker(functools.partial(report_progress, name_tag), min_interval=progress_interval)
+        )
+    cgroup_stats: Dict[str, Any] = {}
+    solver_start = time.perf_counter()
+    with OutputCapture(stdout_path, stderr_path, observers) as capture:
         try:
-            (
-                status,
-                plan_action_count,
-                returncode,
-                wrapper_time_sec,
-                out_text,
-                err_text,
-                planner_used,
-                actions_obj,
-                command_obj,
-            ) = execute_planner(
-                setting=task.setting,
-                domain_path=task.domain.path,
-                problem_path=generated_problem,
-            )
+            with capture_output(capture), launch_in_cgroup(run_cgroup.path if run_cgroup else None):
+                emit_output("err", sandbox_note)
+                (
+                    status,
+                    plan_action_count,
+                    returncode,
+                    wrapper_time_sec,
+                    _stdout_tail,
+                    _stderr_tail,
+                    planner_used,
+                    actions_obj,
+                    command_obj,
+                    planner_metrics,
+                ) = execute_planner_cached(
+                    setting=task.setting,
+                    domain_path=task.domain.path,
+                    problem_path=generated_problem,
+                )
             command = command_to_string(command_obj)
 
             if task.setting.family in {"classic", "fa"}:
@@ -2081,100 +2306,104 @@ def run_single_task(
                     write_plus_timed_plan_file(timed_plan_file, timed_actions)
         except Exception as exc:
             status = "error"
-            out_text = ""
-            err_text = f"[ERR] Planner execution failed: {exc}\n"
+            capture.feed("err", f"[ERR] Planner execution failed: {exc}\n")
             error_message = str(exc)
-        measured_solver_sec = time.perf_counter() - solver_start
-
-        ensure_text_file(stdout_path, out_text)
-        ensure_text_file(stderr_path, err_text)
-
-        full_text = (out_text or "") + "\n" + (err_text or "")
-        if task.setting.family == "plus":
-            parse_metrics = parse_plus_metrics(full_text)
-        elif task.setting.planner == "lifted":
-            parse_metrics = parse_lifted_metrics(full_text)
-        else:
-            parse_metrics = parse_classic_metrics(full_text)
-
-        expanded_nodes = parse_metrics.get("expanded_nodes")
-        reported_search_sec = parse_metrics.get("reported_search_sec")
-        nodes_per_second_derived = None
-        if isinstance(expanded_nodes, int) and isinstance(reported_search_sec, float) and reported_search_sec > 0:
-            nodes_per_second_derived = expanded_nodes / reported_search_sec
-        nodes_per_second_reported = parse_metrics.get("nodes_per_second_reported")
-        nodes_per_second = nodes_per_second_reported if nodes_per_second_reported is not None else nodes_per_second_derived
-
-        row = BenchRow(
-            run_id=task.run_id,
-            pairing_id=task.pairing_id,
-            planner_setting=task.setting.name,
-            planner_family=task.setting.family,
-            planner=planner_used,
-            planner_args=task.setting.planner_args,
-            domain=str(task.domain.path),
-            domain_kind=task.domain.kind,
-            level=str(task.level.path),
-            level_source=task.level.source,
-            phase=task.phase,
-            repeat_index=task.repeat_index,
-            rows=task.level.rows,
-            cols=task.level.cols,
-            cells=task.level.cells,
-            status=status,
-            timeout_sec=task.setting.timeout_sec,
-            measured_total_sec=round(time.perf_counter() - measured_total_start, 6),
-            measured_problem_gen_sec=round(measured_problem_gen_sec, 6),
-            measured_solver_sec=round(measured_solver_sec, 6),
-            wrapper_time_sec=wrapper_time_sec,
-            domain_parsed=parse_metrics.get("domain_parsed"),
-            problem_parsed=parse_metrics.get("problem_parsed"),
-            reported_grounding_msec=parse_metrics.get("reported_grounding_msec"),
-            reported_grounding_sec=parse_metrics.get("reported_grounding_sec"),
-            reported_h1_setup_msec=parse_metrics.get("reported_h1_setup_msec"),
-            reported_h1_setup_sec=parse_metrics.get("reported_h1_setup_sec"),
-            initial_heuristic_h=parse_metrics.get("initial_heuristic_h"),
-            reported_heuristic_msec=parse_metrics.get("reported_heuristic_msec"),
-            reported_heuristic_sec=parse_metrics.get("reported_heuristic_sec"),
-            reported_search_msec=parse_metrics.get("reported_search_msec"),
-            reported_search_sec=reported_search_sec,
-            reported_total_sec=parse_metrics.get("reported_total_sec"),
-            reported_planning_msec=parse_metrics.get("reported_planning_msec"),
-            reported_planning_sec=parse_metrics.get("reported_planning_sec"),
-            reported_elapsed_plan_sec=parse_metrics.get("reported_elapsed_plan_sec"),
-            plan_length_reported=parse_metrics.get("plan_length_reported"),
-            plan_action_count=plan_action_count,
-            plan_cost_reported=parse_metrics.get("plan_cost_reported"),
-            action_set_size=parse_metrics.get("action_set_size"),
-            facts_count=parse_metrics.get("facts_count"),
-            x_count=parse_metrics.get("x_count"),
-            problem_count=parse_metrics.get("problem_count"),
-            predicate_count=parse_metrics.get("predicate_count"),
-            event_count=parse_metrics.get("event_count"),
-            translator_operators=parse_metrics.get("translator_operators"),
-            expanded_nodes=expanded_nodes,
-            reopened_nodes=parse_metrics.get("reopened_nodes"),
-            evaluated_states=parse_metrics.get("evaluated_states"),
-            generated_nodes=parse_metrics.get("generated_nodes"),
-            dead_end_states=parse_metrics.get("dead_end_states"),
-            duplicate_states=parse_metrics.get("duplicate_states"),
-            registered_states=parse_metrics.get("registered_states"),
-            nodes_per_second_reported=nodes_per_second_reported,
-            nodes_per_second_derived=nodes_per_second_derived,
-            nodes_per_second=nodes_per_second,
-            returncode=returncode,
-            command=command,
-            stdout_file=str(stdout_path),
-            stderr_file=str(stderr_path),
-            compiled_problem_file=str(compiled_problem_path),
-            plan_file=str(plan_file) if plan_file.exists() else "",
-            timed_plan_file=str(timed_plan_file) if timed_plan_file.exists() else "",
-            error_message=error_message,
-        )
-        return TaskResult(row=row, task=task)
-    finally:
-        if tmpdir is not None:
-            tmpdir.cleanup()
+    measured_solver_sec = time.perf_counter() - solver_start
+    if run_cgroup is not None:
+        cgroup_stats = run_cgroup.stats()
+        run_cgroup.remove()
+        # memory.max OOM kills look like crashes to the planner wrappers.
+        if cgroup_stats.get("cgroup_oom_kills") and not is_success_status(status):
+            status = "memout"
+
+    parse_metrics = metrics_parser(task.setting)(scanner)
+
+    expanded_nodes = parse_metrics.get("expanded_nodes")
+    reported_search_sec = parse_metrics.get("reported_search_sec")
+    nodes_per_second_derived = None
+    if isinstance(expanded_nodes, int) and isinstance(reported_search_sec, float) and reported_search_sec > 0:
+        nodes_per_second_derived = expanded_nodes / reported_search_sec
+    nodes_per_second_reported = parse_metrics.get("nodes_per_second_reported")
+    nodes_per_second = nodes_per_second_reported if nodes_per_second_reported is not None else nodes_per_second_derived
+
+    row = BenchRow(
+        run_id=task.run_id,
+        pairing_id=task.pairing_id,
+        planner_setting=task.setting.name,
+        planner_family=task.setting.family,
+        planner=planner_used,
+        planner_args=task.setting.planner_args,
+        domain=str(task.domain.path),
+        domain_kind=task.domain.kind,
+        level=str(task.level.path),
+        level_source=task.level.source,
+        phase=task.phase,
+        repeat_index=task.repeat_index,
+        rows=task.level.rows,
+        cols=task.level.cols,
+        cells=task.level.cells,
+        status=status,
+        timeout_sec=task.setting.timeout_sec,
+        measured_total_sec=round(time.perf_counter() - measured_total_start, 6),
+        measured_problem_gen_sec=round(measured_problem_gen_sec, 6),
+        measured_solver_sec=round(measured_solver_sec, 6),
+        wrapper_time_sec=wrapper_time_sec,
+        domain_parsed=parse_metrics.get("domain_parsed"),
+        problem_parsed=parse_metrics.get("problem_parsed"),
+        reported_grounding_msec=parse_metrics.get("reported_grounding_msec"),
+        reported_grounding_sec=parse_metrics.get("reported_grounding_sec"),
+        reported_h1_setup_msec=parse_metrics.get("reported_h1_setup_msec"),
+        reported_h1_setup_sec=parse_metrics.get("reported_h1_setup_sec"),
+        initial_heuristic_h=parse_metrics.get("initial_heuristic_h"),
+        reported_heuristic_msec=parse_metrics.get("reported_heuristic_msec"),
+        reported_heuristic_sec=parse_metrics.get("reported_heuristic_sec"),
+        reported_search_msec=parse_metrics.get("reported_search_msec"),
+        reported_search_sec=reported_search_sec,
+        reported_total_sec=parse_metrics.get("reported_total_sec"),
+        reported_planning_msec=parse_metrics.get("reported_planning_msec"),
+        reported_planning_sec=parse_metrics.get("reported_planning_sec"),
+        reported_elapsed_plan_sec=parse_metrics.get("reported_elapsed_plan_sec"),
+        plan_length_reported=parse_metrics.get("plan_length_reported"),
+        plan_action_count=plan_action_count,
+        plan_cost_reported=parse_metrics.get("plan_cost_reported"),
+        action_set_size=parse_metrics.get("action_set_size"),
+        facts_count=parse_metrics.get("facts_count"),
+        x_count=parse_metrics.get("x_count"),
+        problem_count=parse_metrics.get("problem_count"),
+        predicate_count=parse_metrics.get("predicate_count"),
+        event_count=parse_metrics.get("event_count"),
+        translator_operators=parse_metrics.get("translator_operators"),
+        expanded_nodes=expanded_nodes,
+        reopened_nodes=parse_metrics.get("reopened_nodes"),
+        evaluated_states=parse_metrics.get("evaluated_states"),
+        generated_nodes=parse_metrics.get("generated_nodes"),
+        dead_end_states=parse_metrics.get("dead_end_states"),
+        duplicate_states=parse_metrics.get("duplicate_states"),
+        registered_states=parse_metrics.get("registered_states"),
+        nodes_per_second_reported=nodes_per_second_reported,
+        nodes_per_second_derived=nodes_per_second_derived,
+        nodes_per_second=nodes_per_second,
+        returncode=returncode,
+        command=command,
+        stdout_file=str(stdout_path),
+        stderr_file=str(stderr_path),
+        compiled_problem_file=str(compiled_problem_path),
+        plan_file=str(plan_file) if plan_file.exists() else "",
+        timed_plan_file=str(timed_plan_file) if timed_plan_file.exists() else "",
+        error_message=error_message,
+        problem_cache_hit=problem_cache_hit,
+        scan_chain=task.setting.scan_chain,
+        **estimate_columns(estimate),
+        surviving_processes=parse_last_int(scanner, SURVIVOR_NOTE_RE.pattern),
+        **resource_columns(planner_metrics),
+        memory_limit_mb=task.setting.memory_limit_mb,
+        **cgroup_columns(run_cgroup, cgroup_stats),
+        translate_cache_hit=planner_metrics.get("translate_cache_hit"),
+        translate_saved_sec=planner_metrics.get("translate_saved_sec"),
+        enhsp_worker=planner_metrics.get("enhsp_worker") or "",
+        plan_cache_hit=planner_metrics.get("plan_cache_hit"),
+    )
+    return TaskResult(row=row, task=task)
 
 
 def pairing_matches_setting(setting: PlannerSetting, domain: DomainInfo) -> bool:
@@ -2682,7 +2911,34 @@ def main() -> int:
         action="store_true",
         help="Build and execute the full run matrix without invoking planners.",
     )
+    ap.add_argument(
+        "--sandbox",
+        choices=("none", "cgroup"),
+        default=None,
+        help=(
+            "Run each planner in its own transient cgroup-v2 (cpu.max, memory.max, pids.max) "
+            "and record its memory.peak/cpu.stat; overrides the config's sandbox mode. "
+            "Falls back to plain subprocesses when cgroups are not delegated."
+        ),
+    )
+    ap.add_argument(
+        "--progress-interval",
+        type=float,
+        default=60.0,
+        help=(
+            "Print a [PROGRESS] line (expanded/evaluated states, best h) for each running planner "
+            "at most every N seconds of output; 0 disables."
+        ),
+    )
+    add_problem_cache_args(ap)
+    add_translate_cache_args(ap)
+    add_workspace_args(ap)
+    add_plan_cache_args(ap)
     args = ap.parse_args()
+    apply_problem_cache_args(args)
+    apply_translate_cache_args(args)
+    apply_workspace_args(args)
+    apply_plan_cache_args(args)
 
     config_path = args.config.resolve()
     if not config_path.exists():
@@ -2770,6 +3026,9 @@ def main() -> int:
     plots_dir = args.plots_dir.resolve() if args.plots_dir else (run_dir / "plots")
 
     try:
+        sandbox_mode, sandbox_limits, sandbox_parent = parse_sandbox_config(
+            cfg.get("sandbox"), config_dir=config_dir
+        )
         settings = parse_planner_settings(
             cfg.get("planner_settings"),
             config_dir=config_dir,
@@ -2862,6 +3121,21 @@ def main() -> int:
     )
     print(f"[INFO] Max parallel runs: {max_parallel} (QoS: equal thread priority)")
     print(f"[INFO] Max parallel custom runs: {max_parallel_custom_runs}")
+    sandbox: Optional[CgroupSandbox] = None
+    if args.sandbox is not None:
+        sandbox_mode = args.sandbox
+    if sandbox_mode == "cgroup" and not args.dry_run:
+        sandbox, reason = open_sandbox(sandbox_limits, sandbox_parent)
+        if sandbox is None:
+            print(f"[WARN] cgroup sandbox unavailable ({reason}); running planners as plain subprocesses.")
+        else:
+            print(
+                f"[INFO] cgroup sandbox: {sandbox.runs_dir} "
+                f"(cpu_cores={sandbox_limits.cpu_cores}, memory_max_mb={sandbox_limits.memory_max_mb}, "
+                f"pids_max={sandbox_limits.pids_max})"
+            )
+            if any(s.enhsp_worker for s in settings):
+                print("[WARN] enhsp_worker is ignored under the cgroup sandbox; ENHSP runs use java -jar in their run's cgroup.")
     print(
         "[INFO] Interleave smaller non-custom tasks with custom tasks: "
         f"{interleave_smaller_noncustom_with_custom}"
@@ -2925,6 +3199,12 @@ def main() -> int:
         "terminate_run_on_random_repeat_failure": random_repeat_failure_stops_pair_repeats,
         "repeat_successful_runs": repeat_successful_runs,
         "max_parallel_custom_runs": max_parallel_custom_runs,
+        "sandbox": {
+            "requested": sandbox_mode,
+            "active": sandbox is not None,
+            "runs_dir": str(sandbox.runs_dir) if sandbox else None,
+            **asdict(sandbox_limits),
+        },
         "interleave_smaller_noncustom_with_custom": interleave_smaller_noncustom_with_custom,
         "only_smaller_while_custom_running": only_smaller_while_custom_running,
         "noncustom_percent_smaller_than_custom": noncustom_percent_smaller_than_custom,
@@ -3188,6 +3468,8 @@ def main() -> int:
                         task,
                         run_dir=run_dir,
                         dry_run=args.dry_run,
+                        sandbox=sandbox,
+                        progress_interval=args.progress_interval,
                     )
                     future_to_ctx[fut] = (pid, task)
                     if task.phase == "growth" and (repeat_queues[pid] or not st.done):
@@ -3208,7 +3490,11 @@ def main() -> int:
                 except KeyboardInterrupt:
                     interrupted = True
                     hard_stop_requested = True
-                    print("[WARN] Second interrupt received. Waiting for running tasks to finish; no new tasks will start.")
+                    killed = kill_all_process_groups()
+                    print(
+                        "[WARN] Second interrupt received. "
+                        f"Killed {killed} running planner process group(s); no new tasks will start."
+                    )
                     continue
 
                 if not done:
@@ -3291,6 +3577,7 @@ def main() -> int:
                             plan_file="",
                             timed_plan_file="",
                             error_message=str(exc),
+                            scan_chain=completed_task.setting.scan_chain,
                         )
 
                     if completed_task.phase == "growth":
@@ -3394,6 +3681,8 @@ def main() -> int:
     finally:
         signal.signal(signal.SIGINT, old_sigint)
         signal.signal(signal.SIGTERM, old_sigterm)
+        if sandbox is not None:
+            sandbox.close()
 
     rows.sort(
         key=lambda r: (
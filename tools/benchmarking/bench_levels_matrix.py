@@ -28,6 +28,8 @@ from bench_config_matrix import (
     status_summary,
     write_csv,
 )
+from problem_gen_registry import add_problem_cache_args, apply_problem_cache_args  # type: ignore
+from subprocess_utils import kill_all_process_groups  # type: ignore
 
 
 def default_run_dir(stamp: str) -> Path:
@@ -152,7 +154,9 @@ def main() -> int:
         action="store_true",
         help="Build and execute the full run matrix without invoking planners.",
     )
+    add_problem_cache_args(ap)
     args = ap.parse_args()
+    apply_problem_cache_args(args)
 
     config_path = args.config.resolve()
     if not config_path.exists():
@@ -278,9 +282,10 @@ def main() -> int:
         if signal_hits == 2:
             drain_requested = True
             hard_stop_requested = True
+            killed = kill_all_process_groups()
             print(
                 f"[WARN] Received {name} again. Scheduler is locked; "
-                "waiting only for already-running work to finish."
+                f"killed {killed} running planner process group(s)."
             )
             return
         raise KeyboardInterrupt
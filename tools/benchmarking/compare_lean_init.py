@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Compare default and --lean-init problem output across domain variants.
+
+For every (domain, level) pair the domain's generator is run in-process twice,
+once with the default options and once with lean_init, and the script records
+problem size, :init literal counts and parse time. Parse time is measured with
+the shared s-expression reader (what every planner front end does first);
+`--fd-translate` additionally times Fast Downward's translator on the classic
+and FA variants when planners/fast-downward is built.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gc
+import io
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+TOOLS_DIR = Path(__file__).resolve().parents[1]
+BENCHMARK_DIR = Path(__file__).resolve().parent
+REPO_ROOT = TOOLS_DIR.parent
+if str(TOOLS_DIR) not in sys.path:
+    sys.path.insert(0, str(TOOLS_DIR))
+
+from domain_signature import parse_sexpr  # type: ignore  # noqa: E402
+from problem_gen_registry import (  # type: ignore  # noqa: E402
+    PDDL_DIR,
+    load_generator,
+    problem_gen_for_domain,
+    problem_options,
+)
+
+if str(PDDL_DIR) not in sys.path:
+    sys.path.insert(0, str(PDDL_DIR))
+from level_grid import parse_level_grid  # type: ignore  # noqa: E402
+
+DEFAULT_LEVELS = REPO_ROOT / "stonesandgem" / "bd_levels" / "bd_levels.txt"
+DEFAULT_DOMAINS = REPO_ROOT / "pddl" / "test_domains_target"
+FD_PY = REPO_ROOT / "planners" / "fast-downward" / "fast-downward.py"
+
+
+@dataclass
+class CompareRow:
+    domain: str
+    level: str
+    rows: int
+    cols: int
+    full_bytes: int
+    lean_bytes: int
+    full_init_literals: int
+    lean_init_literals: int
+    full_parse_sec: float
+    lean_parse_sec: float
+    full_translate_sec: Optional[float] = None
+    lean_translate_sec: Optional[float] = None
+
+
+def default_output_csv(stamp: str) -> Path:
+    return BENCHMARK_DIR / "results" / f"lean-init_{stamp}" / "lean_init_compare.csv"
+
+
+def _is_level(text: str) -> bool:
+    try:
+        parse_level_grid(text)
+    except ValueError:
+        return False
+    return True
+
+
+def load_levels(raws: Sequence[str]) -> List[Tuple[str, str]]:
+    """
+    (label, level text) pairs. A .txt file whose lines are each a complete
+    level (like bd_levels.txt) yields one entry per line; directories yield
+    their *.txt files.
+    """
+    levels: List[Tuple[str, str]] = []
+    for raw in raws:
+        path = Path(raw)
+        files = sorted(path.glob("*.txt")) if path.is_dir() else [path]
+        for level_file in files:
+            if not level_file.is_file():
+                raise FileNotFoundError(f"Level file not found: {level_file}")
+            text = level_file.read_text(encoding="utf-8", errors="replace")
+            lines = [line.strip() for line in text.splitlines() if line.strip()]
+            body = [line for line in lines if not line.startswith((";", "#"))]
+            if len(body) > 1 and len(lines) == len(body) and all(_is_level(line) for line in body):
+                for idx, line in enumerate(body, start=1):
+                    levels.append((f"{level_file.stem}_{idx:02d}", line))
+            elif _is_level(text):
+                levels.append((level_file.stem, text))
+            else:
+                print(f"[WARN] Skipping {level_file}: not a level file")
+    return levels
+
+
+def count_init_literals(problem_text: str) -> int:
+    start = problem_text.find("(:init")
+    end = problem_text.find("(:goal", start)
+    return problem_text.count("\n    (", start, end)
+
+
+def best_parse_secs(texts: Sequence[str], repeats: int) -> List[float]:
+    """Best-of-`repeats` parse time per text, interleaved so drift hits all alike."""
+    best = [float("inf")] * len(texts)
+    # The parse allocates one list per s-expression; keep collector pauses out
+    # of the measurement.
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            for idx, text in enumerate(texts):
+                t0 = time.perf_counter()
+                parse_sexpr(text)
+                best[idx] = min(best[idx], time.perf_counter() - t0)
+    finally:
+        gc.enable()
+    return best
+
+
+def fd_translate_sec(domain: Path, problem_text: str) -> Optional[float]:
+    with tempfile.TemporaryDirectory(prefix="lean_init_") as td:
+        problem = Path(td) / "problem.pddl"
+        problem.write_text(problem_text, encoding="utf-8")
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, str(FD_PY), "--translate", str(domain), str(problem)],
+            cwd=td,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        elapsed = time.perf_counter() - t0
+    return elapsed if proc.returncode == 0 else None
+
+
+def render(generator, level_text: str, problem_name: str, options) -> str:
+    buf = io.StringIO()
+    generator(buf, level_text, problem_name, options)
+    return buf.getvalue()
+
+
+def compare(
+    domains: Sequence[Path],
+    levels: Sequence[Tuple[str, str]],
+    *,
+    repeats: int,
+    fd_translate: bool,
+) -> List[CompareRow]:
+    full_options = problem_options()
+    lean_options = problem_options(lean_init=True)
+    rows: List[CompareRow] = []
+    for domain in domains:
+        gen_py = problem_gen_for_domain(domain)
+        generator = load_generator(gen_py) if gen_py.exists() else None
+        if generator is None:
+            print(f"[WARN] Skipping {domain.name}: no in-process generator ({gen_py.name})")
+            continue
+        translate = fd_translate and "plus" not in domain.stem.lower()
+        for label, level_text in levels:
+            problem_name = f"cmp_{label}"
+            try:
+                full = render(generator, level_text, problem_name, full_options)
+                lean = render(generator, level_text, problem_name, lean_options)
+            except Exception as exc:
+                print(f"[WARN] {domain.name}/{label}: {exc}")
+                continue
+            grid = parse_level_grid(level_text)
+            full_parse, lean_parse = best_parse_secs((full, lean), repeats)
+            row = CompareRow(
+                domain=domain.name,
+                level=label,
+                rows=grid.rows,
+                cols=grid.cols,
+                full_bytes=len(full.encode("utf-8")),
+                lean_bytes=len(lean.encode("utf-8")),
+                full_init_literals=count_init_literals(full),
+                lean_init_literals=count_init_literals(lean),
+                full_parse_sec=round(full_parse, 6),
+                lean_parse_sec=round(lean_parse, 6),
+            )
+            if translate:
+                row.full_translate_sec = fd_translate_sec(domain, full)
+                row.lean_translate_sec = fd_translate_sec(domain, lean)
+            rows.append(row)
+    return rows
+
+
+def summarize(rows: Sequence[CompareRow]) -> None:
+    by_domain: Dict[str, List[CompareRow]] = {}
+    for row in rows:
+        by_domain.setdefault(row.domain, []).append(row)
+    print(f"{'domain':<48} {'levels':>6} {'bytes':>8} {'init':>8} {'parse':>8}")
+    for domain, group in sorted(by_domain.items()):
+        full_bytes = sum(r.full_bytes for r in group)
+        full_init = sum(r.full_init_literals for r in group)
+        full_parse = sum(r.full_parse_sec for r in group)
+        bytes_pct = 100.0 * (full_bytes - sum(r.lean_bytes for r in group)) / full_bytes if full_bytes else 0.0
+        init_pct = 100.0 * (full_init - sum(r.lean_init_literals for r in group)) / full_init if full_init else 0.0
+        parse_pct = 100.0 * (full_parse - sum(r.lean_parse_sec for r in group)) / full_parse if full_parse else 0.0
+        print(f"{domain:<48} {len(group):>6} {-bytes_pct:>7.1f}% {-init_pct:>7.1f}% {-parse_pct:>7.1f}%")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        description="Compare default vs --lean-init problem size and parse time for each domain variant."
+    )
+    ap.add_argument(
+        "--levels",
+        nargs="+",
+        default=[str(DEFAULT_LEVELS)],
+        help="Level files (one level per line allowed) or directories (default: bd_levels.txt).",
+    )
+    ap.add_argument(
+        "--domains",
+        nargs="+",
+        type=Path,
+        default=sorted(DEFAULT_DOMAINS.glob("domain*.pddl")),
+        help="Domain files (default: pddl/test_domains_target/domain*.pddl).",
+    )
+    ap.add_argument("--repeats", type=int, default=5, help="Parse repetitions per problem; the best time is kept.")
+    ap.add_argument(
+        "--fd-translate",
+        action="store_true",
+        help="Also time Fast Downward's translator on classic/FA variants (needs planners/fast-downward).",
+    )
+    ap.add_argument("--output-csv", type=Path, default=None, help="CSV path (default: results/lean-init_<timestamp>/).")
+    args = ap.parse_args()
+
+    if args.fd_translate and not FD_PY.exists():
+        print(f"[ERR] --fd-translate needs {FD_PY}")
+        return 1
+    try:
+        levels = load_levels(args.levels)
+    except FileNotFoundError as exc:
+        print(f"[ERR] {exc}")
+        return 1
+
+    rows = compare(
+        [d.resolve() for d in args.domains],
+        levels,
+        repeats=max(1, args.repeats),
+        fd_translate=args.fd_translate,
+    )
+    if not rows:
+        print("[ERR] No (domain, level) pair produced a problem.")
+        return 1
+
+    out_csv = args.output_csv or default_output_csv(datetime.now().strftime("%Y%m%d_%H%M%S"))
+    out_csv.parent.mkdir(parents=True, exist_ok=True)
+    with out_csv.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(CompareRow.__annotations__.keys()))
+        writer.writeheader()
+        writer.writerows(asdict(row) for row in rows)
+
+    summarize(rows)
+    print(f"[OK] {len(rows)} comparisons written to {out_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
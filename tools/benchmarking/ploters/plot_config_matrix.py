@@ -396,12 +396,12 @@ def family_by_setting(rows: Sequence[Dict[str, str]]) -> Dict[str, str]:
 
 
 def is_attempt_status(status: str) -> bool:
-    return status not in {"dry-run", "skipped_after_timeout", ""}
+    return status not in {"dry-run", "over-budget", "skipped_after_timeout", ""}
 
 
 def include_line_scatter_point(status: str) -> bool:
     s = (status or "").strip().lower()
-    return s not in {"timeout", "error"}
+    return s not in {"timeout", "memout", "error", "over-budget"}
 
 
 def marker_for_family(family: str) -> str:
@@ -485,7 +485,7 @@ def red_yellow_green(rate: float) -> str:
 
 def plot_status_by_setting(rows: Sequence[Dict[str, str]], out_path: Path, subtitle: str) -> None:
     settings = sorted(set(r["_setting"] for r in rows))
-    status_order = ["solved", "no-path", "timeout", "error", "unsolved", "dry-run", "skipped_after_timeout"]
+    status_order = ["solved", "no-path", "timeout", "memout", "error", "unsolved", "dry-run", "over-budget", "skipped_after_timeout"]
     other_status = sorted(set(r["_status"] for r in rows if r["_status"] not in status_order))
     statuses = status_order + other_status
     statuses = [s for s in statuses if any(r["_status"] == s for r in rows)]
@@ -605,7 +605,7 @@ def plot_success_rate(rows: Sequence[Dict[str, str]], out_path: Path, subtitle:
 
 def plot_status_by_domain(rows: Sequence[Dict[str, str]], out_path: Path, subtitle: str) -> None:
     domains = sorted(set(r["_domain"] for r in rows))
-    status_order = ["solved", "no-path", "timeout", "error", "unsolved", "dry-run", "skipped_after_timeout"]
+    status_order = ["solved", "no-path", "timeout", "memout", "error", "unsolved", "dry-run", "over-budget", "skipped_after_timeout"]
     statuses = [s for s in status_order if any(r["_status"] == s for r in rows)]
     extras = sorted(set(r["_status"] for r in rows if r["_status"] not in statuses))
     statuses.extend(extras)
@@ -2927,6 +2927,14 @@ def write_plot_manifest(out_dir: Path, generated: Sequence[Path]) -> None:
     (out_dir / "PLOTS.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
 
 
+def cpu_total_sec(row: Dict[str, str]) -> Optional[float]:
+    user = safe_float(row.get("cpu_user_sec", ""))
+    sys_time = safe_float(row.get("cpu_sys_sec", ""))
+    if user is None or sys_time is None:
+        return None
+    return user + sys_time
+
+
 def build_chart_calls(rows: Sequence[Dict[str, str]], subtitle: str) -> List[Tuple[str, Callable[[Path], None]]]:
     return [
         ("status_by_setting.svg", lambda p: plot_status_by_setting(rows, p, subtitle)),
@@ -3020,6 +3028,41 @@ def build_chart_calls(rows: Sequence[Dict[str, str]], subtitle: str) -> List[Tup
                 y_label="Nodes per second",
             ),
         ),
+        (
+            "cpu_time_box_by_setting.svg",
+            lambda p: plot_box_by_setting(
+                rows,
+                p,
+                subtitle,
+                title="Planner CPU Time (user + sys) By Setting",
+                value_fn=cpu_total_sec,
+                y_label="CPU Time (sec)",
+            ),
+        ),
+        (
+            "peak_rss_box_by_setting.svg",
+            lambda p: plot_box_by_setting(
+                rows,
+                p,
+                subtitle,
+                title="Planner Peak RSS By Setting",
+                value_fn=lambda r: safe_float(r.get("max_rss_mb", "")),
+                y_label="Peak RSS (MB)",
+            ),
+        ),
+        (
+            "peak_rss_vs_cells_scatter.svg",
+            lambda p: plot_scatter(
+                rows,
+                p,
+                subtitle,
+                title="Planner Peak RSS vs Map Size",
+                x_fn=lambda r: safe_float(r.get("cells", "")),
+                y_fn=lambda r: safe_float(r.get("max_rss_mb", "")),
+                x_label="Cells (rows × cols)",
+                y_label="Peak RSS (MB)",
+            ),
+        ),
         ("timeout_heatmap_domain_x_setting.svg", lambda p: plot_timeout_heatmap(rows, p, subtitle)),
         (
             "outcome_heatmap_domain_map_x_setting.svg",
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Transient cgroup-v2 sandboxes for benchmark planner runs.
+
+Each run gets its own child cgroup with a cpu.max quota, memory.max limit and
+pids.max cap, so parallel FD/ENHSP runs cannot starve or OOM each other, and
+the kernel's own accounting (memory.peak, cpu.stat, memory.events) is read
+back when the run finishes. Planners join their run cgroup before exec via
+subprocess_utils.launch_in_cgroup.
+
+The runs need a delegated cgroup the current user may write to: either an
+explicit parent (e.g. a `systemd-run --user -p Delegate=yes` unit's cgroup),
+or the cgroup this process already lives in, in which case the process moves
+itself into a `supervisor-<pid>` leaf so controllers can be enabled for its
+siblings. When none of that works (cgroup v1, no delegation, non-Linux)
+`open_sandbox` returns None with the reason, and callers run plain
+subprocesses.
+
+Usage:
+  python3 tools/cgroup_sandbox.py probe [--parent /sys/fs/cgroup/user.slice/...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+CONTROLLERS = ("cpu", "memory", "pids")
+CPU_PERIOD_USEC = 100_000
+REMOVE_RETRY_SEC = 2.0
+
+
+@dataclass(frozen=True)
+class CgroupLimits:
+    cpu_cores: Optional[float] = 1.0  # cpu.max quota in CPUs; None = unlimited
+    memory_max_mb: Optional[int] = None
+    pids_max: Optional[int] = 256
+
+    def files(self, memory_max_mb: Optional[int] = None) -> Dict[str, str]:
+        """Control-file values; `memory_max_mb` overrides the default memory.max."""
+        memory = memory_max_mb or self.memory_max_mb
+        values = {
+            "cpu.max": (
+                f"{max(1000, round(self.cpu_cores * CPU_PERIOD_USEC))} {CPU_PERIOD_USEC}"
+                if self.cpu_cores
+                else f"max {CPU_PERIOD_USEC}"
+            ),
+            "memory.max": str(int(memory) * 1024 * 1024) if memory else "max",
+            "pids.max": str(self.pids_max) if self.pids_max else "max",
+        }
+        if memory:
+            # Without this the kernel swaps the run instead of OOM-killing it.
+            values["memory.swap.max"] = "0"
+        return values
+
+
+def cgroup2_mount() -> Optional[Path]:
+    """Mount point of the unified (v2) hierarchy, or None."""
+    try:
+        lines = Path("/proc/self/mountinfo").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        # <id> <parent> <maj:min> <root> <mount point> <options> ... - <fstype> <source> <super options>
+        pre, _, post = line.partition(" - ")
+        if post.split(" ", 1)[0] == "cgroup2":
+            return Path(pre.split()[4])
+    return None
+
+
+def current_cgroup() -> Optional[Path]:
+    """This process's cgroup-v2 directory, or None."""
+    mount = cgroup2_mount()
+    if mount is None:
+        return None
+    try:
+        lines = Path("/proc/self/cgroup").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        if line.startswith("0::"):
+            return mount / line[3:].lstrip("/")
+    return None
+
+
+def _read(path: Path) -> str:
+    return path.read_text(encoding="utf-8").strip()
+
+
+def _write(path: Path, value: str) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        f.write(value)
+
+
+def _read_keyed(path: Path) -> Dict[str, int]:
+    """'key value' lines (cpu.stat, memory.events); {} when the file is missing."""
+    try:
+        text = _read(path)
+    except OSError:
+        return {}
+    values: Dict[str, int] = {}
+    for line in text.splitlines():
+        key, _, raw = line.partition(" ")
+        if raw.strip().isdigit():
+            values[key] = int(raw)
+    return values
+
+
+def _read_int(path: Path) -> Optional[int]:
+    try:
+        raw = _read(path)
+    except OSError:
+        return None
+    return int(raw) if raw.isdigit() else None
+
+
+def _enable_controllers(cgroup: Path) -> None:
+    available = set(_read(cgroup / "cgroup.controllers").split())
+    missing = [c for c in CONTROLLERS if c not in available]
+    if missing:
+        raise OSError(errno.ENOTSUP, f"controllers not delegated: {' '.join(missing)}")
+    enabled = set(_read(cgroup / "cgroup.subtree_control").split())
+    wanted = [c for c in CONTROLLERS if c not in enabled]
+    if wanted:
+        _write(cgroup / "cgroup.subtree_control", " ".join(f"+{c}" for c in wanted))
+
+
+def _remove(cgroup: Path) -> None:
+    """Kill whatever is left in a cgroup and remove it (best effort)."""
+    if not cgroup.is_dir():
+        return
+    try:
+        _write(cgroup / "cgroup.kill", "1")
+    except OSError:
+        # cgroup.kill needs Linux 5.14; signal the members instead.
+        try:
+            pids = [int(p) for p in _read(cgroup / "cgroup.procs").split()]
+        except OSError:
+            pids = []
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+    deadline = time.monotonic() + REMOVE_RETRY_SEC
+    while True:
+        try:
+            cgroup.rmdir()
+            return
+        except FileNotFoundError:
+            return
+        except OSError:
+            # EBUSY until the killed members are reaped.
+            if time.monotonic() >= deadline:
+                return
+            time.sleep(0.05)
+
+
+class RunCgroup:
+    """One run's transient cgroup; planners join it via launch_in_cgroup(path)."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def stats(self) -> Dict[str, Any]:
+        """Kernel accounting for everything that ran in the cgroup."""
+        cpu = _read_keyed(self.path / "cpu.stat")
+        events = _read_keyed(self.path / "memory.events")
+        peak = _read_int(self.path / "memory.peak")
+
+        def usec(key: str) -> Optional[float]:
+            return round(cpu[key] / 1e6, 3) if key in cpu else None
+
+        return {
+            "cgroup_memory_peak_mb": round(peak / (1024 * 1024), 1) if peak is not None else None,
+            "cgroup_cpu_user_sec": usec("user_usec"),
+            "cgroup_cpu_sys_sec": usec("system_usec"),
+            "cgroup_throttled_sec": usec("throttled_usec"),
+            "cgroup_oom_kills": events.get("oom_kill"),
+            "cgroup_pids_peak": _read_int(self.path / "pids.peak"),
+        }
+
+    def remove(self) -> None:
+        _remove(self.path)
+
+
+class CgroupSandbox:
+    """Creates one transient child cgroup per run under a delegated parent."""
+
+    def __init__(self, runs_dir: Path, limits: CgroupLimits, *, home: Optional[Path] = None) -> None:
+        self.runs_dir = runs_dir
+        self.limits = limits
+        # Set when this process moved itself into a supervisor leaf of `home`.
+        self._home = home
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def create_run(self, tag: str, *, memory_max_mb: Optional[int] = None) -> RunCgroup:
+        with self._lock:
+            self._counter += 1
+            path = self.runs_dir / f"run-{self._counter:06d}-{tag}"[:200]
+        path.mkdir()
+        try:
+            for name, value in self.limits.files(memory_max_mb).items():
+                if name == "memory.swap.max" and not (path / name).exists():
+                    continue
+                _write(path / name, value)
+        except OSError:
+            _remove(path)
+            raise
+        return RunCgroup(path)
+
+    def close(self) -> None:
+        """Remove every run cgroup and the runs directory; undo the supervisor move."""
+        if not self.runs_dir.is_dir():
+            return
+        for child in sorted(self.runs_dir.iterdir()):
+            if child.is_dir():
+                _remove(child)
+        _remove(self.runs_dir)
+        if self._home is None:
+            return
+        supervisor = self._home / f"supervisor-{os.getpid()}"
+        try:
+            enabled = set(_read(self._home / "cgroup.subtree_control").split())
+            if enabled:
+                _write(self._home / "cgroup.subtree_control", " ".join(f"-{c}" for c in sorted(enabled)))
+            _write(self._home / "cgroup.procs", str(os.getpid()))
+            supervisor.rmdir()
+        except OSError:
+            # Other processes still use the controllers; stay in the leaf.
+            pass
+        self._home = None
+
+
+def open_sandbox(
+    limits: CgroupLimits,
+    parent: Optional[Path] = None,
+) -> Tuple[Optional[CgroupSandbox], str]:
+    """
+    (sandbox, "") when per-run cgroups can be created, else (None, reason).
+    Without `parent` the current cgroup is used; this process then moves
+    into a supervisor leaf, which needs every other process to have left it.
+    """
+    if os.name != "posix":
+        return None, "cgroups need Linux"
+    mount = cgroup2_mount()
+    if mount is None:
+        return None, "no cgroup v2 (unified) hierarchy mounted"
+    home: Optional[Path] = None
+    if parent is None:
+        parent = current_cgroup()
+        if parent is None:
+            return None, "cannot determine the current cgroup"
+        home = parent
+    runs_dir = parent / f"bench-{os.getpid()}"
+    moved = False
+    try:
+        if not (parent / "cgroup.procs").exists():
+            return None, f"{parent} is not a cgroup v2 directory"
+        if home is not None:
+            supervisor = home / f"supervisor-{os.getpid()}"
+            supervisor.mkdir(exist_ok=True)
+            _write(supervisor / "cgroup.procs", str(os.getpid()))
+            moved = True
+        _enable_controllers(parent)
+        runs_dir.mkdir(exist_ok=True)
+        _enable_controllers(runs_dir)
+    except OSError as exc:
+        _remove(runs_dir)
+        if moved and home is not None:
+            try:
+                _write(home / "cgroup.procs", str(os.getpid()))
+                (home / f"supervisor-{os.getpid()}").rmdir()
+            except OSError:
+                pass
+        hint = exc.strerror or str(exc)
+        if exc.errno in (errno.EACCES, errno.EPERM, errno.EROFS):
+            hint += " (run under `systemd-run --user --scope -p Delegate=yes` or pass a delegated parent)"
+        elif exc.errno == errno.EBUSY:
+            hint += " (other processes share this cgroup; pass a delegated parent)"
+        return None, f"{parent}: {hint}"
+    return CgroupSandbox(runs_dir, limits, home=home if moved else None), ""
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Check whether per-run cgroup sandboxes are available.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    probe = sub.add_parser("probe", help="Create and remove one run cgroup.")
+    probe.add_argument("--parent", type=Path, default=None, help="Delegated parent cgroup directory.")
+    args = ap.parse_args(argv)
+
+    sandbox, reason = open_sandbox(CgroupLimits(), args.parent)
+    if sandbox is None:
+        print(f"[WARN] cgroup sandbox unavailable: {reason}")
+        return 1
+    try:
+        run = sandbox.create_run("probe")
+        print(f"[INFO] Run cgroup: {run.path}")
+        run.remove()
+    finally:
+        sandbox.close()
+    print("[OK] cgroup sandbox available")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
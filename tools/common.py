@@ -5,13 +5,14 @@ import json
 import os
 import re
 import shutil
-import subprocess
 import sys
 import tempfile
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional, Tuple
 
+import subprocess_utils
+
 
 @dataclass
 class PlanResult:
@@ -42,15 +43,7 @@ def run_cmd(
     cwd: Optional[Path] = None,
     timeout_sec: Optional[int] = None,
 ) -> Tuple[int, str, str]:
-    p = subprocess.run(
-        cmd,
-        cwd=str(cwd) if cwd else None,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        timeout=timeout_sec,
-    )
-    return p.returncode, p.stdout, p.stderr
+    return subprocess_utils.run_cmd(cmd, cwd=cwd, timeout_sec=timeout_sec)
 
 
 def parse_sexp_action(line: str) -> Optional[Tuple[str, List[str]]]:
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Small content-addressed on-disk cache shared by the planning tools.
+
+Entries are directories named after a sha256 key and populated atomically
+(written to a scratch directory, then renamed into place). Files inside an
+entry are made read-only because callers hardlink them into run directories.
+Eviction is LRU by entry mtime, which `get()` refreshes on every hit.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_CACHE_ROOT = REPO_ROOT / ".cache"
+
+# A callable payload receives the destination path and writes the file itself,
+# which lets generators stream straight into the cache.
+CachePayload = Union[bytes, str, Path, Callable[[Path], None]]
+
+
+def hash_parts(*parts: Union[bytes, str]) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode("utf-8") if isinstance(part, str) else part
+        # Length-prefix every part so ("ab", "c") and ("a", "bc") differ.
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def link_or_copy(src: Path, dest: Path) -> None:
+    """Hardlink src to dest, falling back to a copy across filesystems."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for child in path.iterdir():
+        try:
+            total += child.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class ContentCache:
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+
+    def entry_dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Optional[Path]:
+        entry = self.entry_dir(key)
+        if not entry.is_dir():
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            # Evicted between the check and the touch.
+            return None
+        return entry
+
+    def put(self, key: str, files: Dict[str, CachePayload]) -> Path:
+        entry = self.entry_dir(key)
+        scratch = self.root / "tmp" / f"{key}.{os.getpid()}.{uuid.uuid4().hex[:8]}"
+        scratch.mkdir(parents=True, exist_ok=True)
+        size = 0
+        try:
+            for name, payload in files.items():
+                dest = scratch / name
+                if callable(payload):
+                    payload(dest)
+                elif isinstance(payload, Path):
+                    shutil.copyfile(payload, dest)
+                elif isinstance(payload, str):
+                    dest.write_text(payload, encoding="utf-8")
+                else:
+                    dest.write_bytes(payload)
+                dest.chmod(0o444)
+                size += dest.stat().st_size
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(scratch, entry)
+            except OSError:
+                # Another worker stored the same key first; keep theirs.
+                shutil.rmtree(scratch, ignore_errors=True)
+                return entry
+        except Exception:
+            shutil.rmtree(scratch, ignore_errors=True)
+            raise
+
+        with self._lock:
+            if self._approx_bytes is not None:
+                self._approx_bytes += size
+            needs_prune = self._approx_bytes is None or self._approx_bytes > self.max_bytes
+        if needs_prune:
+            self.prune()
+        return entry
+
+    def remove(self, key: str) -> None:
+        """Drop an entry (e.g. to replace it: put() keeps an existing entry)."""
+        entry = self.entry_dir(key)
+        if entry.is_dir():
+            shutil.rmtree(entry, ignore_errors=True)
+            with self._lock:
+                self._approx_bytes = None
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries: List[Tuple[float, int, Path]] = []
+        if not self.root.is_dir():
+            return entries
+        for shard in self.root.iterdir():
+            if not shard.is_dir() or shard.name == "tmp" or len(shard.name) != 2:
+                continue
+            for entry in shard.iterdir():
+                try:
+                    mtime = entry.stat().st_mtime
+                    size = _dir_size(entry)
+                except OSError:
+                    continue
+                entries.append((mtime, size, entry))
+        return entries
+
+    def prune(self) -> int:
+        """Evict least recently used entries until the cache fits max_bytes."""
+        with self._lock:
+            self._clear_stale_scratch()
+            entries = self._entries()
+            total = sum(size for _mtime, size, _entry in entries)
+            removed = 0
+            if total > self.max_bytes:
+                # Drop a little below the bound so we do not rescan on every put.
+                target = int(self.max_bytes * 0.9)
+                for _mtime, size, entry in sorted(entries, key=lambda item: item[0]):
+                    if total <= target:
+                        break
+                    shutil.rmtree(entry, ignore_errors=True)
+                    total -= size
+                    removed += 1
+            self._approx_bytes = total
+            return removed
+
+    def _clear_stale_scratch(self, max_age_sec: float = 3600.0) -> None:
+        scratch_root = self.root / "tmp"
+        if not scratch_root.is_dir():
+            return
+        cutoff = time.time() - max_age_sec
+        for scratch in scratch_root.iterdir():
+            try:
+                if scratch.stat().st_mtime < cutoff:
+                    shutil.rmtree(scratch, ignore_errors=True)
+            except OSError:
+                continue
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Parsed, cached summary of a PDDL domain file.
+
+Generator and planner selection only need a domain's name, its `; source:` /
+`; variant:` headers and the symbols it declares. Parse those once per file
+version, keep them in memory keyed by (path, mtime, size), and persist them in
+the shared on-disk cache so later processes skip the parse as well.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+from content_cache import DEFAULT_CACHE_ROOT, ContentCache, hash_parts
+
+SIGNATURE_VERSION = "domain-signature-v3"
+SIGNATURE_CACHE_DIR = DEFAULT_CACHE_ROOT / "domain_signatures"
+SIGNATURE_CACHE_MAX_MB = 64
+
+_HEADER_RE = re.compile(r"^;\s*([A-Za-z][\w-]*):\s*(.+?)\s*$", flags=re.MULTILINE)
+_TOKEN_RE = re.compile(r"[()]|[^\s()]+")
+
+_LOCK = threading.Lock()
+_SIGNATURES: Dict[Path, Tuple[int, int, "DomainSignature"]] = {}
+_DISK_CACHE: Optional[ContentCache] = ContentCache(SIGNATURE_CACHE_DIR, SIGNATURE_CACHE_MAX_MB * 1024 * 1024)
+
+SExpr = Union[str, List[Any]]
+
+
+@dataclass(frozen=True)
+class DomainSignature:
+    name: str = ""
+    headers: Dict[str, str] = field(default_factory=dict)
+    requirements: Tuple[str, ...] = ()
+    types: Tuple[str, ...] = ()
+    predicates: FrozenSet[str] = frozenset()
+    functions: FrozenSet[str] = frozenset()
+    actions: Tuple[str, ...] = ()
+    events: Tuple[str, ...] = ()
+    processes: Tuple[str, ...] = ()
+    # Every symbol mentioned inside an action/event/process/derived body.
+    referenced: FrozenSet[str] = frozenset()
+    predicate_arities: Dict[str, int] = field(default_factory=dict)
+    # Symbols each action/event/process mentions, by schema name.
+    schema_references: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    schema_arities: Dict[str, int] = field(default_factory=dict)
+    # Predicates some :effect adds or deletes; the rest are static.
+    fluent_predicates: FrozenSet[str] = frozenset()
+
+    def header_name(self, header: str) -> Optional[str]:
+        """File name carried by a `; <header>: path` comment, e.g. source/variant."""
+        value = self.headers.get(header.lower())
+        return Path(value).name if value else None
+
+    @property
+    def source(self) -> Optional[str]:
+        return self.header_name("source")
+
+    @property
+    def variant(self) -> Optional[str]:
+        return self.header_name("variant")
+
+    @property
+    def is_plus(self) -> bool:
+        if self.events or self.processes:
+            return True
+        return any(req.lower() in (":processes", ":events") for req in self.requirements)
+
+    def declares(self, symbol: str) -> bool:
+        """True when `symbol` is a declared predicate or function."""
+        return symbol in self.predicates or symbol in self.functions
+
+    def references(self, symbol: str) -> bool:
+        """True when some action, event, process or derived rule mentions `symbol`."""
+        return symbol in self.referenced
+
+    @property
+    def unreferenced_functions(self) -> FrozenSet[str]:
+        """Declared functions no operator reads or writes, e.g. unused coordinates."""
+        return self.functions - self.referenced
+
+    @property
+    def schemas(self) -> Tuple[str, ...]:
+        """Actions, events and processes, i.e. everything that grounds to operators."""
+        return self.actions + self.events + self.processes
+
+    def to_json(self) -> str:
+        data = asdict(self)
+        data["predicates"] = sorted(self.predicates)
+        data["functions"] = sorted(self.functions)
+        data["referenced"] = sorted(self.referenced)
+        data["fluent_predicates"] = sorted(self.fluent_predicates)
+        return json.dumps(data, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text: str) -> "DomainSignature":
+        data = json.loads(text)
+        return cls(
+            name=data["name"],
+            headers=dict(data["headers"]),
+            requirements=tuple(data["requirements"]),
+            types=tuple(data["types"]),
+            predicates=frozenset(data["predicates"]),
+            functions=frozenset(data["functions"]),
+            actions=tuple(data["actions"]),
+            events=tuple(data["events"]),
+            processes=tuple(data["processes"]),
+            referenced=frozenset(data["referenced"]),
+            predicate_arities=dict(data["predicate_arities"]),
+            schema_references={name: tuple(refs) for name, refs in data["schema_references"].items()},
+            schema_arities=dict(data["schema_arities"]),
+            fluent_predicates=frozenset(data["fluent_predicates"]),
+        )
+
+
+def parse_sexpr(text: str) -> List[SExpr]:
+    """Nested lists of tokens for PDDL text with comments already removed."""
+    stack: List[List[SExpr]] = [[]]
+    for token in _TOKEN_RE.findall(text):
+        if token == "(":
+            stack.append([])
+        elif token == ")":
+            if len(stack) == 1:
+                raise ValueError("unbalanced ')' in domain")
+            done = stack.pop()
+            stack[-1].append(done)
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1:
+        raise ValueError("unbalanced '(' in domain")
+    return stack[0]
+
+
+def _typed_names(items: List[SExpr]) -> List[str]:
+    """Names from a typed list such as `a b - t c`, dropping the type markers."""
+    names: List[str] = []
+    skip_next = False
+    for item in items:
+        if skip_next:
+            skip_next = False
+            continue
+        if item == "-":
+            skip_next = True
+            continue
+        if isinstance(item, str):
+            names.append(item)
+    return names
+
+
+def _symbols(expr: SExpr, into: set) -> None:
+    if isinstance(expr, str):
+        if not expr.startswith(("?", ":")):
+            into.add(expr)
+        return
+    for item in expr:
+        _symbols(item, into)
+
+
+def _effect_symbols(schema: List[SExpr], into: set) -> None:
+    """Symbols under the :effect of an action/event/process body."""
+    for key, value in zip(schema, schema[1:]):
+        if isinstance(key, str) and key.lower() == ":effect":
+            _symbols(value, into)
+
+
+def _parameter_count(schema: List[SExpr]) -> int:
+    for key, value in zip(schema, schema[1:]):
+        if isinstance(key, str) and key.lower() == ":parameters" and isinstance(value, list):
+            return sum(1 for arg in value if isinstance(arg, str) and arg.startswith("?"))
+    return 0
+
+
+def parse_domain_signature(text: str) -> DomainSignature:
+    headers: Dict[str, str] = {}
+    for key, value in _HEADER_RE.findall(text):
+        headers.setdefault(key.lower(), value)
+    body = "\n".join(line.split(";", 1)[0] for line in text.splitlines())
+
+    define = next(
+        (expr for expr in parse_sexpr(body) if isinstance(expr, list) and expr and str(expr[0]).lower() == "define"),
+        None,
+    )
+    if define is None:
+        raise ValueError("no (define ...) form in domain")
+
+    name = ""
+    requirements: List[str] = []
+    types: List[str] = []
+    predicates: List[str] = []
+    arities: Dict[str, int] = {}
+    functions: List[str] = []
+    sections: Dict[str, List[str]] = {":action": [], ":durative-action": [], ":event": [], ":process": []}
+    referenced: set = set()
+    schema_references: Dict[str, Tuple[str, ...]] = {}
+    schema_arities: Dict[str, int] = {}
+    effects: set = set()
+    for section in define[1:]:
+        if not isinstance(section, list) or not section or not isinstance(section[0], str):
+            continue
+        head = section[0].lower()
+        if head == "domain" and len(section) > 1 and isinstance(section[1], str):
+            name = section[1]
+        elif head == ":requirements":
+            requirements.extend(item for item in section[1:] if isinstance(item, str))
+        elif head == ":types":
+            types.extend(_typed_names(section[1:]))
+        elif head == ":predicates":
+            for item in section[1:]:
+                if isinstance(item, list) and item:
+                    predicates.append(item[0])
+                    arities[item[0]] = sum(1 for arg in item[1:] if isinstance(arg, str) and arg.startswith("?"))
+        elif head == ":functions":
+            functions.extend(item[0] for item in section[1:] if isinstance(item, list) and item)
+        elif head in sections and len(section) > 1 and isinstance(section[1], str):
+            sections[head].append(section[1])
+            mentioned: set = set()
+            _symbols(section[2:], mentioned)
+            referenced |= mentioned
+            schema_references[section[1]] = tuple(sorted(mentioned))
+            schema_arities[section[1]] = _parameter_count(section[2:])
+            _effect_symbols(section[2:], effects)
+        elif head == ":derived":
+            _symbols(section[1:], referenced)
+
+    return DomainSignature(
+        name=name,
+        headers=headers,
+        requirements=tuple(requirements),
+        types=tuple(types),
+        predicates=frozenset(predicates),
+        functions=frozenset(functions),
+        actions=tuple(sections[":action"] + sections[":durative-action"]),
+        events=tuple(sections[":event"]),
+        processes=tuple(sections[":process"]),
+        referenced=frozenset(referenced),
+        predicate_arities=arities,
+        schema_references=schema_references,
+        schema_arities=schema_arities,
+        fluent_predicates=frozenset(effects) & frozenset(predicates),
+    )
+
+
+def configure_signature_cache(cache_dir: Optional[Path] = None, enabled: bool = True) -> None:
+    """Relocate or disable the on-disk layer; the in-memory layer always applies."""
+    global _DISK_CACHE
+    _DISK_CACHE = (
+        ContentCache(cache_dir or SIGNATURE_CACHE_DIR, SIGNATURE_CACHE_MAX_MB * 1024 * 1024)
+        if enabled
+        else None
+    )
+
+
+def _load_from_disk(key: str) -> Optional[DomainSignature]:
+    cache = _DISK_CACHE
+    if cache is None:
+        return None
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    try:
+        return DomainSignature.from_json((entry / "signature.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _store_on_disk(key: str, signature: DomainSignature) -> None:
+    cache = _DISK_CACHE
+    if cache is None:
+        return
+    try:
+        cache.put(key, {"signature.json": signature.to_json()})
+    except OSError:
+        pass  # read-only checkout or full disk: the in-memory layer still works
+
+
+def load_domain_signature(path: Path) -> DomainSignature:
+    """Signature for `path`, reparsed only when the file's mtime or size changes."""
+    path = path.resolve()
+    st = path.stat()
+    with _LOCK:
+        cached = _SIGNATURES.get(path)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    key = hash_parts(SIGNATURE_VERSION, str(path), str(st.st_mtime_ns), str(st.st_size))
+    signature = _load_from_disk(key)
+    if signature is None:
+        signature = parse_domain_signature(path.read_text(encoding="utf-8", errors="replace"))
+        _store_on_disk(key, signature)
+    with _LOCK:
+        _SIGNATURES[path] = (st.st_mtime_ns, st.st_size, signature)
+    return signature
+
+
+def try_load_domain_signature(path: Path) -> Optional[DomainSignature]:
+    """Like load_domain_signature, but None for missing or unparsable files."""
+    try:
+        return load_domain_signature(path)
+    except (OSError, ValueError):
+        return None
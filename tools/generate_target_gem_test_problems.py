@@ -2,19 +2,33 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
 import sys
+import time
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 PDDL_DIR = ROOT / "pddl"
+TEST_DOMAINS_DIR = PDDL_DIR / "test_domains_target"
 sys.path.insert(0, str(PDDL_DIR))
+sys.path.insert(0, str(TEST_DOMAINS_DIR))
 
 import problem_gen as base  # type: ignore  # noqa: E402
+from level_grid import parse_level_grid  # type: ignore  # noqa: E402
+import problem_gen_common as common  # type: ignore  # noqa: E402
 import problem_gen_plus_from_domain as plus_gen  # type: ignore  # noqa: E402
 
 SELECTED_LEVELS = (1, 2, 3, 6, 7, 8, 9, 11, 13, 14)
 DEFAULT_DOMAIN_NAME = "mine-tick-gravity-plus-scanner-separated-events"
 STEEL_WALL_ID = 19
+MANIFEST_NAME = "target_gem_manifest.json"
+MANIFEST_VERSION = 1
+# Variants per pool task; one level's chunk shares a single base render per domain generator.
+DEFAULT_CHUNK_SIZE = 256
 
 
 def _load_level_strings(path: Path) -> list[str]:
@@ -22,12 +36,7 @@ def _load_level_strings(path: Path) -> list[str]:
 
 
 def _gem_positions(level_str: str) -> list[tuple[int, int]]:
-    rows, cols, _max_time, _required_gems, cell_ids = base.parse_level_string(level_str)
-    positions: list[tuple[int, int]] = []
-    for idx, cell_id in enumerate(cell_ids):
-        if base.classify_cell_id(cell_id) == "gem":
-            positions.append((idx // cols, idx % cols))
-    return positions
+    return parse_level_grid(level_str).gem_positions
 
 
 def _target_only_name(level_index: int, gem_ordinal: int) -> str:
@@ -53,31 +62,117 @@ def _render_level(
     return "|".join(fields) + "|"
 
 
-def _trim_outer_steel_border(
-    rows: int,
-    cols: int,
-    cell_ids: list[int],
-) -> tuple[int, int, list[int]]:
-    grid = [cell_ids[row_start:row_start + cols] for row_start in range(0, len(cell_ids), cols)]
-
-    while grid and all(cell_id == STEEL_WALL_ID for cell_id in grid[0]):
-        grid.pop(0)
-    while grid and all(cell_id == STEEL_WALL_ID for cell_id in grid[-1]):
-        grid.pop()
-    while grid and grid[0] and all(row[0] == STEEL_WALL_ID for row in grid):
-        for row in grid:
-            del row[0]
-    while grid and grid[0] and all(row[-1] == STEEL_WALL_ID for row in grid):
-        for row in grid:
-            row.pop()
-
-    if not grid or not grid[0]:
+def _steel_trim_bounds(rows: int, cols: int, cell_ids) -> tuple[int, int, int, int]:
+    """
+    [top, bottom) x [left, right) left after peeling all-steel outer rows, then
+    all-steel outer columns of the remaining rows.
+    """
+    def steel_row(r: int) -> bool:
+        return all(cell_id == STEEL_WALL_ID for cell_id in cell_ids[r * cols:(r + 1) * cols])
+
+    def steel_col(c: int) -> bool:
+        return all(cell_ids[r * cols + c] == STEEL_WALL_ID for r in range(top, bottom))
+
+    top, bottom = 0, rows
+    while top < bottom and steel_row(top):
+        top += 1
+    while top < bottom and steel_row(bottom - 1):
+        bottom -= 1
+    left, right = 0, cols
+    while top < bottom and left < right and steel_col(left):
+        left += 1
+    while top < bottom and left < right and steel_col(right - 1):
+        right -= 1
+    if top >= bottom or left >= right:
         raise ValueError("Trimming the outer steel border removed the entire level.")
+    return top, bottom, left, right
+
+
+@dataclass(frozen=True)
+class TrimmedLevel:
+    """
+    One corpus level parsed and steel-trimmed once. Markers never touch steel
+    cells, so every variant shares the trim and differs from `tokens` in at
+    most three cells (target marker, vacated agent cell, start gem).
+    """
+    index: int
+    rows: int
+    cols: int
+    max_time: int
+    required_gems: int
+    cell_ids: tuple[int, ...]
+    # Rendered `|`-fields of the trimmed cells, so a variant only re-renders its edits.
+    tokens: tuple[str, ...]
+    agent_index: int
+    # Trimmed cell index of each gem, in gem-ordinal (row-major) order.
+    gem_indexes: tuple[int, ...]
+
+    @classmethod
+    def parse(cls, level_str: str, index: int = 0) -> "TrimmedLevel":
+        rows, cols, max_time, required_gems, cell_ids = base.parse_level_string(level_str)
+        top, bottom, left, right = _steel_trim_bounds(rows, cols, cell_ids)
+        trimmed = [cell_ids[r * cols + c] for r in range(top, bottom) for c in range(left, right)]
+        trimmed_cols = right - left
+        grid = parse_level_grid(level_str)
+        if not grid.agent_indexes:
+            raise ValueError(f"Level {index} has no agent.")
+        to_trimmed = lambda idx: (idx // cols - top) * trimmed_cols + (idx % cols - left)  # noqa: E731
+        return cls(
+            index=index,
+            rows=bottom - top,
+            cols=trimmed_cols,
+            max_time=max_time,
+            required_gems=required_gems,
+            cell_ids=tuple(trimmed),
+            tokens=tuple(f"{cell_id:02d}" for cell_id in trimmed),
+            agent_index=to_trimmed(grid.agent_indexes[0]),
+            gem_indexes=tuple(to_trimmed(idx) for idx in grid.gem_indexes),
+        )
 
-    trimmed_rows = len(grid)
-    trimmed_cols = len(grid[0])
-    trimmed_cell_ids = [cell_id for row in grid for cell_id in row]
-    return trimmed_rows, trimmed_cols, trimmed_cell_ids
+    @property
+    def gem_count(self) -> int:
+        return len(self.gem_indexes)
+
+    def _text(self, tokens: list[str] | tuple[str, ...]) -> str:
+        header = f"{self.rows}|{self.cols}|{self.max_time}|{self.required_gems}|"
+        return header + "|".join(tokens) + "|"
+
+    @property
+    def base_text(self) -> str:
+        """The unmarked level with the same trim the variants get."""
+        return self._text(self.tokens)
+
+    def variant_text(self, target_gem_ordinal: int, start_gem_ordinal: int | None = None) -> str:
+        tokens = list(self.tokens)
+        target_idx = self.gem_indexes[target_gem_ordinal - 1]
+        if self.cell_ids[target_idx] in base.GEM_FALLING_IDS:
+            tokens[target_idx] = f"{base.TARGET_GEM_FALLING_ID:02d}"
+        else:
+            tokens[target_idx] = f"{base.TARGET_GEM_STATIC_ID:02d}"
+
+        if start_gem_ordinal is not None:
+            if start_gem_ordinal == target_gem_ordinal:
+                raise ValueError(
+                    "Self-contained txt test problems cannot encode start_gem == target_gem."
+                )
+            tokens[self.agent_index] = f"{next(iter(base.EMPTY_IDS)):02d}"
+            tokens[self.gem_indexes[start_gem_ordinal - 1]] = f"{next(iter(base.AGENT_IDS)):02d}"
+        return self._text(tokens)
+
+    def variants(self, all_pairs: bool) -> list[tuple[str, int | None, int]]:
+        """(file stem, start ordinal or None, target ordinal) for this level's variants."""
+        ordinals = range(1, self.gem_count + 1)
+        out: list[tuple[str, int | None, int]] = [
+            (_target_only_name(self.index, target), None, target) for target in ordinals
+        ]
+        if all_pairs:
+            out.extend(
+                (_start_target_name(self.index, start, target), start, target)
+                for start in ordinals
+                for target in ordinals
+                if start != target
+            )
+        return out
 
 
 def _marked_level_text(
@@ -86,94 +181,186 @@ def _marked_level_text(
     target_gem_ordinal: int,
     start_gem_ordinal: int | None = None,
 ) -> str:
-    rows, cols, max_time, required_gems, cell_ids = base.parse_level_string(level_str)
-    gem_positions = _gem_positions(level_str)
-    target_pos = gem_positions[target_gem_ordinal - 1]
-    target_idx = target_pos[0] * cols + target_pos[1]
-    target_cell_id = cell_ids[target_idx]
-    if target_cell_id in base.GEM_FALLING_IDS:
-        cell_ids[target_idx] = base.TARGET_GEM_FALLING_ID
-    else:
-        cell_ids[target_idx] = base.TARGET_GEM_STATIC_ID
+    return TrimmedLevel.parse(level_str).variant_text(target_gem_ordinal, start_gem_ordinal)
 
-    if start_gem_ordinal is not None:
-        if start_gem_ordinal == target_gem_ordinal:
-            raise ValueError(
-                "Self-contained txt test problems cannot encode start_gem == target_gem."
-            )
-        start_pos = gem_positions[start_gem_ordinal - 1]
-        start_idx = start_pos[0] * cols + start_pos[1]
-        agent_idx = next(
-            idx for idx, cell_id in enumerate(cell_ids)
-            if cell_id in base.AGENT_IDS
-        )
-        cell_ids[agent_idx] = next(iter(base.EMPTY_IDS))
-        cell_ids[start_idx] = next(iter(base.AGENT_IDS))
 
-    trimmed_rows, trimmed_cols, trimmed_cell_ids = _trim_outer_steel_border(rows, cols, cell_ids)
-    return _render_level(trimmed_rows, trimmed_cols, max_time, required_gems, trimmed_cell_ids)
+def _base_level_text(level_str: str) -> str:
+    return TrimmedLevel.parse(level_str).base_text
 
 
 def _write_level_file(path: Path, level_str: str) -> None:
     path.write_text(f"{level_str.strip()}\n", encoding="utf-8")
 
 
+@dataclass
+class ManifestEntry:
+    file: str
+    level: int
+    start_gem: int | None
+    target_gem: int
+    rows: int
+    cols: int
+    sha256: str
+
+
+def _write_variant_problems(
+    level: TrimmedLevel,
+    variants: dict[str, str],
+    output_dir: Path,
+    domain_filenames: list[str],
+    options: base.ProblemOptions,
+) -> int:
+    """
+    Compile one level's variants for every domain in a single pass: each
+    generator renders the level once and the variants are patched from it.
+    """
+    writers = common.level_variant_writers(level.base_text, variants, domain_filenames, options)
+    for (stem, domain_filename), write in writers.items():
+        out_path = output_dir / Path(domain_filename).stem / f"{stem}.pddl"
+        with out_path.open("w", encoding="utf-8") as out:
+            write(out)
+    return len(writers)
+
+
+def _write_variant_chunk(
+    level: TrimmedLevel,
+    chunk: list[tuple[str, int | None, int]],
+    output_dir: Path,
+    pddl_domains: list[str],
+    options: base.ProblemOptions,
+) -> list[ManifestEntry]:
+    entries: list[ManifestEntry] = []
+    variants: dict[str, str] = {}
+    for stem, start, target in chunk:
+        text = level.variant_text(target, start)
+        variants[stem] = text
+        _write_level_file(output_dir / f"{stem}.txt", text)
+        entries.append(
+            ManifestEntry(
+                file=f"{stem}.txt",
+                level=level.index,
+                start_gem=start,
+                target_gem=target,
+                rows=level.rows,
+                cols=level.cols,
+                sha256=hashlib.sha256(f"{text}\n".encode("utf-8")).hexdigest(),
+            )
+        )
+    if pddl_domains:
+        _write_variant_problems(level, variants, output_dir, pddl_domains, options)
+    return entries
+
+
+def parse_level_selection(spec: str, level_count: int) -> list[int]:
+    """'selected', 'all', or 1-based indexes and ranges such as '1,3,5-9'."""
+    spec = spec.strip().lower()
+    if spec == "selected":
+        return list(SELECTED_LEVELS)
+    if spec == "all":
+        return list(range(1, level_count + 1))
+    if spec in ("", "none"):
+        return []
+    indexes: dict[int, None] = {}
+    for part in spec.split(","):
+        lo, _, hi = part.strip().partition("-")
+        first = int(lo)
+        for index in range(first, int(hi) + 1 if hi else first + 1):
+            indexes.setdefault(index, None)
+    return list(indexes)
+
+
+def resolve_pddl_domains(patterns: list[str]) -> list[str]:
+    """Domain file names under pddl/test_domains_target matching the globs."""
+    names: dict[str, None] = {}
+    for pattern in patterns:
+        matches = sorted(TEST_DOMAINS_DIR.glob(pattern))
+        if not matches:
+            raise ValueError(f"No domain in {TEST_DOMAINS_DIR} matches {pattern!r}.")
+        for match in matches:
+            names.setdefault(match.name, None)
+    return list(names)
+
+
 def generate_selected_problems(
     levels_path: Path,
     output_dir: Path,
     domain_name: str,
+    pddl_domains: list[str] | None = None,
+    options: base.ProblemOptions | None = None,
+    *,
+    levels: str = "selected",
+    all_pairs_levels: str = "1",
+    jobs: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
 ) -> list[str]:
+    """
+    Write the marked level files for the chosen levels (target-only variants,
+    plus every start/target pair for `all_pairs_levels`) and a manifest. With
+    `pddl_domains` also write each variant's problem for those domain variants
+    to `<output_dir>/<domain stem>/`.
+
+    Each level is parsed once; variant chunks are written by `jobs` worker
+    processes.
+    """
     level_strings = _load_level_strings(levels_path)
     output_dir.mkdir(parents=True, exist_ok=True)
+    pddl_domains = pddl_domains or []
+    options = options or base.DEFAULT_PROBLEM_OPTIONS
+    level_indexes = parse_level_selection(levels, len(level_strings))
+    pair_indexes = set(parse_level_selection(all_pairs_levels, len(level_strings)))
 
     for stale in output_dir.glob("bd_level_*.pddl"):
         stale.unlink()
     for stale in output_dir.glob("bd_level_*.txt"):
         stale.unlink()
+    for domain_filename in pddl_domains:
+        domain_dir = output_dir / Path(domain_filename).stem
+        domain_dir.mkdir(exist_ok=True)
+        for stale in domain_dir.glob("bd_level_*.pddl"):
+            stale.unlink()
+
+    tasks: list[tuple[TrimmedLevel, list[tuple[str, int | None, int]]]] = []
+    for level_index in level_indexes:
+        if not 1 <= level_index <= len(level_strings):
+            raise ValueError(f"Missing level {level_index} in {levels_path}.")
+        level_str = level_strings[level_index - 1]
+        level = TrimmedLevel.parse(level_str, level_index)
+        variants = level.variants(all_pairs=level_index in pair_indexes)
+        for offset in range(0, len(variants), max(1, chunk_size)):
+            tasks.append((level, variants[offset:offset + max(1, chunk_size)]))
+
+    entries: list[ManifestEntry] = []
+    if jobs <= 1 or len(tasks) <= 1:
+        for level, chunk in tasks:
+            entries.extend(_write_variant_chunk(level, chunk, output_dir, pddl_domains, options))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            futures = [
+                pool.submit(_write_variant_chunk, level, chunk, output_dir, pddl_domains, options)
+                for level, chunk in tasks
+            ]
+            for future in futures:
+                entries.extend(future.result())
+
+    write_manifest(output_dir / MANIFEST_NAME, levels_path, entries)
+    return [entry.file for entry in entries]
 
-    written: list[str] = []
-    for level_index in SELECTED_LEVELS:
-        try:
-            level_str = level_strings[level_index - 1]
-        except IndexError as exc:
-            raise ValueError(f"Missing level {level_index} in {levels_path}.") from exc
-
-        gem_positions = _gem_positions(level_str)
-        gem_count = len(gem_positions)
-        for gem_ordinal in range(1, gem_count + 1):
-            stem = _target_only_name(level_index, gem_ordinal)
-            out_path = output_dir / f"{stem}.txt"
-            _write_level_file(
-                out_path,
-                _marked_level_text(level_str, target_gem_ordinal=gem_ordinal),
-            )
-            written.append(out_path.name)
-
-        if level_index == 1:
-            for start_gem_ordinal in range(1, gem_count + 1):
-                for target_gem_ordinal in range(1, gem_count + 1):
-                    if start_gem_ordinal == target_gem_ordinal:
-                        continue
-                    stem = _start_target_name(level_index, start_gem_ordinal, target_gem_ordinal)
-                    out_path = output_dir / f"{stem}.txt"
-                    _write_level_file(
-                        out_path,
-                        _marked_level_text(
-                            level_str,
-                            start_gem_ordinal=start_gem_ordinal,
-                            target_gem_ordinal=target_gem_ordinal,
-                        ),
-                    )
-                    written.append(out_path.name)
-
-    return written
+
+def write_manifest(path: Path, levels_path: Path, entries: list[ManifestEntry]) -> None:
+    payload = {
+        "version": MANIFEST_VERSION,
+        "levels_file": str(levels_path),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "entries": [asdict(entry) for entry in entries],
+    }
+    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
 
 
 def main() -> int:
     ap = argparse.ArgumentParser(
         description=(
             "Generate self-contained level-text test inputs with in-grid target-gem "
-            "markers for selected Stones & Gems levels."
+            "markers for Stones & Gems levels, plus a manifest."
         )
     )
     ap.add_argument(
@@ -191,15 +378,63 @@ def main() -> int:
         default=DEFAULT_DOMAIN_NAME,
         help="Unused compatibility flag kept so existing invocations keep working.",
     )
+    ap.add_argument(
+        "--pddl-domains",
+        nargs="+",
+        default=[],
+        metavar="GLOB",
+        help=(
+            "Also compile every variant for these pddl/test_domains_target domains "
+            "(e.g. 'domain*.pddl') into <output-dir>/<domain stem>/."
+        ),
+    )
+    ap.add_argument(
+        "--levels",
+        default="selected",
+        help=(
+            "Levels to cover: 'selected' (the historical test set), 'all', or 1-based "
+            "indexes/ranges such as '1,3,5-9' (default: selected)."
+        ),
+    )
+    ap.add_argument(
+        "--all-pairs-levels",
+        default="1",
+        help="Levels that also get every start/target gem pair; same syntax as --levels (default: 1).",
+    )
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count).")
+    ap.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Variants per worker task (default: {DEFAULT_CHUNK_SIZE}).",
+    )
+    base.add_problem_option_args(ap)
     args = ap.parse_args()
 
     try:
-        written = generate_selected_problems(args.levels_file, args.output_dir, args.domain_name)
+        pddl_domains = resolve_pddl_domains(args.pddl_domains)
+        written = generate_selected_problems(
+            args.levels_file,
+            args.output_dir,
+            args.domain_name,
+            pddl_domains=pddl_domains,
+            options=base.problem_options_from_args(args),
+            levels=args.levels,
+            all_pairs_levels=args.all_pairs_levels,
+            jobs=args.jobs,
+            chunk_size=args.chunk_size,
+        )
     except Exception as exc:
         sys.stderr.write(f"Error: {exc}\n")
         return 1
 
-    sys.stdout.write(f"Wrote {len(written)} level files to {args.output_dir}\n")
+    sys.stdout.write(
+        f"Wrote {len(written)} level files and {MANIFEST_NAME} to {args.output_dir}\n"
+    )
+    if pddl_domains:
+        sys.stdout.write(
+            f"Wrote {len(written) * len(pddl_domains)} problems for {len(pddl_domains)} domains\n"
+        )
     return 0
 
 
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Predict grounding size for a (level, domain variant) pair without a translator.
+
+Every domain in pddl/ is a grid-local formulation: whatever a schema's
+parameter count, static adjacency ties its parameters to one anchor cell, so
+a schema grounds to roughly one operator per cell it can fire on. The prior
+below counts those cells from the level (open cells for moves, stone/gem
+reachable cells for physics, scan-chain cells for scanner steps) and the
+domain signature (schema references, predicate arities, fluent predicates).
+
+The prior is deliberately structural; `calibrate` fits a per-domain
+`scale * prior + offset` against the translator_operators / facts_count /
+event_count columns of benchmark_matrix.csv runs and stores it next to the
+benchmarks, where `estimate_grounding` picks it up.
+
+Usage:
+  python3 tools/grounding_estimate.py estimate DOMAIN LEVEL [--scan-chain dynamic]
+  python3 tools/grounding_estimate.py calibrate results/*/benchmark_matrix.csv
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+TOOLS_DIR = Path(__file__).resolve().parent
+REPO_ROOT = TOOLS_DIR.parent
+PDDL_DIR = REPO_ROOT / "pddl"
+if str(PDDL_DIR) not in sys.path:
+    sys.path.insert(0, str(PDDL_DIR))
+
+from domain_signature import DomainSignature, load_domain_signature  # type: ignore  # noqa: E402
+from level_grid import LevelGrid, classify_cell_id, load_level_grid  # type: ignore  # noqa: E402
+from problem_gen import dynamic_scan_cells  # type: ignore  # noqa: E402
+
+DEFAULT_CALIBRATION = TOOLS_DIR / "benchmarking" / "grounding_calibration.json"
+CALIBRATION_VERSION = 1
+
+# Schema names the domain generators use for actions the planner must apply
+# as soon as they are enabled; every event counts as forced as well.
+FORCED_PREFIXES = ("__forced__", "forced-", "ev_")
+SCAN_SYMBOLS = frozenset({"first-cell", "next-cell", "last-cell", "scan-at"})
+OBJECT_SYMBOLS = frozenset({"stone", "gem", "falling", "target-gem"})
+QUANTITIES = ("atoms", "operators", "forced")
+
+
+@dataclass(frozen=True)
+class GroundingFeatures:
+    rows: int
+    cols: int
+    open_cells: int
+    dynamic_cells: int
+    scan_cells: int
+
+    @property
+    def cells(self) -> int:
+        return self.rows * self.cols
+
+
+@dataclass(frozen=True)
+class GroundingEstimate:
+    atoms: int
+    operators: int
+    forced: int
+    calibrated: bool = False
+
+
+def grounding_features(grid: LevelGrid, scan_chain: str = "full") -> GroundingFeatures:
+    cell_ids = grid.cell_ids()
+    dynamic = len(dynamic_scan_cells(grid.rows, grid.cols, cell_ids))
+    open_cells = sum(1 for cell_id in cell_ids if classify_cell_id(cell_id) != "brick")
+    return GroundingFeatures(
+        rows=grid.rows,
+        cols=grid.cols,
+        open_cells=open_cells,
+        dynamic_cells=dynamic,
+        scan_cells=dynamic if scan_chain == "dynamic" else grid.rows * grid.cols,
+    )
+
+
+def is_forced(signature: DomainSignature, schema: str) -> bool:
+    return schema in signature.events or schema.lower().startswith(FORCED_PREFIXES)
+
+
+def _schema_cells(signature: DomainSignature, schema: str, features: GroundingFeatures) -> int:
+    if not signature.schema_arities.get(schema, 0):
+        return 1
+    refs = set(signature.schema_references.get(schema, ()))
+    if refs & SCAN_SYMBOLS:
+        return features.scan_cells
+    if refs & OBJECT_SYMBOLS and "agent-at" not in refs:
+        return features.dynamic_cells
+    return features.open_cells
+
+
+def prior_estimate(signature: DomainSignature, features: GroundingFeatures) -> GroundingEstimate:
+    operators = 0
+    forced = 0
+    for schema in signature.schemas:
+        count = _schema_cells(signature, schema, features)
+        operators += count
+        if is_forced(signature, schema):
+            forced += count
+    atoms = 0
+    for pred in signature.fluent_predicates:
+        if not signature.predicate_arities.get(pred, 0):
+            atoms += 1
+        elif pred in SCAN_SYMBOLS or pred == "updated":
+            atoms += features.scan_cells
+        else:
+            atoms += features.open_cells
+    return GroundingEstimate(atoms=atoms, operators=operators, forced=forced)
+
+
+# ----------------------------------------------------------------------
+# Calibration
+# ----------------------------------------------------------------------
+# { "version": 1, "domains": { "<domain file name>":
+#     { "atoms": [scale, offset], "operators": [...], "forced": [...], "samples": n } } }
+
+Calibration = Dict[str, Dict[str, object]]
+
+
+def load_calibration(path: Path = DEFAULT_CALIBRATION) -> Calibration:
+    """Per-domain fits, or {} when no calibration has been written yet."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    if data.get("version") != CALIBRATION_VERSION:
+        print(f"[WARN] Ignoring {path}: calibration version {data.get('version')!r}")
+        return {}
+    return dict(data.get("domains") or {})
+
+
+def apply_calibration(prior: GroundingEstimate, fit: Optional[Dict[str, object]]) -> GroundingEstimate:
+    if not fit:
+        return prior
+    values = {}
+    for quantity in QUANTITIES:
+        raw = getattr(prior, quantity)
+        coeffs = fit.get(quantity)
+        values[quantity] = max(0, round(coeffs[0] * raw + coeffs[1])) if coeffs else raw
+    return GroundingEstimate(calibrated=True, **values)
+
+
+def estimate_grounding(
+    domain: Path,
+    level: LevelGrid | Path,
+    *,
+    scan_chain: str = "full",
+    calibration: Optional[Calibration] = None,
+) -> GroundingEstimate:
+    """Predicted atoms/operators/forced actions; calibrated when a fit exists for the domain."""
+    grid = level if isinstance(level, LevelGrid) else load_level_grid(Path(level))
+    prior = prior_estimate(load_domain_signature(Path(domain)), grounding_features(grid, scan_chain))
+    if calibration is None:
+        calibration = load_calibration()
+    return apply_calibration(prior, calibration.get(Path(domain).name))
+
+
+def _fit_line(points: Sequence[Tuple[int, int]]) -> List[float]:
+    """Least-squares scale/offset; a pure ratio when the prior never varies."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        return [mean_y / mean_x if mean_x else 0.0, 0.0 if mean_x else mean_y]
+    scale = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+    return [round(scale, 6), round(mean_y - scale * mean_x, 3)]
+
+
+def _int_or_none(raw: Optional[str]) -> Optional[int]:
+    try:
+        return int(float(raw)) if raw not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def fit_calibration(csv_paths: Iterable[Path]) -> Calibration:
+    """
+    Fit every domain seen in benchmark_matrix.csv rows whose level and domain
+    files still exist. Operators come from translator_operators (FD) or
+    action_set_size (ENHSP |A|), atoms from facts_count, forced from
+    event_count.
+    """
+    points: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+    priors: Dict[Tuple[str, str, str], GroundingEstimate] = {}
+    for csv_path in csv_paths:
+        with Path(csv_path).open(newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                domain = Path(row.get("domain") or "")
+                level = Path(row.get("level") or "")
+                scan_chain = row.get("scan_chain") or "full"
+                if not domain.is_file() or not level.is_file():
+                    continue
+                key = (str(domain), str(level), scan_chain)
+                if key not in priors:
+                    try:
+                        priors[key] = prior_estimate(
+                            load_domain_signature(domain),
+                            grounding_features(load_level_grid(level), scan_chain),
+                        )
+                    except (OSError, ValueError) as exc:
+                        print(f"[WARN] {domain.name}/{level.name}: {exc}")
+                        continue
+                prior = priors[key]
+                observed = {
+                    "atoms": _int_or_none(row.get("facts_count")),
+                    "operators": _int_or_none(row.get("translator_operators"))
+                    or _int_or_none(row.get("action_set_size")),
+                    "forced": _int_or_none(row.get("event_count")),
+                }
+                per_domain = points.setdefault(domain.name, {q: [] for q in QUANTITIES})
+                for quantity, value in observed.items():
+                    if value is not None:
+                        per_domain[quantity].append((getattr(prior, quantity), value))
+
+    calibration: Calibration = {}
+    for domain_name, per_domain in sorted(points.items()):
+        fit: Dict[str, object] = {q: _fit_line(p) for q, p in per_domain.items() if p}
+        if fit:
+            fit["samples"] = max(len(p) for p in per_domain.values())
+            calibration[domain_name] = fit
+    return calibration
+
+
+def write_calibration(calibration: Calibration, path: Path = DEFAULT_CALIBRATION) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"version": CALIBRATION_VERSION, "domains": calibration}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Predict grounding size for (level, domain) pairs.")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    est = sub.add_parser("estimate", help="Print the predicted grounding size.")
+    est.add_argument("domain", type=Path)
+    est.add_argument("levels", nargs="+", type=Path)
+    est.add_argument("--scan-chain", choices=("full", "dynamic"), default="full")
+    est.add_argument("--calibration", type=Path, default=DEFAULT_CALIBRATION)
+    est.add_argument("--json", action="store_true", help="One JSON object per level.")
+
+    cal = sub.add_parser("calibrate", help="Fit per-domain corrections from benchmark_matrix.csv files.")
+    cal.add_argument("csv", nargs="+", type=Path)
+    cal.add_argument("-o", "--output", type=Path, default=DEFAULT_CALIBRATION)
+
+    args = ap.parse_args(argv)
+
+    if args.command == "calibrate":
+        calibration = fit_calibration(args.csv)
+        if not calibration:
+            print("[ERR] No usable rows (domain/level files missing or no translator counts).")
+            return 1
+        write_calibration(calibration, args.output)
+        for domain_name, fit in calibration.items():
+            print(f"[INFO] {domain_name}: {fit['samples']} samples")
+        print(f"[OK] Calibration written to {args.output}")
+        return 0
+
+    calibration = load_calibration(args.calibration)
+    for level in args.levels:
+        try:
+            estimate = estimate_grounding(
+                args.domain, level, scan_chain=args.scan_chain, calibration=calibration
+            )
+        except (OSError, ValueError) as exc:
+            print(f"[ERR] {level}: {exc}")
+            return 1
+        if args.json:
+            print(json.dumps({"level": str(level), "domain": str(args.domain), **asdict(estimate)}))
+        else:
+            tag = "calibrated" if estimate.calibrated else "prior"
+            print(
+                f"{level.name}: atoms={estimate.atoms} operators={estimate.operators} "
+                f"forced={estimate.forced} ({tag})"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
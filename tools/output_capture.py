@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Streaming sinks for planner output (see subprocess_utils.capture_output).
+
+A debug-verbosity FD search prints hundreds of MB; holding that as strings
+(and again concatenated for metric regexes) for a dozen parallel runs does not
+fit in memory. OutputCapture instead writes each line to the run's log file
+as it arrives and hands it to line observers:
+
+- MetricScanner remembers the first and last match of each metric pattern,
+  so the bench parse_*_metrics functions run on it instead of the full text.
+- ProgressTracker follows expanded/evaluated counts and the best heuristic
+  value and reports them to a callback at most every `min_interval` seconds.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Sequence, TextIO, Tuple, Union
+
+METRIC_FLAGS = re.IGNORECASE | re.MULTILINE
+
+LineObserver = Callable[[str, str], None]
+
+
+class OutputCapture:
+    """Sink writing "out"/"err" lines to two log files and passing them to observers."""
+
+    def __init__(self, stdout_path: Path, stderr_path: Path, observers: Sequence[LineObserver] = ()) -> None:
+        stdout_path.parent.mkdir(parents=True, exist_ok=True)
+        stderr_path.parent.mkdir(parents=True, exist_ok=True)
+        self._files: Dict[str, TextIO] = {
+            "out": stdout_path.open("w", encoding="utf-8"),
+            "err": stderr_path.open("w", encoding="utf-8"),
+        }
+        self.observers = list(observers)
+        # ENHSP worker jobs and timeout notes can feed from another thread.
+        self._lock = threading.Lock()
+
+    def feed(self, tag: str, line: str) -> None:
+        with self._lock:
+            self._files["err" if tag == "err" else "out"].write(line)
+            for observer in self.observers:
+                observer(tag, line)
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self) -> "OutputCapture":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+_REGEX_META = set(".^$*+?{}[]|()\\")
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    escaped = in_class = False
+    for c in pattern:
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif in_class:
+            in_class = c != "]"
+        elif c == "[":
+            in_class = True
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == "|" and depth == 0:
+            return True
+    return False
+
+
+def literal_prefix(pattern: str) -> str:
+    """
+    Lower-cased literal text every match of `pattern` starts with (after a
+    leading ^ or \\s*); "" when the pattern does not start with a literal.
+    """
+    if _has_top_level_alternation(pattern):
+        return ""
+    i = 0
+    for lead in ("^", "\\s*", "\\b"):
+        if pattern.startswith(lead, i):
+            i += len(lead)
+    chars: List[str] = []
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\":
+            nxt = pattern[i + 1:i + 2]
+            if not nxt or nxt.isalnum():
+                break  # \s, \d, \b, ...
+            chars.append(nxt)
+            i += 2
+            continue
+        if c in _REGEX_META:
+            break
+        chars.append(c)
+        i += 1
+    # A quantifier applies to the last literal character, which is then optional.
+    if i < len(pattern) and pattern[i] in "*?{" and chars:
+        chars.pop()
+    return "".join(chars).lower()
+
+
+class _PatternRecorder:
+    """Stand-in text that records which patterns a parse function asks for."""
+
+    def __init__(self) -> None:
+        self.patterns: List[str] = []
+
+    def first(self, pattern: str) -> None:
+        self.patterns.append(pattern)
+        return None
+
+    def last(self, pattern: str) -> None:
+        self.patterns.append(pattern)
+        return None
+
+
+class MetricScanner:
+    """
+    First/last match of a fixed set of patterns over a line stream. Patterns
+    are matched one line at a time (with IGNORECASE | MULTILINE, like the old
+    whole-text searches), so they must not span lines.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self._compiled: Dict[str, Pattern[str]] = {}
+        # (pattern, regex, lower-case literal every match contains or "")
+        self._checks: List[Tuple[str, Pattern[str], str]] = []
+        for pattern in patterns:
+            if pattern not in self._compiled:
+                self._compiled[pattern] = re.compile(pattern, METRIC_FLAGS)
+                self._checks.append((pattern, self._compiled[pattern], literal_prefix(pattern)))
+        self._first: Dict[str, "re.Match[str]"] = {}
+        self._last: Dict[str, "re.Match[str]"] = {}
+
+    @classmethod
+    def for_parser(cls, parse: Callable[..., object], extra: Iterable[str] = ()) -> "MetricScanner":
+        """Scanner for every pattern `parse(text)` looks up, plus `extra`."""
+        recorder = _PatternRecorder()
+        parse(recorder)
+        return cls([*recorder.patterns, *extra])
+
+    def __call__(self, tag: str, line: str) -> None:
+        line = line.rstrip("\n")
+        # Substring tests reject most (line, pattern) pairs far faster than
+        # running the regex, which matters at millions of debug lines per run.
+        lowered = line.lower()
+        for pattern, rx, literal in self._checks:
+            if literal not in lowered:
+                continue
+            m = rx.search(line)
+            if m:
+                self._first.setdefault(pattern, m)
+                self._last[pattern] = m
+
+    def first(self, pattern: str) -> Optional["re.Match[str]"]:
+        return self._first.get(pattern)
+
+    def last(self, pattern: str) -> Optional["re.Match[str]"]:
+        return self._last.get(pattern)
+
+
+MetricText = Union[str, MetricScanner, _PatternRecorder]
+
+
+def search_first(text: MetricText, pattern: str) -> Optional["re.Match[str]"]:
+    if isinstance(text, str):
+        return re.search(pattern, text, flags=METRIC_FLAGS)
+    return text.first(pattern)
+
+
+def search_last(text: MetricText, pattern: str) -> Optional["re.Match[str]"]:
+    if isinstance(text, str):
+        last = None
+        for last in re.finditer(pattern, text, flags=METRIC_FLAGS):
+            pass
+        return last
+    return text.last(pattern)
+
+
+# -----------------------------
+# Progress
+# -----------------------------
+
+# FD: "[g=12, 345 evaluated, 123 expanded, t=0.5s, 40 KB]" and the final
+# statistics; ENHSP: "Expanded Nodes: 123"; Powerlifted: "Expanded: 123".
+EXPANDED_RES = (
+    re.compile(r"([0-9][0-9,]*)\s+expanded\b", re.IGNORECASE),
+    re.compile(r"\bExpanded(?: Nodes?)?:\s*([0-9][0-9,]*)", re.IGNORECASE),
+)
+EVALUATED_RES = (
+    re.compile(r"([0-9][0-9,]*)\s+evaluated\b", re.IGNORECASE),
+    re.compile(r"\bStates Evaluated:\s*([0-9][0-9,]*)", re.IGNORECASE),
+)
+# FD: "New best heuristic value for ff: 7"; ENHSP: "h(n = 7.0 )" / "h(n)=7.0";
+# Powerlifted: "New best heuristic value: 7".
+BEST_H_RES = (
+    re.compile(r"New best heuristic value(?: for [^:]+)?:\s*(-?[0-9.]+)", re.IGNORECASE),
+    re.compile(r"\bh\(n\)?\s*=\s*(-?[0-9.]+)", re.IGNORECASE),
+)
+
+
+@dataclass(frozen=True)
+class ProgressSnapshot:
+    elapsed_sec: float
+    expanded: Optional[int]
+    evaluated: Optional[int]
+    best_h: Optional[float]
+    lines: int
+
+    def describe(self) -> str:
+        parts = []
+        if self.expanded is not None:
+            parts.append(f"{self.expanded:,} expanded")
+        if self.evaluated is not None:
+            parts.append(f"{self.evaluated:,} evaluated")
+        if self.best_h is not None:
+            parts.append(f"best h {self.best_h:g}")
+        parts.append(f"{self.lines:,} log lines")
+        return f"{', '.join(parts)} after {self.elapsed_sec:.0f}s"
+
+
+def _last_number(patterns: Sequence[Pattern[str]], line: str) -> Optional[float]:
+    for rx in patterns:
+        m = rx.search(line)
+        if m:
+            try:
+                return float(m.group(1).replace(",", ""))
+            except ValueError:
+                return None
+    return None
+
+
+class ProgressTracker:
+    """Line observer reporting search progress to `callback` at most every `min_interval` seconds."""
+
+    def __init__(self, callback: Callable[[ProgressSnapshot], None], min_interval: float = 60.0) -> None:
+        self.callback = callback
+        self.min_interval = min_interval
+        self.start = time.monotonic()
+        self._next_report = self.start + min_interval
+        self.expanded: Optional[int] = None
+        self.evaluated: Optional[int] = None
+        self.best_h: Optional[float] = None
+        self.lines = 0
+
+    def __call__(self, tag: str, line: str) -> None:
+        self.lines += 1
+        lowered = line.lower()
+        if "expanded" in lowered:
+            expanded = _last_number(EXPANDED_RES, line)
+            if expanded is not None:
+                self.expanded = int(expanded)
+        if "evaluated" in lowered:
+            evaluated = _last_number(EVALUATED_RES, line)
+            if evaluated is not None:
+                self.evaluated = int(evaluated)
+        if "heuristic value" in lowered or "h(n" in lowered:
+            h = _last_number(BEST_H_RES, line)
+            if h is not None and (self.best_h is None or h < self.best_h):
+                self.best_h = h
+        now = time.monotonic()
+        if now >= self._next_report:
+            self._next_report = now + self.min_interval
+            self.callback(self.snapshot())
+
+    def snapshot(self) -> ProgressSnapshot:
+        return ProgressSnapshot(
+            elapsed_sec=round(time.monotonic() - self.start, 3),
+            expanded=self.expanded,
+            evaluated=self.evaluated,
+            best_h=self.best_h,
+            lines=self.lines,
+        )
@@ -7,13 +7,44 @@ import json
 import os
 import re
 import shlex
-import shutil
 import subprocess
 import sys
-import tempfile
 import time
 from pathlib import Path
-from typing import List, Optional, Tuple, Dict, Any, Sequence
+from typing import List, Optional, Tuple, Dict, Any, Sequence, Callable
+
+from domain_signature import try_load_domain_signature
+from grounding_estimate import estimate_grounding
+from problem_gen_registry import PDDL_DIR, add_problem_cache_args, apply_problem_cache_args, compile_problem
+from subprocess_utils import (
+    Launch,
+    ProcessGroupTimeout,
+    ResourceUsage,
+    SolveSteps,
+    emit_output,
+    is_memout,
+    run_cmd,
+    run_steps,
+    run_steps_async,
+    stream_cmd,
+)
+from anytime_plans import AnytimePlan, AnytimePlanCallback, PlanFileWatcher
+from content_cache import link_or_copy
+from plan_cache import add_plan_cache_args, apply_plan_cache_args, hit_metrics, lookup_plan, plan_cache_key, store_plan
+from workspace import Workspace, add_workspace_args, apply_workspace_args, run_workspace
+from translate_cache import (
+    add_translate_cache_args,
+    apply_translate_cache_args,
+    keep_sas_args,
+    lookup_translation,
+    split_translate_options,
+    store_translation,
+    translation_cache_key,
+)
+
+if str(PDDL_DIR) not in sys.path:
+    sys.path.insert(0, str(PDDL_DIR))
+from level_grid import load_level_grid  # type: ignore  # noqa: E402
 
 
 # -----------------------------
@@ -25,7 +56,7 @@ class PlanResult:
     planner: str
     domain: str
     problem: str
-    status: str  # solved | no-path | unsolved | timeout | error
+    status: str  # solved | no-path | unsolved | timeout | memout | error
     actions: List[Tuple[str, List[str]]]
     raw_stdout: str
     raw_stderr: str
@@ -75,17 +106,11 @@ def run_cmd_capture(
     timeout_sec: Optional[int] = None,
 ) -> Tuple[int, str, str]:
     """
-    Run and capture stdout/stderr. Raises subprocess.TimeoutExpired on timeout.
+    Run and capture stdout/stderr in a separate process group. Raises
+    ProcessGroupTimeout (a subprocess.TimeoutExpired) on timeout, after the
+    planner driver and every translator/search process it started are killed.
     """
-    p = subprocess.run(
-        cmd,
-        cwd=str(cwd) if cwd else None,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        timeout=timeout_sec,
-    )
-    return p.returncode, p.stdout, p.stderr
+    return run_cmd(cmd, cwd=cwd, timeout_sec=timeout_sec)
 
 
 def run_cmd_stream(
@@ -99,44 +124,51 @@ def run_cmd_stream(
     Uses combined stdout/stderr for simplicity but returns separated buffers
     (stderr will be empty, combined goes to stdout buffer).
     """
-    start = time.time()
-    proc = subprocess.Popen(
+    return stream_cmd(cmd, cwd=cwd, timeout_sec=timeout_sec, prefix=prefix, merge_stderr=True)
+
+
+def planner_launch(
+    cmd: List[str],
+    cwd: Path,
+    timeout_sec: Optional[int],
+    stream: bool,
+    prefix: str,
+    memory_limit_mb: Optional[int] = None,
+) -> Launch:
+    """
+    Planner launch shared by the FF/FD wrappers: own process group, resource
+    usage, optional RLIMIT_AS cap. Streaming merges stderr into stdout.
+    """
+    return Launch(
         cmd,
-        cwd=str(cwd) if cwd else None,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
+        cwd=cwd,
+        timeout_sec=timeout_sec,
+        prefix=prefix,
+        live=stream,
+        merge_stderr=stream,
+        memory_limit_mb=memory_limit_mb,
     )
 
-    out_lines: List[str] = []
-
-    try:
-        assert proc.stdout is not None
-        for line in proc.stdout:
-            out_lines.append(line)
-            if prefix:
-                sys.stdout.write(f"{prefix}{line}")
-            else:
-                sys.stdout.write(line)
-            sys.stdout.flush()
 
-            if timeout_sec is not None and (time.time() - start) > timeout_sec:
-                proc.kill()
-                raise subprocess.TimeoutExpired(cmd=cmd, timeout=timeout_sec)
+def resource_metrics(usage: Optional[ResourceUsage], memory_limit_mb: Optional[int]) -> Dict[str, Any]:
+    metrics: Dict[str, Any] = usage.metrics() if usage else {}
+    metrics["memory_limit_mb"] = memory_limit_mb
+    return metrics
 
-        rc = proc.wait()
-        out = "".join(out_lines)
-        return rc, out, ""  # stderr is merged into stdout
 
-    except subprocess.TimeoutExpired:
-        # ensure process is gone
-        try:
-            proc.kill()
-        except Exception:
-            pass
-        raise
+def timeout_output(exc: subprocess.TimeoutExpired) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Partial stdout/stderr of a timed-out run, with the process-group kill note
+    appended, plus survivor/resource metrics.
+    """
+    out = exc.output if isinstance(exc.output, str) else ""
+    err = exc.stderr if isinstance(exc.stderr, str) else ""
+    if isinstance(exc, ProcessGroupTimeout):
+        metrics: Dict[str, Any] = exc.usage.metrics() if exc.usage else {}
+        metrics["survivors"] = len(exc.survivors)
+        emit_output("err", exc.note())
+        return out, err + exc.note() + "\n", metrics
+    return out, err, {}
 
 
 # -----------------------------
@@ -158,6 +190,13 @@ def normalise_problem_name(problem: Path) -> str:
     return problem.stem
 
 
+def replace_text_file(path: Path, text: str) -> None:
+    """Write via a temporary sibling and rename, so readers never see a partial plan."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
 def write_plan_file(path: Path, actions: List[Tuple[str, List[str]]]) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     lines = []
@@ -166,7 +205,7 @@ def write_plan_file(path: Path, actions: List[Tuple[str, List[str]]]) -> None:
             lines.append(f"({name} {' '.join(args)})")
         else:
             lines.append(f"({name})")
-    path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+    replace_text_file(path, "\n".join(lines) + ("\n" if lines else ""))
 
 
 def _dir_from_coords(src: str, dst: str) -> Optional[str]:
@@ -216,7 +255,7 @@ def write_direction_plan(path: Path, actions: List[Tuple[str, List[str]]]) -> No
             continue
     if tokens:
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text("\n".join(f"({t})" for t in tokens) + "\n", encoding="utf-8")
+        replace_text_file(path, "\n".join(f"({t})" for t in tokens) + "\n")
 
 def write_text_file(path: Path, text: str) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -256,24 +295,28 @@ def resolve_level_file_for_trace(problem: Path, explicit_level: Optional[Path])
     return None
 
 
+def print_grounding_estimate(domain: Path, problem: Path, explicit_level: Optional[Path]) -> int:
+    level = explicit_level or (problem if problem.suffix.lower() == ".txt" else problem.with_suffix(".txt"))
+    if not level.exists():
+        print("[ERR] --estimate needs a level: pass a .txt as --problem or use --play-level.", file=sys.stderr)
+        return 2
+    try:
+        estimate = estimate_grounding(domain, level)
+    except (OSError, ValueError) as e:
+        print(f"[ERR] Failed to estimate grounding for {level}: {e}", file=sys.stderr)
+        return 1
+    tag = "calibrated" if estimate.calibrated else "uncalibrated prior"
+    print(f"[INFO] Estimated grounding for {domain.name} on {level.name} ({tag}):")
+    print(f"  atoms:     {estimate.atoms}")
+    print(f"  operators: {estimate.operators}")
+    print(f"  forced:    {estimate.forced}")
+    return 0
+
+
 def parse_level_bricks(level: Path) -> set[int]:
     try:
-        parts = [p.strip() for p in level.read_text(encoding="utf-8", errors="replace").split("|") if p.strip()]
-        if len(parts) < 4:
-            return set()
-        rows = int(parts[0])
-        cols = int(parts[1])
-        expected = rows * cols
-        cells = parts[4:]
-        if len(cells) < expected:
-            return set()
-        brick_ids = {7, 8, 18, 19, 20, 21, 22}
-        bricks: set[int] = set()
-        for idx, cell in enumerate(cells[:expected]):
-            if int(cell) in brick_ids:
-                bricks.add(idx)
-        return bricks
-    except Exception:
+        return set(load_level_grid(level).static_indexes)
+    except (OSError, ValueError):
         return set()
 
 
@@ -335,50 +378,52 @@ def _parse_fd_plan_file(plan_path: Path) -> List[Tuple[str, List[str]]]:
 # Planners
 # -----------------------------
 
-def solve_with_ff(
+def _ff_steps(
     domain: Path,
     problem: Path,
     timeout: int | None,
     stream: bool,
     planner_args: str = "",
-) -> PlanResult:
+    memory_limit_mb: Optional[int] = None,
+) -> SolveSteps[PlanResult]:
     root = repo_root()
     ff_bin = root / "planners" / "forced-action-ff" / "ff"
     ensure_executable(ff_bin)
 
     start = time.time()
 
-    with tempfile.TemporaryDirectory(prefix="ff_run_") as td:
-        td_path = Path(td)
+    with run_workspace() as ws:
+        td_path = ws.path
         dname = "domain.pddl"
         pname = "problem.pddl"
-        shutil.copy2(domain, td_path / dname)
-        shutil.copy2(problem, td_path / pname)
-        
+        ws.link_input(domain, dname)
+        ws.link_input(problem, pname)
+
         pdir = str(td_path) + os.sep  # IMPORTANT: FF concatenates -p + filename
         extra_args = shlex.split(planner_args or "")
         cmd = [str(ff_bin), "-p", pdir, "-o", dname, "-f", pname] + extra_args
 
         try:
-            if stream:
-                rc, out, err = run_cmd_stream(cmd, cwd=td_path, timeout_sec=timeout, prefix="[FF] ")
-            else:
-                rc, out, err = run_cmd_capture(cmd, cwd=td_path, timeout_sec=timeout)
-        except subprocess.TimeoutExpired:
+            run = yield planner_launch(cmd, td_path, timeout, stream, "[FF] ", memory_limit_mb)
+        except subprocess.TimeoutExpired as exc:
+            out, err, kill_metrics = timeout_output(exc)
             return PlanResult(
                 planner="ff",
                 domain=str(domain),
                 problem=str(problem),
                 status="timeout",
                 actions=[],
-                raw_stdout="",
-                raw_stderr="",
+                raw_stdout=out,
+                raw_stderr=err,
                 metrics={
                     "returncode": None,
                     "time_sec": round(time.time() - start, 3),
                     "command": cmd,
+                    "memory_limit_mb": memory_limit_mb,
+                    **kill_metrics,
                 },
             )
+        rc, out, err = run.returncode, run.stdout, run.stderr
 
         actions: List[Tuple[str, List[str]]] = []
 
@@ -427,6 +472,8 @@ def solve_with_ff(
         status = "solved"
     elif rc == 0 and any(tok in lowered for tok in no_path_tokens):
         status = "no-path"
+    elif status == "error" and is_memout(rc, lowered):
+        status = "memout"
 
     return PlanResult(
         planner="ff",
@@ -440,10 +487,34 @@ def solve_with_ff(
             "returncode": rc,
             "time_sec": round(time.time() - start, 3),
             "command": cmd,
+            **resource_metrics(run.usage, memory_limit_mb),
         },
     )
 
 
+def solve_with_ff(
+    domain: Path,
+    problem: Path,
+    timeout: int | None,
+    stream: bool,
+    planner_args: str = "",
+    memory_limit_mb: Optional[int] = None,
+) -> PlanResult:
+    return run_steps(_ff_steps(domain, problem, timeout, stream, planner_args, memory_limit_mb))
+
+
+async def solve_with_ff_async(
+    domain: Path,
+    problem: Path,
+    timeout: int | None,
+    stream: bool,
+    planner_args: str = "",
+    memory_limit_mb: Optional[int] = None,
+) -> PlanResult:
+    """solve_with_ff on the running event loop (see run_process_async)."""
+    return await run_steps_async(_ff_steps(domain, problem, timeout, stream, planner_args, memory_limit_mb))
+
+
 def _fd_args_override_default_search(extra_args: Sequence[str]) -> bool:
     # If user supplied a complete FD search/alias configuration, do not
     # inject the benchmarker's default --search expression.
@@ -458,7 +529,7 @@ def _fd_args_override_default_search(extra_args: Sequence[str]) -> bool:
     return any(tok in override_flags for tok in extra_args)
 
 
-def solve_with_fd(
+def _fd_steps(
     domain: Path,
     problem: Path,
     timeout: int | None,
@@ -466,7 +537,9 @@ def solve_with_fd(
     stream: bool,
     keep_searching: bool = False,
     planner_args: str = "",
-) -> PlanResult:
+    memory_limit_mb: Optional[int] = None,
+    on_plan: Optional[AnytimePlanCallback] = None,
+) -> SolveSteps[PlanResult]:
     root = repo_root()
     fd_py = root / "planners" / "fast-downward" / "fast-downward.py"
     if not fd_py.exists():
@@ -474,8 +547,8 @@ def solve_with_fd(
 
     start = time.time()
 
-    with tempfile.TemporaryDirectory(prefix="fd_run_") as td:
-        td_path = Path(td)
+    with run_workspace() as ws:
+        td_path = ws.path
 
         extra_args = shlex.split(planner_args or "")
         if optimal:
@@ -502,14 +575,43 @@ def solve_with_fd(
             default_search_args = ["--search", search]
 
         fd_args = extra_args if _fd_args_override_default_search(extra_args) else (default_search_args + extra_args)
-        cmd = [sys.executable, str(fd_py), str(domain), str(problem)] + fd_args
-
-        try:
-            if stream:
-                rc, out, err = run_cmd_stream(cmd, cwd=td_path, timeout_sec=timeout, prefix="[FD] ")
+        # Settings that share (domain, problem, translator options) translate
+        # once; later runs start FD on the cached output.sas (search only).
+        sas_file = td_path / "output.sas"
+        cache_key = translation_cache_key(fd_py.parent, domain, problem, fd_args)
+        cached = lookup_translation(cache_key)
+        replayed = ""
+        if cached is not None:
+            try:
+                link_or_copy(cached.sas_file, sas_file)
+                replayed = cached.replay_log()
+            except FileNotFoundError:
+                cached = None  # evicted by a concurrent prune; translate below
             else:
-                rc, out, err = run_cmd_capture(cmd, cwd=td_path, timeout_sec=timeout)
-        except subprocess.TimeoutExpired:
+                emit_output("out", replayed)
+        if cached is not None:
+            cmd = [sys.executable, str(fd_py), str(sas_file)] + split_translate_options(fd_args)[1]
+            if stream:
+                print(f"[FD] {replayed.splitlines()[0]}")
+        else:
+            keep_sas = list(keep_sas_args(fd_py.parent)) if cache_key else []
+            cmd = [sys.executable, str(fd_py)] + keep_sas + [str(domain), str(problem)] + fd_args
+        cache_metrics = {
+            "translate_cache_hit": (cached is not None) if cache_key else None,
+            "translate_saved_sec": cached.translate_sec if cached is not None else None,
+        }
+
+        # Anytime searches write improved plans (sas_plan.N) while they run.
+        watcher = PlanFileWatcher(td_path, on_plan, started_at=start)
+        try:
+            with watcher:
+                run = yield planner_launch(cmd, td_path, timeout, stream, "[FD] ", memory_limit_mb)
+        except subprocess.TimeoutExpired as exc:
+            out, err, kill_metrics = timeout_output(exc)
+            if cached is None:
+                # A search timeout still leaves a complete translation behind.
+                store_translation(cache_key, sas_file, out)
+            out = replayed + out
             plan_files = _find_fd_plan_files(td_path)
             actions = _parse_fd_plan_file(plan_files[-1]) if plan_files else []
             return PlanResult(
@@ -518,15 +620,23 @@ def solve_with_fd(
                 problem=str(problem),
                 status="timeout",
                 actions=actions,
-                raw_stdout="",
-                raw_stderr="",
+                raw_stdout=out,
+                raw_stderr=err,
                 metrics={
                     "returncode": None,
                     "time_sec": round(time.time() - start, 3),
                     "plan_file": str(plan_files[-1]) if plan_files else None,
                     "command": cmd,
+                    "memory_limit_mb": memory_limit_mb,
+                    **kill_metrics,
+                    **cache_metrics,
+                    **watcher.metrics(),
                 },
             )
+        rc, out, err = run.returncode, run.stdout, run.stderr
+        if cached is None:
+            store_translation(cache_key, sas_file, out)
+        out = replayed + out
 
         plan_files = _find_fd_plan_files(td_path)
         actions = _parse_fd_plan_file(plan_files[-1]) if plan_files else []
@@ -549,6 +659,11 @@ def solve_with_fd(
             status = "no-path"
         elif rc == 0:
             status = "unsolved"
+        elif rc == 23:
+            # The driver's search time limit, not the wrapper's.
+            status = "timeout"
+        elif is_memout(rc, lowered):
+            status = "memout"
         else:
             status = "error"
 
@@ -566,10 +681,80 @@ def solve_with_fd(
                 "plan_file": str(plan_files[-1]) if plan_files else None,
                 "num_plan_files": len(plan_files),
                 "command": cmd,
+                **resource_metrics(run.usage, memory_limit_mb),
+                **cache_metrics,
+                **watcher.metrics(),
             },
         )
 
 
+def solve_with_fd(
+    domain: Path,
+    problem: Path,
+    timeout: int | None,
+    optimal: bool,
+    stream: bool,
+    keep_searching: bool = False,
+    planner_args: str = "",
+    memory_limit_mb: Optional[int] = None,
+    on_plan: Optional[AnytimePlanCallback] = None,
+) -> PlanResult:
+    """
+    Run Fast Downward. `on_plan` receives each improved plan as soon as FD
+    writes it (from a watcher thread; see anytime_plans.PlanFileWatcher).
+    """
+    return run_steps(
+        _fd_steps(domain, problem, timeout, optimal, stream, keep_searching, planner_args, memory_limit_mb, on_plan)
+    )
+
+
+async def solve_with_fd_async(
+    domain: Path,
+    problem: Path,
+    timeout: int | None,
+    optimal: bool,
+    stream: bool,
+    keep_searching: bool = False,
+    planner_args: str = "",
+    memory_limit_mb: Optional[int] = None,
+    on_plan: Optional[AnytimePlanCallback] = None,
+) -> PlanResult:
+    """solve_with_fd on the running event loop (see run_process_async)."""
+    return await run_steps_async(
+        _fd_steps(domain, problem, timeout, optimal, stream, keep_searching, planner_args, memory_limit_mb, on_plan)
+    )
+
+
+def solve_with_plan_cache(
+    key: Optional[str],
+    domain: Path,
+    problem: Path,
+    solve: Callable[[], PlanResult],
+) -> PlanResult:
+    """solve(), or the stored result of an identical earlier run (see plan_cache)."""
+    start = time.time()
+    cached = lookup_plan(key)
+    if cached is not None:
+        stored = cached.result
+        print(f"[INFO] plan cache hit: {stored['planner']} {stored['status']} (saved {stored['metrics'].get('time_sec')}s)")
+        return PlanResult(
+            planner=stored["planner"],
+            domain=str(domain),
+            problem=str(problem),
+            status=stored["status"],
+            actions=[(name, list(args)) for name, args in stored["actions"]],
+            raw_stdout=cached.stdout,
+            raw_stderr=cached.stderr,
+            metrics=hit_metrics(stored["metrics"], time.time() - start),
+        )
+    result = solve()
+    if key is not None:
+        result.metrics["plan_cache_hit"] = False
+        stored = {"planner": result.planner, "status": result.status, "actions": result.actions, "metrics": result.metrics}
+        store_plan(key, stored, result.raw_stdout, result.raw_stderr)
+    return result
+
+
 # -----------------------------
 # CLI main
 # -----------------------------
@@ -578,14 +763,8 @@ def select_problem_gen(domain: Path) -> Path:
     root = repo_root()
 
     def read_header_name(path: Path, header: str) -> Optional[str]:
-        try:
-            text = path.read_text(encoding="utf-8", errors="replace")
-        except Exception:
-            return None
-        m = re.search(rf"^;\s*{re.escape(header)}:\s*(.+)$", text, flags=re.MULTILINE)
-        if not m:
-            return None
-        return Path(m.group(1).strip()).name
+        signature = try_load_domain_signature(path)
+        return signature.header_name(header) if signature else None
 
     # New domain-matched wrappers live alongside generated test domains and are keyed
     # by either the file stem itself or the `; variant:` header carried in the file.
@@ -627,45 +806,74 @@ def select_problem_gen(domain: Path) -> Path:
 
 def generate_problem_from_level(
     level_txt: Path, problem_name: str, domain: Path
-) -> Tuple[Path, tempfile.TemporaryDirectory]:
+) -> Tuple[Path, Workspace]:
     """
     Use the appropriate problem_gen script to generate a PDDL problem
-    from a level text file. Returns (pddl_path, tempdir) so caller can
-    keep tempdir alive.
+    from a level text file. Returns (pddl_path, workspace) so caller can
+    keep the workspace alive.
     """
     gen_py = select_problem_gen(domain)
     if not gen_py.exists():
         raise FileNotFoundError(f"Missing problem generator at {gen_py}")
-    tmpdir = tempfile.TemporaryDirectory(prefix="gen_problem_")
-    out_path = Path(tmpdir.name) / f"{problem_name}.pddl"
-    cmd = [sys.executable, str(gen_py), str(level_txt), "-p", problem_name]
-    rc, out, err = run_cmd_capture(cmd)
-    if rc != 0:
+    tmpdir = run_workspace()
+    out_path = tmpdir.path / f"{problem_name}.pddl"
+    try:
+        compile_problem(gen_py, level_txt, problem_name, out_path, domain=domain, cwd=tmpdir.path)
+    except Exception:
         tmpdir.cleanup()
-        raise RuntimeError(f"{gen_py.name} failed (rc={rc}): {err or out}")
-    out_path.write_text(out, encoding="utf-8")
+        raise
     return out_path, tmpdir
 
 def main() -> int:
     ap = argparse.ArgumentParser(description="Run planners and save plans under plans/<problem_name>/, or play back an existing plan.")
     ap.add_argument("--domain", type=Path, help="Domain PDDL (required unless using --play-plan)")
     ap.add_argument("--problem", type=Path, help="Problem PDDL (required unless using --play-plan)")
-    ap.add_argument("--planner", choices=["ff", "fd", "both"], default="fd")
+    ap.add_argument("--planner", choices=["ff", "fd", "both", "portfolio"], default="fd")
     ap.add_argument(
         "--planner-args",
         default="",
         help="Extra args passed through to FF/FD planner invocation.",
     )
     ap.add_argument("--timeout", type=int, default=None)
+    ap.add_argument(
+        "--memory-limit-mb",
+        type=int,
+        default=None,
+        help="Cap each planner process's address space (RLIMIT_AS); out-of-memory runs report status memout.",
+    )
     ap.add_argument("--optimal", action="store_true", help="FD only: attempt optimal planning (alias seq-opt-lmcut)")
     ap.add_argument("--fd-keep-searching", action="store_true", help="FD only: keep searching for better solutions until timeout using iterated greedy search")
     ap.add_argument("--stream", action="store_true", help="Stream planner output live to terminal")
+    ap.add_argument(
+        "--portfolio-config",
+        type=Path,
+        default=None,
+        help="Portfolio only: JSON member list (see tools/portfolio.py; default: ff, fd and lifted on one core each).",
+    )
+    ap.add_argument(
+        "--portfolio-best",
+        action="store_true",
+        help="Portfolio only: let every member finish within the timeout and keep the shortest plan instead of the first.",
+    )
     ap.add_argument("--play-plan", type=Path, help="Play an existing plan file with the plan_player GUI and exit.")
     ap.add_argument("--play-level", type=Path, help="Optional level file to pass to plan_player.")
     ap.add_argument("--view", action="store_true", help="After planning, open the first solved plan in plan_player.")
     ap.add_argument("--pddl-failure-trace-out", type=Path, help="Write pddl_failure states (JSONL) extracted from FD stdout.")
+    ap.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Print the predicted grounding size (atoms/operators/forced actions) for the level and exit without planning.",
+    )
     ap.add_argument("--view-pddl-failure", action="store_true", help="Open trace_viewer to show all pddl_failure states (FD only).")
+    add_problem_cache_args(ap)
+    add_translate_cache_args(ap)
+    add_workspace_args(ap)
+    add_plan_cache_args(ap)
     args = ap.parse_args()
+    apply_problem_cache_args(args)
+    apply_translate_cache_args(args)
+    apply_workspace_args(args)
+    apply_plan_cache_args(args)
 
     if args.play_plan:
         plan_file = args.play_plan.resolve()
@@ -687,12 +895,14 @@ def main() -> int:
 
     domain = args.domain.resolve()
     input_problem = args.problem.resolve()
+    if args.estimate:
+        return print_grounding_estimate(domain, input_problem, args.play_level)
     level_file_for_view = resolve_level_file_for_trace(input_problem, args.play_level)
     base_bricks_for_view = parse_level_bricks(level_file_for_view) if level_file_for_view else set()
     problem = input_problem
 
     # If a level .txt is passed as the "problem", generate a PDDL problem via problem_gen.
-    temp_problem_dir: Optional[tempfile.TemporaryDirectory] = None
+    temp_problem_dir: Optional[Workspace] = None
     if problem.suffix.lower() == ".txt":
         problem_name = problem.stem
         try:
@@ -720,12 +930,19 @@ def main() -> int:
     play_candidates: List[Path] = []
 
     if args.planner in ("ff", "both"):
-        r = solve_with_ff(
+        ff_config = {"planner_args": args.planner_args, "timeout": args.timeout, "memory_limit_mb": args.memory_limit_mb}
+        r = solve_with_plan_cache(
+            plan_cache_key("ff", ff_config, domain, problem),
             domain,
             problem,
-            timeout=args.timeout,
-            stream=args.stream,
-            planner_args=args.planner_args,
+            lambda: solve_with_ff(
+                domain,
+                problem,
+                timeout=args.timeout,
+                stream=args.stream,
+                planner_args=args.planner_args,
+                memory_limit_mb=args.memory_limit_mb,
+            ),
         )
         results.append(r)
 
@@ -739,18 +956,40 @@ def main() -> int:
             play_candidates.append(ff_plan_path)
 
     if args.planner in ("fd", "both"):
-        r = solve_with_fd(
+        fd_name = "fd-opt" if args.optimal else "fd"
+
+        def save_anytime_plan(plan: AnytimePlan) -> None:
+            # Consumers can pick up fd.plan / fd.play.plan while the search goes on.
+            write_plan_file(out_dir / f"{fd_name}.plan", plan.actions)
+            write_direction_plan(out_dir / f"{fd_name}.play.plan", plan.actions)
+            cost = f", cost {plan.cost:g}" if plan.cost is not None else ""
+            print(f"[PLAN] FD plan #{plan.index}: {len(plan.actions)} actions{cost} after {plan.elapsed_sec}s", flush=True)
+
+        fd_config = {
+            "optimal": args.optimal,
+            "keep_searching": args.fd_keep_searching,
+            "planner_args": args.planner_args,
+            "timeout": args.timeout,
+            "memory_limit_mb": args.memory_limit_mb,
+        }
+        r = solve_with_plan_cache(
+            plan_cache_key("fd", fd_config, domain, problem),
             domain,
             problem,
-            timeout=args.timeout,
-            optimal=args.optimal,
-            stream=args.stream,
-            keep_searching=args.fd_keep_searching,
-            planner_args=args.planner_args,
+            lambda: solve_with_fd(
+                domain,
+                problem,
+                timeout=args.timeout,
+                optimal=args.optimal,
+                stream=args.stream,
+                keep_searching=args.fd_keep_searching,
+                planner_args=args.planner_args,
+                memory_limit_mb=args.memory_limit_mb,
+                on_plan=save_anytime_plan,
+            ),
         )
         results.append(r)
 
-        fd_name = "fd-opt" if args.optimal else "fd"
         fd_plan_path = out_dir / f"{fd_name}.plan"
         write_plan_file(fd_plan_path, r.actions)
         if r.actions:
@@ -783,12 +1022,62 @@ def main() -> int:
                         except Exception as e:
                             print(f"[WARN] trace_viewer failed: {e}", file=sys.stderr)
 
+    if args.planner == "portfolio":
+        from portfolio import load_members, solve_portfolio
+
+        try:
+            members = load_members(args.portfolio_config.resolve() if args.portfolio_config else None)
+            race = solve_portfolio(
+                members,
+                domain,
+                problem,
+                level=input_problem if input_problem.suffix.lower() == ".txt" else None,
+                timeout=args.timeout,
+                stream=args.stream,
+                wait_best=args.portfolio_best,
+                memory_limit_mb=args.memory_limit_mb,
+            )
+        except Exception as e:
+            print(f"[ERR] Portfolio failed: {e}", file=sys.stderr)
+            return 1
+        if race.oversubscribed:
+            print("[WARN] Portfolio members asked for more cores than are available; some share CPUs.", file=sys.stderr)
+        r = race.to_plan_result(domain, problem)
+        results.append(r)
+
+        portfolio_plan_path = out_dir / "portfolio.plan"
+        write_plan_file(portfolio_plan_path, r.actions)
+        if r.actions:
+            write_direction_plan(out_dir / "portfolio.play.plan", r.actions)
+        write_text_file(out_dir / "portfolio.stdout.txt", r.raw_stdout)
+        write_text_file(out_dir / "portfolio.stderr.txt", r.raw_stderr)
+        write_text_file(out_dir / "portfolio.json", json.dumps(race.summary(), indent=2) + "\n")
+        if r.status == "solved" and r.actions:
+            play_candidates.append(portfolio_plan_path)
+
     # Summary
     print("\n== Summary ==")
     for r in results:
         print(f"- {r.planner}: {r.status}  (actions={len(r.actions)})  time={r.metrics.get('time_sec')}s")
-        if "plan_file" in r.metrics and r.metrics["plan_file"]:
+        if r.metrics.get("max_rss_mb") is not None:
+            cpu = r.metrics["cpu_user_sec"] + r.metrics["cpu_sys_sec"]
+            print(f"    cpu={cpu:.2f}s  peak_rss={r.metrics['max_rss_mb']}MB  major_faults={r.metrics['major_faults']}")
+        if r.metrics.get("plan_cache_hit"):
+            print(f"    from the plan cache (original run took {r.metrics.get('plan_cache_saved_sec')}s)")
+        elif "plan_file" in r.metrics and r.metrics["plan_file"]:
             print(f"    fd plan source: {r.metrics['plan_file']}")
+        if len(r.metrics.get("anytime_plans") or []) > 1:
+            print(
+                f"    {len(r.metrics['anytime_plans'])} improving plans: first after {r.metrics['time_to_first_plan_sec']}s, "
+                f"best after {r.metrics['time_to_best_plan_sec']}s"
+            )
+        if "portfolio_first_member" in r.metrics:
+            first = r.metrics["portfolio_first_member"]
+            if first:
+                print(f"    first plan: {first} after {r.metrics['time_to_first_plan_sec']}s")
+            for m in race.outcomes:
+                length = f"{len(m.actions)} actions" if m.has_plan else m.status
+                print(f"    {m.name:<12} {length:<14} {m.finished_sec}s  cpus={','.join(map(str, m.cpus))}")
 
     print(f"\nPlans saved under: {out_dir}")
 
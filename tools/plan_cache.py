@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Opt-in cache of finished planner runs.
+
+Re-running tools/plan.py or a benchmark on an unchanged (domain, problem,
+planner configuration) repeats the whole search even though FF, FD and
+seeded Powerlifted configurations are deterministic. With --plan-cache the
+outcome (status, plan, metrics and the kept stdout/stderr) is stored in a
+ContentCache keyed by a hash of the domain and problem contents, the
+planner configuration and the size/mtime of the planner's files; a later
+identical request is answered from the cache.
+
+Only definite outcomes (solved, no-path, unsolved) are stored; timeouts,
+memouts and errors always re-run. Planners behind a `cmd` template are
+identified by the template only, so use --refresh-plan-cache after changing
+such a planner.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from content_cache import DEFAULT_CACHE_ROOT, ContentCache, hash_parts
+from translate_cache import translator_fingerprint
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+FD_ROOT = REPO_ROOT / "planners" / "fast-downward"
+PLAN_CACHE_DIR = DEFAULT_CACHE_ROOT / "plans"
+PLAN_CACHE_MAX_MB = 1024
+_PLAN_CACHE: Optional[ContentCache] = None
+_REFRESH = False
+
+RESULT_FILE = "result.json"
+STDOUT_FILE = "stdout.txt"
+STDERR_FILE = "stderr.txt"
+
+CACHEABLE_STATUSES = frozenset({"solved", "no-path", "unsolved"})
+
+# Files whose size/mtime identify a planner build (globs under the repo root).
+# FD's translator sources are covered by the translate cache's fingerprint.
+PLANNER_FILE_GLOBS: Dict[str, Sequence[str]] = {
+    "ff": ("planners/forced-action-ff/ff",),
+    "fd": (
+        "planners/fast-downward/fast-downward.py",
+        "planners/fast-downward/builds/*/bin/downward",
+    ),
+    "lifted": (
+        "planners/powerlifted/powerlifted.py",
+        "planners/powerlifted/builds/*/search/search",
+    ),
+    "plus": (
+        "planners/pddl-plus/pddl_plus_runner.py",
+        "planners/pddl-plus/enhsp.jar",
+        "planners/pddl-plus/enhsp/enhsp.jar",
+        "planners/pddl-plus/enhsp/*/enhsp.jar",
+        "planners/pddl-plus/enhsp/build/libs/enhsp.jar",
+        "planners/pddl-plus/optic*",
+        "planners/pddl-plus/OPTIC/optic-clp",
+    ),
+}
+
+# Measurements of the original run that a cache hit did not repeat.
+RUN_ONLY_METRICS = ("cpu_user_sec", "cpu_sys_sec", "max_rss_mb", "major_faults", "survivors")
+
+
+@dataclass(frozen=True)
+class CachedPlan:
+    result: Dict[str, Any]
+    stdout: str
+    stderr: str
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+def configure_plan_cache(
+    cache_dir: Optional[Path] = None,
+    max_mb: Optional[int] = None,
+    enabled: bool = False,
+    refresh: bool = False,
+) -> None:
+    """Switch the process-wide plan cache on (it is off by default) or off."""
+    global _PLAN_CACHE, _REFRESH
+    _REFRESH = refresh
+    if not (enabled or refresh):
+        _PLAN_CACHE = None
+        return
+    _PLAN_CACHE = ContentCache(
+        cache_dir or PLAN_CACHE_DIR,
+        (max_mb if max_mb is not None else PLAN_CACHE_MAX_MB) * 1024 * 1024,
+    )
+
+
+def add_plan_cache_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--plan-cache",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Answer runs identical to an earlier solved/no-path/unsolved run from the plan cache (default: off).",
+    )
+    ap.add_argument(
+        "--refresh-plan-cache",
+        action="store_true",
+        help="Re-run every planner and overwrite its plan cache entry (implies --plan-cache).",
+    )
+    ap.add_argument(
+        "--plan-cache-dir",
+        type=Path,
+        default=None,
+        help=f"Plan cache directory (default: {PLAN_CACHE_DIR.relative_to(REPO_ROOT)}).",
+    )
+    ap.add_argument(
+        "--plan-cache-max-mb",
+        type=int,
+        default=None,
+        help=f"Evict least recently used plans above this size (default: {PLAN_CACHE_MAX_MB}).",
+    )
+
+
+def apply_plan_cache_args(args: argparse.Namespace) -> None:
+    configure_plan_cache(
+        cache_dir=args.plan_cache_dir.resolve() if args.plan_cache_dir else None,
+        max_mb=args.plan_cache_max_mb,
+        enabled=args.plan_cache,
+        refresh=args.refresh_plan_cache,
+    )
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+
+def planner_files(planner: str, extra: Sequence[Optional[Path]] = ()) -> List[Path]:
+    files: List[Path] = []
+    for pattern in PLANNER_FILE_GLOBS.get(planner, ()):
+        files.extend(sorted(REPO_ROOT.glob(pattern)))
+    files.extend(p for p in extra if p is not None)
+    return files
+
+
+def _file_stamp(path: Path) -> str:
+    try:
+        st = path.stat()
+    except OSError:
+        return f"{path}:missing"
+    return f"{path}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def plan_cache_key(
+    planner: str,
+    config: Dict[str, Any],
+    domain: Path,
+    problem: Path,
+    extra_files: Sequence[Optional[Path]] = (),
+) -> Optional[str]:
+    """Key for this run, or None when the cache is off."""
+    if _PLAN_CACHE is None:
+        return None
+    return hash_parts(
+        "plan-cache-v1",
+        planner,
+        json.dumps(config, sort_keys=True, default=str),
+        "\0".join(_file_stamp(p) for p in planner_files(planner, extra_files)),
+        translator_fingerprint(FD_ROOT) if planner == "fd" else "",
+        domain.read_bytes(),
+        problem.read_bytes(),
+    )
+
+
+# -----------------------------
+# Lookup / store
+# -----------------------------
+
+def lookup_plan(key: Optional[str]) -> Optional[CachedPlan]:
+    cache = _PLAN_CACHE
+    if key is None or cache is None or _REFRESH:
+        return None
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    try:
+        return CachedPlan(
+            result=json.loads((entry / RESULT_FILE).read_text(encoding="utf-8")),
+            stdout=(entry / STDOUT_FILE).read_text(encoding="utf-8", errors="replace"),
+            stderr=(entry / STDERR_FILE).read_text(encoding="utf-8", errors="replace"),
+        )
+    except (OSError, ValueError):
+        return None  # evicted mid-read or written by an older version
+
+
+def store_plan(key: Optional[str], result: Dict[str, Any], stdout: str, stderr: str) -> bool:
+    """Cache a run whose result["status"] is a definite outcome; returns True when stored."""
+    cache = _PLAN_CACHE
+    if key is None or cache is None or result.get("status") not in CACHEABLE_STATUSES:
+        return False
+    if _REFRESH:
+        cache.remove(key)
+    cache.put(
+        key,
+        {
+            RESULT_FILE: json.dumps(result, default=str),
+            STDOUT_FILE: stdout or "",
+            STDERR_FILE: stderr or "",
+        },
+    )
+    return True
+
+
+def hit_metrics(stored: Dict[str, Any], elapsed_sec: float) -> Dict[str, Any]:
+    """Metrics for a cache hit: the stored ones minus per-run measurements."""
+    metrics = {k: v for k, v in stored.items() if k not in RUN_ONLY_METRICS}
+    metrics["plan_cache_saved_sec"] = stored.get("time_sec")
+    metrics["time_sec"] = round(elapsed_sec, 3)
+    metrics["plan_cache_hit"] = True
+    return metrics
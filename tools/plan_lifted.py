@@ -6,11 +6,24 @@ import re
 import shlex
 import subprocess
 import sys
-import tempfile
 import time
 from pathlib import Path
 from typing import List, Optional, Tuple
 
+from problem_gen_registry import generate_problem_text
+from subprocess_utils import (
+    Launch,
+    ProcessGroupTimeout,
+    SolveSteps,
+    emit_output,
+    is_memout,
+    run_cmd,
+    run_steps,
+    run_steps_async,
+    stream_cmd,
+)
+from workspace import Workspace, add_workspace_args, apply_workspace_args, run_workspace
+
 
 SEARCH_CHOICES = [
     "astar",
@@ -76,15 +89,7 @@ def run_cmd_capture(
     cwd: Optional[Path] = None,
     timeout_sec: Optional[int] = None,
 ) -> Tuple[int, str, str]:
-    proc = subprocess.run(
-        cmd,
-        cwd=str(cwd) if cwd else None,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        timeout=timeout_sec,
-    )
-    return proc.returncode, proc.stdout, proc.stderr
+    return run_cmd(cmd, cwd=cwd, timeout_sec=timeout_sec)
 
 
 def run_cmd_stream(
@@ -93,30 +98,7 @@ def run_cmd_stream(
     timeout_sec: Optional[int] = None,
     prefix: str = "",
 ) -> Tuple[int, str, str]:
-    start = time.time()
-    proc = subprocess.Popen(
-        cmd,
-        cwd=str(cwd) if cwd else None,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
-    )
-    out_lines: List[str] = []
-    assert proc.stdout is not None
-    for line in proc.stdout:
-        out_lines.append(line)
-        if prefix:
-            sys.stdout.write(f"{prefix}{line}")
-        else:
-            sys.stdout.write(line)
-        sys.stdout.flush()
-        if timeout_sec is not None and (time.time() - start) > timeout_sec:
-            proc.kill()
-            raise subprocess.TimeoutExpired(cmd=cmd, timeout=timeout_sec)
-    rc = proc.wait()
-    return rc, "".join(out_lines), ""
+    return stream_cmd(cmd, cwd=cwd, timeout_sec=timeout_sec, prefix=prefix, merge_stderr=True)
 
 
 def normalise_problem_name(problem: Path) -> str:
@@ -194,17 +176,17 @@ def select_problem_gen(domain: Path) -> Path:
     return root / "pddl" / "problem_gen.py"
 
 
-def generate_problem_from_level(level_txt: Path, problem_name: str, domain: Path, explicit_gen: Optional[Path]) -> Tuple[Path, tempfile.TemporaryDirectory]:
+def generate_problem_from_level(level_txt: Path, problem_name: str, domain: Path, explicit_gen: Optional[Path]) -> Tuple[Path, Workspace]:
     gen_py = explicit_gen.resolve() if explicit_gen else select_problem_gen(domain)
     if not gen_py.exists():
         raise FileNotFoundError(f"Missing problem generator at {gen_py}")
-    tmpdir = tempfile.TemporaryDirectory(prefix="gen_lifted_problem_")
-    out_path = Path(tmpdir.name) / f"{problem_name}.pddl"
-    cmd = [sys.executable, str(gen_py), str(level_txt), "-p", problem_name]
-    rc, out, err = run_cmd_capture(cmd, cwd=Path(tmpdir.name))
-    if rc != 0:
+    tmpdir = run_workspace()
+    out_path = tmpdir.path / f"{problem_name}.pddl"
+    try:
+        out = generate_problem_text(gen_py, level_txt, problem_name, cwd=tmpdir.path)
+    except Exception:
         tmpdir.cleanup()
-        raise RuntimeError(f"{gen_py.name} failed (rc={rc}): {err or out}")
+        raise
     # Keep our canonical copy at out_path even if generator already wrote one.
     out_path.write_text(out, encoding="utf-8")
     return out_path, tmpdir
@@ -243,7 +225,11 @@ def parse_powerlifted_plan(path: Path) -> List[Tuple[str, List[str]]]:
     return actions
 
 
-def solve_with_lifted(
+# (status, actions, stdout, stderr, {"metrics": ..., "raw_plan_text": ...})
+LiftedResult = Tuple[str, List[Tuple[str, List[str]]], str, str, dict]
+
+
+def _lifted_steps(
     domain: Path,
     problem: Path,
     search: str,
@@ -260,15 +246,16 @@ def solve_with_lifted(
     novelty_early_stop: bool,
     planner_args: str,
     stream: bool,
-) -> Tuple[str, List[Tuple[str, List[str]]], str, str, dict]:
+    memory_limit_mb: Optional[int] = None,
+) -> SolveSteps[LiftedResult]:
     root = repo_root()
     runner = root / "planners" / "powerlifted" / "powerlifted.py"
     if not runner.exists():
         raise FileNotFoundError(f"Powerlifted entrypoint not found: {runner}")
 
     start = time.time()
-    with tempfile.TemporaryDirectory(prefix="lifted_run_") as td:
-        td_path = Path(td)
+    with run_workspace() as ws:
+        td_path = ws.path
         raw_plan_path = td_path / "plan.powerlifted"
 
         cmd: List[str] = [
@@ -310,19 +297,15 @@ def solve_with_lifted(
             cmd.extend(shlex.split(planner_args))
 
         try:
-            if stream:
-                rc, out, err = run_cmd_stream(
-                    cmd,
-                    cwd=td_path,
-                    timeout_sec=hard_timeout,
-                    prefix="[LIFTED] ",
-                )
-            else:
-                rc, out, err = run_cmd_capture(
-                    cmd,
-                    cwd=td_path,
-                    timeout_sec=hard_timeout,
-                )
+            run = yield Launch(
+                cmd,
+                cwd=td_path,
+                timeout_sec=hard_timeout,
+                prefix="[LIFTED] ",
+                live=stream,
+                merge_stderr=stream,
+                memory_limit_mb=memory_limit_mb,
+            )
         except subprocess.TimeoutExpired as exc:
             actions = parse_powerlifted_plan(raw_plan_path)
             raw_plan_text = (
@@ -336,9 +319,17 @@ def solve_with_lifted(
                 "returncode": None,
                 "time_sec": round(time.time() - start, 3),
                 "command": cmd,
+                "memory_limit_mb": memory_limit_mb,
             }
+            if isinstance(exc, ProcessGroupTimeout):
+                err += exc.note() + "\n"
+                emit_output("err", exc.note())
+                metrics["survivors"] = len(exc.survivors)
+                if exc.usage:
+                    metrics.update(exc.usage.metrics())
             return "timeout", actions, out, err, {"metrics": metrics, "raw_plan_text": raw_plan_text}
 
+        rc, out, err = run.returncode, run.stdout, run.stderr
         actions = parse_powerlifted_plan(raw_plan_path)
         raw_plan_text = raw_plan_path.read_text(encoding="utf-8", errors="replace") if raw_plan_path.exists() else ""
 
@@ -365,6 +356,8 @@ def solve_with_lifted(
 
     if solved:
         status = "solved"
+    elif is_memout(None, lower_out):
+        status = "memout"
     elif hard_error:
         status = "error"
     elif timed_out:
@@ -380,10 +373,97 @@ def solve_with_lifted(
         "returncode": rc,
         "time_sec": round(time.time() - start, 3),
         "command": cmd,
+        "memory_limit_mb": memory_limit_mb,
+        **(run.usage.metrics() if run.usage else {}),
     }
     return status, actions, out, err, {"metrics": metrics, "raw_plan_text": raw_plan_text}
 
 
+def solve_with_lifted(
+    domain: Path,
+    problem: Path,
+    search: str,
+    evaluator: str,
+    generator: str,
+    time_limit: Optional[int],
+    hard_timeout: Optional[int],
+    seed: int,
+    build: bool,
+    debug: bool,
+    cxx_compiler: str,
+    unit_cost: bool,
+    only_effects_novelty_check: bool,
+    novelty_early_stop: bool,
+    planner_args: str,
+    stream: bool,
+    memory_limit_mb: Optional[int] = None,
+) -> LiftedResult:
+    return run_steps(
+        _lifted_steps(
+            domain=domain,
+            problem=problem,
+            search=search,
+            evaluator=evaluator,
+            generator=generator,
+            time_limit=time_limit,
+            hard_timeout=hard_timeout,
+            seed=seed,
+            build=build,
+            debug=debug,
+            cxx_compiler=cxx_compiler,
+            unit_cost=unit_cost,
+            only_effects_novelty_check=only_effects_novelty_check,
+            novelty_early_stop=novelty_early_stop,
+            planner_args=planner_args,
+            stream=stream,
+            memory_limit_mb=memory_limit_mb,
+        )
+    )
+
+
+async def solve_with_lifted_async(
+    domain: Path,
+    problem: Path,
+    search: str,
+    evaluator: str,
+    generator: str,
+    time_limit: Optional[int],
+    hard_timeout: Optional[int],
+    seed: int,
+    build: bool,
+    debug: bool,
+    cxx_compiler: str,
+    unit_cost: bool,
+    only_effects_novelty_check: bool,
+    novelty_early_stop: bool,
+    planner_args: str,
+    stream: bool,
+    memory_limit_mb: Optional[int] = None,
+) -> LiftedResult:
+    """solve_with_lifted on the running event loop (see run_process_async)."""
+    return await run_steps_async(
+        _lifted_steps(
+            domain=domain,
+            problem=problem,
+            search=search,
+            evaluator=evaluator,
+            generator=generator,
+            time_limit=time_limit,
+            hard_timeout=hard_timeout,
+            seed=seed,
+            build=build,
+            debug=debug,
+            cxx_compiler=cxx_compiler,
+            unit_cost=unit_cost,
+            only_effects_novelty_check=only_effects_novelty_check,
+            novelty_early_stop=novelty_early_stop,
+            planner_args=planner_args,
+            stream=stream,
+            memory_limit_mb=memory_limit_mb,
+        )
+    )
+
+
 def main() -> int:
     ap = argparse.ArgumentParser(description="Run Powerlifted and save plans under plans/<problem_name>/.")
     ap.add_argument("--domain", type=Path, help="Domain PDDL (required unless using --play-plan)")
@@ -405,7 +485,9 @@ def main() -> int:
     ap.add_argument("--play-plan", type=Path, help="Play an existing plan file and exit")
     ap.add_argument("--play-level", type=Path, help="Optional level file for plan_player")
     ap.add_argument("--problem-gen", type=Path, default=None, help="Override problem generator script when --problem is a .txt level")
+    add_workspace_args(ap)
     args = ap.parse_args()
+    apply_workspace_args(args)
 
     if args.play_plan:
         plan_file = args.play_plan.resolve()
@@ -433,7 +515,7 @@ def main() -> int:
         return 2
 
     problem = input_problem
-    temp_problem_dir: Optional[tempfile.TemporaryDirectory] = None
+    temp_problem_dir: Optional[Workspace] = None
     if problem.suffix.lower() == ".txt":
         try:
             problem, temp_problem_dir = generate_problem_from_level(
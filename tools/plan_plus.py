@@ -5,10 +5,13 @@ import argparse
 import re
 import subprocess
 import sys
-import tempfile
 from pathlib import Path
 from typing import List, Optional, Tuple
 
+from domain_signature import try_load_domain_signature
+from problem_gen_registry import generate_problem_text
+from workspace import Workspace, run_workspace
+
 
 def repo_root() -> Path:
     return Path(__file__).resolve().parents[1]
@@ -139,14 +142,8 @@ def select_problem_gen(domain: Path) -> Path:
     root = repo_root()
 
     def read_source_name(path: Path) -> Optional[str]:
-        try:
-            text = path.read_text(encoding="utf-8", errors="replace")
-        except Exception:
-            return None
-        m = re.search(r"^;\s*source:\s*(.+)$", text, flags=re.MULTILINE)
-        if not m:
-            return None
-        return Path(m.group(1).strip()).name
+        signature = try_load_domain_signature(path)
+        return signature.source if signature else None
 
     source_to_gen = {
         "domain.pddl": "problem_gen.py",
@@ -199,21 +196,21 @@ def select_problem_gen(domain: Path) -> Path:
     return root / "pddl" / "problem_gen.py"
 
 
-def generate_problem_from_level(level_txt: Path, problem_name: str, domain: Path, explicit_gen: Optional[Path]) -> Tuple[Path, tempfile.TemporaryDirectory]:
+def generate_problem_from_level(level_txt: Path, problem_name: str, domain: Path, explicit_gen: Optional[Path]) -> Tuple[Path, Workspace]:
     gen_py = explicit_gen.resolve() if explicit_gen else select_problem_gen(domain)
     if not gen_py.exists():
         raise FileNotFoundError(f"Missing problem generator at {gen_py}")
 
-    tmpdir = tempfile.TemporaryDirectory(prefix="gen_plus_problem_")
-    out_path = Path(tmpdir.name) / f"{problem_name}.pddl"
+    tmpdir = run_workspace()
+    out_path = tmpdir.path / f"{problem_name}.pddl"
 
-    cmd = [sys.executable, str(gen_py), str(level_txt), "-p", problem_name]
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if proc.returncode != 0:
+    try:
+        out = generate_problem_text(gen_py, level_txt, problem_name, cwd=tmpdir.path)
+    except Exception:
         tmpdir.cleanup()
-        raise RuntimeError(f"{gen_py.name} failed (rc={proc.returncode}): {proc.stderr or proc.stdout}")
+        raise
 
-    out_path.write_text(proc.stdout, encoding="utf-8")
+    out_path.write_text(out, encoding="utf-8")
     return out_path, tmpdir
 
 
@@ -291,7 +288,7 @@ def main() -> int:
         return 2
 
     problem = input_problem
-    temp_problem_dir: Optional[tempfile.TemporaryDirectory] = None
+    temp_problem_dir: Optional[Workspace] = None
 
     if problem.suffix.lower() == ".txt":
         try:
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Portfolio racing for tools/plan.py (`--planner portfolio`).
+
+All members (FF, FD configurations, Powerlifted, PDDL+ planners) start at
+once on one asyncio event loop (see the *_async planner entry points), each
+pinned to its own slice of the available CPUs. By default the first member to
+return a plan wins and the others are cancelled, which kills their process
+groups; with wait_best every member runs to completion (or its timeout) and
+the shortest plan wins. Members with their own `domain` get a problem
+compiled from the level for that domain.
+
+Members come from a JSON file:
+
+  {"members": [
+    {"name": "ff", "planner": "ff"},
+    {"name": "lama", "planner": "fd", "planner_args": "--alias lama-first", "cores": 1},
+    {"name": "bfws", "planner": "lifted", "search": "alt-bfws1", "evaluator": "ff"},
+    {"name": "enhsp", "planner": "enhsp", "domain": "../pddl/domain_plus.pddl", "java_opts": "-Xmx4g", "cores": 2}
+  ]}
+
+Relative paths are resolved against the file's directory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from plan import PlanResult, generate_problem_from_level, normalise_problem_name, solve_with_fd_async, solve_with_ff_async
+from plan_lifted import solve_with_lifted_async
+from subprocess_utils import available_cpus, launch_on_cpus
+from workspace import Workspace
+
+PLUS_RUNNER_DIR = Path(__file__).resolve().parents[1] / "planners" / "pddl-plus"
+if str(PLUS_RUNNER_DIR) not in sys.path:
+    sys.path.insert(0, str(PLUS_RUNNER_DIR))
+
+from pddl_plus_runner import solve_async as solve_plus_async  # type: ignore  # noqa: E402
+
+CLASSIC_PLANNERS = ("ff", "fd", "lifted")
+PLUS_PLANNERS = ("enhsp", "optic", "cmd")
+MEMBER_PLANNERS = CLASSIC_PLANNERS + PLUS_PLANNERS
+
+
+@dataclass(frozen=True)
+class PortfolioMember:
+    name: str
+    planner: str  # ff | fd | lifted | enhsp | optic | cmd
+    domain: Optional[Path] = None  # own domain variant; None = the portfolio's domain
+    planner_args: str = ""
+    cores: int = 1
+    memory_limit_mb: Optional[int] = None
+    # fd
+    optimal: bool = False
+    keep_searching: bool = False
+    # lifted
+    search: str = "alt-bfws1"
+    evaluator: str = "ff"
+    generator: str = "yannakakis"
+    # PDDL+
+    java_opts: str = ""
+    enhsp_jar: Optional[Path] = None
+    cmd_template: Optional[str] = None
+
+
+DEFAULT_MEMBERS: Tuple[PortfolioMember, ...] = (
+    PortfolioMember(name="ff", planner="ff"),
+    PortfolioMember(name="fd", planner="fd"),
+    PortfolioMember(name="lifted", planner="lifted"),
+)
+
+
+@dataclass
+class MemberOutcome:
+    name: str
+    planner: str
+    status: str  # planner status, or "cancelled" when another member won first
+    actions: List[Tuple[str, List[str]]]
+    finished_sec: float  # since the race started
+    cpus: Tuple[int, ...]
+    raw_stdout: str = ""
+    raw_stderr: str = ""
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def has_plan(self) -> bool:
+        return self.status == "solved" and bool(self.actions)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "planner": self.planner,
+            "status": self.status,
+            "plan_length": len(self.actions) if self.has_plan else None,
+            "finished_sec": self.finished_sec,
+            "cpus": list(self.cpus),
+            "time_sec": self.metrics.get("time_sec"),
+            "returncode": self.metrics.get("returncode"),
+        }
+
+
+@dataclass
+class PortfolioResult:
+    mode: str  # first | best
+    winner: Optional[MemberOutcome]
+    first_member: Optional[str]
+    time_to_first_plan_sec: Optional[float]
+    wall_sec: float
+    outcomes: List[MemberOutcome]
+    oversubscribed: bool = False
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "winner": self.winner.name if self.winner else None,
+            "first_member": self.first_member,
+            "time_to_first_plan_sec": self.time_to_first_plan_sec,
+            "wall_sec": self.wall_sec,
+            "oversubscribed": self.oversubscribed,
+            "members": [o.summary() for o in self.outcomes],
+        }
+
+    def to_plan_result(self, domain: Path, problem: Path) -> PlanResult:
+        """The winning plan as a PlanResult (planner "portfolio:<member>")."""
+        winner = self.winner
+        statuses = {o.status for o in self.outcomes}
+        status = "solved" if winner else next(
+            (s for s in ("no-path", "memout", "timeout", "unsolved") if s in statuses), "error"
+        )
+        return PlanResult(
+            planner=f"portfolio:{winner.name}" if winner else "portfolio",
+            domain=str(domain),
+            problem=str(problem),
+            status=status,
+            actions=winner.actions if winner else [],
+            raw_stdout=winner.raw_stdout if winner else "",
+            raw_stderr=winner.raw_stderr if winner else "",
+            metrics={
+                **(winner.metrics if winner else {}),
+                "time_sec": self.wall_sec,
+                "portfolio_winner": winner.name if winner else None,
+                "portfolio_first_member": self.first_member,
+                "time_to_first_plan_sec": self.time_to_first_plan_sec,
+            },
+        )
+
+
+# -----------------------------
+# Members
+# -----------------------------
+
+_PATH_FIELDS = {"domain", "enhsp_jar"}
+
+
+def load_members(path: Optional[Path]) -> List[PortfolioMember]:
+    """Members from a portfolio JSON file, or DEFAULT_MEMBERS."""
+    if path is None:
+        return list(DEFAULT_MEMBERS)
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    entries = raw.get("members") if isinstance(raw, dict) else raw
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path}: expected a non-empty 'members' list")
+    known = {f.name for f in dataclasses.fields(PortfolioMember)}
+    members: List[PortfolioMember] = []
+    for idx, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"{path}: member #{idx} must be an object")
+        unknown = sorted(set(entry) - known)
+        if unknown:
+            raise ValueError(f"{path}: member #{idx} has unknown keys: {', '.join(unknown)}")
+        planner = str(entry.get("planner", "")).lower()
+        if planner not in MEMBER_PLANNERS:
+            raise ValueError(f"{path}: member #{idx} planner must be one of {', '.join(MEMBER_PLANNERS)}")
+        values = dict(entry, planner=planner)
+        values.setdefault("name", planner)
+        for key in _PATH_FIELDS & set(values):
+            if values[key] is not None:
+                p = Path(values[key]).expanduser()
+                values[key] = p if p.is_absolute() else (path.parent / p).resolve()
+        if int(values.get("cores", 1)) < 1:
+            raise ValueError(f"{path}: member {values['name']!r} needs cores >= 1")
+        members.append(PortfolioMember(**values))
+    names = [m.name for m in members]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"{path}: duplicate member names: {', '.join(duplicates)}")
+    return members
+
+
+def allot_cpus(
+    members: Sequence[PortfolioMember],
+    cpus: Optional[Sequence[int]] = None,
+) -> Tuple[List[Tuple[int, ...]], bool]:
+    """
+    Consecutive CPU slices of `cores` each, in member order; (slices,
+    oversubscribed). When members ask for more cores than exist, slices wrap
+    around and share CPUs.
+    """
+    pool = list(cpus) if cpus else available_cpus()
+    slices: List[Tuple[int, ...]] = []
+    pos = 0
+    for member in members:
+        take = min(member.cores, len(pool))
+        slices.append(tuple(pool[(pos + i) % len(pool)] for i in range(take)))
+        pos += take
+    return slices, pos > len(pool)
+
+
+# -----------------------------
+# Race
+# -----------------------------
+
+async def _solve_member(
+    member: PortfolioMember,
+    domain: Path,
+    problem: Path,
+    timeout: Optional[int],
+    stream: bool,
+    memory_limit_mb: Optional[int],
+) -> Tuple[str, str, List[Tuple[str, List[str]]], str, str, Dict[str, Any]]:
+    """(planner tag, status, actions, stdout, stderr, metrics) for one member run."""
+    memory = member.memory_limit_mb or memory_limit_mb
+    if member.planner == "ff":
+        r = await solve_with_ff_async(domain, problem, timeout, stream, member.planner_args, memory)
+        return r.planner, r.status, r.actions, r.raw_stdout, r.raw_stderr, r.metrics
+    if member.planner == "fd":
+        r = await solve_with_fd_async(
+            domain,
+            problem,
+            timeout,
+            member.optimal,
+            stream,
+            keep_searching=member.keep_searching,
+            planner_args=member.planner_args,
+            memory_limit_mb=memory,
+        )
+        return r.planner, r.status, r.actions, r.raw_stdout, r.raw_stderr, r.metrics
+    if member.planner == "lifted":
+        status, actions, out, err, extra = await solve_with_lifted_async(
+            domain=domain,
+            problem=problem,
+            search=member.search,
+            evaluator=member.evaluator,
+            generator=member.generator,
+            time_limit=timeout,
+            hard_timeout=timeout,
+            seed=1,
+            build=False,
+            debug=False,
+            cxx_compiler="default",
+            unit_cost=False,
+            only_effects_novelty_check=False,
+            novelty_early_stop=False,
+            planner_args=member.planner_args,
+            stream=stream,
+            memory_limit_mb=memory,
+        )
+        return "lifted", status, actions, out, err, extra.get("metrics", {})
+    plus = await solve_plus_async(
+        domain,
+        problem,
+        planner=member.planner,
+        timeout=timeout,
+        stream=stream,
+        planner_args=member.planner_args,
+        java_opts=member.java_opts,
+        cmd_template=member.cmd_template,
+        enhsp_jar=member.enhsp_jar,
+        memory_limit_mb=memory,
+    )
+    actions = [(a.name, list(a.args)) for a in plus.actions]
+    return plus.planner, plus.status, actions, plus.raw_stdout, plus.raw_stderr, plus.metrics
+
+
+async def _run_member(
+    member: PortfolioMember,
+    domain: Path,
+    problem: Path,
+    cpus: Tuple[int, ...],
+    start: float,
+    timeout: Optional[int],
+    stream: bool,
+    memory_limit_mb: Optional[int],
+) -> MemberOutcome:
+    with launch_on_cpus(cpus):
+        try:
+            tag, status, actions, out, err, metrics = await _solve_member(
+                member, domain, problem, timeout, stream, memory_limit_mb
+            )
+        except Exception as exc:
+            tag, status, actions, out, err, metrics = member.planner, "error", [], "", f"[ERR] {exc}\n", {}
+    return MemberOutcome(
+        name=member.name,
+        planner=tag,
+        status=status,
+        actions=actions,
+        finished_sec=round(time.monotonic() - start, 3),
+        cpus=cpus,
+        raw_stdout=out or "",
+        raw_stderr=err or "",
+        metrics=metrics,
+    )
+
+
+async def race_async(
+    members: Sequence[PortfolioMember],
+    problems: Sequence[Tuple[Path, Path]],
+    *,
+    timeout: Optional[int] = None,
+    stream: bool = False,
+    wait_best: bool = False,
+    memory_limit_mb: Optional[int] = None,
+    cpus: Optional[Sequence[int]] = None,
+) -> PortfolioResult:
+    """
+    Race `members`, member i solving problems[i] = (domain, problem). The
+    first plan wins unless wait_best, where the shortest plan wins (ties go
+    to the member that finished first).
+    """
+    slices, oversubscribed = allot_cpus(members, cpus)
+    start = time.monotonic()
+    tasks = {
+        asyncio.ensure_future(
+            _run_member(member, domain, problem, slices[i], start, timeout, stream, memory_limit_mb)
+        ): member
+        for i, (member, (domain, problem)) in enumerate(zip(members, problems))
+    }
+    outcomes: Dict[str, MemberOutcome] = {}
+    first: Optional[MemberOutcome] = None
+    best: Optional[MemberOutcome] = None
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda t: t.result().finished_sec):
+                outcome = task.result()
+                outcomes[outcome.name] = outcome
+                if not outcome.has_plan:
+                    continue
+                if first is None:
+                    first = outcome
+                if best is None or len(outcome.actions) < len(best.actions):
+                    best = outcome
+            if first is not None and not wait_best:
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Cancellation kills each member's process group before returning.
+            await asyncio.gather(*pending, return_exceptions=True)
+    for i, member in enumerate(members):
+        if member.name not in outcomes:
+            outcomes[member.name] = MemberOutcome(
+                name=member.name,
+                planner=member.planner,
+                status="cancelled",
+                actions=[],
+                finished_sec=round(time.monotonic() - start, 3),
+                cpus=slices[i],
+            )
+    return PortfolioResult(
+        mode="best" if wait_best else "first",
+        winner=best if wait_best else first,
+        first_member=first.name if first else None,
+        time_to_first_plan_sec=first.finished_sec if first else None,
+        wall_sec=round(time.monotonic() - start, 3),
+        outcomes=[outcomes[m.name] for m in members],
+        oversubscribed=oversubscribed,
+    )
+
+
+def prepare_problems(
+    members: Sequence[PortfolioMember],
+    domain: Path,
+    problem: Path,
+    level: Optional[Path],
+) -> Tuple[List[Tuple[Path, Path]], List[Workspace]]:
+    """
+    (domain, problem) per member, compiling the level once per distinct
+    member domain. Without a level, members with their own domain get the
+    given problem as is.
+    """
+    tempdirs: List[Workspace] = []
+    compiled: Dict[Path, Path] = {domain: problem}
+    pairs: List[Tuple[Path, Path]] = []
+    for member in members:
+        member_domain = member.domain or domain
+        if member_domain not in compiled:
+            if level is None:
+                print(
+                    f"[WARN] portfolio member {member.name!r} has its own domain but no level was given; "
+                    f"using {problem}",
+                    file=sys.stderr,
+                )
+                compiled[member_domain] = problem
+            else:
+                compiled_problem, tmp = generate_problem_from_level(
+                    level, normalise_problem_name(problem), member_domain
+                )
+                tempdirs.append(tmp)
+                compiled[member_domain] = compiled_problem
+        pairs.append((member_domain, compiled[member_domain]))
+    return pairs, tempdirs
+
+
+def solve_portfolio(
+    members: Sequence[PortfolioMember],
+    domain: Path,
+    problem: Path,
+    *,
+    level: Optional[Path] = None,
+    timeout: Optional[int] = None,
+    stream: bool = False,
+    wait_best: bool = False,
+    memory_limit_mb: Optional[int] = None,
+) -> PortfolioResult:
+    """Blocking entry point: compile per-member problems, race, clean up."""
+    problems, tempdirs = prepare_problems(members, domain, problem, level)
+    try:
+        return asyncio.run(
+            race_async(
+                members,
+                problems,
+                timeout=timeout,
+                stream=stream,
+                wait_best=wait_best,
+                memory_limit_mb=memory_limit_mb,
+            )
+        )
+    finally:
+        for tmp in tempdirs:
+            tmp.cleanup()
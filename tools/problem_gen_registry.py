@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+In-process access to the pddl/ problem generators.
+
+The planning wrappers and benchmark runners historically compiled every level by
+spawning `python <problem_gen>.py <level> -p <name>`. Interpreter start-up and the
+generator imports dominated that cost for small levels, so known generators are
+now imported once per process and called directly. Anything we do not recognise
+(custom `problem_gen` paths from a config, older wrapper copies) still goes
+through the subprocess path.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import importlib.util
+import io
+import re
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO, Tuple
+
+from content_cache import DEFAULT_CACHE_ROOT, ContentCache, hash_parts, link_or_copy
+from domain_signature import try_load_domain_signature
+from workspace import run_workspace
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+PDDL_DIR = REPO_ROOT / "pddl"
+
+# In-process generators stream the problem into a text stream:
+# `(out, level_text, problem_name, options) -> None`, where options is a
+# problem_gen.ProblemOptions (None for the historical output).
+GeneratorFn = Callable[[TextIO, str, str, Any], None]
+
+# Generator scripts in pddl/ that are thin CLIs around one module writer.
+# The domain name mirrors each script's argparse default so the in-process text
+# matches `python <script> <level> -p <name>` exactly.
+MODULE_GENERATORS: Dict[str, Tuple[str, str]] = {
+    "problem_gen.py": ("write_pddl_problem", "mine-tick-gravity"),
+    "problem_gen_scanner_separated.py": ("write_pddl_problem", "mine-tick-gravity"),
+    "problem_gen_plus_from_domain.py": (
+        "write_compact_problem",
+        "mine-tick-gravity-plus-from-domain",
+    ),
+    "problem_gen_plus_from_domain_int_state.py": (
+        "write_compact_problem",
+        "mine-tick-gravity-plus-from-domain-int-state",
+    ),
+    "problem_gen_plus_scanner_separated.py": (
+        "write_compact_problem",
+        "mine-tick-gravity-plus-scanner-separated",
+    ),
+    "problem_gen_plus_scanner_separated_int_state.py": (
+        "write_compact_problem",
+        "mine-tick-gravity-plus-scanner-separated-int-state",
+    ),
+    "problem_gen_plus_scanner_separated_events_fluents.py": (
+        "write_compact_problem",
+        "mine-tick-gravity-plus-scanner-separated-events-fluents",
+    ),
+    "problem_gen_plus_scanner_separated_events_fluents_trimmed.py": (
+        "write_compact_problem",
+        "mine-tick-gravity-plus-scanner-separated-events-fluents-trimmed",
+    ),
+}
+
+# Domain-matched wrappers under pddl/test_domains*/ are one-liners of this shape.
+_WRAPPER_RE = re.compile(r"main_for_domain_file\(\s*[\"']([^\"']+)[\"']\s*\)")
+
+# Domain `; source:` headers -> the pddl/ generator that emits matching problems.
+SOURCE_TO_GENERATOR: Dict[str, str] = {
+    "domain.pddl": "problem_gen.py",
+    "domain_merged.pddl": "problem_gen.py",
+    "domain_scanner_combined.pddl": "problem_gen.py",
+    "domain_scanner_separated.pddl": "problem_gen_scanner_separated.py",
+    "domain_plus_from_domain.pddl": "problem_gen_plus_from_domain.py",
+    "domain_plus_scanner_separated.pddl": "problem_gen_plus_scanner_separated.py",
+    "domain_plus_scanner_separated_events.pddl": "problem_gen_plus_scanner_separated.py",
+    "domain_plus_scanner_separated_events_fluents.pddl": "problem_gen_plus_scanner_separated_events_fluents.py",
+    "domain_plus_scanner_separated_events_fluents_trimmed.pddl": "problem_gen_plus_scanner_separated_events_fluents_trimmed.py",
+    "domain_plus_relaxed.pddl": "problem_gen_plus_relaxed.py",
+}
+
+_LOCK = threading.Lock()
+_GENERATORS: Dict[Path, Optional[GeneratorFn]] = {}
+_COMMON_MODULES: Dict[Path, ModuleType] = {}
+
+PROBLEM_CACHE_DIR = DEFAULT_CACHE_ROOT / "problems"
+PROBLEM_CACHE_MAX_MB = 2048
+_PROBLEM_CACHE: Optional[ContentCache] = ContentCache(PROBLEM_CACHE_DIR, PROBLEM_CACHE_MAX_MB * 1024 * 1024)
+_SOURCE_DIGESTS: Dict[Path, Tuple[int, int, str]] = {}
+
+
+def _import_pddl_module(name: str) -> ModuleType:
+    if str(PDDL_DIR) not in sys.path:
+        sys.path.insert(0, str(PDDL_DIR))
+    return importlib.import_module(name)
+
+
+def problem_options(**kwargs: Any) -> Any:
+    """Build a problem_gen.ProblemOptions without importing pddl/ at call sites."""
+    return _import_pddl_module("problem_gen").ProblemOptions(**kwargs)
+
+
+def _is_default_options(options: Any) -> bool:
+    return options is None or not options.cli_args()
+
+
+def _load_common_module(common_py: Path) -> ModuleType:
+    module = _COMMON_MODULES.get(common_py)
+    if module is not None:
+        return module
+    # Each test_domains* directory ships its own problem_gen_common.py, so load
+    # them under distinct names instead of letting the first one win.
+    module_name = f"_problem_gen_common_{common_py.parent.name.replace('-', '_')}"
+    spec = importlib.util.spec_from_file_location(module_name, common_py)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Cannot load {common_py}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    _COMMON_MODULES[common_py] = module
+    return module
+
+
+def _wrapper_target(gen_py: Path) -> Optional[Tuple[ModuleType, str]]:
+    """(problem_gen_common module, domain filename) for a domain-matched wrapper script."""
+    common_py = gen_py.parent / "problem_gen_common.py"
+    if not common_py.exists():
+        return None
+    try:
+        source = gen_py.read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return None
+    match = _WRAPPER_RE.search(source)
+    if not match:
+        return None
+    return _load_common_module(common_py), match.group(1)
+
+
+def _resolve_generator(gen_py: Path) -> Optional[GeneratorFn]:
+    if gen_py.parent == PDDL_DIR and gen_py.name in MODULE_GENERATORS:
+        func_name, default_domain = MODULE_GENERATORS[gen_py.name]
+        func = getattr(_import_pddl_module(gen_py.stem), func_name)
+
+        def generate_module(out: TextIO, level_text: str, problem_name: str, options: Any = None) -> None:
+            func(out, level_text, problem_name=problem_name, domain_name=default_domain, options=options)
+
+        return generate_module
+
+    wrapper = _wrapper_target(gen_py)
+    if wrapper is None:
+        return None
+    common, domain_filename = wrapper
+    common_py = gen_py.parent / "problem_gen_common.py"
+    write_for_domain_file = getattr(common, "write_for_domain_file", None)
+    if write_for_domain_file is not None:
+
+        def write_wrapper(out: TextIO, level_text: str, problem_name: str, options: Any = None) -> None:
+            write_for_domain_file(out, domain_filename, level_text, problem_name, options=options)
+
+        return write_wrapper
+
+    generate_for_domain_file = getattr(common, "generate_for_domain_file", None)
+    if generate_for_domain_file is None:
+        return None
+
+    def generate_wrapper(out: TextIO, level_text: str, problem_name: str, options: Any = None) -> None:
+        if not _is_default_options(options):
+            raise ValueError(f"{common_py} predates problem options; only the default output is available")
+        out.write(generate_for_domain_file(domain_filename, level_text, problem_name))
+
+    return generate_wrapper
+
+
+def load_generator(gen_py: Path) -> Optional[GeneratorFn]:
+    """
+    Return an in-process `(out, level_text, problem_name, options)` writer for gen_py,
+    or None when the script is not one we know how to call directly.
+    """
+    key = gen_py.resolve()
+    with _LOCK:
+        if key not in _GENERATORS:
+            _GENERATORS[key] = _resolve_generator(key)
+        return _GENERATORS[key]
+
+
+def variant_writers_for(
+    gen_pys: Sequence[Path],
+    level_path: Path,
+    problem_name: str,
+    options: Any = None,
+) -> Dict[Path, Callable[[TextIO], None]]:
+    """
+    Writers for the wrappers in gen_pys that can share one build of level_path.
+
+    Wrappers whose problem_gen_common.py offers `variant_writers` are grouped
+    per common module, so all of a directory's variants reuse a single parse
+    and fact build of the level (see pddl/test_domains_target). Generators that
+    cannot share a build are left out; callers compile those one by one.
+    """
+    groups: Dict[ModuleType, Dict[str, List[Path]]] = {}
+    for gen_py in gen_pys:
+        wrapper = _wrapper_target(gen_py.resolve())
+        if wrapper is None or not hasattr(wrapper[0], "variant_writers"):
+            continue
+        common, domain_filename = wrapper
+        groups.setdefault(common, {}).setdefault(domain_filename, []).append(gen_py)
+    if not groups:
+        return {}
+
+    level_text = level_path.read_text(encoding="utf-8").strip()
+    writers: Dict[Path, Callable[[TextIO], None]] = {}
+    for common, by_domain in groups.items():
+        for domain_filename, write in common.variant_writers(by_domain, level_text, problem_name, options).items():
+            for gen_py in by_domain[domain_filename]:
+                writers[gen_py] = write
+    return writers
+
+
+def read_source_name(domain: Path) -> Optional[str]:
+    signature = try_load_domain_signature(domain)
+    return signature.source if signature else None
+
+
+def default_problem_gen_for_domain(domain: Path) -> Path:
+    source_name = read_source_name(domain)
+    if source_name and source_name in SOURCE_TO_GENERATOR:
+        return PDDL_DIR / SOURCE_TO_GENERATOR[source_name]
+
+    name = (source_name or domain.name).lower()
+    if "scanner_separated_events_fluents_trimmed" in name:
+        return PDDL_DIR / "problem_gen_plus_scanner_separated_events_fluents_trimmed.py"
+    if "scanner_separated_events_fluents" in name:
+        return PDDL_DIR / "problem_gen_plus_scanner_separated_events_fluents.py"
+    if "plus" in name and ("plus_scanner" in name or "scanner_separated" in name):
+        return PDDL_DIR / "problem_gen_plus_scanner_separated.py"
+    if "plus_relaxed" in name:
+        return PDDL_DIR / "problem_gen_plus_relaxed.py"
+    if "plus" in name:
+        return PDDL_DIR / "problem_gen_plus_from_domain.py"
+    if "scanner_separated" in name or "scaner_separated" in name:
+        return PDDL_DIR / "problem_gen_scanner_separated.py"
+    return PDDL_DIR / "problem_gen.py"
+
+
+def problem_gen_for_domain(domain: Path) -> Path:
+    """
+    The domain-matched wrapper next to `domain` when one exists, otherwise the
+    pddl/ generator picked from its `; source:` header.
+    """
+    # Wrappers are keyed by the file stem or by the `; variant:` header, which
+    # drops the classic_ marker that classic matrix files carry on disk.
+    stems = [domain.stem]
+    signature = try_load_domain_signature(domain)
+    if signature is not None and signature.variant:
+        stems.append(Path(signature.variant).stem)
+    for stem in stems:
+        candidate = domain.parent / f"problem_gen_{stem}.py"
+        if candidate.exists():
+            return candidate
+    return default_problem_gen_for_domain(domain)
+
+
+def run_generator_subprocess(
+    gen_py: Path,
+    level_path: Path,
+    problem_name: str,
+    cwd: Optional[Path] = None,
+    options: Any = None,
+) -> str:
+    cmd = [sys.executable, str(gen_py.resolve()), str(level_path.resolve()), "-p", problem_name]
+    if options is not None:
+        cmd += options.cli_args()
+    if cwd is None:
+        # Keep the CLIs' `<problem_name>.pddl` side-effect out of the caller's cwd.
+        with run_workspace() as scratch:
+            return run_generator_subprocess(gen_py, level_path, problem_name, cwd=scratch.path, options=options)
+    proc = subprocess.run(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=str(cwd),
+    )
+    if proc.returncode != 0:
+        detail = (proc.stderr or proc.stdout).strip()
+        raise RuntimeError(f"{gen_py.name} failed (rc={proc.returncode}): {detail}")
+    return proc.stdout
+
+
+def generate_problem_text(
+    gen_py: Path,
+    level_path: Path,
+    problem_name: str,
+    cwd: Optional[Path] = None,
+    options: Any = None,
+) -> str:
+    """
+    Compile level_path with gen_py, in-process when possible.
+
+    `cwd` only matters for the subprocess fallback: several generator CLIs also
+    drop `<problem_name>.pddl` into their working directory.
+    """
+    if not gen_py.exists():
+        raise FileNotFoundError(f"Missing problem generator at {gen_py}")
+    generator = load_generator(gen_py)
+    if generator is None:
+        return run_generator_subprocess(gen_py, level_path, problem_name, cwd=cwd, options=options)
+
+    buf = io.StringIO()
+    _run_generator(generator, gen_py, level_path, problem_name, buf, options)
+    return buf.getvalue()
+
+
+def _run_generator(
+    generator: GeneratorFn,
+    gen_py: Path,
+    level_path: Path,
+    problem_name: str,
+    out: TextIO,
+    options: Any = None,
+) -> None:
+    level_text = level_path.read_text(encoding="utf-8").strip()
+    try:
+        generator(out, level_text, problem_name, options)
+    except Exception as exc:
+        raise RuntimeError(f"{gen_py.name} failed: {exc}") from exc
+
+
+
+# -----------------------------
+# Compiled-problem cache
+# -----------------------------
+
+def configure_problem_cache(
+    cache_dir: Optional[Path] = None,
+    max_mb: Optional[int] = None,
+    enabled: bool = True,
+) -> None:
+    """Point the process-wide problem cache somewhere else, or switch it off."""
+    global _PROBLEM_CACHE
+    if not enabled:
+        _PROBLEM_CACHE = None
+        return
+    _PROBLEM_CACHE = ContentCache(
+        cache_dir or PROBLEM_CACHE_DIR,
+        (max_mb if max_mb is not None else PROBLEM_CACHE_MAX_MB) * 1024 * 1024,
+    )
+
+
+def add_problem_cache_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--problem-cache-dir",
+        type=Path,
+        default=None,
+        help=f"Compiled-problem cache directory (default: {PROBLEM_CACHE_DIR.relative_to(REPO_ROOT)}).",
+    )
+    ap.add_argument(
+        "--problem-cache-max-mb",
+        type=int,
+        default=None,
+        help=f"Evict least recently used compiled problems above this size (default: {PROBLEM_CACHE_MAX_MB}).",
+    )
+    ap.add_argument(
+        "--no-problem-cache",
+        action="store_true",
+        help="Always regenerate problems instead of reusing cached compilations.",
+    )
+
+
+def apply_problem_cache_args(args: argparse.Namespace) -> None:
+    configure_problem_cache(
+        cache_dir=args.problem_cache_dir.resolve() if args.problem_cache_dir else None,
+        max_mb=args.problem_cache_max_mb,
+        enabled=not args.no_problem_cache,
+    )
+
+
+def _source_digest(path: Path) -> str:
+    st = path.stat()
+    with _LOCK:
+        cached = _SOURCE_DIGESTS.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return cached[2]
+    digest = hash_parts(path.read_bytes())
+    with _LOCK:
+        _SOURCE_DIGESTS[path] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+def _generator_sources(gen_py: Path) -> List[Path]:
+    if load_generator(gen_py) is None:
+        return [gen_py]
+    # Known generators import each other freely, so any pddl/*.py edit counts.
+    sources = sorted(PDDL_DIR.glob("*.py"))
+    if gen_py.parent != PDDL_DIR:
+        sources += [gen_py, gen_py.parent / "problem_gen_common.py"]
+    return sources
+
+
+def _repo_relative(path: Path) -> str:
+    return str(path.relative_to(REPO_ROOT)) if path.is_relative_to(REPO_ROOT) else str(path)
+
+
+def generator_fingerprint(gen_py: Path) -> str:
+    gen_py = gen_py.resolve()
+    parts = [_repo_relative(gen_py)]
+    for source in _generator_sources(gen_py):
+        parts.append(_repo_relative(source))
+        parts.append(_source_digest(source))
+    return hash_parts(*parts)
+
+
+def _reads_domain(gen_py: Path) -> bool:
+    # Plain pddl/ generators only see the level; wrappers and unknown scripts may
+    # inspect the domain file (declared predicates, headers).
+    gen_py = gen_py.resolve()
+    return not (gen_py.parent == PDDL_DIR and gen_py.name in MODULE_GENERATORS)
+
+
+def problem_cache_key(
+    gen_py: Path,
+    level_path: Path,
+    problem_name: str,
+    domain: Optional[Path] = None,
+    options: Any = None,
+) -> str:
+    domain_part = b""
+    if domain is not None and _reads_domain(gen_py) and domain.exists():
+        domain_part = domain.read_bytes()
+    parts = [
+        "problem-v1",
+        generator_fingerprint(gen_py),
+        level_path.read_bytes(),
+        problem_name,
+        domain_part,
+    ]
+    # Only non-default options extend the key, so existing entries stay valid.
+    if not _is_default_options(options):
+        parts.append(" ".join(options.cli_args()))
+    return hash_parts(*parts)
+
+
+def compile_problem(
+    gen_py: Path,
+    level_path: Path,
+    problem_name: str,
+    dest: Path,
+    domain: Optional[Path] = None,
+    cwd: Optional[Path] = None,
+    options: Any = None,
+    writer: Optional[Callable[[TextIO], None]] = None,
+) -> bool:
+    """
+    Materialise the compiled problem at dest, hardlinked from the cache when an
+    identical (generator, level, problem name, domain, options) input was seen before.
+    Returns True on a cache hit.
+
+    `writer` (from variant_writers_for) replaces the generator call on a miss,
+    so sibling variants of one level share the build.
+    """
+    if not gen_py.exists():
+        raise FileNotFoundError(f"Missing problem generator at {gen_py}")
+
+    def write_problem_file(path: Path) -> None:
+        if writer is not None:
+            with path.open("w", encoding="utf-8") as out:
+                try:
+                    writer(out)
+                except Exception as exc:
+                    raise RuntimeError(f"{gen_py.name} failed: {exc}") from exc
+            return
+        generator = load_generator(gen_py)
+        if generator is None:
+            text = generate_problem_text(gen_py, level_path, problem_name, cwd=cwd, options=options)
+            path.write_text(text, encoding="utf-8")
+            return
+        # Stream straight to disk; large grids never exist as one string.
+        with path.open("w", encoding="utf-8") as out:
+            _run_generator(generator, gen_py, level_path, problem_name, out, options)
+
+    cache = _PROBLEM_CACHE
+    if cache is None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists():
+            dest.unlink()  # may be a read-only hardlink into the cache
+        write_problem_file(dest)
+        return False
+
+    key = problem_cache_key(gen_py, level_path, problem_name, domain, options)
+    entry = cache.get(key)
+    if entry is not None:
+        try:
+            link_or_copy(entry / "problem.pddl", dest)
+            return True
+        except FileNotFoundError:
+            pass  # evicted by a concurrent prune; regenerate below
+
+    entry = cache.put(key, {"problem.pddl": write_problem_file})
+    try:
+        link_or_copy(entry / "problem.pddl", dest)
+    except FileNotFoundError:
+        write_problem_file(dest)
+    return False
@@ -10,9 +10,10 @@ Key points (updated):
 - If log lines contain state_id + parent_id, we use them exactly:
     - id := state_id
     - pId := parent_id (or -1 if missing/None)
-- Optional level file supplies width/height and static terrain and can be arbitrarily
-  wrapped across lines; we ignore whitespace AND line breaks by treating it as a stream
-  of integers separated by '|'.
+- Optional level file supplies width/height and static terrain. Standard
+  rows|cols|max_time|required_gems|cells files go through pddl/level_grid.py;
+  older rows|cols|cells files are read as a stream of integers separated by '|',
+  ignoring whitespace AND line breaks.
 
 Usage:
   python sng_log_to_posthoc.py search.log --level level.txt > out.posthoc.yaml
@@ -25,9 +26,17 @@ from __future__ import annotations
 import argparse
 import json
 import re
+import sys
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+PDDL_DIR = Path(__file__).resolve().parents[1] / "pddl"
+if str(PDDL_DIR) not in sys.path:
+    sys.path.insert(0, str(PDDL_DIR))
+
+from level_grid import load_level_grid  # type: ignore  # noqa: E402
+
 
 # --- Render codes used in Posthoc tiles (visualisation codes, not game enums) ---
 EMPTY = 0
@@ -76,14 +85,14 @@ def parse_line_to_payload(line: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def parse_level_file(path: str) -> Level:
+def _read_legacy_level_values(path: str) -> Tuple[int, int, List[int]]:
     """
-    Level file parser that ignores ALL whitespace and ALL line breaks.
+    Legacy level parser that ignores ALL whitespace and ALL line breaks.
 
     Treat file as a stream of integers separated by '|'.
 
     Rules:
-      - First two ints: width, height
+      - First two ints: height, width
       - Next (width * height) ints: grid, row-major
     """
     with open(path, "r", encoding="utf-8") as f:
@@ -102,8 +111,17 @@ def parse_level_file(path: str) -> Level:
         raise ValueError(
             f"Level file too short: expected {expected} grid values, got {len(values) - 2}"
         )
+    return w, h, values[2: 2 + expected]
+
+
+def parse_level_file(path: str) -> Level:
+    try:
+        grid = load_level_grid(Path(path))
+        w, h, grid_vals = grid.cols, grid.rows, grid.cell_ids()
+    except ValueError:
+        # Not the standard four-field header: fall back to rows|cols|cells.
+        w, h, grid_vals = _read_legacy_level_values(path)
 
-    grid_vals = values[2: 2 + expected]
     raw: List[List[int]] = [grid_vals[r * w: (r + 1) * w] for r in range(h)]
 
     # Detect legacy vs canonical encoding
@@ -1,101 +1,808 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import codecs
+import contextlib
+import contextvars
+import io
+import locale
+import os
+import queue
+import re
+import signal
 import subprocess
+import sys
+import threading
 import time
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Generator, Iterator, List, Optional, Protocol, Sequence, Tuple, TypeVar
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
 
-def run_cmd(
-    cmd: List[str],
-    cwd: Optional[Path] = None,
-    timeout_sec: Optional[int] = None,
-) -> Tuple[int, str, str]:
-    """Run a command and capture stdout/stderr (no live streaming)."""
-    p = subprocess.run(
-        cmd,
-        cwd=str(cwd) if cwd else None,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        timeout=timeout_sec,
+# Planner drivers (fast-downward.py, powerlifted.py, the ENHSP launcher) fork
+# the translator and search as grandchildren. Every launch below gets its own
+# session, so a timeout or Ctrl-C signals the whole process group instead of
+# only the driver and leaving the search running.
+
+KILL_GRACE_SEC = 2.0
+REAP_POLL_SEC = 0.05
+
+SURVIVOR_NOTE_RE = re.compile(r"process group \d+: (\d+) process\(es\) survived SIGKILL")
+
+# Fast Downward's driver exit codes for translator out of memory (20), search
+# out of memory (22) and search out of both time and memory (24; 23 is a plain
+# search timeout), and what other planners (Python, C++, the JVM) print when
+# an allocation fails.
+MEMOUT_EXIT_CODES = {20, 22, 24}
+MEMOUT_TOKENS = ("memoryerror", "std::bad_alloc", "outofmemoryerror", "out of memory", "memory limit has been reached")
+
+# Re-entrant: bench runners call kill_all_process_groups from a signal handler.
+_LIVE_LOCK = threading.RLock()
+_LIVE_GROUPS: Dict[int, subprocess.Popen] = {}
+# Groups started by run_process_async; their event loop reaps the leader.
+_LIVE_ASYNC_GROUPS: Dict[int, "asyncio.subprocess.Process"] = {}
+
+# Cgroup (v2 directory) that launches join before exec, and output sink that
+# run_process streams lines to; bench workers set both around one task with
+# launch_in_cgroup / capture_output. Context variables, so they are per thread
+# and, for run_process_async, per asyncio task.
+_LAUNCH_CGROUP: contextvars.ContextVar[Optional[Path]] = contextvars.ContextVar("launch_cgroup", default=None)
+_LAUNCH_CAPTURE: contextvars.ContextVar[Optional["OutputSink"]] = contextvars.ContextVar("launch_capture", default=None)
+# CPUs launches are pinned to (sched_setaffinity, inherited by children).
+_LAUNCH_CPUS: contextvars.ContextVar[Optional[Tuple[int, ...]]] = contextvars.ContextVar("launch_cpus", default=None)
+
+# Inside capture_output, run_process keeps only this much of each stream in
+# memory: the first HEAD_BYTES (driver banners, translator summary) and the
+# last TAIL_BYTES (plan, final statistics, errors). The sink sees every line.
+HEAD_BYTES = 256 * 1024
+TAIL_BYTES = 1024 * 1024
+# Lines buffered between the pipe readers and run_process; beyond this the
+# planner blocks on write instead of Python memory growing.
+PUMP_QUEUE_LINES = 10_000
+
+
+class ProcessGroupTimeout(subprocess.TimeoutExpired):
+    """TimeoutExpired after the whole process group was killed; `survivors` lists PIDs still alive."""
+
+    def __init__(
+        self,
+        cmd: Sequence[str],
+        timeout: float,
+        output: Optional[str] = None,
+        stderr: Optional[str] = None,
+        pgid: Optional[int] = None,
+        survivors: Sequence[int] = (),
+    ) -> None:
+        super().__init__(cmd, timeout, output=output, stderr=stderr)
+        self.pgid = pgid
+        self.survivors = tuple(survivors)
+        self.usage: Optional[ResourceUsage] = None
+
+    def note(self) -> str:
+        """One-line summary for logs; bench runners parse the survivor count from it."""
+        return kill_note(self.pgid, self.survivors)
+
+
+@dataclass(frozen=True)
+class ResourceUsage:
+    """
+    wait4() accounting for one launch: the process plus every descendant it
+    reaped itself (e.g. fast-downward.py's translator and search). max_rss_mb
+    is the peak of the largest single process, not a sum.
+    """
+    user_sec: float
+    sys_sec: float
+    max_rss_mb: float
+    major_faults: int
+
+    @classmethod
+    def from_rusage(cls, ru: Any) -> "ResourceUsage":
+        # ru_maxrss is KiB on Linux and bytes on macOS.
+        rss_unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return cls(
+            user_sec=round(ru.ru_utime, 3),
+            sys_sec=round(ru.ru_stime, 3),
+            max_rss_mb=round(ru.ru_maxrss / rss_unit, 1),
+            major_faults=int(ru.ru_majflt),
+        )
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "cpu_user_sec": self.user_sec,
+            "cpu_sys_sec": self.sys_sec,
+            "max_rss_mb": self.max_rss_mb,
+            "major_faults": self.major_faults,
+        }
+
+
+@dataclass
+class ProcessResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    usage: Optional[ResourceUsage] = None
+
+
+class OutputSink(Protocol):
+    def feed(self, tag: str, line: str) -> None:
+        """One line (with its newline) of stream `tag` ("out" or "err")."""
+
+
+class BoundedText:
+    """
+    Append-only text that keeps its first `head_bytes` and last `tail_bytes`
+    (in whole lines); text() marks the gap. Sizes count characters.
+    """
+
+    def __init__(self, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES) -> None:
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self._head: List[str] = []
+        self._head_size = 0
+        self._tail: Deque[str] = deque()
+        self._tail_size = 0
+        self.dropped_lines = 0
+        self.dropped_bytes = 0
+
+    def append(self, line: str) -> None:
+        if not self._tail and self._head_size + len(line) <= self.head_bytes:
+            self._head.append(line)
+            self._head_size += len(line)
+            return
+        self._tail.append(line)
+        self._tail_size += len(line)
+        while self._tail_size > self.tail_bytes and len(self._tail) > 1:
+            old = self._tail.popleft()
+            self._tail_size -= len(old)
+            self.dropped_lines += 1
+            self.dropped_bytes += len(old)
+
+    def text(self) -> str:
+        gap = ""
+        if self.dropped_lines:
+            gap = f"[... {self.dropped_lines} line(s), {self.dropped_bytes} byte(s) not kept in memory ...]\n"
+        return "".join(self._head) + gap + "".join(self._tail)
+
+
+def is_memout(returncode: Optional[int], text: str) -> bool:
+    """Whether a failed run ran out of memory (exit code or allocator message)."""
+    if returncode in MEMOUT_EXIT_CODES:
+        return True
+    lowered = text.lower()
+    return any(token in lowered for token in MEMOUT_TOKENS)
+
+
+def kill_note(pgid: Optional[int], survivors: Sequence[int]) -> str:
+    if pgid is None:
+        return "[WARN] timeout: planner process killed"
+    if survivors:
+        pids = " ".join(str(pid) for pid in survivors)
+        return f"[WARN] process group {pgid}: {len(survivors)} process(es) survived SIGKILL ({pids})"
+    return f"[INFO] process group {pgid}: 0 process(es) survived SIGKILL"
+
+
+@contextlib.contextmanager
+def launch_in_cgroup(cgroup: Optional[Path]) -> Iterator[None]:
+    """Commands this thread starts inside the block join `cgroup` (None: no change)."""
+    token = _LAUNCH_CGROUP.set(cgroup)
+    try:
+        yield
+    finally:
+        _LAUNCH_CGROUP.reset(token)
+
+
+@contextlib.contextmanager
+def launch_on_cpus(cpus: Optional[Sequence[int]]) -> Iterator[None]:
+    """Commands started inside the block run on these CPUs only (None: no change; Linux only)."""
+    token = _LAUNCH_CPUS.set(tuple(cpus) if cpus else None)
+    try:
+        yield
+    finally:
+        _LAUNCH_CPUS.reset(token)
+
+
+def launch_context() -> Tuple[Optional[Path], Optional[Tuple[int, ...]]]:
+    """The (cgroup, CPUs) that launches from this thread would get right now."""
+    return _LAUNCH_CGROUP.get(), _LAUNCH_CPUS.get()
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+@contextlib.contextmanager
+def capture_output(sink: Optional[OutputSink]) -> Iterator[None]:
+    """
+    run_process calls in this thread feed every output line to `sink` and
+    keep only a BoundedText head/tail of each stream in memory (None: no
+    change).
+    """
+    token = _LAUNCH_CAPTURE.set(sink)
+    try:
+        yield
+    finally:
+        _LAUNCH_CAPTURE.reset(token)
+
+
+def emit_output(tag: str, text: str) -> None:
+    """Feed wrapper-generated text (kill notes, replayed logs) to the active capture, if any."""
+    sink = _LAUNCH_CAPTURE.get()
+    if sink is None or not text:
+        return
+    for line in text.splitlines(keepends=True):
+        sink.feed(tag, line if line.endswith("\n") else line + "\n")
+
+
+def read_captured(path: Path, tag: str = "out") -> str:
+    """
+    Text of an output file a planner wrote itself; inside capture_output its
+    lines go to the sink and only a BoundedText excerpt is returned.
+    """
+    sink = _LAUNCH_CAPTURE.get()
+    if sink is None:
+        return path.read_text(encoding="utf-8", errors="replace")
+    kept = BoundedText()
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            kept.append(line)
+            sink.feed(tag, line)
+    return kept.text()
+
+
+def _child_setup(
+    memory_limit_mb: Optional[int],
+    cgroup: Optional[Path],
+    cpus: Optional[Tuple[int, ...]] = None,
+) -> Callable[[], None]:
+    limit = int(memory_limit_mb) * 1024 * 1024 if memory_limit_mb else None
+    procs = str(cgroup / "cgroup.procs") if cgroup else None
+
+    def apply() -> None:
+        if limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+        if procs is not None:
+            # "0" moves the writing process; children forked later inherit it.
+            fd = os.open(procs, os.O_WRONLY)
+            try:
+                os.write(fd, b"0")
+            finally:
+                os.close(fd)
+
+    return apply
+
+
+def _group_kwargs(memory_limit_mb: Optional[int]) -> Dict[str, Any]:
+    """Popen keyword arguments for a new session, RLIMIT_AS cap, launch cgroup and CPUs."""
+    kwargs: Dict[str, Any] = {}
+    if os.name == "posix":
+        kwargs["start_new_session"] = True
+    cgroup = _LAUNCH_CGROUP.get()
+    cpus = _LAUNCH_CPUS.get() if hasattr(os, "sched_setaffinity") else None
+    if memory_limit_mb and resource is None:
+        memory_limit_mb = None
+    if memory_limit_mb or cgroup or cpus:
+        kwargs["preexec_fn"] = _child_setup(memory_limit_mb, cgroup, cpus)
+    return kwargs
+
+
+def popen_group(cmd: Sequence[str], memory_limit_mb: Optional[int] = None, **kwargs) -> subprocess.Popen:
+    """
+    Popen in a new session so the command and everything it forks share one
+    process group. memory_limit_mb caps each process's address space
+    (RLIMIT_AS, inherited by children); note the JVM reserves far more
+    virtual memory than it touches, so prefer -Xmx for ENHSP. Inside
+    launch_in_cgroup the command also joins that cgroup before exec.
+    """
+    proc = subprocess.Popen(list(cmd), **_group_kwargs(memory_limit_mb), **kwargs)
+    with _LIVE_LOCK:
+        _LIVE_GROUPS[proc.pid] = proc
+    return proc
+
+
+def _forget(proc: subprocess.Popen) -> None:
+    with _LIVE_LOCK:
+        _LIVE_GROUPS.pop(proc.pid, None)
+
+
+def group_members(pgid: int) -> List[int]:
+    """Live (non-zombie) PIDs in a process group."""
+    if os.name != "posix":
+        return []
+    proc_root = Path("/proc")
+    if not proc_root.is_dir():
+        try:
+            os.killpg(pgid, 0)
+        except (ProcessLookupError, PermissionError):
+            return []
+        return [pgid]
+    members: List[int] = []
+    for entry in proc_root.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # Fields after the parenthesised comm: state ppid pgrp ...
+        fields = stat[stat.rfind(")") + 2:].split()
+        if len(fields) > 2 and fields[0] != "Z" and int(fields[2]) == pgid:
+            members.append(int(entry.name))
+    return sorted(members)
+
+
+def _signal_group(pgid: int, sig: int) -> None:
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _reap(proc: subprocess.Popen, timeout: Optional[float]) -> bool:
+    """
+    Wait for the group leader with wait4() so its resource usage is kept
+    (as `proc.usage`); returns False if it is still running after `timeout`.
+    """
+    if proc.returncode is not None:
+        return True
+    if os.name != "posix":
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return False
+        return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            pid, status, ru = os.wait4(proc.pid, 0 if deadline is None else os.WNOHANG)
+        except ChildProcessError:
+            # Reaped elsewhere (e.g. Popen.__del__); the exit code is lost.
+            proc.returncode = proc.returncode if proc.returncode is not None else -1
+            return True
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            proc.usage = ResourceUsage.from_rusage(ru)  # type: ignore[attr-defined]
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(REAP_POLL_SEC)
+
+
+def _wait_group_empty(proc: subprocess.Popen, pgid: int, deadline: float) -> bool:
+    while True:
+        if _reap(proc, 0) and not group_members(pgid):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(REAP_POLL_SEC)
+
+
+def kill_process_group(proc: subprocess.Popen, grace_sec: float = KILL_GRACE_SEC) -> Tuple[int, ...]:
+    """
+    SIGTERM the process group, SIGKILL it after `grace_sec`, reap the leader
+    and return the PIDs that are still alive afterwards (normally none).
+    """
+    _forget(proc)
+    if os.name != "posix":
+        proc.kill()
+        proc.wait()
+        return ()
+    pgid = proc.pid
+    _signal_group(pgid, signal.SIGTERM)
+    if not _wait_group_empty(proc, pgid, time.monotonic() + grace_sec):
+        _signal_group(pgid, signal.SIGKILL)
+        _wait_group_empty(proc, pgid, time.monotonic() + grace_sec)
+    _reap(proc, grace_sec)
+    return tuple(group_members(pgid))
+
+
+def kill_all_process_groups(grace_sec: float = KILL_GRACE_SEC) -> int:
+    """Kill every planner group still running (hard stop / interpreter exit); returns how many."""
+    with _LIVE_LOCK:
+        live = list(_LIVE_GROUPS.values())
+        detached = list(_LIVE_ASYNC_GROUPS)
+        _LIVE_ASYNC_GROUPS.clear()
+    if os.name == "posix":
+        # Signal every group first so their grace periods overlap.
+        for pgid in [proc.pid for proc in live] + detached:
+            _signal_group(pgid, signal.SIGTERM)
+    for proc in live:
+        kill_process_group(proc, grace_sec)
+    if detached:
+        # No event loop may be running to reap these leaders; only make sure
+        # nothing in the groups is left alive.
+        deadline = time.monotonic() + grace_sec
+        while any(group_members(pgid) for pgid in detached) and time.monotonic() < deadline:
+            time.sleep(REAP_POLL_SEC)
+        for pgid in detached:
+            if group_members(pgid):
+                _signal_group(pgid, signal.SIGKILL)
+    return len(live) + len(detached)
+
+
+atexit.register(kill_all_process_groups, 0.5)
+
+
+def _pump(
+    stream,
+    tag: str,
+    sink: "queue.Queue[Tuple[str, Optional[str]]]",
+    abandoned: threading.Event,
+) -> None:
+    def put(item: Tuple[str, Optional[str]]) -> bool:
+        # A full queue blocks the reader and, through the pipe, the planner;
+        # give up once run_process stopped consuming.
+        while not abandoned.is_set():
+            try:
+                sink.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for line in stream:
+            if not put((tag, line)):
+                return
+    finally:
+        put((tag, None))
+
+
+def _collector(live: bool, prefix: str) -> Tuple[Dict[str, Any], Callable[[str, str], None]]:
+    """Per-stream line buffers (bounded inside capture_output) and the function adding a line."""
+    sink_to = _LAUNCH_CAPTURE.get()
+    captured: Dict[str, Any] = (
+        {"out": BoundedText(), "err": BoundedText()} if sink_to is not None else {"out": [], "err": []}
     )
-    return p.returncode, p.stdout, p.stderr
 
+    def take(tag: str, line: str) -> None:
+        captured[tag].append(line)
+        if sink_to is not None:
+            sink_to.feed(tag, line)
+        if live:
+            sys.stdout.write(f"{prefix}{line}")
+            sys.stdout.flush()
 
-def run_cmd_streaming(
-    cmd: List[str],
+    return captured, take
+
+
+def _joined(buffer: Any) -> str:
+    return buffer.text() if isinstance(buffer, BoundedText) else "".join(buffer)
+
+
+def run_process(
+    cmd: Sequence[str],
+    *,
     cwd: Optional[Path] = None,
-    timeout_sec: Optional[int] = None,
+    timeout_sec: Optional[float] = None,
     prefix: str = "",
-    live: bool = True,
-) -> Tuple[int, str, str]:
+    live: bool = False,
+    merge_stderr: bool = False,
+    memory_limit_mb: Optional[int] = None,
+) -> ProcessResult:
     """
-    Run a command and (optionally) stream stdout/stderr live to terminal.
-    Always returns (returncode, full_stdout, full_stderr).
+    Run a command in its own process group, capturing stdout/stderr and
+    (when `live`) echoing them to the terminal with `prefix`. With
+    merge_stderr the stderr buffer is empty.
 
-    If live=False, behaves like run_cmd but still uses Popen.
-    Timeout returns code 124.
+    The timeout is enforced even while the command prints nothing. On timeout
+    the whole group is killed and ProcessGroupTimeout (a TimeoutExpired)
+    carries the output so far and the resource usage; Ctrl-C kills the group
+    and re-raises.
+
+    Inside capture_output every line also goes to the sink as it arrives,
+    and the returned stdout/stderr are bounded head/tail excerpts.
     """
-    start = time.time()
-    proc = subprocess.Popen(
+    proc = popen_group(
         cmd,
+        memory_limit_mb=memory_limit_mb,
         cwd=str(cwd) if cwd else None,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+        stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
         text=True,
         bufsize=1,  # line buffered
-        universal_newlines=True,
     )
+    sink: "queue.Queue[Tuple[str, Optional[str]]]" = queue.Queue(maxsize=PUMP_QUEUE_LINES)
+    abandoned = threading.Event()
+    streams = [("out", proc.stdout)] + ([] if merge_stderr else [("err", proc.stderr)])
+    for tag, stream in streams:
+        threading.Thread(target=_pump, args=(stream, tag, sink, abandoned), daemon=True).start()
 
-    stdout_lines: list[str] = []
-    stderr_lines: list[str] = []
+    captured, take = _collector(live, prefix)
+    open_streams = len(streams)
 
+    deadline = time.monotonic() + timeout_sec if timeout_sec else None
     try:
-        # Stream stdout
+        while open_streams:
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                raise subprocess.TimeoutExpired(list(cmd), timeout_sec or 0)
+            try:
+                tag, line = sink.get(timeout=wait)
+            except queue.Empty:
+                continue
+            if line is None:
+                open_streams -= 1
+            else:
+                take(tag, line)
+        wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if not _reap(proc, wait):
+            raise subprocess.TimeoutExpired(list(cmd), timeout_sec or 0)
+    except subprocess.TimeoutExpired:
+        survivors = kill_process_group(proc)
+        # Keep whatever the readers got before the pipes closed.
         while True:
-            line = proc.stdout.readline() if proc.stdout else ""
-            if line:
-                stdout_lines.append(line)
-                if live:
-                    print(f"{prefix}{line}", end="")
-            elif proc.poll() is not None:
+            try:
+                tag, line = sink.get(timeout=0.1 if open_streams else 0)
+            except queue.Empty:
                 break
+            if line is None:
+                open_streams -= 1
+            else:
+                take(tag, line)
+        exc = ProcessGroupTimeout(
+            list(cmd),
+            timeout_sec or 0,
+            _joined(captured["out"]),
+            _joined(captured["err"]),
+            pgid=proc.pid,
+            survivors=survivors,
+        )
+        exc.usage = getattr(proc, "usage", None)
+        raise exc from None
+    except BaseException:
+        kill_process_group(proc)
+        raise
+    finally:
+        abandoned.set()
+    _forget(proc)
+    return ProcessResult(
+        returncode=proc.returncode,
+        stdout=_joined(captured["out"]),
+        stderr=_joined(captured["err"]),
+        usage=getattr(proc, "usage", None),
+    )
 
-            if timeout_sec and (time.time() - start) > timeout_sec:
-                proc.kill()
-                # Drain anything available quickly
-                try:
-                    out_rest, err_rest = proc.communicate(timeout=1)
-                    if out_rest:
-                        stdout_lines.append(out_rest)
-                        if live:
-                            print(f"{prefix}{out_rest}", end="")
-                    if err_rest:
-                        stderr_lines.append(err_rest)
-                        if live:
-                            print(f"{prefix}{err_rest}", end="")
-                except Exception:
-                    pass
-                return 124, "".join(stdout_lines), "".join(stderr_lines)
-
-        # Drain remaining stdout
-        if proc.stdout:
-            rest = proc.stdout.read()
-            if rest:
-                stdout_lines.append(rest)
-                if live:
-                    print(f"{prefix}{rest}", end="")
-
-        # Drain stderr
-        if proc.stderr:
-            for line in proc.stderr:
-                stderr_lines.append(line)
-                if live:
-                    print(f"{prefix}{line}", end="")
-
-        return proc.returncode, "".join(stdout_lines), "".join(stderr_lines)
-
-    except KeyboardInterrupt:
-        proc.kill()
+
+# -----------------------------
+# asyncio
+# -----------------------------
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+async def _drain(stream: "asyncio.StreamReader", tag: str, take: Callable[[str, str], None]) -> None:
+    """Feed a pipe to `take` line by line, decoded like Popen(text=True) output."""
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(locale.getpreferredencoding(False))("replace"), translate=True
+    )
+    pending = ""
+    while True:
+        chunk = await stream.read(STREAM_CHUNK_BYTES)
+        text = pending + decoder.decode(chunk, final=not chunk)
+        lines = text.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            take(tag, line + "\n")
+        if not chunk:
+            if pending:
+                take(tag, pending)
+            return
+
+
+async def _kill_group_async(proc: "asyncio.subprocess.Process", grace_sec: float = KILL_GRACE_SEC) -> Tuple[int, ...]:
+    """kill_process_group for run_process_async launches; waits without blocking the loop."""
+    with _LIVE_LOCK:
+        _LIVE_ASYNC_GROUPS.pop(proc.pid, None)
+    if os.name != "posix":
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+        return ()
+    pgid = proc.pid
+
+    async def wait_empty() -> bool:
+        deadline = time.monotonic() + grace_sec
+        while True:
+            if proc.returncode is not None and not group_members(pgid):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(REAP_POLL_SEC)
+
+    _signal_group(pgid, signal.SIGTERM)
+    if not await wait_empty():
+        _signal_group(pgid, signal.SIGKILL)
+        await wait_empty()
+    return tuple(group_members(pgid))
+
+
+async def run_process_async(
+    cmd: Sequence[str],
+    *,
+    cwd: Optional[Path] = None,
+    timeout_sec: Optional[float] = None,
+    prefix: str = "",
+    live: bool = False,
+    merge_stderr: bool = False,
+    memory_limit_mb: Optional[int] = None,
+) -> ProcessResult:
+    """
+    run_process on the running event loop: same process group, memory cap,
+    launch cgroup, capture and timeout behaviour, without a thread per
+    command. Cancelling the awaiting task kills the process group.
+
+    `usage` is None, since the event loop's child watcher reaps the process
+    (and discards its rusage); read cgroup or /proc accounting instead.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        cwd=str(cwd) if cwd else None,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT if merge_stderr else asyncio.subprocess.PIPE,
+        **_group_kwargs(memory_limit_mb),
+    )
+    with _LIVE_LOCK:
+        _LIVE_ASYNC_GROUPS[proc.pid] = proc
+    captured, take = _collector(live, prefix)
+    streams = [("out", proc.stdout)] + ([] if merge_stderr else [("err", proc.stderr)])
+
+    async def finish() -> int:
+        await asyncio.gather(*(_drain(stream, tag, take) for tag, stream in streams))
+        return await proc.wait()
+
+    finished = asyncio.ensure_future(finish())
+    try:
+        done, _ = await asyncio.wait({finished}, timeout=timeout_sec or None)
+        if not done:
+            survivors = await _kill_group_async(proc)
+            # Keep whatever is still in the pipes.
+            await asyncio.wait({finished}, timeout=KILL_GRACE_SEC)
+            finished.cancel()
+            raise ProcessGroupTimeout(
+                list(cmd),
+                timeout_sec or 0,
+                _joined(captured["out"]),
+                _joined(captured["err"]),
+                pgid=proc.pid,
+                survivors=survivors,
+            )
+        returncode = finished.result()
+    except BaseException:
+        finished.cancel()
+        if proc.returncode is None or group_members(proc.pid):
+            # Shielded: a second cancel must not leave the group running.
+            await asyncio.shield(_kill_group_async(proc))
         raise
+    finally:
+        with _LIVE_LOCK:
+            _LIVE_ASYNC_GROUPS.pop(proc.pid, None)
+    return ProcessResult(
+        returncode=returncode,
+        stdout=_joined(captured["out"]),
+        stderr=_joined(captured["err"]),
+        usage=None,
+    )
+
+
+# -----------------------------
+# Solve steps (sync and async drivers)
+# -----------------------------
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Launch:
+    """One command a planner wrapper's step generator asks its driver to run (run_process arguments)."""
+    cmd: Sequence[str]
+    cwd: Optional[Path] = None
+    timeout_sec: Optional[float] = None
+    prefix: str = ""
+    live: bool = False
+    merge_stderr: bool = False
+    memory_limit_mb: Optional[int] = None
+
+    def options(self) -> Dict[str, Any]:
+        return {
+            "cwd": self.cwd,
+            "timeout_sec": self.timeout_sec,
+            "prefix": self.prefix,
+            "live": self.live,
+            "merge_stderr": self.merge_stderr,
+            "memory_limit_mb": self.memory_limit_mb,
+        }
+
+
+# Planner wrappers are written as generators that yield Launch requests and
+# get back the ProcessResult (or have the run's exception, e.g. a
+# ProcessGroupTimeout, raised at the yield); run_steps / run_steps_async
+# drive the same generator with run_process / run_process_async.
+SolveSteps = Generator[Launch, ProcessResult, T]
+
+
+def run_steps(steps: SolveSteps[T]) -> T:
+    try:
+        launch = next(steps)
+        while True:
+            try:
+                result = run_process(launch.cmd, **launch.options())
+            except BaseException as exc:
+                launch = steps.throw(exc)
+            else:
+                launch = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_steps_async(steps: SolveSteps[T]) -> T:
+    try:
+        launch = next(steps)
+        while True:
+            try:
+                result = await run_process_async(launch.cmd, **launch.options())
+            except BaseException as exc:
+                launch = steps.throw(exc)
+            else:
+                launch = steps.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+def run_cmd(
+    cmd: List[str],
+    cwd: Optional[Path] = None,
+    timeout_sec: Optional[float] = None,
+) -> Tuple[int, str, str]:
+    """
+    Run a command in its own process group and capture stdout/stderr (no live
+    streaming). Raises ProcessGroupTimeout (a subprocess.TimeoutExpired) after
+    killing the whole group on timeout.
+    """
+    result = run_process(cmd, cwd=cwd, timeout_sec=timeout_sec)
+    return result.returncode, result.stdout, result.stderr
+
+
+def stream_cmd(
+    cmd: List[str],
+    cwd: Optional[Path] = None,
+    timeout_sec: Optional[float] = None,
+    prefix: str = "",
+    live: bool = True,
+    merge_stderr: bool = False,
+) -> Tuple[int, str, str]:
+    """Like run_cmd, but echoes output live to the terminal (see run_process)."""
+    result = run_process(
+        cmd, cwd=cwd, timeout_sec=timeout_sec, prefix=prefix, live=live, merge_stderr=merge_stderr
+    )
+    return result.returncode, result.stdout, result.stderr
+
+
+def run_cmd_streaming(
+    cmd: List[str],
+    cwd: Optional[Path] = None,
+    timeout_sec: Optional[int] = None,
+    prefix: str = "",
+    live: bool = True,
+) -> Tuple[int, str, str]:
+    """
+    Run a command and (optionally) stream stdout/stderr live to terminal.
+    Always returns (returncode, full_stdout, full_stderr).
+
+    If live=False, behaves like run_cmd.
+    Timeout returns code 124 after killing the process group.
+    """
+    try:
+        return stream_cmd(cmd, cwd=cwd, timeout_sec=timeout_sec, prefix=prefix, live=live)
+    except ProcessGroupTimeout as exc:
+        return 124, exc.output or "", (exc.stderr or "") + exc.note() + "\n"
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Translate-once cache for Fast Downward.
+
+Every FD planner setting in a benchmark config re-runs the Python translator
+on the same (domain, problem) pair before its own search. The translator's
+output.sas depends only on the two input files, the translator options and
+the translator sources, so it is stored in a ContentCache keyed by exactly
+those; later runs hand FD the cached output.sas and run the search component
+only.
+
+The translator's log is stored next to output.sas and replayed in front of
+the search output, so "Translator operators/facts" counts still parse; its
+timing lines are dropped on replay, since that time was not spent again.
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from content_cache import DEFAULT_CACHE_ROOT, ContentCache, hash_parts
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+TRANSLATE_CACHE_DIR = DEFAULT_CACHE_ROOT / "fd-translate"
+TRANSLATE_CACHE_MAX_MB = 4096
+_TRANSLATE_CACHE: Optional[ContentCache] = ContentCache(TRANSLATE_CACHE_DIR, TRANSLATE_CACHE_MAX_MB * 1024 * 1024)
+
+SAS_FILE = "output.sas"
+LOG_FILE = "translate.log"
+META_FILE = "meta.json"
+
+# Driver options that pick components or the SAS file themselves; runs using
+# them bypass the cache.
+UNCACHEABLE_DRIVER_ARGS = frozenset({"--translate", "--run-all", "--validate", "--sas-file", "--keep-sas-file"})
+TRANSLATE_DONE_RE = re.compile(r"translate exit code:\s*0\b")
+TRANSLATE_TIME_RES = (
+    re.compile(r"Done!\s*\[[0-9.,]+s CPU,\s*([0-9.,]+)s wall-clock\]"),
+    re.compile(r"translator wall-clock time:\s*([0-9.,]+)s"),
+)
+
+
+@dataclass(frozen=True)
+class CachedTranslation:
+    sas_file: Path
+    log: str
+    translate_sec: Optional[float]
+
+    def replay_log(self) -> str:
+        """The stored translator log without its timing lines."""
+        kept = [
+            line
+            for line in self.log.splitlines(keepends=True)
+            if not any(rx.search(line) for rx in TRANSLATE_TIME_RES)
+        ]
+        saved = f"{self.translate_sec:.3f}s" if self.translate_sec is not None else "unknown time"
+        return f"[INFO] translate cache hit: reusing {SAS_FILE} (saved {saved})\n" + "".join(kept)
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+def configure_translate_cache(
+    cache_dir: Optional[Path] = None,
+    max_mb: Optional[int] = None,
+    enabled: bool = True,
+) -> None:
+    """Point the process-wide translation cache somewhere else, or switch it off."""
+    global _TRANSLATE_CACHE
+    if not enabled:
+        _TRANSLATE_CACHE = None
+        return
+    _TRANSLATE_CACHE = ContentCache(
+        cache_dir or TRANSLATE_CACHE_DIR,
+        (max_mb if max_mb is not None else TRANSLATE_CACHE_MAX_MB) * 1024 * 1024,
+    )
+
+
+def add_translate_cache_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--translate-cache-dir",
+        type=Path,
+        default=None,
+        help=f"Fast Downward translation cache directory (default: {TRANSLATE_CACHE_DIR.relative_to(REPO_ROOT)}).",
+    )
+    ap.add_argument(
+        "--translate-cache-max-mb",
+        type=int,
+        default=None,
+        help=f"Evict least recently used translations above this size (default: {TRANSLATE_CACHE_MAX_MB}).",
+    )
+    ap.add_argument(
+        "--no-translate-cache",
+        action="store_true",
+        help="Always run Fast Downward's translator instead of reusing a cached output.sas.",
+    )
+
+
+def apply_translate_cache_args(args: argparse.Namespace) -> None:
+    configure_translate_cache(
+        cache_dir=args.translate_cache_dir.resolve() if args.translate_cache_dir else None,
+        max_mb=args.translate_cache_max_mb,
+        enabled=not args.no_translate_cache,
+    )
+
+
+# -----------------------------
+# Keys
+# -----------------------------
+
+def split_translate_options(fd_args: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """
+    (translator options, everything else) for the arguments given after the
+    input files: FD reads tokens between --translate-options and
+    --search-options as translator options.
+    """
+    translate: List[str] = []
+    rest: List[str] = []
+    in_translate = False
+    for tok in fd_args:
+        if tok == "--translate-options":
+            in_translate = True
+        elif tok == "--search-options":
+            in_translate = False
+            rest.append(tok)
+        elif in_translate:
+            translate.append(tok)
+        else:
+            rest.append(tok)
+    return translate, rest
+
+
+@functools.lru_cache(maxsize=None)
+def translator_fingerprint(fd_root: Path) -> str:
+    """Digest of the translator sources FD would run (src/translate, else the builds' copies)."""
+    source_dir = fd_root / "src" / "translate"
+    if source_dir.is_dir():
+        sources = sorted(source_dir.rglob("*.py"))
+    else:
+        sources = sorted(fd_root.glob("builds/*/bin/translate/**/*.py"))
+    parts: List[bytes | str] = []
+    for source in sources:
+        parts.append(str(source.relative_to(fd_root)))
+        parts.append(source.read_bytes())
+    return hash_parts(*parts)
+
+
+@functools.lru_cache(maxsize=None)
+def keep_sas_args(fd_root: Path) -> Tuple[str, ...]:
+    """
+    Driver flag that stops FD deleting output.sas after the search. Older
+    drivers lack it and always leave the file behind.
+    """
+    try:
+        driver = (fd_root / "driver" / "arguments.py").read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return ()
+    return ("--keep-sas-file",) if "--keep-sas-file" in driver else ()
+
+
+def translation_cache_key(
+    fd_root: Path,
+    domain: Path,
+    problem: Path,
+    fd_args: Sequence[str],
+) -> Optional[str]:
+    """Cache key for this FD invocation, or None when the cache is off or cannot apply."""
+    if _TRANSLATE_CACHE is None or UNCACHEABLE_DRIVER_ARGS.intersection(fd_args):
+        return None
+    translate_options, _search_args = split_translate_options(fd_args)
+    return hash_parts(
+        "fd-translate-v1",
+        translator_fingerprint(fd_root),
+        domain.read_bytes(),
+        problem.read_bytes(),
+        "\0".join(translate_options),
+    )
+
+
+# -----------------------------
+# Lookup / store
+# -----------------------------
+
+def lookup_translation(key: Optional[str]) -> Optional[CachedTranslation]:
+    cache = _TRANSLATE_CACHE
+    if key is None or cache is None:
+        return None
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    try:
+        log = (entry / LOG_FILE).read_text(encoding="utf-8", errors="replace")
+        meta = json.loads((entry / META_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None  # evicted mid-read or written by an older version
+    return CachedTranslation(sas_file=entry / SAS_FILE, log=log, translate_sec=meta.get("translate_sec"))
+
+
+def translator_log(output: str) -> Optional[str]:
+    """The driver output up to a successful translator exit, or None if translation did not finish."""
+    match = TRANSLATE_DONE_RE.search(output)
+    if match is None:
+        return None
+    end = output.find("\n", match.end())
+    return output if end < 0 else output[: end + 1]
+
+
+def translate_seconds(log: str) -> Optional[float]:
+    for rx in TRANSLATE_TIME_RES:
+        match = rx.search(log)
+        if match:
+            try:
+                return float(match.group(1).replace(",", ""))
+            except ValueError:
+                continue
+    return None
+
+
+def store_translation(key: Optional[str], sas_file: Path, output: str) -> bool:
+    """Cache sas_file when `output` shows the translator finished; returns True when stored."""
+    cache = _TRANSLATE_CACHE
+    if key is None or cache is None or not sas_file.is_file():
+        return False
+    log = translator_log(output)
+    if log is None:
+        return False
+    meta = {"translate_sec": translate_seconds(log)}
+    cache.put(key, {SAS_FILE: sas_file, LOG_FILE: log, META_FILE: json.dumps(meta)})
+    return True
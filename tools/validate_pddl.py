@@ -25,6 +25,12 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional, Iterable, Set
 from plan import write_direction_plan
+from problem_gen_registry import PDDL_DIR, add_problem_cache_args, apply_problem_cache_args, compile_problem
+from workspace import Workspace, run_workspace
+
+if str(PDDL_DIR) not in sys.path:
+    sys.path.insert(0, str(PDDL_DIR))
+from level_grid import DIRT_IDS, LevelGrid, load_level_grid  # type: ignore  # noqa: E402
 
 
 
@@ -201,8 +207,8 @@ def run_translate(domain: Path, problem: Path, timeout: Optional[int]) -> str:
     fd_py = repo_root() / "planners" / "fast-downward" / "fast-downward.py"
     if not fd_py.exists():
         raise FileNotFoundError(f"fast-downward.py not found at {fd_py}")
-    with tempfile.TemporaryDirectory(prefix="fd_translate_") as td:
-        sas_file = Path(td) / "output.sas"
+    with run_workspace() as ws:
+        sas_file = ws.path / "output.sas"
         cmd = [
             sys.executable,
             str(fd_py),
@@ -219,7 +225,7 @@ def run_translate(domain: Path, problem: Path, timeout: Optional[int]) -> str:
             subprocess.run(
                 cmd,
                 check=True,
-                cwd=td,
+                cwd=ws.path,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
@@ -640,38 +646,19 @@ def cells_from_atoms(atoms: Iterable[str]) -> Tuple[
 
 # -------------------- Native trace --------------------
 
-def _parse_level_data(level: Path) -> Optional[Tuple[int, int, List[int]]]:
+def _load_level_grid(level: Path) -> Optional[LevelGrid]:
     try:
-        parts = [p.strip() for p in level.read_text(encoding="utf-8", errors="replace").split("|") if p.strip()]
-        if len(parts) < 4:
-            return None
-        rows = int(parts[0])
-        cols = int(parts[1])
-        expected = rows * cols
-        cells = parts[4:]
-        if len(cells) < expected:
-            return None
-        cell_ids = [int(cell) for cell in cells[:expected]]
-        return rows, cols, cell_ids
-    except Exception:
+        return load_level_grid(level)
+    except (OSError, ValueError):
         return None
 
 
 def parse_level_static_sets(level: Path) -> Tuple[int, int, Set[int], Set[int]]:
-    parsed = _parse_level_data(level)
-    if not parsed:
+    grid = _load_level_grid(level)
+    if grid is None:
         return 0, 0, set(), set()
-    rows, cols, cell_ids = parsed
-    brick_ids = {7, 8, 18, 19, 20, 21, 22}
-    dirt_ids = {2}
-    bricks: Set[int] = set()
-    dirt: Set[int] = set()
-    for idx, cell_id in enumerate(cell_ids):
-        if cell_id in brick_ids:
-            bricks.add(idx)
-        if cell_id in dirt_ids:
-            dirt.add(idx)
-    return rows, cols, bricks, dirt
+    dirt = {idx for idx, cell_id in enumerate(grid.cells) if cell_id in DIRT_IDS}
+    return grid.rows, grid.cols, set(grid.static_indexes), dirt
 
 
 def parse_level_bricks(level: Path) -> Set[int]:
@@ -916,21 +903,21 @@ def select_problem_gen(domain: Path) -> Path:
 def prepare_problem_and_level(
     problem_input: Path,
     domain: Path,
-) -> Tuple[Path, Path, Optional[tempfile.TemporaryDirectory]]:
-    temp_problem_dir: Optional[tempfile.TemporaryDirectory] = None
+) -> Tuple[Path, Path, Optional[Workspace]]:
+    temp_problem_dir: Optional[Workspace] = None
     if problem_input.suffix.lower() == ".txt":
         level_path = problem_input
         problem_name = problem_input.stem
         gen_py = select_problem_gen(domain)
         if not gen_py.exists():
             raise FileNotFoundError(f"Problem generator not found at {gen_py}")
-        temp_problem_dir = tempfile.TemporaryDirectory(prefix="gen_problem_")
-        problem = Path(temp_problem_dir.name) / f"{problem_name}.pddl"
-        cmd = [sys.executable, str(gen_py), str(problem_input), "-p", problem_name]
-        rc = subprocess.run(cmd, text=True, capture_output=True)
-        if rc.returncode != 0:
-            raise RuntimeError(f"{gen_py.name} failed (rc={rc.returncode}): {rc.stderr or rc.stdout}")
-        problem.write_text(rc.stdout, encoding="utf-8")
+        temp_problem_dir = run_workspace()
+        problem = temp_problem_dir.path / f"{problem_name}.pddl"
+        try:
+            compile_problem(gen_py, problem_input, problem_name, problem, domain=domain, cwd=temp_problem_dir.path)
+        except Exception:
+            temp_problem_dir.cleanup()
+            raise
         return problem, level_path, temp_problem_dir
 
     problem = problem_input
@@ -1075,7 +1062,9 @@ def main() -> int:
     ap.add_argument("--pddl-trace-out", type=Path, help="Optional path to write the simulated PDDL trace as JSONL for external viewers.")
     ap.add_argument("--view", action="store_true", help="Open a simple GUI to view native vs PDDL states side-by-side.")
     ap.add_argument("--timeout", type=int, default=None, help="Translate timeout (seconds)")
+    add_problem_cache_args(ap)
     args = ap.parse_args()
+    apply_problem_cache_args(args)
 
     if args.plan and args.human_plan:
         sys.stderr.write("[ERR] --plan and --human-plan are mutually exclusive.\n")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Run directories for planner invocations.
+
+Every FF/FD/Powerlifted run, translator call and level compilation needs a
+scratch directory that is thrown away afterwards. Creating and deleting one
+per run on the results disk is a lot of metadata churn in a parallel sweep,
+so run directories come from a WorkspacePool instead:
+
+- the pool lives under a configurable root, by default /dev/shm when it has
+  SHM_MIN_FREE_MB free (tmpfs: nothing reaches a disk), else the system
+  temp directory;
+- inputs are linked into a workspace (hardlink, else symlink) rather than
+  copied;
+- a released workspace is emptied and kept for the next run, up to
+  `pool_size` idle directories.
+
+Callers persist what they need (plans, logs, cache entries) before releasing
+the workspace. Each process uses its own <root>/bolderdash_ws_<pid>_*
+directory, removed at exit; ones left behind by dead processes are removed
+when the next pool starts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import os
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+SHM_ROOT = Path("/dev/shm")
+SHM_MIN_FREE_MB = 1024
+DEFAULT_POOL_SIZE = 32
+POOL_DIR_PREFIX = "bolderdash_ws_"
+_POOL_DIR_RE = re.compile(rf"^{POOL_DIR_PREFIX}(\d+)_")
+
+
+def default_workspace_root() -> Path:
+    """/dev/shm when it is writable and has room, else the system temp directory."""
+    try:
+        if SHM_ROOT.is_dir() and os.access(SHM_ROOT, os.W_OK):
+            st = os.statvfs(SHM_ROOT)
+            if st.f_bavail * st.f_frsize >= SHM_MIN_FREE_MB * 1024 * 1024:
+                return SHM_ROOT
+    except OSError:
+        pass
+    return Path(tempfile.gettempdir())
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_stale_pool_dirs(root: Path) -> None:
+    try:
+        entries = list(root.iterdir())
+    except OSError:
+        return
+    for entry in entries:
+        m = _POOL_DIR_RE.match(entry.name)
+        if m and int(m.group(1)) != os.getpid() and not _pid_alive(int(m.group(1))):
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def _empty_dir(path: Path) -> bool:
+    """Remove everything inside path; False if something could not be removed."""
+    try:
+        for child in path.iterdir():
+            if child.is_dir() and not child.is_symlink():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
+    except OSError:
+        return False
+    return True
+
+
+class Workspace:
+    """
+    One run directory. Usable like tempfile.TemporaryDirectory (`name`,
+    `cleanup()`, context manager); cleanup() hands it back to the pool.
+    """
+
+    def __init__(self, path: Path, pool: "WorkspacePool") -> None:
+        self.path = path
+        self._pool: Optional[WorkspacePool] = pool
+
+    @property
+    def name(self) -> str:
+        return str(self.path)
+
+    def link_input(self, src: Path, name: Optional[str] = None) -> Path:
+        """src under `name` (default: its file name) in this workspace, linked rather than copied."""
+        dest = self.path / (name or src.name)
+        try:
+            os.link(src, dest)
+        except OSError:
+            try:
+                os.symlink(src.resolve(), dest)
+            except OSError:
+                shutil.copyfile(src, dest)
+        return dest
+
+    def cleanup(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.release(self.path)
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.cleanup()
+
+
+class WorkspacePool:
+    def __init__(self, root: Optional[Path] = None, pool_size: int = DEFAULT_POOL_SIZE) -> None:
+        self.root = root or default_workspace_root()
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._idle: List[Path] = []
+        self._count = 0
+        self._base: Optional[Path] = None
+
+    def _base_dir(self) -> Path:
+        # Called with the lock held.
+        if self._base is None or not self._base.is_dir():
+            self.root.mkdir(parents=True, exist_ok=True)
+            _remove_stale_pool_dirs(self.root)
+            self._base = Path(tempfile.mkdtemp(prefix=f"{POOL_DIR_PREFIX}{os.getpid()}_", dir=self.root))
+        return self._base
+
+    def acquire(self) -> Workspace:
+        with self._lock:
+            while self._idle:
+                path = self._idle.pop()
+                if path.is_dir():
+                    return Workspace(path, self)
+            self._count += 1
+            path = self._base_dir() / f"run_{self._count:05d}"
+        path.mkdir()
+        return Workspace(path, self)
+
+    def release(self, path: Path) -> None:
+        with self._lock:
+            keep = len(self._idle) < self.pool_size
+        if keep and _empty_dir(path):
+            with self._lock:
+                self._idle.append(path)
+            return
+        shutil.rmtree(path, ignore_errors=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            base, self._base = self._base, None
+            self._idle.clear()
+        if base is not None:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+_POOL: Optional[WorkspacePool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def workspace_pool() -> WorkspacePool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = WorkspacePool()
+            atexit.register(_POOL.shutdown)
+        return _POOL
+
+
+def run_workspace() -> Workspace:
+    """A fresh (or recycled, emptied) run directory from the process-wide pool."""
+    return workspace_pool().acquire()
+
+
+# -----------------------------
+# Configuration
+# -----------------------------
+
+def configure_workspaces(root: Optional[Path] = None, pool_size: Optional[int] = None) -> None:
+    """Replace the process-wide pool (call before any run starts)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
+        _POOL = WorkspacePool(root, DEFAULT_POOL_SIZE if pool_size is None else pool_size)
+        atexit.register(_POOL.shutdown)
+
+
+def add_workspace_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--workspace-root",
+        type=Path,
+        default=None,
+        help=f"Directory for planner run directories (default: {SHM_ROOT} with {SHM_MIN_FREE_MB} MB free, else the system temp dir).",
+    )
+    ap.add_argument(
+        "--workspace-pool-size",
+        type=int,
+        default=None,
+        help=f"Emptied run directories kept for reuse (default: {DEFAULT_POOL_SIZE}; 0 deletes each one).",
+    )
+
+
+def apply_workspace_args(args: argparse.Namespace) -> None:
+    if args.workspace_root is None and args.workspace_pool_size is None:
+        return
+    configure_workspaces(
+        root=args.workspace_root.resolve() if args.workspace_root else None,
+        pool_size=args.workspace_pool_size,
+    )